@@ -0,0 +1,35 @@
+"""reservation_overlap_exclusion
+
+Revision ID: 6c1f4a9d2e73
+Revises: 2b8a0d0b536b
+Create Date: 2026-10-19 10:12:41.218305
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '6c1f4a9d2e73'
+down_revision = '2b8a0d0b536b'
+branch_labels = None
+depends_on = None
+
+CONSTRAINT = 'ex_reservations_vehicle_overlap'
+
+
+def upgrade() -> None:
+    # PostgreSQL only: SQLite serializes bookings with BEGIN IMMEDIATE instead.
+    # Fails if live reservations already overlap; cancel those first.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.execute(
+        f"ALTER TABLE reservations ADD CONSTRAINT {CONSTRAINT} EXCLUDE USING gist "
+        f"(vehicle_id WITH =, tsrange(start_date, end_date) WITH &&) WHERE (status <> 'CANCELLED')"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(f'ALTER TABLE reservations DROP CONSTRAINT IF EXISTS {CONSTRAINT}')
@@ -7,6 +7,7 @@ os.environ['DISABLE_DATABASE_LOGGING'] = 'true'  # Disable Flask database loggin
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 from app.api.api import api_router
 from app.core.config import settings
@@ -30,6 +31,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses over COMPRESSION_MIN_BYTES (gzip; same threshold as the Flask app)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES,
+                       compresslevel=settings.COMPRESSION_LEVEL)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -0,0 +1,29 @@
+"""Fingerprinted static assets (see app/services/asset_service.py)"""
+import mimetypes
+import os
+from flask import Blueprint, abort, current_app, request, send_file
+from app.extensions import limiter
+from app.services.asset_service import AssetService, MAX_AGE
+
+asset_bp = Blueprint('assets', __name__)
+
+
+@asset_bp.route('/<path:filename>')
+@limiter.exempt
+def asset(filename):
+    """Send an asset by fingerprinted name, precompressed when accepted; cached as immutable"""
+    source = AssetService.source(filename)
+    if source is None:
+        abort(404)
+    mimetype = mimetypes.guess_type(source)[0] or 'application/octet-stream'
+    path, encoding = AssetService.variant(filename, request.accept_encodings)
+    if path is None:
+        path = os.path.join(current_app.static_folder, *source.split('/'))
+    # The fingerprint is the version: nothing to revalidate
+    response = send_file(path, mimetype=mimetype, conditional=False, etag=False, max_age=MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -8,7 +8,7 @@ from app.services.driver_service import DriverService
 from app.services.organization_service import OrganizationService
 from app.services.vehicle_assignment_service import VehicleAssignmentService
 from app.models.vehicle_driver_association import VehicleDriverAssociation
-from app.utils.organization_access import organization_protect
+from app.utils.organization_access import organization_protect, _current_user_org_id
 from app.models.vehicle_assignment import VehicleAssignment, AssignmentType, PaymentStatus
 from app.models.user import UserRole
 from app.extensions import db
@@ -81,23 +81,12 @@ def assign_vehicle():
             err_id = log_exception(e, __name__)
             flash(f'Error al asignar vehículo (id={err_id})', 'error')
 
-    # Filter vehicles and drivers by organization unit for non-admin users
-    if current_user.role in [UserRole.ADMIN, UserRole.FLEET_MANAGER]:
-        vehicles = VehicleService.get_all_vehicles()
-        drivers = DriverService.get_active_drivers()
-    else:
-        # Get organization unit from current user's driver profile
-        user_driver = current_user.driver
-        if user_driver:
-            organization_unit_id = user_driver.organization_unit_id
-            vehicles = VehicleService.get_all_vehicles(organization_unit_id=organization_unit_id)
-            drivers = DriverService.get_all_drivers(organization_unit_id=organization_unit_id)
-        else:
-            vehicles = []
-            drivers = []
-            flash('Usuario no asociado a ninguna unidad organizacional', 'warning')
+    # The pickers query /search/typeahead, which applies the same organization
+    # scoping (whole fleet for admins and fleet managers)
+    if current_user.role not in [UserRole.ADMIN, UserRole.FLEET_MANAGER] and not _current_user_org_id():
+        flash('Usuario no asociado a ninguna unidad organizacional', 'warning')
 
-    return render_template('assignments/form.html', vehicles=vehicles, drivers=drivers)
+    return render_template('assignments/form.html')
 
 @assignment_bp.route('/unassign/<int:assignment_id>', methods=['POST'])
 @login_required
@@ -136,17 +125,22 @@ def cesion_records():
     base_list_url = url_for('assignments.cesion_records')
     preserved_qs = urlencode(preserved_args) if preserved_args else ''
 
+    # ?status=OVERDUE etc. filters on the indexed status column kept by the status sweeper
+    status = PaymentStatus.__members__.get(request.args.get('status', ''))
+
     # Filter records by user's organization unless admin
     if current_user.role == UserRole.ADMIN:
-        all_records = VehicleAssignmentService.get_all_assignments()
+        all_records = VehicleAssignmentService.get_all_assignments(payment_status=status)
     else:
         user_driver = getattr(current_user, 'driver', None)
         if user_driver and user_driver.organization_unit_id:
-            all_records = [r for r in VehicleAssignmentService.get_all_assignments() if getattr(r, 'organization_unit_id', None) == user_driver.organization_unit_id]
+            all_records = VehicleAssignmentService.get_all_assignments(
+                payment_status=status, organization_unit_id=user_driver.organization_unit_id)
         else:
             all_records = []
     records, pagination = paginate_list(all_records, page=page, per_page=per_page)
-    return render_template('assignments/cesiones.html', records=records, pagination=pagination, base_list_url=base_list_url, preserved_qs=preserved_qs)
+    return render_template('assignments/cesiones.html', records=records, pagination=pagination, base_list_url=base_list_url, preserved_qs=preserved_qs,
+                           statuses=list(PaymentStatus), selected_status=status)
 
 @assignment_bp.route('/cesiones/<int:assignment_id>')
 @login_required
@@ -11,8 +11,11 @@ from app.services.authorization_service import AuthorizationService
 from app.services.vehicle_service import VehicleService
 from app.services.insurance_service import InsuranceService
 from app.services.driver_service import DriverService
+from app.services.typeahead_service import TypeaheadService
+from app.services.compliance_alert_service import ComplianceAlertService
 from app.utils.organization_access import organization_protect
-from app.utils.helpers import save_uploaded_file, parse_money
+from app.services.file_storage_service import FileStorageService
+from app.utils.helpers import parse_money
 from app.utils.error_helpers import log_exception
 from app.models.itv import ITVResult
 from app.models.tax import TaxType, PaymentStatus
@@ -27,36 +30,32 @@ compliance_bp = Blueprint('compliance', __name__)
 @login_required
 def compliance_dashboard():
     """Compliance dashboard"""
-    # Get statistics
-    expired_itvs = ITVService.get_expired_itvs()
-    expiring_itvs = ITVService.get_expiring_soon(30)
+    # Expiry alerts come precomputed from compliance_alerts (one grouped query)
+    ComplianceAlertService.scan_if_due()
+    alerts = ComplianceAlertService.summary(days=30)
     pending_taxes = TaxService.get_pending_taxes()
     overdue_taxes = TaxService.get_overdue_taxes()
     pending_fines = FineService.get_pending_fines()
     overdue_fines = FineService.get_overdue_fines()
-    # Get insurance statistics
-    expiring_insurances = InsuranceService.get_expiring_soon_insurances(30)
-    expired_insurances = InsuranceService.get_expired_insurances()
     pending_insurance_payments = InsuranceService.get_pending_insurances()
-    expiring_auths = AuthorizationService.get_expiring_soon(30)
     stats = {
-        'expired_itvs_count': len(expired_itvs),
-        'expiring_itvs_count': len(expiring_itvs),
+        'expired_itvs_count': alerts['itv']['expired'],
+        'expiring_itvs_count': alerts['itv']['expiring'],
         'pending_taxes_count': len(pending_taxes),
         'overdue_taxes_count': len(overdue_taxes),
         'pending_fines_count': len(pending_fines),
         'overdue_fines_count': len(overdue_fines),
-        'expiring_insurances_count': len(expiring_insurances),
-        'expired_insurances_count': len(expired_insurances),
+        'expiring_insurances_count': alerts['insurance']['expiring'],
+        'expired_insurances_count': alerts['insurance']['expired'],
         'pending_insurance_payments_count': len(pending_insurance_payments),
-        'expiring_auths_count': len(expiring_auths),
+        'expiring_auths_count': alerts['authorization']['expiring'],
         'total_pending_fines_amount': sum(f.amount for f in pending_fines),
         'total_pending_taxes_amount': sum(float(t.amount) for t in pending_taxes)
     }
     
     return render_template('compliance/dashboard.html', 
                          stats=stats,
-                         expired_itvs=expired_itvs[:5],
+                         upcoming_alerts=ComplianceAlertService.get_alerts(days=30, limit=10),
                          pending_fines=pending_fines[:5])
 @login_required
 def insurance_list():
@@ -139,8 +138,7 @@ def create_itv():
             err_id = log_exception(e, __name__)
             flash(f'Error al crear registro (id={err_id})', 'error')
     
-    vehicles = VehicleService.get_all_vehicles()
-    return render_template('compliance/itv_form.html', vehicles=vehicles, itv_results=ITVResult)
+    return render_template('compliance/itv_form.html', vehicle_label='', itv_results=ITVResult)
 
 # ============= Tax Routes =============
 @compliance_bp.route('/taxes')
@@ -160,9 +158,12 @@ def tax_records():
     base_list_url = url_for('compliance.tax_records')
     preserved_qs = urlencode(preserved_args) if preserved_args else ''
 
-    all_records = TaxService.get_all_taxes()
+    # ?status=OVERDUE etc. filters on the indexed status column kept by the status sweeper
+    status = PaymentStatus.__members__.get(request.args.get('status', ''))
+    all_records = TaxService.get_all_taxes(payment_status=status)
     records, pagination = paginate_list(all_records, page=page, per_page=per_page)
-    return render_template('compliance/taxes.html', records=records, pagination=pagination, base_list_url=base_list_url, preserved_qs=preserved_qs)
+    return render_template('compliance/taxes.html', records=records, pagination=pagination, base_list_url=base_list_url, preserved_qs=preserved_qs,
+                           statuses=list(PaymentStatus), selected_status=status)
 
 @compliance_bp.route('/taxes/<int:tax_id>')
 @login_required
@@ -285,13 +286,17 @@ def create_insurance():
                 raise ValueError('Formato de fecha inválido, use YYYY-MM-DD')
             # Handle file upload using helper and app config
             document = request.files.get('document')
+            document_ref = request.form.get('document_ref')
             document_path = None
-            if document and document.filename:
-                upload_dir = current_app.config.get('INSURANCE_UPLOAD_FOLDER')
+            if document_ref or (document and document.filename):
                 allowed_ext = current_app.config.get('INSURANCE_ALLOWED_EXTENSIONS')
                 max_bytes = current_app.config.get('INSURANCE_MAX_BYTES')
                 try:
-                    document_path, _ = save_uploaded_file(document, upload_dir, allowed_ext, max_bytes)
+                    if document_ref:
+                        # Sent beforehand by chunks (/files/uploads)
+                        document_path = FileStorageService.check_reference(document_ref, allowed_ext)
+                    else:
+                        document_path = FileStorageService.store(document, allowed_ext, max_bytes)
                 except UploadError as ue:
                     err_id = uuid.uuid4().hex[:8]
                     logging.getLogger(__name__).exception('Upload failed [%s]: %s', err_id, ue)
@@ -368,13 +373,17 @@ def edit_insurance(insurance_id):
 
             # Handle optional file upload via helper
             document = request.files.get('document')
+            document_ref = request.form.get('document_ref')
             document_path = None
-            if document and document.filename:
-                upload_dir = current_app.config.get('INSURANCE_UPLOAD_FOLDER')
+            if document_ref or (document and document.filename):
                 allowed_ext = current_app.config.get('INSURANCE_ALLOWED_EXTENSIONS')
                 max_bytes = current_app.config.get('INSURANCE_MAX_BYTES')
                 try:
-                    document_path, _ = save_uploaded_file(document, upload_dir, allowed_ext, max_bytes)
+                    if document_ref:
+                        # Sent beforehand by chunks (/files/uploads)
+                        document_path = FileStorageService.check_reference(document_ref, allowed_ext)
+                    else:
+                        document_path = FileStorageService.store(document, allowed_ext, max_bytes)
                 except UploadError as ue:
                     err_id = uuid.uuid4().hex[:8]
                     logging.getLogger(__name__).exception('Upload failed [%s]: %s', err_id, ue)
@@ -437,9 +446,12 @@ def fine_records():
     base_list_url = url_for('compliance.fine_records')
     preserved_qs = urlencode(preserved_args) if preserved_args else ''
 
-    all_records = FineService.get_all_fines()
+    # ?status=OVERDUE etc. filters on the indexed status column kept by the status sweeper
+    status = FineStatus.__members__.get(request.args.get('status', ''))
+    all_records = FineService.get_all_fines(status=status)
     records, pagination = paginate_list(all_records, page=page, per_page=per_page)
-    return render_template('compliance/fines.html', records=records, pagination=pagination, base_list_url=base_list_url, preserved_qs=preserved_qs)
+    return render_template('compliance/fines.html', records=records, pagination=pagination, base_list_url=base_list_url, preserved_qs=preserved_qs,
+                           statuses=list(FineStatus), selected_status=status)
 
 @compliance_bp.route('/fines/<int:fine_id>')
 @login_required
@@ -636,8 +648,8 @@ def edit_itv(record_id):
             err_id = log_exception(e, __name__)
             flash(f'Error al actualizar registro: (id={err_id})', 'error')
     
-    vehicles = VehicleService.get_all_vehicles()
-    return render_template('compliance/itv_form.html', record=record, vehicles=vehicles, itv_results=ITVResult)
+    return render_template('compliance/itv_form.html', record=record,
+                           vehicle_label=TypeaheadService.label_for(record.vehicle), itv_results=ITVResult)
 
 @compliance_bp.route('/itv/<int:record_id>/delete', methods=['POST'])
 @login_required
@@ -1,13 +1,14 @@
 """Driver controller"""
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, time, timedelta
 from calendar import monthrange
 from app.services.driver_service import DriverService
 from app.utils.organization_access import organization_protect
 from app.models.driver import Driver
 from app.services.organization_service import OrganizationService
 from app.services.reservation_service import ReservationService
+from app.services.reservation_series_service import ReservationSeriesService
 from app.services.auth_service import AuthService
 from app.models.driver import DriverType, DriverStatus
 from app.models.user import UserRole, User
@@ -277,6 +278,9 @@ def driver_dashboard():
     reservations = ReservationService.get_reservations_by_driver_and_date_range(
         driver.id, current_date, date(year, month, last_day)
     )
+    reservations = ReservationSeriesService.with_occurrences(
+        reservations, datetime.combine(current_date, time.min), datetime.combine(date(year, month, last_day), time.max),
+        driver_id=driver.id)
 
     # Group reservations by date
     reservations_by_date = {}
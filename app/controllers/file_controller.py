@@ -0,0 +1,140 @@
+"""Stored document downloads and resumable uploads (see app/services/file_storage_service.py
+and app/services/chunked_upload_service.py)"""
+import mimetypes
+import os
+from flask import Blueprint, abort, current_app, jsonify, request, send_file, url_for
+from flask_login import current_user, login_required
+from app.services.chunked_upload_service import ChunkedUploadService, UPLOAD_TARGETS
+from app.services.file_storage_service import FileStorageService, REF_PREFIX, document_url, parse_reference
+from app.utils.exceptions import UploadError, UploadOffsetError
+from app.utils.organization_access import can_access
+
+file_bp = Blueprint('files', __name__)
+
+# Content never changes under a hash: cache it privately for a year
+MAX_AGE = 365 * 24 * 3600
+
+
+@file_bp.route('/<string:name>')
+@login_required
+def download(name):
+    """Send a stored file; the hash is the ETag, Range and conditional requests are honoured"""
+    sha256 = parse_reference(REF_PREFIX + name)
+    stored = FileStorageService.get(sha256) if sha256 else None
+    if stored is None:
+        abort(404)
+    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    accel = current_app.config.get('FILE_STORAGE_ACCEL_REDIRECT')
+    if accel:
+        # nginx sends the body, and answers Range, from its internal location
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = f"{accel.rstrip('/')}/{FileStorageService.relative_path(sha256)}"
+    else:
+        path = FileStorageService.blob_path(sha256)
+        if not os.path.exists(path):
+            abort(404)
+        response = send_file(path, mimetype=mimetype, download_name=name, conditional=False, etag=False,
+                             max_age=MAX_AGE)
+    response.set_etag(sha256)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = MAX_AGE
+    # Offloaded bodies (X-Accel-Redirect, X-Sendfile): the web server slices ranges
+    if accel or current_app.config.get('USE_X_SENDFILE'):
+        return response.make_conditional(request)
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response.make_conditional(request, accept_ranges=True, complete_length=stored.size)
+
+
+# ---- resumable chunked uploads -----------------------------------------------
+
+def _upload_state(upload, status=200):
+    offset = ChunkedUploadService.offset(upload)
+    response = jsonify({'id': upload.id, 'size': upload.size, 'offset': offset,
+                        'chunk_size': current_app.config.get('CHUNKED_UPLOAD_CHUNK_BYTES'),
+                        'url': url_for('files.upload_chunk', upload_id=upload.id)})
+    response.status_code = status
+    response.headers['Upload-Offset'] = str(offset)
+    return response
+
+
+def _own_upload(upload_id):
+    upload = ChunkedUploadService.get_upload(upload_id, current_user.id)
+    if upload is None:
+        abort(404)
+    return upload
+
+
+@file_bp.route('/uploads', methods=['POST'])
+@login_required
+def start_upload():
+    """Open an upload: {"kind", "filename", "size", "record_id" (optional)}"""
+    payload = request.get_json(silent=True) or {}
+    kind = payload.get('kind')
+    record_id = payload.get('record_id')
+    try:
+        size = int(payload.get('size'))
+        record_id = int(record_id) if record_id is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'size y record_id deben ser enteros'}), 400
+    if record_id is not None and kind in UPLOAD_TARGETS:
+        record = ChunkedUploadService.get_target(kind, record_id)
+        if record is None:
+            return jsonify({'error': 'Registro no encontrado'}), 404
+        if not can_access(record):
+            return jsonify({'error': 'Acceso denegado: recurso fuera de tu unidad organizativa'}), 403
+    try:
+        upload = ChunkedUploadService.start(current_user.id, kind, payload.get('filename'), size, record_id)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    return _upload_state(upload, 201)
+
+
+@file_bp.route('/uploads/<string:upload_id>', methods=['GET'])
+@login_required
+def upload_status(upload_id):
+    """Where an upload stands: resume by sending the chunk that starts at ``offset``"""
+    return _upload_state(_own_upload(upload_id))
+
+
+@file_bp.route('/uploads/<string:upload_id>', methods=['PUT'])
+@login_required
+def upload_chunk(upload_id):
+    """Receive one chunk; the Upload-Offset header says where it starts"""
+    upload = _own_upload(upload_id)
+    if request.content_length is None:
+        return jsonify({'error': 'Falta la cabecera Content-Length'}), 411
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'error': 'Falta la cabecera Upload-Offset'}), 400
+    try:
+        ChunkedUploadService.write_chunk(upload, offset, request.stream, request.content_length)
+    except UploadOffsetError as e:
+        return jsonify({'error': str(e), 'offset': e.offset}), 409
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    return _upload_state(upload)
+
+
+@file_bp.route('/uploads/<string:upload_id>/finalize', methods=['POST'])
+@login_required
+def finalize_upload(upload_id):
+    """Validate and store the complete file; returns its document path"""
+    upload = _own_upload(upload_id)
+    try:
+        path = ChunkedUploadService.finalize(upload)
+    except UploadOffsetError as e:
+        return jsonify({'error': str(e), 'offset': e.offset}), 409
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'path': path, 'url': document_url(path)})
+
+
+@file_bp.route('/uploads/<string:upload_id>', methods=['DELETE'])
+@login_required
+def abort_upload(upload_id):
+    """Discard an upload"""
+    ChunkedUploadService.abort(_own_upload(upload_id))
+    return '', 204
@@ -0,0 +1,86 @@
+"""Bulk import controller (CSV/XLSX files of vehicles, drivers and compliance records)"""
+import csv
+import io
+from flask import Blueprint, Response, current_app, flash, render_template, request
+from flask_login import login_required, current_user
+from app.extensions import limiter
+from app.core.permissions import has_role
+from app.models.user import UserRole
+from app.services.bulk_import_service import BulkImportService, ENTITIES, read_rows, template_header
+from app.services.organization_service import OrganizationService
+from app.utils.error_helpers import log_exception
+from app.utils.organization_access import _current_user_org_id
+
+import_bp = Blueprint('imports', __name__)
+
+ENTITY_LABELS = {
+    'vehicles': 'Vehículos',
+    'drivers': 'Conductores',
+    'itv': 'ITV',
+    'insurances': 'Seguros',
+    'taxes': 'Impuestos',
+}
+
+
+def _render(report=None, entity='vehicles'):
+    is_admin = current_user.role == UserRole.ADMIN
+    return render_template('imports/index.html', report=report, entity=entity, entities=ENTITY_LABELS,
+                           organizations=OrganizationService.get_all_organizations() if is_admin else [],
+                           max_rows_shown=500)
+
+
+@import_bp.route('/', methods=['GET', 'POST'])
+@login_required
+@limiter.limit("30 per hour", methods=['POST'])
+@has_role(UserRole.ADMIN, UserRole.FLEET_MANAGER)
+def index():
+    """Upload form and, after a POST, the import report"""
+    if request.method == 'GET':
+        return _render()
+
+    entity = request.form.get('entity', '')
+    upload = request.files.get('file')
+    if entity not in ENTITIES or not upload or not upload.filename:
+        flash('Seleccione el tipo de datos y un fichero .csv o .xlsx', 'warning')
+        return _render(entity=entity if entity in ENTITIES else 'vehicles')
+    max_bytes = current_app.config.get('IMPORT_MAX_BYTES', 20 * 1024 * 1024)
+    if request.content_length and request.content_length > max_bytes:
+        flash(f'El fichero supera el máximo de {max_bytes // (1024 * 1024)} MB', 'warning')
+        return _render(entity=entity)
+
+    # Admins choose the default unit (rows may set organization_unit_code); others import into their own
+    if current_user.role == UserRole.ADMIN:
+        organization_unit_id = request.form.get('organization_unit_id', type=int)
+        locked = False
+    else:
+        organization_unit_id = _current_user_org_id()
+        locked = True
+        if not organization_unit_id:
+            flash('No estás asignado a una unidad organizativa', 'error')
+            return _render(entity=entity)
+
+    try:
+        report = BulkImportService.import_rows(
+            entity, read_rows(upload.stream, upload.filename), organization_unit_id=organization_unit_id,
+            lock_organization_unit=locked, dry_run=bool(request.form.get('dry_run')), created_by=current_user.id)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return _render(entity=entity)
+    except Exception as e:
+        err_id = log_exception(e, __name__)
+        flash(f'Error al importar el fichero (id={err_id})', 'error')
+        return _render(entity=entity)
+    return _render(report=report, entity=entity)
+
+
+@import_bp.route('/template/<entity>.csv')
+@login_required
+@has_role(UserRole.ADMIN, UserRole.FLEET_MANAGER)
+def template(entity):
+    """Empty CSV with the accepted columns of `entity`"""
+    if entity not in ENTITIES:
+        return Response('Tipo de importación no válido', status=404, mimetype='text/plain')
+    output = io.StringIO()
+    csv.writer(output).writerow(template_header(entity))
+    return Response(output.getvalue(), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename=plantilla_{entity}.csv'})
@@ -1,9 +1,10 @@
 """Main controller for general routes"""
 from flask import Blueprint, render_template, redirect, url_for, request
 from flask_login import login_required, current_user
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
 from calendar import monthrange
 from app.services.reservation_service import ReservationService
+from app.services.reservation_series_service import ReservationSeriesService
 from app.services.vehicle_service import VehicleService
 from app.services.maintenance_service import MaintenanceService
 from app.services.organization_service import OrganizationService
@@ -36,28 +37,7 @@ def dashboard():
         year += 1
 
     current_date = date(year, month, 1)
-    start_of_month = current_date
-    _, last_day = monthrange(year, month)
-    end_of_month = date(year, month, last_day)
-
-    reservations = ReservationService.get_reservations_by_date_range(start_of_month, end_of_month)
-
-    # Ensure relationships are loaded
-    for reservation in reservations:
-        # Access relationships to trigger lazy loading
-        _ = reservation.vehicle
-        _ = reservation.driver
-
-    # Group reservations by date
-    reservations_by_date = {}
-    for res in reservations:
-        res_date = res.start_date.date()
-        if res_date not in reservations_by_date:
-            reservations_by_date[res_date] = []
-        reservations_by_date[res_date].append(res)
-
-    # Generate calendar with proper week alignment
-    calendar_data = generate_calendar_grid(year, month, reservations_by_date)
+    calendar_data = month_calendar(year, month)
 
     return render_template('dashboard.html',
                          user=current_user,
@@ -84,11 +64,24 @@ def calendar():
         year += 1
 
     current_date = date(year, month, 1)
-    start_of_month = current_date
+
+    # The grid is a cached fragment: the reservations are only loaded on a miss
+    return render_template('main/calendar.html',
+                         load_calendar=lambda: month_calendar(year, month),
+                         current_month=current_date,
+                         today=today)
+
+
+def month_calendar(year, month):
+    """Calendar grid of a month with its reservations, recurring occurrences included"""
+    start_of_month = date(year, month, 1)
     _, last_day = monthrange(year, month)
     end_of_month = date(year, month, last_day)
 
     reservations = ReservationService.get_reservations_by_date_range(start_of_month, end_of_month)
+    # Occurrences of recurring reservations are expanded for this month only
+    reservations = ReservationSeriesService.with_occurrences(
+        reservations, datetime.combine(start_of_month, time.min), datetime.combine(end_of_month, time.max))
 
     # Ensure relationships are loaded
     for reservation in reservations:
@@ -105,12 +98,7 @@ def calendar():
         reservations_by_date[res_date].append(res)
 
     # Generate calendar with proper week alignment
-    calendar_data = generate_calendar_grid(year, month, reservations_by_date)
-
-    return render_template('main/calendar.html',
-                         calendar_data=calendar_data,
-                         current_month=current_date,
-                         today=today)
+    return generate_calendar_grid(year, month, reservations_by_date)
 
 def generate_calendar_grid(year, month, reservations_by_date):
     """Generate a proper calendar grid for the month"""
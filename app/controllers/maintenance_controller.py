@@ -2,7 +2,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required
 from datetime import datetime
-from app.utils.helpers import parse_money
+from app.utils.helpers import parse_money, stream_page
 from app.services.maintenance_service import MaintenanceService
 from app.utils.organization_access import organization_protect
 from app.services.vehicle_service import VehicleService
@@ -34,7 +34,7 @@ def list_maintenance():
 
     all_records = MaintenanceService.get_all_maintenance_records()
     records, pagination = paginate_list(all_records, page=page, per_page=per_page)
-    return render_template('maintenance/list.html', records=records, pagination=pagination, base_list_url=base_list_url, preserved_qs=preserved_qs)
+    return stream_page('maintenance/list.html', records=records, pagination=pagination, base_list_url=base_list_url, preserved_qs=preserved_qs)
 
 @maintenance_bp.route('/<int:record_id>')
 @login_required
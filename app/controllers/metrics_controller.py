@@ -0,0 +1,26 @@
+"""Metrics controller (Prometheus text exposition)"""
+import hmac
+from flask import Blueprint, Response, request, current_app, abort
+from app.extensions import limiter
+from app.services.metrics_service import Metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics')
+@limiter.exempt
+def metrics():
+    """Expose request, database and audit metrics for scraping"""
+    if not Metrics.is_enabled():
+        abort(404)
+
+    # Bearer token, mandatory outside development and testing: the scrape
+    # exposes endpoint names, per-table SQL activity and pool state
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token and not (current_app.debug or current_app.testing):
+        abort(404)
+    if token:
+        provided = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(provided, f'Bearer {token}'):
+            abort(403)
+
+    return Response(Metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
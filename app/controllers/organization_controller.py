@@ -1,5 +1,6 @@
 """Organization controller"""
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+import traceback
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, make_response
 from flask_login import login_required, current_user
 from app.services.organization_service import OrganizationService
 from app.models.organization import OrganizationUnit
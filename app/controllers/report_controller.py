@@ -0,0 +1,130 @@
+"""Report controller (fleet analytics pages and their JSON API)"""
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode
+from flask import Blueprint, abort, render_template, request, jsonify
+from flask_login import login_required, current_user
+from app.extensions import limiter
+from app.core.permissions import has_role
+from app.models.user import UserRole
+from app.services.organization_service import OrganizationService
+from app.services.utilization_service import UtilizationService
+from app.services.vehicle_cost_service import VehicleCostService, GROUPINGS
+from app.utils.organization_access import _current_user_org_id
+from app.utils.pagination import paginate_list
+
+report_bp = Blueprint('reports', __name__)
+
+# Default report windows when no dates are given
+DEFAULT_PERIOD_DAYS = 30
+DEFAULT_COST_MONTHS = 12
+
+_COST_SCOPE_ERROR = 'Periodo o agrupación no válidos: meses AAAA-MM (inicio anterior al final) y by=month|vehicle|organization_unit'
+
+
+def _can_pick_unit() -> bool:
+    return current_user.role in (UserRole.ADMIN, UserRole.FLEET_MANAGER)
+
+
+def _report_org_unit():
+    """Admins and fleet managers may pick any unit (?org_unit=<id>) or the whole fleet; everyone else sees their own"""
+    if _can_pick_unit():
+        return request.args.get('org_unit', type=int)
+    organization_unit_id = _current_user_org_id()
+    if organization_unit_id is None:
+        # None would mean the whole fleet: a scoped user without a unit has no report
+        abort(403)
+    return organization_unit_id
+
+
+def _report_scope():
+    """(start, end, organization_unit_id) from ?start=YYYY-MM-DD&end=YYYY-MM-DD&org_unit=<id>; `end` is inclusive"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    end = datetime.strptime(request.args['end'], '%Y-%m-%d') if request.args.get('end') else today
+    start = (datetime.strptime(request.args['start'], '%Y-%m-%d') if request.args.get('start')
+             else end - timedelta(days=DEFAULT_PERIOD_DAYS - 1))
+    return start, end + timedelta(days=1), _report_org_unit()
+
+
+def _cost_scope():
+    """(start month, end month, by) from ?start=YYYY-MM&end=YYYY-MM&by=month|vehicle|organization_unit"""
+    today = datetime.utcnow().date()
+    end = datetime.strptime(request.args['end'], '%Y-%m').date() if request.args.get('end') else today.replace(day=1)
+    if request.args.get('start'):
+        start = datetime.strptime(request.args['start'], '%Y-%m').date()
+    else:
+        months = end.year * 12 + end.month - DEFAULT_COST_MONTHS
+        start = date(months // 12, months % 12 + 1, 1)
+    if end < start:
+        raise ValueError('end before start')
+    return start, end, request.args.get('by', 'month')
+
+
+@report_bp.route('/utilization')
+@login_required
+@has_role(UserRole.ADMIN, UserRole.FLEET_MANAGER, UserRole.OPERATIONS_MANAGER)
+def utilization():
+    """Utilization, idle time, km, booking lead time and no-shows per vehicle and unit"""
+    try:
+        start, end, organization_unit_id = _report_scope()
+        report = UtilizationService.report(start, end, organization_unit_id=organization_unit_id)
+        error = None
+    except ValueError:
+        start = end = organization_unit_id = report = None
+        error = 'Periodo no válido: use fechas AAAA-MM-DD con el inicio anterior al final'
+    try:
+        page = int(request.args.get('page', 1))
+    except ValueError:
+        page = 1
+    vehicles, pagination = paginate_list(report['vehicles'] if report else [], page=page, per_page=50)
+    preserved_args = {k: v for k, v in request.args.items() if k != 'page'}
+    preserved_qs = urlencode(preserved_args) if preserved_args else ''
+    return render_template('reports/utilization.html', report=report, vehicles=vehicles, pagination=pagination,
+                           error=error, start=start, end=end - timedelta(days=1) if end else None,
+                           organization_unit_id=organization_unit_id, preserved_qs=preserved_qs,
+                           organizations=OrganizationService.get_all_organizations() if _can_pick_unit() else [])
+
+
+@report_bp.route('/utilization.json')
+@login_required
+@limiter.limit("300 per hour")
+@has_role(UserRole.ADMIN, UserRole.FLEET_MANAGER, UserRole.OPERATIONS_MANAGER)
+def utilization_json():
+    """Same report as JSON: {period, fleet, organization_units: [...], vehicles: [...]}"""
+    try:
+        start, end, organization_unit_id = _report_scope()
+        return jsonify(UtilizationService.report(start, end, organization_unit_id=organization_unit_id))
+    except ValueError:
+        return jsonify({'error': 'Periodo no válido: use fechas AAAA-MM-DD con el inicio anterior al final'}), 400
+
+
+@report_bp.route('/costs')
+@login_required
+@has_role(UserRole.ADMIN, UserRole.FLEET_MANAGER, UserRole.OPERATIONS_MANAGER)
+def costs():
+    """Total cost of ownership by month, vehicle or organization unit and category"""
+    try:
+        start, end, by = _cost_scope()
+        report = VehicleCostService.report(start, end, by, organization_unit_id=_report_org_unit(),
+                                           vehicle_id=request.args.get('vehicle_id', type=int))
+        error = None
+    except ValueError:
+        start = end = report = None
+        by = 'month'
+        error = _COST_SCOPE_ERROR
+    return render_template('reports/costs.html', report=report, error=error, start=start, end=end, by=by,
+                           groupings=GROUPINGS, organization_unit_id=_report_org_unit(),
+                           organizations=OrganizationService.get_all_organizations() if _can_pick_unit() else [])
+
+
+@report_bp.route('/costs.json')
+@login_required
+@limiter.limit("300 per hour")
+@has_role(UserRole.ADMIN, UserRole.FLEET_MANAGER, UserRole.OPERATIONS_MANAGER)
+def costs_json():
+    """Same report as JSON: {start, end, by, rows: [{key, label, categories, total}], categories, total}"""
+    try:
+        start, end, by = _cost_scope()
+        return jsonify(VehicleCostService.report(start, end, by, organization_unit_id=_report_org_unit(),
+                                                 vehicle_id=request.args.get('vehicle_id', type=int)))
+    except ValueError:
+        return jsonify({'error': _COST_SCOPE_ERROR}), 400
@@ -1,17 +1,27 @@
 """Reservation controller"""
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.services.reservation_service import ReservationService
+from app.services.allocation_service import AllocationService
+from app.services.reservation_series_service import ReservationSeriesService
+from app.services.reservation_suggestion_service import ReservationSuggestionService
+from app.services.typeahead_service import TypeaheadService
 from app.services.vehicle_service import VehicleService
-from app.services.driver_service import DriverService
 from app.utils.organization_access import organization_protect
 from app.models.reservation import ReservationStatus
+from app.models.reservation_series import SeriesFrequency
 from app.models.user import UserRole
 from app.utils.error_helpers import log_exception
+from app.utils.exceptions import ReservationConflictError
+from app.db.reservation_overlap import is_overlap_violation
+from sqlalchemy.exc import IntegrityError
 from app.services.reservation_service import ReservationService as RService
 from urllib.parse import urlencode
 from app.core.permissions import has_role, has_permission
+from app.extensions import limiter
+from app.utils.organization_access import _current_user_org_id
+from app.utils.helpers import stream_page
 
 reservation_bp = Blueprint('reservations', __name__)
 
@@ -71,7 +81,7 @@ def list_reservations():
     reservations = pagination.items if hasattr(pagination, 'items') else []
     is_date_filtered = date_str is not None
     filtered_date = day if date_str else None
-    return render_template('reservations/list.html', reservations=reservations, pagination=pagination, preserved_args=preserved_args, base_list_url=base_list_url, preserved_qs=preserved_qs, is_date_filtered=is_date_filtered, filtered_date=filtered_date)
+    return stream_page('reservations/list.html', reservations=reservations, pagination=pagination, preserved_args=preserved_args, base_list_url=base_list_url, preserved_qs=preserved_qs, is_date_filtered=is_date_filtered, filtered_date=filtered_date)
 
 @reservation_bp.route('/<int:reservation_id>')
 @login_required
@@ -84,6 +94,64 @@ def view_reservation(reservation_id):
         return redirect(url_for('reservations.list_reservations'))
     return render_template('reservations/detail.html', reservation=reservation)
 
+def _picker_context(reservation=None):
+    """Vehicle/driver picker values of the form; options come from /search/typeahead"""
+    context = {
+        'vehicle_label': TypeaheadService.label_for(reservation.vehicle) if reservation else '',
+        'driver_label': TypeaheadService.label_for(reservation.driver) if reservation else '',
+        'driver_options': None,
+    }
+    # Drivers can only book for themselves
+    if current_user.role == UserRole.DRIVER:
+        drivers = [current_user.driver] if current_user.driver else []
+        context['driver_options'] = [{'id': d.id, 'label': TypeaheadService.label_for(d)} for d in drivers]
+    return context
+
+
+def _conflict_page(error, action, vehicle_id, start_date, end_date, reservation=None):
+    """Conflict page for a rejected create/edit, with the nearest free slots and equivalent free vehicles"""
+    data = dict(
+        vehicle_id=vehicle_id,
+        driver_id=request.form.get('driver_id'),
+        start_date=request.form.get('start_date'),
+        end_date=request.form.get('end_date'),
+        purpose=request.form.get('purpose'),
+        destination=request.form.get('destination'),
+        notes=request.form.get('notes')
+    )
+    conflict = ReservationService.get_reservation_by_id(error.reservation_id) if error.reservation_id else None
+    series = ReservationSeriesService.get_series_by_id(error.series_id) if error.series_id else None
+    suggestions = ReservationSuggestionService.suggest(
+        vehicle_id, start_date, end_date, exclude_reservation_id=reservation.id if reservation else None)
+    return render_template('reservations/conflict.html', conflict=conflict, series=series, data=data, action=action,
+                           suggestions=suggestions, reservation=reservation)
+
+
+@reservation_bp.route('/batch', methods=['POST'])
+@login_required
+@limiter.limit("60 per hour")
+@has_role(UserRole.ADMIN, UserRole.FLEET_MANAGER, UserRole.OPERATIONS_MANAGER)
+def create_reservations_batch():
+    """Create many reservations from JSON: {"reservations": [...], "all_or_nothing": false} or a list"""
+    payload = request.get_json(silent=True)
+    items = payload.get('reservations') if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        return jsonify({'error': 'Se espera una lista de reservas (JSON)'}), 400
+    # Only admins book for other units; everyone else books for their own
+    if current_user.role != UserRole.ADMIN:
+        items = [dict(item, organization_unit_id=_current_user_org_id()) if isinstance(item, dict) else item
+                 for item in items]
+    try:
+        result = ReservationService.create_reservations_batch(
+            items, user_id=current_user.id, organization_unit_id=_current_user_org_id(),
+            all_or_nothing=bool(isinstance(payload, dict) and payload.get('all_or_nothing')))
+    except ReservationConflictError as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+
 @reservation_bp.route('/new', methods=['GET', 'POST'])
 @login_required
 def create_reservation():
@@ -122,36 +190,15 @@ def create_reservation():
             )
             flash('Reserva creada exitosamente', 'success')
             return redirect(url_for('reservations.view_reservation', reservation_id=reservation.id))
+        except ReservationConflictError as e:
+            return _conflict_page(e, 'create', vehicle_id, start_date, end_date)
         except ValueError as ve:
-            # overlap detected - try to extract the conflicting reservation id from the message
-            msg = str(ve)
-            import re
-            m = re.search(r'id=(\d+)', msg)
-            conflict = None
-            if m:
-                conflict = ReservationService.get_reservation_by_id(int(m.group(1)))
-            data = dict(
-                vehicle_id=vehicle_id,
-                driver_id=driver_id,
-                start_date=request.form.get('start_date'),
-                end_date=request.form.get('end_date'),
-                purpose=request.form.get('purpose'),
-                destination=request.form.get('destination'),
-                notes=request.form.get('notes')
-            )
-            return render_template('reservations/conflict.html', conflict=conflict, data=data, action='create')
+            flash(str(ve), 'error')
         except Exception as e:
             err_id = log_exception(e, __name__)
             flash(f'Error al crear reserva (id={err_id})', 'error')
     
-    vehicles = VehicleService.get_available_vehicles()
-    drivers = DriverService.get_active_drivers()
-    
-    # If user is a driver, only show themselves as driver option
-    if current_user.role == UserRole.DRIVER:
-        drivers = [current_user.driver] if current_user.driver else []
-    
-    return render_template('reservations/form.html', vehicles=vehicles, drivers=drivers)
+    return render_template('reservations/form.html', **_picker_context())
 
 
 @reservation_bp.route('/<int:reservation_id>/edit', methods=['GET', 'POST'])
@@ -183,33 +230,15 @@ def edit_reservation(reservation_id):
             ReservationService.update_reservation(reservation_id, **update_kwargs)
             flash('Reserva actualizada exitosamente', 'success')
             return redirect(url_for('reservations.view_reservation', reservation_id=reservation_id))
+        except ReservationConflictError as e:
+            return _conflict_page(e, 'edit', update_kwargs['vehicle_id'], start_date, end_date, reservation=reservation)
         except ValueError as ve:
-            msg = str(ve)
-            import re
-            m = re.search(r'id=(\d+)', msg)
-            conflict = None
-            if m:
-                conflict = ReservationService.get_reservation_by_id(int(m.group(1)))
-            data = dict(
-                vehicle_id=request.form.get('vehicle_id'),
-                driver_id=request.form.get('driver_id'),
-                start_date=request.form.get('start_date'),
-                end_date=request.form.get('end_date'),
-                purpose=request.form.get('purpose'),
-                destination=request.form.get('destination'),
-                notes=request.form.get('notes')
-            )
-            return render_template('reservations/conflict.html', conflict=conflict, data=data, action='edit')
+            flash(str(ve), 'error')
         except Exception as e:
             err_id = log_exception(e, __name__)
             flash(f'Error al actualizar reserva (id={err_id})', 'error')
 
-    vehicles = VehicleService.get_available_vehicles()
-    drivers = DriverService.get_active_drivers()
-    if current_user.role == UserRole.DRIVER:
-        drivers = [current_user.driver] if current_user.driver else []
-
-    return render_template('reservations/form.html', vehicles=vehicles, drivers=drivers, reservation=reservation)
+    return render_template('reservations/form.html', reservation=reservation, **_picker_context(reservation))
 
 
 @reservation_bp.route('/requests/<int:reservation_id>/change', methods=['POST'])
@@ -256,6 +285,16 @@ def force_reservation():
         _db.session.commit()
         flash('Reserva forzada creada correctamente', 'success')
         return redirect(url_for('reservations.view_reservation', reservation_id=r.id))
+    except IntegrityError as e:
+        _db.session.rollback()
+        if is_overlap_violation(e):
+            # The database enforces the overlap exclusion (PostgreSQL): not even admins can double-book
+            flash('La base de datos no admite reservas solapadas del mismo vehículo; cancele antes la reserva '
+                  'conflictiva', 'error')
+        else:
+            err_id = log_exception(e, __name__)
+            flash(f'Error al forzar reserva (id={err_id})', 'error')
+        return redirect(url_for('reservations.list_reservations'))
     except Exception as e:
         err_id = log_exception(e, __name__)
         flash(f'Error al forzar reserva (id={err_id})', 'error')
@@ -324,3 +363,199 @@ def cancel_reservation(reservation_id):
     else:
         flash('Error al cancelar reserva', 'error')
     return redirect(url_for('reservations.view_reservation', reservation_id=reservation_id))
+
+
+# Weekday checkboxes of the series form (0 = Monday)
+WEEKDAY_NAMES = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+# Weeks of occurrences shown on the series detail page
+SERIES_PREVIEW_WEEKS = 8
+
+
+@reservation_bp.route('/series')
+@login_required
+def list_series():
+    """Active recurring reservations (drivers see their own, managers those of their unit)"""
+    if current_user.role == UserRole.DRIVER:
+        driver = current_user.driver
+        series = ReservationSeriesService.list_series(driver_id=driver.id) if driver else []
+    elif current_user.role == UserRole.ADMIN:
+        series = ReservationSeriesService.list_series()
+    else:
+        series = ReservationSeriesService.list_series(organization_unit_id=_current_user_org_id())
+    return render_template('reservations/series_list.html', series_list=series)
+
+
+@reservation_bp.route('/series/new', methods=['GET', 'POST'])
+@login_required
+def create_series():
+    """Create a recurring reservation"""
+    if request.method == 'POST':
+        try:
+            start_date = datetime.strptime(request.form.get('start_date'), '%Y-%m-%dT%H:%M')
+            end_date = datetime.strptime(request.form.get('end_date'), '%Y-%m-%dT%H:%M')
+            until = request.form.get('until')
+            count = request.form.get('count')
+            if current_user.role == UserRole.DRIVER:
+                if not current_user.driver:
+                    raise ValueError('No se encontró conductor asociado')
+                driver_id = current_user.driver.id
+                organization_unit_id = current_user.driver.organization_unit_id
+            else:
+                driver_id = int(request.form.get('driver_id'))
+                organization_unit_id = _current_user_org_id()
+            series = ReservationSeriesService.create_series(
+                vehicle_id=int(request.form.get('vehicle_id')),
+                driver_id=driver_id,
+                start_date=start_date,
+                end_date=end_date,
+                frequency=request.form.get('frequency'),
+                interval=int(request.form.get('interval') or 1),
+                weekdays=[int(day) for day in request.form.getlist('weekdays')],
+                # The end date is inclusive: occurrences starting any time that day are kept
+                until=datetime.strptime(until, '%Y-%m-%d').replace(hour=23, minute=59) if until else None,
+                count=int(count) if count else None,
+                purpose=request.form.get('purpose'),
+                destination=request.form.get('destination'),
+                notes=request.form.get('notes'),
+                user_id=current_user.id,
+                organization_unit_id=organization_unit_id,
+                skip_conflicts=bool(request.form.get('skip_conflicts')),
+            )
+            skipped = len(series.overrides)
+            flash('Reserva periódica creada' + (f' ({skipped} ocurrencias omitidas por conflicto)' if skipped else ''),
+                  'success')
+            return redirect(url_for('reservations.view_series', series_id=series.id))
+        except (TypeError, ValueError) as e:
+            flash(str(e) if isinstance(e, ValueError) else 'Faltan datos obligatorios', 'error')
+        except Exception as e:
+            err_id = log_exception(e, __name__)
+            flash(f'Error al crear la reserva periódica (id={err_id})', 'error')
+    return render_template('reservations/series_form.html', frequencies=list(SeriesFrequency),
+                           weekday_names=WEEKDAY_NAMES, form=request.form, **_picker_context())
+
+
+@reservation_bp.route('/series/<int:series_id>')
+@login_required
+@organization_protect(loader=ReservationSeriesService.get_series_by_id, id_arg='series_id')
+def view_series(series_id):
+    """Series details with the occurrences of the next weeks"""
+    series = ReservationSeriesService.get_series_by_id(series_id)
+    if not series:
+        flash('Reserva periódica no encontrada', 'error')
+        return redirect(url_for('reservations.list_series'))
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    occurrences = ReservationSeriesService.upcoming(series, start, start + timedelta(weeks=SERIES_PREVIEW_WEEKS))
+    return render_template('reservations/series_detail.html', series=series, occurrences=occurrences,
+                           weekday_names=WEEKDAY_NAMES)
+
+
+@reservation_bp.route('/series/<int:series_id>/skip', methods=['POST'])
+@login_required
+@organization_protect(loader=ReservationSeriesService.get_series_by_id, id_arg='series_id')
+def skip_series_occurrence(series_id):
+    """Skip one occurrence (occurrence=YYYY-MM-DDTHH:MM)"""
+    try:
+        occurrence = datetime.strptime(request.form.get('occurrence', ''), '%Y-%m-%dT%H:%M')
+        ReservationSeriesService.skip_occurrence(series_id, occurrence)
+        flash('Ocurrencia omitida', 'success')
+    except ValueError as e:
+        flash(str(e), 'error')
+    return redirect(url_for('reservations.view_series', series_id=series_id))
+
+
+@reservation_bp.route('/series/<int:series_id>/cancel', methods=['POST'])
+@login_required
+@organization_protect(loader=ReservationSeriesService.get_series_by_id, id_arg='series_id')
+def cancel_series(series_id):
+    """Cancel the series and its reservations that have not started"""
+    if ReservationSeriesService.cancel_series(series_id):
+        flash('Reserva periódica cancelada', 'success')
+    else:
+        flash('Reserva periódica no encontrada', 'error')
+    return redirect(url_for('reservations.list_series'))
+
+
+@reservation_bp.route('/allocation/requests', methods=['POST'])
+@login_required
+@limiter.limit("60 per hour")
+def create_vehicle_requests():
+    """Request vehicles without choosing one: {"requests": [...], "allocate": true}; drivers request for themselves"""
+    payload = request.get_json(silent=True)
+    items = payload.get('requests') if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        return jsonify({'error': 'Se espera una lista de solicitudes (JSON)'}), 400
+    if current_user.role == UserRole.DRIVER:
+        if not current_user.driver:
+            return jsonify({'error': 'No se encontró conductor asociado'}), 400
+        items = [dict(item, driver_id=current_user.driver.id,
+                      organization_unit_id=current_user.driver.organization_unit_id)
+                 if isinstance(item, dict) else item for item in items]
+    elif current_user.role != UserRole.ADMIN:
+        items = [dict(item, organization_unit_id=_current_user_org_id()) if isinstance(item, dict) else item
+                 for item in items]
+    try:
+        requests = AllocationService.create_requests(items, user_id=current_user.id,
+                                                     organization_unit_id=_current_user_org_id())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    result = {'requests': [r.id for r in requests]}
+    if not isinstance(payload, dict) or payload.get('allocate', True):
+        result['allocation'] = AllocationService.allocate_pending(request_ids=result['requests'])
+    return jsonify(result)
+
+
+@reservation_bp.route('/allocation/run', methods=['POST'])
+@login_required
+@limiter.limit("60 per hour")
+@has_role(UserRole.ADMIN, UserRole.FLEET_MANAGER, UserRole.OPERATIONS_MANAGER)
+def run_allocation():
+    """Allocate vehicles to the pending requests (of ?date=YYYY-MM-DD, or all); JSON or back to the calendar"""
+    payload = (request.get_json(silent=True) or {}) if request.is_json else request.form
+    day = payload.get('date')
+    try:
+        start = datetime.strptime(day, '%Y-%m-%d') if day else None
+    except ValueError:
+        start = None
+    result = AllocationService.allocate_pending(start=start, end=start + timedelta(days=1) if start else None,
+                                                dry_run=bool(request.is_json and payload.get('dry_run')))
+    if request.is_json:
+        return jsonify(result)
+    flash(f"Asignación automática: {result['allocated']} de {result['requests']} solicitudes con vehículo"
+          + (f", {result['unassigned']} sin vehículo disponible" if result['unassigned'] else ''),
+          'success' if not result['unassigned'] else 'warning')
+    return redirect(request.referrer or url_for('main.calendar'))
+
+
+@reservation_bp.route('/allocation/from-conflict', methods=['POST'])
+@login_required
+def allocate_from_conflict():
+    """From the conflict page: ask for any free vehicle of the same type instead of the one chosen"""
+    try:
+        vehicle = VehicleService.get_vehicle_by_id(int(request.form.get('vehicle_id')))
+        if current_user.role == UserRole.DRIVER:
+            driver_id = current_user.driver.id
+            organization_unit_id = current_user.driver.organization_unit_id
+        else:
+            driver_id = int(request.form.get('driver_id'))
+            organization_unit_id = vehicle.organization_unit_id if vehicle else None
+        vehicle_request = AllocationService.create_requests([{
+            'driver_id': driver_id,
+            'start_date': datetime.strptime(request.form.get('start_date'), '%Y-%m-%dT%H:%M'),
+            'end_date': datetime.strptime(request.form.get('end_date'), '%Y-%m-%dT%H:%M'),
+            'vehicle_type': vehicle.vehicle_type.value if vehicle else None,
+            'organization_unit_id': organization_unit_id,
+            'purpose': request.form.get('purpose'),
+            'destination': request.form.get('destination'),
+            'notes': request.form.get('notes'),
+        }], user_id=current_user.id)[0]
+        AllocationService.allocate_pending(request_ids=[vehicle_request.id])
+        if vehicle_request.reservation_id:
+            flash(f'Vehículo asignado automáticamente: {vehicle_request.reservation.vehicle.license_plate}', 'success')
+            return redirect(url_for('reservations.view_reservation', reservation_id=vehicle_request.reservation_id))
+        flash('No hay otro vehículo libre ahora; la solicitud queda pendiente de asignación', 'warning')
+    except (TypeError, ValueError) as e:
+        flash(str(e) if isinstance(e, ValueError) else 'Faltan datos obligatorios', 'error')
+    except Exception as e:
+        err_id = log_exception(e, __name__)
+        flash(f'Error en la asignación automática (id={err_id})', 'error')
+    return redirect(url_for('reservations.list_reservations'))
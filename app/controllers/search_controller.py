@@ -0,0 +1,79 @@
+"""Search controller"""
+from flask import Blueprint, request, jsonify, url_for
+from flask_login import login_required, current_user
+from app.extensions import limiter
+from app.models.user import UserRole
+from app.services.search_service import SearchService
+from app.services.typeahead_service import TypeaheadService
+from app.utils.organization_access import _current_user_org_id
+
+search_bp = Blueprint('search', __name__)
+
+# Roles allowed to see providers (same as the provider pages)
+PROVIDER_ROLES = (UserRole.ADMIN, UserRole.FLEET_MANAGER, UserRole.OPERATIONS_MANAGER)
+
+_DETAIL_ENDPOINTS = {
+    'vehicle': ('vehicles.view_vehicle', 'vehicle_id'),
+    'driver': ('drivers.view_driver', 'driver_id'),
+    'provider': ('providers.view_provider', 'provider_id'),
+}
+
+
+@search_bp.route('/')
+@login_required
+@limiter.limit("300 per hour")
+def search():
+    """Ranked JSON search: ?q=<term>&types=vehicle,driver,provider&org_unit=<id>&page=1&per_page=20"""
+    try:
+        page = int(request.args.get('page', 1))
+    except ValueError:
+        page = 1
+    try:
+        per_page = int(request.args.get('per_page', 20))
+    except ValueError:
+        per_page = 20
+
+    types = [t.strip() for t in request.args.get('types', 'vehicle,driver,provider').split(',') if t.strip()]
+    if current_user.role not in PROVIDER_ROLES and not current_user.is_superuser:
+        types = [t for t in types if t != 'provider']
+
+    # Non-admin users only search their own organization unit
+    if current_user.role == UserRole.ADMIN:
+        organization_unit_id = request.args.get('org_unit', type=int)
+    else:
+        organization_unit_id = _current_user_org_id()
+        if organization_unit_id is None:
+            # Without a unit there is nothing to scope to: no results rather than every unit
+            return jsonify(SearchService.search('', types=types, page=page, per_page=per_page))
+
+    result = SearchService.search(request.args.get('q', ''), types=types,
+                                  organization_unit_id=organization_unit_id, page=page, per_page=per_page)
+    for item in result['results']:
+        endpoint, id_arg = _DETAIL_ENDPOINTS[item['type']]
+        item['url'] = url_for(endpoint, **{id_arg: item['id']})
+    return jsonify(result)
+
+
+@search_bp.route('/typeahead')
+@login_required
+@limiter.limit("2000 per hour")
+def typeahead():
+    """Prefix autocomplete for form pickers: ?type=vehicle|driver&q=<prefix>&limit=10&available=1"""
+    kind = request.args.get('type', 'vehicle')
+    if kind not in ('vehicle', 'driver'):
+        return jsonify({'error': 'Tipo no soportado'}), 400
+    limit = request.args.get('limit', 10, type=int) or 10
+
+    # Same visibility as the forms: admins and fleet managers pick from the
+    # whole fleet, everyone else from their organization unit
+    if current_user.role in (UserRole.ADMIN, UserRole.FLEET_MANAGER):
+        organization_unit_id = None
+    else:
+        organization_unit_id = _current_user_org_id()
+        if organization_unit_id is None:
+            # As the forms did: a scoped role without a unit has nothing to pick from
+            return jsonify({'results': []})
+
+    results = TypeaheadService.lookup(kind, request.args.get('q', ''), organization_unit_id=organization_unit_id,
+                                      limit=limit, available_only=request.args.get('available') == '1')
+    return jsonify({'results': results})
@@ -11,6 +11,7 @@ from app.core.permissions import has_permission, audit_operation
 from app.services.security_audit_service import SecurityAudit
 from urllib.parse import urlencode
 from app.utils.pagination import paginate_list
+from app.utils.helpers import stream_page
 
 vehicle_bp = Blueprint('vehicles', __name__)
 
@@ -44,7 +45,7 @@ def list_vehicles():
     else:
         all_vehicles = VehicleService.get_all_vehicles()
     vehicles, pagination = paginate_list(all_vehicles, page=page, per_page=per_page)
-    return render_template('vehicles/list.html', vehicles=vehicles, pagination=pagination, base_list_url=base_list_url, preserved_qs=preserved_qs)
+    return stream_page('vehicles/list.html', vehicles=vehicles, pagination=pagination, base_list_url=base_list_url, preserved_qs=preserved_qs)
 
 @vehicle_bp.route('/<int:vehicle_id>')
 @login_required
@@ -61,19 +62,21 @@ def view_vehicle(vehicle_id):
     # Get vehicle history
     history = VehicleHistoryService.get_vehicle_history(vehicle_id)
     
-    return render_template('vehicles/detail.html', 
-                         vehicle=vehicle, 
-                         history=history,
-                         history_by_type={
-                             'all': history,
-                             'assignments': [h for h in history if h['type'] == 'assignment'],
-                             'maintenance': [h for h in history if h['type'] == 'maintenance'],
-                             'insurance': [h for h in history if h['type'] == 'insurance'],
-                             'inspection': [h for h in history if h['type'] == 'inspection'],
-                             'tax': [h for h in history if h['type'] == 'tax'],
-                             'fine': [h for h in history if h['type'] == 'fine'],
-                             'authorization': [h for h in history if h['type'] == 'authorization']
-                         })
+    # One pass over the history for the per-type tabs
+    history_by_type = {tab: [] for tab in ('assignments', 'maintenance', 'insurance', 'inspection', 'tax', 'fine',
+                                           'authorization')}
+    for item in history:
+        tab = 'assignments' if item['type'] == 'assignment' else item['type']
+        if tab in history_by_type:
+            history_by_type[tab].append(item)
+    history_by_type['all'] = history
+
+    # The page lists the whole history once per tab: stream it so the browser
+    # starts receiving (and drawing) it before the last tab is rendered
+    return stream_page('vehicles/detail.html',
+                       vehicle=vehicle,
+                       history=history,
+                       history_by_type=history_by_type)
 
 @vehicle_bp.route('/new', methods=['GET', 'POST'])
 @login_required
@@ -25,10 +25,99 @@ class Config:
     # SQLAlchemy
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    # Uploads (default locations and limits)
-    INSURANCE_UPLOAD_FOLDER = os.environ.get('INSURANCE_UPLOAD_FOLDER', os.path.join('static', 'uploads', 'insurances'))
+    # Write one correlated audit record per request instead of one line per layer
+    AUDIT_EVENT_AGGREGATION = os.environ.get('AUDIT_EVENT_AGGREGATION', 'True').lower() == 'true'
+
+    # Per-request SQL profiler (Server-Timing header + N+1 detection)
+    SQL_PROFILER_ENABLED = os.environ.get('SQL_PROFILER_ENABLED', 'False').lower() == 'true'
+    SQL_PROFILER_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_PROFILER_N_PLUS_ONE_THRESHOLD', 5))
+
+    # Metrics (/metrics endpoint). Set METRICS_MULTIPROC_DIR when running several
+    # gunicorn workers so samples are shared through per-worker mmap files.
+    # Outside development/testing the endpoint is only served with METRICS_TOKEN.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # In-memory typeahead index (plates, driver names): seconds before a full
+    # rebuild picks up writes from other workers or bulk SQL
+    TYPEAHEAD_TTL_SECONDS = int(os.environ.get('TYPEAHEAD_TTL_SECONDS', 300))
+
+    # Compliance alerts: seconds between full expiry scans triggered by the
+    # dashboard (0 = only scripts/scan_compliance_alerts.py and write hooks)
+    COMPLIANCE_ALERT_SCAN_SECONDS = int(os.environ.get('COMPLIANCE_ALERT_SCAN_SECONDS', 3600))
+
+    # Predictive maintenance: km/day is estimated from the odometer readings of
+    # the last MILEAGE_RATE_WINDOW_DAYS; services due within
+    # MAINTENANCE_FORECAST_HORIZON_DAYS are scheduled automatically
+    MILEAGE_RATE_WINDOW_DAYS = int(os.environ.get('MILEAGE_RATE_WINDOW_DAYS', 180))
+    MAINTENANCE_FORECAST_HORIZON_DAYS = int(os.environ.get('MAINTENANCE_FORECAST_HORIZON_DAYS', 30))
+
+    # Recurring reservations: occurrences are expanded on demand; endless
+    # series are checked for conflicts RESERVATION_SERIES_CHECK_DAYS ahead and
+    # turned into real reservations RESERVATION_SERIES_MATERIALIZE_DAYS ahead
+    RESERVATION_SERIES_CHECK_DAYS = int(os.environ.get('RESERVATION_SERIES_CHECK_DAYS', 365))
+    RESERVATION_SERIES_MATERIALIZE_DAYS = int(os.environ.get('RESERVATION_SERIES_MATERIALIZE_DAYS', 2))
+
+    # Conflict page: free slots of the requested vehicle are searched up to
+    # SUGGESTION_SEARCH_DAYS before and after the requested window
+    SUGGESTION_SEARCH_DAYS = int(os.environ.get('SUGGESTION_SEARCH_DAYS', 7))
+
+    # Background jobs (jobs table). Run workers with scripts/run_jobs.py or,
+    # for single-process setups, as threads of the web process.
+    JOB_INPROCESS_WORKERS = int(os.environ.get('JOB_INPROCESS_WORKERS', 0))
+    JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 1.0))
+    JOB_LOCK_TIMEOUT_SECONDS = int(os.environ.get('JOB_LOCK_TIMEOUT_SECONDS', 600))
+    # Running jobs renew their lock this often; keep it well below the lock timeout
+    JOB_HEARTBEAT_SECONDS = float(os.environ.get('JOB_HEARTBEAT_SECONDS', 60))
+    JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', 7))
+
+    # Rate limiting (Flask-Limiter). Only disable it for load tests against a local server.
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'True').lower() == 'true'
+
+    # Uploaded documents are stored once per content under FILE_STORAGE_ROOT and
+    # served by /files/ (login required). Behind nginx, set
+    # FILE_STORAGE_ACCEL_REDIRECT to an internal location aliasing the root so
+    # nginx sends the bytes; unreferenced files are deleted by the nightly
+    # files.collect job after FILE_STORAGE_GC_GRACE_HOURS
+    FILE_STORAGE_ROOT = os.environ.get('FILE_STORAGE_ROOT', os.path.join('storage', 'files'))
+    FILE_STORAGE_ACCEL_REDIRECT = os.environ.get('FILE_STORAGE_ACCEL_REDIRECT', '')
+    FILE_STORAGE_GC_GRACE_HOURS = int(os.environ.get('FILE_STORAGE_GC_GRACE_HOURS', 24))
+
+    # Response compression (HTML, JSON, text): gzip, or Brotli if installed and
+    # accepted. Bodies under COMPRESSION_MIN_BYTES are sent as they are; turn it
+    # off when a proxy in front already compresses
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+    COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', 6))
+
+    # Static assets: css/js get content-hash names at startup (static_url in
+    # templates) and are served from /assets/ as immutable for a year, with
+    # .gz (and .br if Brotli is installed) copies written under ASSET_CACHE_DIR
+    ASSET_FINGERPRINTING = os.environ.get('ASSET_FINGERPRINTING', 'True').lower() == 'true'
+    ASSET_CACHE_DIR = os.environ.get('ASSET_CACHE_DIR', os.path.join('storage', 'assets'))
+
+    # Templates: bytecode shared by all workers under JINJA_BYTECODE_CACHE_DIR,
+    # every template compiled at startup (TEMPLATE_PRECOMPILE) and {% cache %}
+    # fragments kept per worker (FRAGMENT_CACHE_MAX_ENTRIES, least recently used)
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR', os.path.join('storage', 'jinja'))
+    TEMPLATE_PRECOMPILE = os.environ.get('TEMPLATE_PRECOMPILE', 'True').lower() == 'true'
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', 'True').lower() == 'true'
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 512))
+
+    # Uploads (limits)
     INSURANCE_ALLOWED_EXTENSIONS = {'.pdf'}
     INSURANCE_MAX_BYTES = int(os.environ.get('INSURANCE_MAX_BYTES', 5 * 1024 * 1024))  # 5 MB default
+    IMPORT_MAX_BYTES = int(os.environ.get('IMPORT_MAX_BYTES', 20 * 1024 * 1024))  # CSV/XLSX bulk imports
+
+    # Resumable chunked uploads (/files/uploads) for large scanned documents:
+    # up to CHUNKED_UPLOAD_MAX_BYTES, sent in requests of at most
+    # CHUNKED_UPLOAD_CHUNK_BYTES; unfinished uploads are discarded after
+    # CHUNKED_UPLOAD_EXPIRY_HOURS without a chunk (files.expire_uploads job)
+    DOCUMENT_ALLOWED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png'}  # fines, maintenance, pickups
+    CHUNKED_UPLOAD_MAX_BYTES = int(os.environ.get('CHUNKED_UPLOAD_MAX_BYTES', 100 * 1024 * 1024))
+    CHUNKED_UPLOAD_CHUNK_BYTES = int(os.environ.get('CHUNKED_UPLOAD_CHUNK_BYTES', 4 * 1024 * 1024))
+    CHUNKED_UPLOAD_EXPIRY_HOURS = int(os.environ.get('CHUNKED_UPLOAD_EXPIRY_HOURS', 24))
 
     # Security - valores más seguros
     ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 1  # 1 day instead of 8 days
@@ -63,22 +152,37 @@ class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     TESTING = False
+    SQL_PROFILER_ENABLED = os.environ.get('SQL_PROFILER_ENABLED', 'True').lower() == 'true'
+    # Edited css/js show up without restarting the server
+    ASSET_FINGERPRINTING = os.environ.get('ASSET_FINGERPRINTING', 'False').lower() == 'true'
 
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     TESTING = False
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'False').lower() == 'true'
 
 class TestingConfig(Config):
     """Testing configuration"""
     DEBUG = True
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # Every test creates an app: compile templates on use only
+    TEMPLATE_PRECOMPILE = False
+
+class BenchmarkConfig(Config):
+    """Benchmark configuration (see benchmarks/): production-like (CSRF on), without rate limits"""
+    DEBUG = False
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCHMARK_DATABASE_URL', 'sqlite:///:memory:')
+    RATELIMIT_ENABLED = False
+    SQL_PROFILER_ENABLED = True
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
+    'benchmark': BenchmarkConfig,
     'default': DevelopmentConfig
 }
 
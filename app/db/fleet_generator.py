@@ -0,0 +1,497 @@
+"""Synthetic fleet generator using bulk Core inserts.
+
+Builds realistic, referentially consistent fleets (deep organization
+hierarchies, vehicles, drivers, users, reservations and ITV / tax / insurance /
+fine / maintenance histories) directly through ``Table.insert()`` batches, or
+``COPY ... FROM STDIN`` on PostgreSQL, without creating ORM objects. Primary
+keys are assigned by the generator so child rows can reference their parents
+without round trips; the output is fully determined by the seed, the sizes and
+the reference date (the "today" the generated history ends at).
+"""
+import csv
+import enum
+import io
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, select, text
+
+from app.models import (
+    User, UserRole, OrganizationUnit, Vehicle, VehicleType, OwnershipType, VehicleStatus,
+    Driver, DriverType, DriverStatus, Reservation, ReservationStatus, ITVRecord, ITVResult,
+    VehicleTax, TaxType, PaymentStatus, VehicleInsurance, InsuranceType, InsurancePaymentStatus,
+    Fine, FineType, FineStatus, MaintenanceRecord, MaintenanceType, MaintenanceStatus
+)
+
+DEFAULT_SIZES = {
+    'org_units': 200,
+    'org_depth': 5,
+    'vehicles': 1000,
+    'drivers': 600,
+    'years': 2,
+    'reservations_per_vehicle_year': 24,
+    'fines_per_vehicle_year': 1,
+    'maintenance_per_vehicle_year': 2,
+}
+
+# Tables written by the generator, in foreign key order
+TABLES = [
+    OrganizationUnit.__table__, User.__table__, Driver.__table__, Vehicle.__table__,
+    Reservation.__table__, ITVRecord.__table__, VehicleTax.__table__,
+    VehicleInsurance.__table__, Fine.__table__, MaintenanceRecord.__table__,
+]
+
+MAKES = [
+    ('Seat', ['Ibiza', 'León', 'Arona']),
+    ('Renault', ['Clio', 'Kangoo', 'Master']),
+    ('Citroën', ['C3', 'Berlingo', 'Jumper']),
+    ('Toyota', ['Corolla', 'Yaris', 'Proace']),
+    ('Ford', ['Focus', 'Transit', 'Ranger']),
+]
+FIRST_NAMES = ['Ana', 'Luis', 'María', 'Javier', 'Lucía', 'Carlos', 'Elena', 'Pablo', 'Marta', 'Jorge']
+LAST_NAMES = ['García', 'Martínez', 'López', 'Sánchez', 'Pérez', 'Gómez', 'Ruiz', 'Díaz', 'Moreno', 'Álvarez']
+DESTINATIONS = ['Sede central', 'Delegación norte', 'Delegación sur', 'Almacén', 'Aeropuerto', 'Puerto']
+PLATE_LETTERS = 'BCDFGHJKLMNPRSTVWXYZ'
+
+
+def license_plate(index: int) -> str:
+    """Spanish-style plate (NNNN LLL) unique for every index"""
+    letters = ''
+    n = index // 10000
+    for _ in range(3):
+        letters = PLATE_LETTERS[n % len(PLATE_LETTERS)] + letters
+        n //= len(PLATE_LETTERS)
+    return f'{index % 10000:04d}{letters}'
+
+
+class FleetGenerator:
+    """Generate a synthetic fleet into an empty database.
+
+    Args:
+        engine: SQLAlchemy engine of the target database.
+        seed: Random seed; the same seed and sizes always produce the same rows.
+        batch_size: Rows per INSERT batch / COPY chunk.
+        password_hash: Hash stored for every generated user.
+        use_copy: Use COPY on PostgreSQL (default: automatically on PostgreSQL).
+        progress: Optional callable receiving progress messages.
+        reference_date: Date the history ends at (default: today).
+        **sizes: Overrides for DEFAULT_SIZES.
+    """
+
+    def __init__(self, engine, seed: int = 42, batch_size: int = 5000, password_hash: str = '',
+                 use_copy: bool = None, progress=None, reference_date: date = None, **sizes):
+        unknown = set(sizes) - set(DEFAULT_SIZES)
+        if unknown:
+            raise ValueError(f"Unknown fleet sizes: {', '.join(sorted(unknown))}")
+        self.engine = engine
+        self.seed = seed
+        self.batch_size = batch_size
+        self.password_hash = password_hash
+        self.sizes = dict(DEFAULT_SIZES, **sizes)
+        self.use_copy = engine.dialect.name == 'postgresql' if use_copy is None else use_copy
+        self.progress = progress or (lambda message: None)
+        reference_date = reference_date or date.today()
+        self.now = datetime(reference_date.year, reference_date.month, reference_date.day)
+        self.start = self.now - timedelta(days=365 * self.sizes['years'])
+        self.counts = {table.name: 0 for table in TABLES}
+        self._buffers = {table.name: [] for table in TABLES}
+
+    def _rng(self, stream: str) -> random.Random:
+        # One independent stream per entity: changing a size does not reshuffle the others
+        return random.Random(f'{self.seed}:{stream}')
+
+    # ---- writing ---------------------------------------------------------
+
+    def _add(self, conn, table, row: dict):
+        buffer = self._buffers[table.name]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            # Parents are written first so foreign keys are always satisfied
+            for parent in TABLES[:TABLES.index(table) + 1]:
+                self._flush(conn, parent)
+
+    def _flush(self, conn, table):
+        rows = self._buffers[table.name]
+        if not rows:
+            return
+        if self.use_copy:
+            self._copy(conn, table, rows)
+        else:
+            conn.execute(table.insert(), rows)
+        self.counts[table.name] += len(rows)
+        self._buffers[table.name] = []
+
+    def _flush_all(self, conn):
+        for table in TABLES:
+            self._flush(conn, table)
+
+    def _copy(self, conn, table, rows):
+        """Stream rows through COPY FROM STDIN (PostgreSQL / psycopg2)"""
+        columns = list(rows[0].keys())
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in rows:
+            writer.writerow([self._copy_value(row[column]) for column in columns])
+        buf.seek(0)
+        cursor = conn.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf
+            )
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _copy_value(value):
+        if value is None:
+            return '\\N'
+        if isinstance(value, enum.Enum):
+            # SQLAlchemy Enum columns persist the member name
+            return value.name
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        if isinstance(value, datetime):
+            return value.isoformat(sep=' ')
+        return str(value)
+
+    # ---- orchestration ---------------------------------------------------
+
+    def run(self) -> dict:
+        """Generate the whole fleet and return a summary"""
+        started = time.perf_counter()
+        with self.engine.connect() as conn:
+            # Keys are assigned explicitly, so any existing row may collide
+            populated = [table.name for table in TABLES
+                         if conn.execute(select(func.count()).select_from(table)).scalar()]
+            if populated:
+                raise ValueError('The target database is not empty '
+                                 f"({', '.join(populated)}); use an empty database")
+
+            synchronous = None
+            if self.engine.dialect.name == 'sqlite':
+                synchronous = conn.exec_driver_sql('PRAGMA synchronous').scalar()
+                conn.exec_driver_sql('PRAGMA synchronous = OFF')
+            try:
+                org_levels = self._generate_org_units(conn)
+                self._flush_all(conn)
+                conn.commit()
+                users = self._generate_users(conn, org_levels)
+                drivers_by_org = self._generate_drivers(conn, org_levels, users)
+                self._flush_all(conn)
+                conn.commit()
+                self._generate_vehicles(conn, org_levels, users, drivers_by_org)
+                self._flush_all(conn)
+                conn.commit()
+
+                if self.engine.dialect.name == 'postgresql':
+                    self._reset_sequences(conn)
+                    conn.commit()
+            finally:
+                if synchronous is not None:
+                    # The connection goes back to the pool: restore the durability setting
+                    conn.rollback()
+                    conn.exec_driver_sql(f'PRAGMA synchronous = {int(synchronous)}')
+
+        org_ids = [org_id for level in org_levels for org_id in level]
+        return {
+            'seed': self.seed,
+            'reference_date': self.now.date().isoformat(),
+            'sizes': self.sizes,
+            'counts': dict(self.counts),
+            'elapsed_seconds': round(time.perf_counter() - started, 2),
+            'user_ids': users['by_role'],
+            'org_unit_ids': org_ids,
+            'driver_ids': range(1, self.sizes['drivers'] + 1),
+            'vehicle_ids': range(1, self.sizes['vehicles'] + 1),
+        }
+
+    def _reset_sequences(self, conn):
+        """Move the id sequences past the explicitly assigned keys"""
+        for table in TABLES:
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"
+            ))
+
+    # ---- entities --------------------------------------------------------
+
+    def _generate_org_units(self, conn):
+        """Organization tree of `org_depth` levels; every unit hangs from one of the previous level"""
+        rng = self._rng('org_units')
+        total, depth = self.sizes['org_units'], max(1, self.sizes['org_depth'])
+        roots = max(1, min(total, round(total ** (1 / depth))))
+        levels, next_id = [], 1
+        remaining = total
+        for level in range(depth):
+            if remaining <= 0:
+                break
+            if level == 0:
+                count = roots
+            elif level == depth - 1:
+                count = remaining
+            else:
+                count = min(remaining, max(1, round(len(levels[-1]) * (total / roots) ** (1 / (depth - 1)))))
+            ids = []
+            for _ in range(count):
+                parent = rng.choice(levels[-1]) if levels else None
+                self._add(conn, OrganizationUnit.__table__, {
+                    'id': next_id,
+                    'name': f'Unidad {next_id:06d}',
+                    'code': f'U{next_id:06d}',
+                    'description': f'Unidad organizativa sintética de nivel {level + 1}',
+                    'parent_id': parent,
+                    'manager_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    'contact_email': f'unidad{next_id}@example.com',
+                    'contact_phone': f'9{rng.randint(10000000, 99999999)}',
+                    'is_active': True,
+                    'created_at': self.start,
+                    'updated_at': self.start,
+                })
+                ids.append(next_id)
+                next_id += 1
+            levels.append(ids)
+            remaining -= count
+        self.progress(f'organization_units: {next_id - 1} in {len(levels)} levels')
+        return levels
+
+    def _user_row(self, user_id, username, role, org_id):
+        return {
+            'id': user_id,
+            'email': f'{username}@example.com',
+            'username': username,
+            'hashed_password': self.password_hash,
+            'first_name': 'Usuario',
+            'last_name': username,
+            'role': role,
+            'is_active': True,
+            'is_superuser': role == UserRole.ADMIN,
+            'organization_unit_id': org_id,
+            'created_at': self.start,
+            'updated_at': self.start,
+        }
+
+    def _generate_users(self, conn, org_levels):
+        """One user per role, a fleet manager per top-level unit and one user per driver"""
+        root_org = org_levels[0][0]
+        by_role, next_id = {}, 1
+        for role in UserRole:
+            self._add(conn, User.__table__, self._user_row(next_id, f'demo_{role.value}', role, root_org))
+            by_role[role.value] = next_id
+            next_id += 1
+        for org_id in org_levels[0]:
+            self._add(conn, User.__table__,
+                      self._user_row(next_id, f'manager_{org_id}', UserRole.FLEET_MANAGER, org_id))
+            next_id += 1
+        return {'by_role': by_role, 'next_id': next_id}
+
+    def _generate_drivers(self, conn, org_levels, users):
+        rng = self._rng('drivers')
+        org_ids = [org_id for level in org_levels for org_id in level]
+        drivers_by_org = {}
+        next_user_id = users['next_id']
+        for driver_id in range(1, self.sizes['drivers'] + 1):
+            org_id = org_levels[0][0] if driver_id == 1 else rng.choice(org_ids)
+            # The first driver belongs to the generic DRIVER user, the rest get their own account
+            if driver_id == 1:
+                user_id = users['by_role'][UserRole.DRIVER.value]
+            else:
+                user_id = next_user_id
+                next_user_id += 1
+                self._add(conn, User.__table__,
+                          self._user_row(user_id, f'driver_{driver_id}', UserRole.DRIVER, org_id))
+            self._add(conn, Driver.__table__, {
+                'id': driver_id,
+                'first_name': rng.choice(FIRST_NAMES),
+                'last_name': f'{rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}',
+                'document_type': 'DNI',
+                'document_number': f'{driver_id:08d}X',
+                'driver_license_number': f'LIC{driver_id:09d}',
+                'driver_license_expiry': self.now + timedelta(days=rng.randint(30, 3650)),
+                'driver_type': rng.choice(list(DriverType)),
+                'status': DriverStatus.ACTIVE,
+                'email': f'driver{driver_id}@example.com',
+                'phone': f'6{rng.randint(10000000, 99999999)}',
+                'organization_unit_id': org_id,
+                'user_id': user_id,
+                'is_active': True,
+                'created_at': self.start,
+                'updated_at': self.start,
+            })
+            drivers_by_org.setdefault(org_id, []).append(driver_id)
+        self.progress(f"drivers: {self.sizes['drivers']}")
+        return drivers_by_org
+
+    def _generate_vehicles(self, conn, org_levels, users, drivers_by_org):
+        rng = self._rng('vehicles')
+        history_rng = self._rng('history')
+        org_ids = [org_id for level in org_levels for org_id in level]
+        all_drivers = range(1, self.sizes['drivers'] + 1)
+        fleet_user = users['by_role'][UserRole.DRIVER.value]
+        counters = {'reservation': 1, 'itv': 1, 'tax': 1, 'insurance': 1, 'fine': 1, 'maintenance': 1}
+        total = self.sizes['vehicles']
+
+        for vehicle_id in range(1, total + 1):
+            make, models = rng.choice(MAKES)
+            org_id = org_levels[0][0] if vehicle_id == 1 else rng.choice(org_ids)
+            drivers = drivers_by_org.get(org_id) or all_drivers
+            daily_km = rng.randint(20, 180)
+            initial_mileage = rng.randint(0, 120000)
+            final_mileage = initial_mileage + daily_km * 365 * self.sizes['years']
+            self._add(conn, Vehicle.__table__, {
+                'id': vehicle_id,
+                'license_plate': license_plate(vehicle_id - 1),
+                'make': make,
+                'model': rng.choice(models),
+                'year': rng.randint(2010, 2025),
+                'color': rng.choice(['blanco', 'gris', 'negro', 'azul', 'rojo']),
+                'vin': f'VSS{vehicle_id:014d}',
+                'vehicle_type': rng.choice([VehicleType.CAR, VehicleType.CAR, VehicleType.VAN, VehicleType.TRUCK]),
+                'status': VehicleStatus.AVAILABLE,
+                'ownership_type': rng.choice(list(OwnershipType)),
+                'organization_unit_id': org_id,
+                'current_mileage': final_mileage,
+                'fuel_type': rng.choice(['diesel', 'gasolina', 'eléctrico', 'híbrido']),
+                'fuel_capacity': rng.choice([40, 50, 60, 80]),
+                'is_active': True,
+                'created_at': self.start,
+                'updated_at': self.start,
+            })
+            mileage_at = lambda when: initial_mileage + int(daily_km * max(0, (when - self.start).days))
+
+            self._generate_reservations(conn, history_rng, vehicle_id, org_id, drivers, fleet_user, mileage_at, counters)
+            self._generate_compliance(conn, history_rng, vehicle_id, drivers, mileage_at, counters)
+
+            if vehicle_id % 10000 == 0:
+                self.progress(f'vehicles: {vehicle_id}/{total}')
+
+        if total % 10000:
+            self.progress(f'vehicles: {total}/{total}')
+
+    def _generate_reservations(self, conn, rng, vehicle_id, org_id, drivers, user_id, mileage_at, counters):
+        """Non-overlapping reservations spread over the history window"""
+        days = 365 * self.sizes['years']
+        slots = self.sizes['reservations_per_vehicle_year'] * self.sizes['years']
+        slot_length = days / max(slots, 1)
+        max_hours = int(max(3, slot_length * 24 - 12))
+        for n in range(slots):
+            start = self.start + timedelta(days=n * slot_length, hours=rng.randint(7, 10))
+            end = start + timedelta(hours=rng.randint(2, max_hours))
+            if end < self.now:
+                status = ReservationStatus.CANCELLED if rng.random() < 0.05 else ReservationStatus.COMPLETED
+            else:
+                status = rng.choice([ReservationStatus.PENDING, ReservationStatus.CONFIRMED])
+            completed = status == ReservationStatus.COMPLETED
+            self._add(conn, Reservation.__table__, {
+                'id': counters['reservation'],
+                'vehicle_id': vehicle_id,
+                'driver_id': rng.choice(drivers),
+                'user_id': user_id,
+                'organization_unit_id': org_id,
+                'start_date': start,
+                'end_date': end,
+                'actual_start_date': start if completed else None,
+                'actual_end_date': end if completed else None,
+                'actual_start_mileage': mileage_at(start) if completed else None,
+                'actual_end_mileage': mileage_at(end) if completed else None,
+                'status': status,
+                'purpose': 'Servicio programado',
+                'destination': rng.choice(DESTINATIONS),
+                'cancelled_at': start - timedelta(days=1) if status == ReservationStatus.CANCELLED else None,
+                'created_at': start - timedelta(days=3),
+                'updated_at': end if completed else start - timedelta(days=3),
+            })
+            counters['reservation'] += 1
+
+    def _generate_compliance(self, conn, rng, vehicle_id, drivers, mileage_at, counters):
+        """Yearly ITV, tax and insurance plus fines and maintenance"""
+        for year in range(self.sizes['years']):
+            year_start = self.start + timedelta(days=365 * year)
+
+            inspection = year_start + timedelta(days=rng.randint(0, 300))
+            self._add(conn, ITVRecord.__table__, {
+                'id': counters['itv'],
+                'vehicle_id': vehicle_id,
+                'inspection_date': inspection,
+                'expiry_date': inspection + timedelta(days=365),
+                'next_inspection_date': inspection + timedelta(days=365),
+                'result': ITVResult.FAVORABLE if rng.random() < 0.9 else ITVResult.DESFAVORABLE,
+                'inspection_center': 'ITV Centro',
+                'certificate_number': f'ITV-{counters["itv"]:09d}',
+                'cost': Decimal('45.50'),
+                'mileage_at_inspection': mileage_at(inspection),
+                'created_at': inspection,
+                'updated_at': inspection,
+            })
+            counters['itv'] += 1
+
+            due = year_start + timedelta(days=rng.randint(60, 200))
+            paid = due < self.now and rng.random() < 0.85
+            self._add(conn, VehicleTax.__table__, {
+                'id': counters['tax'],
+                'vehicle_id': vehicle_id,
+                'tax_type': TaxType.IVTM,
+                'tax_year': year_start.year,
+                'amount': Decimal(rng.randint(60, 220)),
+                'due_date': due,
+                'payment_date': due - timedelta(days=5) if paid else None,
+                'payment_status': PaymentStatus.PAID if paid else PaymentStatus.PENDING,
+                'alert_days_before': 15,
+                'created_at': year_start,
+                'updated_at': year_start,
+            })
+            counters['tax'] += 1
+
+            self._add(conn, VehicleInsurance.__table__, {
+                'id': counters['insurance'],
+                'vehicle_id': vehicle_id,
+                'insurance_type': rng.choice(list(InsuranceType)),
+                'insurance_company': rng.choice(['Mapfre', 'Allianz', 'AXA', 'Generali']),
+                'policy_number': f'POL-{counters["insurance"]:09d}',
+                'premium_amount': Decimal(rng.randint(300, 1500)),
+                'start_date': year_start,
+                'end_date': year_start + timedelta(days=365),
+                'payment_status': InsurancePaymentStatus.PAID if year_start < self.now else InsurancePaymentStatus.PENDING,
+                'alert_days_before': 30,
+                'created_at': year_start,
+                'updated_at': year_start,
+            })
+            counters['insurance'] += 1
+
+            for _ in range(self.sizes['fines_per_vehicle_year']):
+                fine_date = year_start + timedelta(days=rng.randint(0, 364))
+                self._add(conn, Fine.__table__, {
+                    'id': counters['fine'],
+                    'vehicle_id': vehicle_id,
+                    'driver_id': rng.choice(drivers),
+                    'fine_number': f'MUL-{counters["fine"]:09d}',
+                    'fine_type': rng.choice(list(FineType)),
+                    'fine_date': fine_date,
+                    'description': 'Multa sintética',
+                    'amount': Decimal(rng.choice([100, 200, 500])),
+                    'payment_deadline': fine_date + timedelta(days=30),
+                    'status': rng.choice([FineStatus.PAID, FineStatus.PAID, FineStatus.PENDING]),
+                    'appeal_filed': False,
+                    'created_at': fine_date,
+                    'updated_at': fine_date,
+                })
+                counters['fine'] += 1
+
+            for _ in range(self.sizes['maintenance_per_vehicle_year']):
+                scheduled = year_start + timedelta(days=rng.randint(0, 364))
+                done = scheduled < self.now
+                self._add(conn, MaintenanceRecord.__table__, {
+                    'id': counters['maintenance'],
+                    'vehicle_id': vehicle_id,
+                    'maintenance_type': rng.choice(list(MaintenanceType)),
+                    'status': MaintenanceStatus.COMPLETED if done else MaintenanceStatus.SCHEDULED,
+                    'scheduled_date': scheduled,
+                    'completed_date': scheduled if done else None,
+                    'mileage_at_service': mileage_at(scheduled),
+                    'cost': Decimal(rng.randint(80, 900)),
+                    'description': 'Mantenimiento sintético',
+                    'created_at': scheduled,
+                    'updated_at': scheduled,
+                })
+                counters['maintenance'] += 1
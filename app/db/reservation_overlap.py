@@ -0,0 +1,82 @@
+"""Overlap exclusion for reservations that holds under concurrent writers.
+
+``ReservationService`` checks the vehicle for overlaps and then inserts; two
+requests doing that at once could both pass the check. The database closes
+that window:
+
+PostgreSQL: an exclusion constraint rejects two live (not cancelled)
+reservations of the same vehicle with intersecting periods, whatever process
+writes them. ``btree_gist`` is needed to mix ``=`` on ``vehicle_id`` with
+``&&`` on the period in one GiST index.
+
+SQLite: a single writer at a time; the check-and-insert transaction starts
+with ``BEGIN IMMEDIATE`` (see ``begin_booking_write``) so the write lock is
+taken before the check reads, and a second booking waits for the first to
+commit instead of reading stale data.
+
+The constraint is created right after ``create_all`` creates the table; for
+an existing database run the Alembic migration or
+``install_overlap_constraint`` (scripts/install_overlap_constraint.py).
+"""
+import logging
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+from app.models import Reservation
+
+logger = logging.getLogger(__name__)
+
+OVERLAP_CONSTRAINT = 'ex_reservations_vehicle_overlap'
+
+# The status column stores enum names
+POSTGRES_STATEMENTS = [
+    'CREATE EXTENSION IF NOT EXISTS btree_gist',
+    f"ALTER TABLE reservations ADD CONSTRAINT {OVERLAP_CONSTRAINT} EXCLUDE USING gist "
+    f"(vehicle_id WITH =, tsrange(start_date, end_date) WITH &&) WHERE (status <> 'CANCELLED')",
+]
+
+
+def install_overlap_constraint(connection) -> bool:
+    """Create the exclusion constraint (PostgreSQL, idempotent); True when it is in place"""
+    if connection.dialect.name != 'postgresql':
+        return False
+    exists = connection.exec_driver_sql(
+        'SELECT 1 FROM pg_constraint WHERE conname = %(name)s', {'name': OVERLAP_CONSTRAINT}).scalar()
+    if exists:
+        return True
+    # btree_gist may need privileges the application role lacks, and existing
+    # overlapping rows block the constraint: keep the schema usable (the
+    # service check still applies) instead of failing create_all
+    try:
+        with connection.begin_nested():
+            for statement in POSTGRES_STATEMENTS:
+                connection.exec_driver_sql(statement)
+        return True
+    except DBAPIError as e:
+        logger.warning('Reservation overlap constraint not created: %s', e)
+        return False
+
+
+def is_overlap_violation(error: IntegrityError) -> bool:
+    """Whether an IntegrityError comes from the overlap exclusion constraint"""
+    return OVERLAP_CONSTRAINT in str(error.orig)
+
+
+def begin_booking_write(session):
+    """SQLite: take the database write lock now, before the overlap check reads.
+
+    Must run before the session writes anything in the transaction; a
+    transaction that already wrote holds the lock. No-op elsewhere.
+    """
+    connection = session.connection()
+    if connection.dialect.name != 'sqlite':
+        return
+    if not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def _after_create(target, connection, **kw):
+    install_overlap_constraint(connection)
+
+
+event.listen(Reservation.__table__, 'after_create', _after_create)
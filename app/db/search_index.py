@@ -0,0 +1,111 @@
+"""Full-text search indexes for vehicles, drivers and providers.
+
+SQLite: one external-content FTS5 table per source (``<table>_fts``) with the
+trigram tokenizer, so partial plates and documents match anywhere in the
+value; triggers keep it in sync with the source table on every write.
+
+PostgreSQL: GIN ``pg_trgm`` indexes on the searched columns. PostgreSQL keeps
+indexes in sync by itself and the planner uses them for ``ILIKE '%term%'``.
+
+The DDL runs right after ``create_all`` creates each source table. For an
+existing database call ``install_search_index`` (see
+scripts/rebuild_search_index.py).
+"""
+import logging
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+
+from app.models import Vehicle, Driver, Provider
+
+logger = logging.getLogger(__name__)
+
+# Searchable entity -> source table and the columns matched by a query
+SEARCH_SOURCES = {
+    'vehicle': {'table': Vehicle.__table__, 'columns': ('license_plate', 'make', 'model')},
+    'driver': {'table': Driver.__table__,
+               'columns': ('first_name', 'last_name', 'document_number', 'driver_license_number')},
+    'provider': {'table': Provider.__table__, 'columns': ('name', 'contact_person', 'email', 'phone')},
+}
+
+
+def fts_table(source: str) -> str:
+    """Name of the FTS5 table of a search source"""
+    return f"{SEARCH_SOURCES[source]['table'].name}_fts"
+
+
+def _sqlite_statements(source: str):
+    table = SEARCH_SOURCES[source]['table'].name
+    columns = SEARCH_SOURCES[source]['columns']
+    fts = fts_table(source)
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{c}' for c in columns)
+    old_values = ', '.join(f'old.{c}' for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{column_list}, content='{table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column_list} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+    ]
+
+
+def _postgres_statements(source: str):
+    table = SEARCH_SOURCES[source]['table'].name
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)"
+        for column in SEARCH_SOURCES[source]['columns']
+    ]
+
+
+def _install_source(connection, source: str, rebuild: bool = False):
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        for statement in _sqlite_statements(source):
+            connection.exec_driver_sql(statement)
+        if rebuild:
+            fts = fts_table(source)
+            connection.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        # pg_trgm may need privileges the application role lacks: keep the
+        # schema usable (unindexed ILIKE) instead of failing create_all
+        try:
+            with connection.begin_nested():
+                connection.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                for statement in _postgres_statements(source):
+                    connection.exec_driver_sql(statement)
+        except DBAPIError as e:
+            logger.warning('pg_trgm search indexes not created for %s: %s', source, e)
+
+
+def install_search_index(connection, rebuild: bool = True):
+    """Create (idempotently) the search index of every source and reindex existing rows"""
+    for source in SEARCH_SOURCES:
+        _install_source(connection, source, rebuild=rebuild)
+
+
+def drop_search_index(connection):
+    """Remove the FTS5 tables (their triggers go away with the source tables)"""
+    if connection.dialect.name != 'sqlite':
+        return
+    for source in SEARCH_SOURCES:
+        connection.exec_driver_sql(f'DROP TABLE IF EXISTS {fts_table(source)}')
+
+
+def _register_ddl_events():
+    for source, spec in SEARCH_SOURCES.items():
+        def after_create(target, connection, _source=source, **kw):
+            _install_source(connection, _source)
+
+        def before_drop(target, connection, _source=source, **kw):
+            if connection.dialect.name == 'sqlite':
+                connection.exec_driver_sql(f'DROP TABLE IF EXISTS {fts_table(_source)}')
+
+        event.listen(spec['table'], 'after_create', after_create)
+        event.listen(spec['table'], 'before_drop', before_drop)
+
+
+_register_ddl_events()
@@ -26,6 +26,60 @@ def init_extensions(app):
     from app.services.database_audit_service import init_database_logging
     init_database_logging(app)
 
+    # Collapse the audit records of each request into one correlated event
+    from app.services.audit_event_service import init_audit_events
+    init_audit_events(app)
+
+    # Initialize per-request SQL profiler (toggled by SQL_PROFILER_ENABLED)
+    from app.services.query_profiler_service import init_query_profiler
+    init_query_profiler(app)
+
+    # Initialize metrics registry (served on /metrics)
+    from app.services.metrics_service import init_metrics
+    init_metrics(app)
+
+    # Initialize the typeahead index (built lazily on first lookup)
+    from app.services.typeahead_service import init_typeahead
+    init_typeahead(app)
+
+    # Keep compliance_alerts in sync with ITV/insurance/authorization writes
+    from app.services import compliance_alert_service  # noqa: F401
+
+    # Keep vehicle_cost_monthly in sync with maintenance/tax/insurance/fine/renting/assignment writes
+    from app.services import vehicle_cost_service  # noqa: F401
+
+    # Keep mileage_readings in sync with pickup/reservation/maintenance/ITV writes
+    from app.services import mileage_service  # noqa: F401
+
+    # Nightly materialization of recurring reservations (reservation_series.materialize job)
+    from app.services import reservation_series_service  # noqa: F401
+
+    # Vehicle allocation for pending requests (reservations.allocate job)
+    from app.services import allocation_service  # noqa: F401
+
+    # Content-addressed document storage (reference counts, files.collect job, document_url)
+    from app.services.file_storage_service import init_file_storage
+    init_file_storage(app)
+
+    # Resumable chunked uploads (files.expire_uploads job)
+    from app.services import chunked_upload_service  # noqa: F401
+
+    # gzip/Brotli compression of HTML and JSON responses, streamed ones included
+    from app.services.compression_service import init_compression
+    init_compression(app)
+
+    # Shared Jinja bytecode cache and {% cache %} fragment tag
+    from app.services.template_cache_service import init_template_cache
+    init_template_cache(app)
+
+    # Fingerprinted, precompressed static assets (manifest, static_url)
+    from app.services.asset_service import init_assets
+    init_assets(app)
+
+    # Background job queue (queue depth gauge, optional in-process workers)
+    from app.services.job_service import init_jobs
+    init_jobs(app)
+
     # Configure login manager
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Por favor inicia sesión para acceder a esta página.'
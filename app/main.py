@@ -25,7 +25,7 @@ def create_app(config_name=None):
             duration_ms = (time.time() - g.request_start_time) * 1000
 
             # Skip logging for static files and health checks
-            if not request.path.startswith('/static') and request.path not in ['/favicon.ico']:
+            if not request.path.startswith(('/static', '/assets')) and request.path not in ['/favicon.ico']:
                 SecurityAudit.log_api_access(
                     endpoint=request.endpoint or 'unknown',
                     method=request.method,
@@ -83,6 +83,10 @@ def create_app(config_name=None):
     # Register context processors
     register_context_processors(app)
 
+    # Compile templates now rather than on each worker's first requests
+    from app.services.template_cache_service import precompile_templates
+    precompile_templates(app)
+
     return app
 
 def register_blueprints(app):
@@ -99,8 +103,15 @@ def register_blueprints(app):
     from app.controllers.assignment_controller import assignment_bp
     from app.controllers.user_controller import user_bp
     from app.controllers.main_controller import main_bp
+    from app.controllers.metrics_controller import metrics_bp
+    from app.controllers.search_controller import search_bp
+    from app.controllers.report_controller import report_bp
+    from app.controllers.import_controller import import_bp
+    from app.controllers.file_controller import file_bp
+    from app.controllers.asset_controller import asset_bp
 
     app.register_blueprint(main_bp)
+    app.register_blueprint(metrics_bp)
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(vehicle_bp, url_prefix='/vehicles')
     app.register_blueprint(driver_bp, url_prefix='/drivers')
@@ -112,6 +123,11 @@ def register_blueprints(app):
     app.register_blueprint(provider_bp, url_prefix='/providers')
     app.register_blueprint(assignment_bp, url_prefix='/assignments')
     app.register_blueprint(user_bp, url_prefix='/users')
+    app.register_blueprint(search_bp, url_prefix='/search')
+    app.register_blueprint(report_bp, url_prefix='/reports')
+    app.register_blueprint(import_bp, url_prefix='/imports')
+    app.register_blueprint(file_bp, url_prefix='/files')
+    app.register_blueprint(asset_bp, url_prefix='/assets')
 
 def register_error_handlers(app):
     """Register error handlers"""
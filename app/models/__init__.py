@@ -16,6 +16,15 @@ from .insurance import VehicleInsurance, InsuranceType, InsurancePaymentStatus
 from .fine import Fine, FineStatus, FineType
 from .authorization import UrbanAccessAuthorization
 from .permission import Permission, RolePermission
+from .compliance_alert import ComplianceAlert, ComplianceAlertType, AlertSeverity
+from .job import Job, JobStatus
+from .vehicle_cost import VehicleCostMonthly, CostCategory
+from .mileage import MileageReading, MileageSource
+from .reservation_series import ReservationSeries, ReservationSeriesOverride, SeriesFrequency
+from .vehicle_request import VehicleRequest, VehicleRequestStatus
+from .stored_file import StoredFile
+from .upload_session import UploadSession
+from .cache_version import CacheVersion
 
 __all__ = [
     "User",
@@ -58,4 +67,26 @@ __all__ = [
     "AssignmentType",
     "Permission",
     "RolePermission",
+    "ComplianceAlert",
+    "ComplianceAlertType",
+    "AlertSeverity",
+    "Job",
+    "JobStatus",
+    "VehicleCostMonthly",
+    "CostCategory",
+    "MileageReading",
+    "MileageSource",
+    "ReservationSeries",
+    "ReservationSeriesOverride",
+    "SeriesFrequency",
+    "VehicleRequest",
+    "VehicleRequestStatus",
+    "StoredFile",
+    "UploadSession",
+    "CacheVersion",
 ]
+
+# Full-text search DDL runs when create_all creates the searchable tables
+from app.db import search_index  # noqa: E402,F401
+# Reservation overlap exclusion constraint (PostgreSQL), same mechanism
+from app.db import reservation_overlap  # noqa: E402,F401
@@ -0,0 +1,21 @@
+"""Per-table version counters for template fragment caching"""
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+
+from app.extensions import db
+
+class CacheVersion(db.Model):
+    """Version of a table's contents, bumped after each commit that writes to it.
+
+    Cached template fragments include the versions of the tables they depend on
+    in their key (see app/services/template_cache_service.py), so a write in
+    any worker makes them miss.
+    """
+    __tablename__ = "cache_versions"
+
+    namespace = Column(String(100), primary_key=True)  # table name
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CacheVersion {self.namespace}={self.version}>"
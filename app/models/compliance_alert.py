@@ -0,0 +1,47 @@
+"""Materialized compliance alerts (expiring ITV, insurance, authorizations...)"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from datetime import datetime
+import enum
+
+from app.extensions import db
+
+class ComplianceAlertType(str, enum.Enum):
+    ITV = "itv"
+    INSURANCE = "insurance"
+    AUTHORIZATION = "authorization"
+    RENTING = "renting"
+    DRIVER_LICENSE = "driver_license"
+
+class AlertSeverity(str, enum.Enum):
+    EXPIRED = "expired"
+    CRITICAL = "critical"
+    WARNING = "warning"
+
+class ComplianceAlert(db.Model):
+    """One row per expiring or expired document, kept by ComplianceAlertService"""
+    __tablename__ = "compliance_alerts"
+    __table_args__ = (
+        UniqueConstraint('alert_type', 'entity_id', name='uq_compliance_alerts_entity'),
+        Index('ix_compliance_alerts_org_due', 'organization_unit_id', 'due_date'),
+        Index('ix_compliance_alerts_due', 'due_date'),
+        Index('ix_compliance_alerts_vehicle', 'vehicle_id'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    alert_type = Column(Enum(ComplianceAlertType), nullable=False)
+    entity_id = Column(Integer, nullable=False)  # id in the source table of alert_type
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"))
+    driver_id = Column(Integer, ForeignKey("drivers.id"))
+    organization_unit_id = Column(Integer, ForeignKey("organization_units.id"))
+    due_date = Column(DateTime, nullable=False)
+    severity = Column(Enum(AlertSeverity), nullable=False)
+    description = Column(String(200))
+    scanned_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    vehicle = relationship("Vehicle")
+    driver = relationship("Driver")
+
+    def __repr__(self):
+        return f"<ComplianceAlert {self.alert_type} {self.entity_id} - {self.severity} {self.due_date}>"
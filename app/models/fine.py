@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Boolean, Text, Numeric
+from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Boolean, Text, Numeric, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -21,6 +21,10 @@ class FineType(str, enum.Enum):
 
 class Fine(db.Model):
     __tablename__ = "fines"
+    __table_args__ = (
+        # Status listings and the overdue sweeper (StatusSweeperService)
+        Index('ix_fines_status_deadline', 'status', 'payment_deadline'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False)
@@ -0,0 +1,39 @@
+"""Background job queue model"""
+from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, Index
+from datetime import datetime
+import enum
+
+from app.extensions import db
+
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class Job(db.Model):
+    """One queued call of a function registered with @job (see app/services/job_service.py)"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Claim order: ready pending jobs by priority, then age
+        Index('ix_jobs_claim', 'status', 'run_at', 'priority'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)
+    payload = Column(Text)  # JSON {"args": [...], "kwargs": {...}}
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.PENDING)
+    priority = Column(Integer, nullable=False, default=0)  # higher runs first
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    # Set for scheduled runs so that several workers enqueue each slot once
+    unique_key = Column(String(150), unique=True)
+    locked_by = Column(String(100))
+    locked_at = Column(DateTime)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.name} - {self.status}>"
@@ -0,0 +1,36 @@
+"""Odometer readings collected from pickups, reservations, maintenance and ITV"""
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Enum, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from datetime import datetime
+import enum
+
+from app.extensions import db
+
+class MileageSource(str, enum.Enum):
+    PICKUP_START = "pickup_start"
+    PICKUP_END = "pickup_end"
+    RESERVATION_START = "reservation_start"
+    RESERVATION_END = "reservation_end"
+    MAINTENANCE = "maintenance"
+    ITV = "itv"
+
+class MileageReading(db.Model):
+    """One row per odometer value found in a source record, kept by MileageService"""
+    __tablename__ = "mileage_readings"
+    __table_args__ = (
+        UniqueConstraint('source', 'source_id', name='uq_mileage_readings_source'),
+        Index('ix_mileage_readings_vehicle_read', 'vehicle_id', 'read_at'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False)
+    source = Column(Enum(MileageSource), nullable=False)
+    source_id = Column(Integer, nullable=False)  # id in the source table of `source`
+    read_at = Column(DateTime, nullable=False)
+    mileage = Column(Integer, nullable=False)
+    recorded_at = Column(DateTime, default=datetime.utcnow)
+
+    vehicle = relationship("Vehicle")
+
+    def __repr__(self):
+        return f"<MileageReading Vehicle:{self.vehicle_id} {self.read_at} {self.mileage} km>"
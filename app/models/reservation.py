@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -14,6 +14,12 @@ class ReservationStatus(str, enum.Enum):
 
 class Reservation(db.Model):
     __tablename__ = "reservations"
+    __table_args__ = (
+        # Period scans (utilization reports)
+        Index('ix_reservations_start', 'start_date'),
+        # Overlap checks per vehicle (batch creation)
+        Index('ix_reservations_vehicle_start', 'vehicle_id', 'start_date'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False)
@@ -0,0 +1,135 @@
+"""Recurring reservations: a rule plus per-occurrence overrides, occurrences are never stored"""
+from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Boolean, Text, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from calendar import monthrange
+from datetime import datetime, timedelta
+import enum
+
+from app.extensions import db
+
+class SeriesFrequency(str, enum.Enum):
+    DAILY = "diaria"
+    WEEKLY = "semanal"
+    MONTHLY = "mensual"
+
+class ReservationSeries(db.Model):
+    """Booking repeated by an RRULE-like rule (FREQ, INTERVAL, BYDAY, UNTIL/COUNT).
+
+    Occurrences are expanded on demand for the window being looked at; an
+    occurrence that was skipped or turned into a real reservation has a
+    ReservationSeriesOverride row and is no longer expanded.
+    """
+    __tablename__ = "reservation_series"
+    __table_args__ = (
+        Index('ix_reservation_series_vehicle_active', 'vehicle_id', 'is_active'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False)
+    driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    organization_unit_id = Column(Integer, ForeignKey("organization_units.id"), nullable=False)
+
+    # Regla: primera ocurrencia, duración y repetición
+    start_date = Column(DateTime, nullable=False)
+    duration_minutes = Column(Integer, nullable=False)
+    frequency = Column(Enum(SeriesFrequency), nullable=False)
+    interval = Column(Integer, nullable=False, default=1)
+    weekdays = Column(String(20))  # weekly only: "0,2,4" (0 = Monday); default the weekday of start_date
+    until = Column(DateTime)  # start of the last occurrence (set from `count` when given)
+    count = Column(Integer)
+
+    purpose = Column(Text, nullable=False)
+    destination = Column(String(200))
+    notes = Column(Text)
+
+    is_active = Column(Boolean, default=True)
+    cancelled_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    vehicle = relationship("Vehicle")
+    driver = relationship("Driver")
+    user = relationship("User")
+    organization_unit = relationship("OrganizationUnit")
+    overrides = relationship("ReservationSeriesOverride", back_populates="series", cascade="all, delete-orphan")
+
+    @property
+    def duration(self) -> timedelta:
+        return timedelta(minutes=self.duration_minutes)
+
+    @property
+    def weekday_list(self):
+        if self.weekdays:
+            return sorted({int(day) for day in self.weekdays.split(',') if day.strip()})
+        return [self.start_date.weekday()]
+
+    def starts_from(self, lower: datetime):
+        """Occurrence starts >= `lower` in order, ignoring `until` (an endless generator).
+
+        The first candidate is computed from the rule, so expanding a window costs
+        the same for a series created yesterday or ten years ago.
+        """
+        first = self.start_date
+        interval = self.interval or 1
+        lower = max(lower, first)
+        if self.frequency == SeriesFrequency.DAILY:
+            step = timedelta(days=interval)
+            k = -((first - lower) // step)
+            while True:
+                yield first + k * step
+                k += 1
+        elif self.frequency == SeriesFrequency.WEEKLY:
+            days = self.weekday_list
+            week = first - timedelta(days=first.weekday())
+            step = timedelta(weeks=interval)
+            k = (lower - week) // step
+            while True:
+                base = week + k * step
+                for day in days:
+                    start = base + timedelta(days=day)
+                    if start >= lower:
+                        yield start
+                k += 1
+        else:
+            # Months without the day of the first occurrence are skipped (like RRULE BYMONTHDAY)
+            k = ((lower.year - first.year) * 12 + lower.month - first.month) // interval
+            while True:
+                months = first.month - 1 + k * interval
+                year, month = first.year + months // 12, months % 12 + 1
+                if first.day <= monthrange(year, month)[1]:
+                    start = first.replace(year=year, month=month)
+                    if start >= lower:
+                        yield start
+                k += 1
+
+    def occurrences(self, window_start: datetime, window_end: datetime):
+        """(start, end) of the occurrences overlapping [window_start, window_end), in order (overrides not applied)"""
+        duration = self.duration
+        for start in self.starts_from(window_start - duration):
+            if start >= window_end or (self.until and start > self.until):
+                return
+            if start + duration > window_start:
+                yield start, start + duration
+
+    def __repr__(self):
+        return f"<ReservationSeries {self.id} - Vehicle:{self.vehicle_id} {self.frequency}>"
+
+class ReservationSeriesOverride(db.Model):
+    """An occurrence that is no longer expanded: skipped, or materialized as `reservation`"""
+    __tablename__ = "reservation_series_overrides"
+    __table_args__ = (
+        UniqueConstraint('series_id', 'occurrence_start', name='uq_reservation_series_overrides_occurrence'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    series_id = Column(Integer, ForeignKey("reservation_series.id"), nullable=False)
+    occurrence_start = Column(DateTime, nullable=False)
+    reservation_id = Column(Integer, ForeignKey("reservations.id"))  # NULL: skipped
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    series = relationship("ReservationSeries", back_populates="overrides")
+    reservation = relationship("Reservation")
+
+    def __repr__(self):
+        return f"<ReservationSeriesOverride Series:{self.series_id} {self.occurrence_start}>"
@@ -0,0 +1,28 @@
+"""Content-addressed document storage: one row (and one file on disk) per distinct content"""
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index
+from datetime import datetime
+
+from app.extensions import db
+
+class StoredFile(db.Model):
+    """A stored blob, keyed by the SHA-256 of its content (see app/services/file_storage_service.py).
+
+    Records point to it with a ``files/<sha256><ext>`` document path; ``ref_count``
+    counts those references and unreferenced blobs are garbage collected.
+    """
+    __tablename__ = "stored_files"
+    __table_args__ = (
+        # Garbage collection scan
+        Index('ix_stored_files_unreferenced', 'ref_count', 'updated_at'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), unique=True, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    extension = Column(String(10), nullable=False)  # ".pdf" of the first upload
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)  # last upload or reference change
+
+    def __repr__(self):
+        return f"<StoredFile {self.sha256[:12]} {self.size}B refs={self.ref_count}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Boolean, Text, Numeric
+from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Boolean, Text, Numeric, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -17,6 +17,10 @@ class PaymentStatus(str, enum.Enum):
 
 class VehicleTax(db.Model):
     __tablename__ = "vehicle_taxes"
+    __table_args__ = (
+        # Status listings and the overdue sweeper (StatusSweeperService)
+        Index('ix_vehicle_taxes_status_due', 'payment_status', 'due_date'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False)
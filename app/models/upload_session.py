@@ -0,0 +1,26 @@
+"""Resumable chunked uploads in progress"""
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey
+from datetime import datetime
+
+from app.extensions import db
+
+class UploadSession(db.Model):
+    """A document being uploaded in chunks (see app/services/chunked_upload_service.py).
+
+    The bytes received so far live in ``<FILE_STORAGE_ROOT>/uploads/<id>.part``;
+    its size is the offset the next chunk must start at.
+    """
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)  # random hex, also the upload URL
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    kind = Column(String(20), nullable=False)  # insurance, fine, maintenance, pickup
+    record_id = Column(Integer)  # record the document is attached to on finalize, if any
+    filename = Column(String(255), nullable=False)
+    extension = Column(String(10), nullable=False)
+    size = Column(BigInteger, nullable=False)  # declared total size
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)  # last chunk received
+
+    def __repr__(self):
+        return f"<UploadSession {self.id} {self.kind} {self.size}B>"
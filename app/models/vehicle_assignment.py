@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Boolean, Text, Numeric
+from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Boolean, Text, Numeric, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -19,6 +19,10 @@ class PaymentStatus(str, enum.Enum):
 
 class VehicleAssignment(db.Model):
     __tablename__ = "vehicle_assignments"
+    __table_args__ = (
+        # Status listings and the overdue sweeper (StatusSweeperService)
+        Index('ix_vehicle_assignments_status_end', 'payment_status', 'end_date'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False)
@@ -67,6 +71,9 @@ class VehicleAssignment(db.Model):
 
     @property
     def is_overdue(self):
+        # Persisted by the status sweeper; still-pending rows cover the time until its next run
+        if self.payment_status == PaymentStatus.OVERDUE:
+            return True
         if self.payment_status == PaymentStatus.PENDING and self.end_date:
             return datetime.utcnow() > self.end_date
         return False
@@ -0,0 +1,37 @@
+"""Monthly cost rollup per vehicle and category (total cost of ownership)"""
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, Enum, Numeric, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from datetime import datetime
+import enum
+
+from app.extensions import db
+
+class CostCategory(str, enum.Enum):
+    MAINTENANCE = "maintenance"
+    TAX = "tax"
+    INSURANCE = "insurance"
+    FINE = "fine"
+    RENTING = "renting"
+    ASSIGNMENT = "assignment"
+
+class VehicleCostMonthly(db.Model):
+    """One row per vehicle, month and category, kept by VehicleCostService"""
+    __tablename__ = "vehicle_cost_monthly"
+    __table_args__ = (
+        UniqueConstraint('vehicle_id', 'month', 'category', name='uq_vehicle_cost_monthly'),
+        Index('ix_vehicle_cost_monthly_org_month', 'organization_unit_id', 'month'),
+        Index('ix_vehicle_cost_monthly_month', 'month'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False)
+    organization_unit_id = Column(Integer, ForeignKey("organization_units.id"))
+    month = Column(Date, nullable=False)  # first day of the month
+    category = Column(Enum(CostCategory), nullable=False)
+    amount = Column(Numeric(12, 2), nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    vehicle = relationship("Vehicle")
+
+    def __repr__(self):
+        return f"<VehicleCostMonthly Vehicle:{self.vehicle_id} {self.month:%Y-%m} {self.category} {self.amount}>"
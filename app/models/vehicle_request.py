@@ -0,0 +1,47 @@
+"""Booking requests without a vehicle; the allocator assigns one and creates the reservation"""
+from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Text, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+import enum
+
+from app.extensions import db
+from app.models.vehicle import VehicleType
+
+class VehicleRequestStatus(str, enum.Enum):
+    PENDING = "pendiente"
+    ALLOCATED = "asignada"
+    UNFULFILLED = "sin_vehiculo"
+    CANCELLED = "cancelada"
+
+class VehicleRequest(db.Model):
+    __tablename__ = "vehicle_requests"
+    __table_args__ = (
+        # Allocation runs read the pending requests of a window
+        Index('ix_vehicle_requests_status_start', 'status', 'start_date'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    organization_unit_id = Column(Integer, ForeignKey("organization_units.id"), nullable=False)
+    vehicle_type = Column(Enum(VehicleType))  # NULL: any vehicle of the unit
+
+    start_date = Column(DateTime, nullable=False)
+    end_date = Column(DateTime, nullable=False)
+    purpose = Column(Text, nullable=False)
+    destination = Column(String(200))
+    notes = Column(Text)
+
+    status = Column(Enum(VehicleRequestStatus), default=VehicleRequestStatus.PENDING, nullable=False)
+    reservation_id = Column(Integer, ForeignKey("reservations.id"))
+    allocated_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    driver = relationship("Driver")
+    user = relationship("User")
+    organization_unit = relationship("OrganizationUnit")
+    reservation = relationship("Reservation")
+
+    def __repr__(self):
+        return f"<VehicleRequest {self.id} - Driver:{self.driver_id} {self.status}>"
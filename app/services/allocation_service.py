@@ -0,0 +1,331 @@
+"""Automatic vehicle allocation for booking requests (VehicleRequest).
+
+A request asks for "a vehicle of unit U (of type T) from s to e". The pending
+requests of a run are allocated together:
+
+1. Timelines: the busy intervals of every candidate vehicle (active, not in
+   maintenance or out of service) within the run window are read once --
+   reservations and recurring series occurrences -- merged, and kept as
+   sorted start/end lists, so "is the vehicle free over [s, e)" is two
+   bisections.
+2. Greedy by end time: requests are taken by increasing end, the order that
+   places the most intervals on interchangeable vehicles (interval graph
+   colouring), and each goes to the free candidate with the tightest fit:
+   the smallest idle gaps to its neighbouring bookings, capped at
+   FIT_HORIZON. Packing requests against existing bookings keeps long free
+   blocks together and touches as few vehicles as possible.
+3. Repair: with vehicles that start the run with different bookings the
+   greedy pass can leave a request out that fits if one request of this run
+   moves elsewhere. Every request left without a vehicle tries those moves
+   (augmenting paths of length one) and takes the cheapest by the same fit
+   score.
+
+Allocated requests become PENDING reservations. Requests still without a
+vehicle stay pending for the next run, or become UNFULFILLED once their start
+has passed. Runs as the ``reservations.allocate`` job and on demand from the
+calendar.
+"""
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+from sqlalchemy import select
+from app.db.reservation_overlap import begin_booking_write
+from app.extensions import db
+from app.models import (VehicleRequest, VehicleRequestStatus, Vehicle, VehicleType, VehicleStatus, Driver,
+                        Reservation, ReservationStatus)
+from app.services.job_service import job
+from app.services.metrics_service import Metrics
+from app.services.reservation_series_service import ReservationSeriesService
+from app.services.security_audit_service import SecurityAudit
+
+# Idle gaps longer than this count as "free block"; smaller gaps are the fit to minimize
+FIT_HORIZON = timedelta(hours=12)
+MAX_REQUESTS = 5000
+
+UNAVAILABLE_STATUSES = (VehicleStatus.MAINTENANCE, VehicleStatus.OUT_OF_SERVICE)
+
+
+class VehicleTimeline:
+    """Disjoint busy intervals of one vehicle sorted by start; `owners` holds the request index (None: existing)"""
+    __slots__ = ('starts', 'ends', 'owners')
+
+    def __init__(self, intervals: Iterable):
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start < merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+        self.owners = [None] * len(merged)
+
+    def blocking(self, start: datetime, end: datetime) -> range:
+        """Positions of the intervals overlapping [start, end)"""
+        return range(bisect_right(self.ends, start), bisect_left(self.starts, end))
+
+    def fit(self, start: datetime, end: datetime) -> Optional[float]:
+        """Idle seconds left next to [start, end) (capped per side), or None when not free"""
+        position = bisect_right(self.ends, start)
+        if position < len(self.starts) and self.starts[position] < end:
+            return None
+        before = start - self.ends[position - 1] if position else FIT_HORIZON
+        after = self.starts[position] - end if position < len(self.starts) else FIT_HORIZON
+        return (min(before, FIT_HORIZON) + min(after, FIT_HORIZON)).total_seconds()
+
+    def gaps(self, lower: datetime, upper: datetime):
+        """Free (start, end) windows within [lower, upper), in order"""
+        position = bisect_right(self.ends, lower)
+        cursor = lower
+        for busy_start, busy_end in zip(self.starts[position:], self.ends[position:]):
+            if busy_start >= upper:
+                break
+            if busy_start > cursor:
+                yield cursor, busy_start
+            cursor = max(cursor, busy_end)
+        if cursor < upper:
+            yield cursor, upper
+
+    def insert(self, start: datetime, end: datetime, owner: int):
+        position = bisect_right(self.ends, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.owners.insert(position, owner)
+
+    def remove(self, position: int):
+        del self.starts[position], self.ends[position], self.owners[position]
+
+
+def _best_fit(timelines: Dict[int, VehicleTimeline], candidates: Sequence[int], start: datetime, end: datetime,
+              exclude: Optional[int] = None):
+    """(fit, vehicle_id) of the tightest free candidate, or None"""
+    best, idle_seen = None, False
+    for vehicle_id in candidates:
+        if vehicle_id == exclude:
+            continue
+        timeline = timelines[vehicle_id]
+        if not timeline.starts:
+            # Idle vehicles all fit the same; the first one stands for the rest
+            if idle_seen:
+                continue
+            idle_seen = True
+        fit = timeline.fit(start, end)
+        if fit is not None and (best is None or fit < best[0]):
+            best = (fit, vehicle_id)
+            if fit == 0:
+                break
+    return best
+
+
+def assign(slots: Sequence, candidates: Sequence[Sequence[int]],
+           timelines: Dict[int, VehicleTimeline]) -> Dict[int, int]:
+    """{slot index: vehicle_id} for (start, end) `slots`; `candidates[i]` are the vehicles slot i may use.
+
+    `timelines` is updated with the assigned slots.
+    """
+    assignment = {}
+    order = sorted(range(len(slots)), key=lambda i: (slots[i][1], slots[i][0], i))
+    for i in order:
+        best = _best_fit(timelines, candidates[i], *slots[i])
+        if best:
+            timelines[best[1]].insert(*slots[i], i)
+            assignment[i] = best[1]
+
+    for i in order:
+        if i in assignment:
+            continue
+        start, end = slots[i]
+        best = None
+        for vehicle_id in candidates[i]:
+            timeline = timelines[vehicle_id]
+            blocking = timeline.blocking(start, end)
+            if len(blocking) != 1 or timeline.owners[blocking[0]] is None:
+                continue
+            moved = timeline.owners[blocking[0]]
+            target = _best_fit(timelines, candidates[moved], *slots[moved], exclude=vehicle_id)
+            if target and (best is None or target[0] < best[0]):
+                best = (target[0], vehicle_id, blocking[0], moved, target[1])
+        if best:
+            _, vehicle_id, position, moved, target = best
+            timelines[vehicle_id].remove(position)
+            timelines[target].insert(*slots[moved], moved)
+            timelines[vehicle_id].insert(start, end, i)
+            assignment[moved] = target
+            assignment[i] = vehicle_id
+    return assignment
+
+
+class AllocationService:
+    """Vehicle requests and their allocation"""
+
+    @staticmethod
+    def _parse_request(item) -> Dict:
+        if not isinstance(item, dict):
+            raise ValueError('Cada solicitud debe ser un objeto')
+        try:
+            fields = {'driver_id': int(item['driver_id'])}
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('driver_id es obligatorio y numérico')
+        for name in ('start_date', 'end_date'):
+            value = item.get(name)
+            try:
+                fields[name] = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+            except ValueError:
+                raise ValueError(f'{name} debe ser una fecha ISO 8601 (AAAA-MM-DDTHH:MM)')
+        if fields['end_date'] <= fields['start_date']:
+            raise ValueError('end_date debe ser posterior a start_date')
+        purpose = (item.get('purpose') or '').strip()
+        if not purpose:
+            raise ValueError('purpose es obligatorio')
+        vehicle_type = item.get('vehicle_type')
+        if vehicle_type:
+            # Value ("furgoneta") or name ("VAN")
+            try:
+                vehicle_type = VehicleType(vehicle_type)
+            except ValueError:
+                try:
+                    vehicle_type = VehicleType[str(vehicle_type).upper()]
+                except KeyError:
+                    raise ValueError(f'vehicle_type no válido: {vehicle_type}')
+        fields.update(purpose=purpose, vehicle_type=vehicle_type or None,
+                      destination=item.get('destination'), notes=item.get('notes'))
+        if item.get('organization_unit_id') is not None:
+            try:
+                fields['organization_unit_id'] = int(item['organization_unit_id'])
+            except (TypeError, ValueError):
+                raise ValueError('organization_unit_id debe ser numérico')
+        return fields
+
+    @staticmethod
+    def create_requests(items: List[dict], user_id: int,
+                        organization_unit_id: Optional[int] = None) -> List[VehicleRequest]:
+        """Store pending requests; raises ValueError naming the first invalid item"""
+        if len(items) > MAX_REQUESTS:
+            raise ValueError(f'Como máximo {MAX_REQUESTS} solicitudes por llamada')
+        requests = []
+        for index, item in enumerate(items):
+            try:
+                fields = AllocationService._parse_request(item)
+                fields.setdefault('organization_unit_id', organization_unit_id)
+                if fields['organization_unit_id'] is None:
+                    raise ValueError('organization_unit_id es obligatorio')
+            except ValueError as e:
+                raise ValueError(f'Solicitud {index}: {e}')
+            requests.append(VehicleRequest(user_id=user_id, status=VehicleRequestStatus.PENDING, **fields))
+        drivers = {r.driver_id for r in requests}
+        known = set(db.session.execute(
+            select(Driver.id).where(Driver.id.in_(drivers), Driver.is_active == True)).scalars())  # noqa: E712
+        if drivers - known:
+            raise ValueError(f'Conductores no encontrados: {sorted(drivers - known)}')
+        db.session.add_all(requests)
+        db.session.commit()
+        return requests
+
+    @staticmethod
+    def load_timelines(vehicle_ids: Sequence[int], start: datetime, end: datetime,
+                       exclude_reservation_id: Optional[int] = None) -> Dict[int, VehicleTimeline]:
+        """Busy timeline of each vehicle within [start, end): reservations plus series occurrences"""
+        busy = {vehicle_id: [] for vehicle_id in vehicle_ids}
+        if busy:
+            query = (select(Reservation.vehicle_id, Reservation.start_date, Reservation.end_date)
+                     .where(Reservation.vehicle_id.in_(busy),
+                            Reservation.status != ReservationStatus.CANCELLED,
+                            Reservation.start_date < end,
+                            Reservation.end_date > start))
+            if exclude_reservation_id is not None:
+                query = query.where(Reservation.id != exclude_reservation_id)
+            for vehicle_id, busy_start, busy_end in db.session.execute(query):
+                busy[vehicle_id].append((busy_start, busy_end))
+            for occurrence in ReservationSeriesService.occurrences_between(start, end, vehicle_ids=busy):
+                busy[occurrence.vehicle_id].append((occurrence.start_date, occurrence.end_date))
+        return {vehicle_id: VehicleTimeline(intervals) for vehicle_id, intervals in busy.items()}
+
+    @staticmethod
+    def plan(requests: Sequence[VehicleRequest]) -> Dict[int, int]:
+        """{request id: vehicle_id} for the requests that can be allocated (nothing is written)"""
+        if not requests:
+            return {}
+        units = {r.organization_unit_id for r in requests}
+        vehicles = db.session.execute(
+            select(Vehicle.id, Vehicle.organization_unit_id, Vehicle.vehicle_type)
+            .where(Vehicle.organization_unit_id.in_(units), Vehicle.is_active == True,  # noqa: E712
+                   Vehicle.status.notin_(UNAVAILABLE_STATUSES))
+            .order_by(Vehicle.id)
+        ).all()
+        pools = {}
+        for vehicle_id, unit, vehicle_type in vehicles:
+            pools.setdefault((unit, None), []).append(vehicle_id)
+            pools.setdefault((unit, vehicle_type), []).append(vehicle_id)
+
+        timelines = AllocationService.load_timelines([row[0] for row in vehicles],
+                                                     min(r.start_date for r in requests),
+                                                     max(r.end_date for r in requests))
+
+        slots = [(r.start_date, r.end_date) for r in requests]
+        candidates = [pools.get((r.organization_unit_id, r.vehicle_type), []) for r in requests]
+        return {requests[i].id: vehicle_id for i, vehicle_id in assign(slots, candidates, timelines).items()}
+
+    @staticmethod
+    def allocate_pending(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         request_ids: Optional[Iterable[int]] = None, now: Optional[datetime] = None,
+                         dry_run: bool = False) -> Dict:
+        """Allocate the pending requests overlapping [start, end) (all when not given).
+
+        Returns {'requests', 'allocated', 'unassigned', 'unfulfilled', 'vehicles_used', 'seconds',
+        'assignments': {request_id: vehicle_id}}.
+        """
+        started = time.perf_counter()
+        now = now or datetime.utcnow()
+        query = VehicleRequest.query.filter(VehicleRequest.status == VehicleRequestStatus.PENDING)
+        if start is not None:
+            query = query.filter(VehicleRequest.end_date > start)
+        if end is not None:
+            query = query.filter(VehicleRequest.start_date < end)
+        if request_ids is not None:
+            query = query.filter(VehicleRequest.id.in_(set(request_ids)))
+        requests = query.order_by(VehicleRequest.id).all()
+        if not dry_run and requests:
+            # Plan against the bookings as they are when the new ones are written
+            begin_booking_write(db.session)
+        assignments = AllocationService.plan(requests)
+
+        unfulfilled = [r for r in requests if r.id not in assignments and r.start_date <= now]
+        if not dry_run and requests:
+            reservations = []
+            for request in requests:
+                vehicle_id = assignments.get(request.id)
+                if vehicle_id is None:
+                    continue
+                request.reservation = Reservation(
+                    vehicle_id=vehicle_id, driver_id=request.driver_id, user_id=request.user_id,
+                    organization_unit_id=request.organization_unit_id, start_date=request.start_date,
+                    end_date=request.end_date, purpose=request.purpose, destination=request.destination,
+                    notes=request.notes, status=ReservationStatus.PENDING)
+                request.status = VehicleRequestStatus.ALLOCATED
+                request.allocated_at = now
+                reservations.append(request.reservation)
+            for request in unfulfilled:
+                request.status = VehicleRequestStatus.UNFULFILLED
+            db.session.add_all(reservations)
+            db.session.commit()
+            Metrics.inc('vehicle_allocations', {'outcome': 'allocated'}, amount=len(assignments))
+            Metrics.inc('vehicle_allocations', {'outcome': 'unfulfilled'}, amount=len(unfulfilled))
+            SecurityAudit.log_operation('ALLOCATE', 'vehicle_requests', True, {
+                'requests': len(requests), 'allocated': len(assignments), 'unfulfilled': len(unfulfilled),
+            })
+        return {
+            'requests': len(requests),
+            'allocated': len(assignments),
+            'unassigned': len(requests) - len(assignments),
+            'unfulfilled': len(unfulfilled),
+            'vehicles_used': len(set(assignments.values())),
+            'seconds': round(time.perf_counter() - started, 3),
+            'assignments': assignments,
+        }
+
+
+@job('reservations.allocate', schedule='*/15 * * * *')
+def allocate_vehicle_requests():
+    """Allocate vehicles to pending requests"""
+    AllocationService.allocate_pending()
@@ -0,0 +1,132 @@
+"""Fingerprinted, precompressed static assets without a build step.
+
+At startup every stylesheet and script under ``app/static`` is hashed and
+gets a content-addressed name (``js/main.js`` -> ``js/main.3f2a1b9c0d4e.js``).
+Templates link assets with ``static_url('js/main.js')``, which returns
+``/assets/<fingerprinted name>``; that URL changes whenever the content
+changes, so it is served with ``Cache-Control: public, max-age=<1 year>,
+immutable`` and browsers stop revalidating assets on every page.
+
+Compressed copies (``.gz``, and ``.br`` when the Brotli package is installed)
+are written once under ASSET_CACHE_DIR, named after the fingerprint so
+several workers starting together write identical files, and sent when the
+request accepts that encoding. Files not in the manifest (images, or every
+file when ASSET_FINGERPRINTING is off, as in development) keep their plain
+``/static/`` URL.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Dict, Optional, Tuple
+from flask import current_app, url_for
+
+try:
+    import brotli
+except ImportError:  # optional: .br copies are skipped without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINTED_EXTENSIONS = ('.css', '.js')
+# Compressing tiny files saves nothing worth a lookup
+MIN_COMPRESS_BYTES = 512
+MAX_AGE = 365 * 24 * 3600
+
+# Content-Encoding -> suffix of the precompressed copy, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# logical name -> fingerprinted name, and the reverse
+_manifest: Dict[str, str] = {}
+_sources: Dict[str, str] = {}
+
+
+def _fingerprinted_name(name: str, content: bytes) -> str:
+    stem, extension = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}'
+
+
+def _write_once(path: str, data: bytes):
+    """Write a file unless present; atomic, so concurrent workers never see partial files"""
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as out:
+        out.write(data)
+    os.replace(tmp_path, path)
+
+
+class AssetService:
+    """Build the asset manifest and resolve fingerprinted names"""
+
+    @staticmethod
+    def cache_dir() -> str:
+        return os.path.abspath(current_app.config['ASSET_CACHE_DIR'])
+
+    @staticmethod
+    def build(static_folder: str, cache_dir: str) -> Dict[str, str]:
+        """Fingerprint the assets under static_folder and precompress them into cache_dir"""
+        manifest = {}
+        for directory, _, filenames in os.walk(static_folder):
+            for filename in filenames:
+                if not filename.endswith(FINGERPRINTED_EXTENSIONS):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, static_folder).replace(os.sep, '/')
+                with open(path, 'rb') as source:
+                    content = source.read()
+                fingerprinted = _fingerprinted_name(name, content)
+                manifest[name] = fingerprinted
+                if len(content) < MIN_COMPRESS_BYTES:
+                    continue
+                target = os.path.join(cache_dir, *fingerprinted.split('/'))
+                try:
+                    _write_once(target + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+                    if brotli is not None:
+                        _write_once(target + '.br', brotli.compress(content))
+                except OSError as e:
+                    # Read-only deployment: assets are still fingerprinted, just sent uncompressed
+                    logger.warning('Precompressed copy of %s not written: %s', name, e)
+        return manifest
+
+    @staticmethod
+    def load(app):
+        """(Re)build the manifest for the app's static folder"""
+        _manifest.clear()
+        _sources.clear()
+        if not app.config.get('ASSET_FINGERPRINTING', True):
+            return
+        manifest = AssetService.build(app.static_folder, os.path.abspath(app.config['ASSET_CACHE_DIR']))
+        _manifest.update(manifest)
+        _sources.update({fingerprinted: name for name, fingerprinted in manifest.items()})
+        logger.info('Asset manifest: %d files', len(manifest))
+
+    @staticmethod
+    def source(fingerprinted: str) -> Optional[str]:
+        """Logical name of a fingerprinted asset; None for unknown (or outdated) names"""
+        return _sources.get(fingerprinted)
+
+    @staticmethod
+    def variant(fingerprinted: str, accept_encoding) -> Tuple[Optional[str], Optional[str]]:
+        """Precompressed copy the client accepts, as (path, Content-Encoding); (None, None) if none"""
+        base = os.path.join(AssetService.cache_dir(), *fingerprinted.split('/'))
+        for encoding, suffix in ENCODINGS:
+            if encoding in accept_encoding and os.path.exists(base + suffix):
+                return base + suffix, encoding
+        return None, None
+
+
+def static_url(filename: str) -> str:
+    """URL of a static file: fingerprinted under /assets/ when in the manifest, plain /static/ otherwise"""
+    fingerprinted = _manifest.get(filename)
+    if fingerprinted:
+        return url_for('assets.asset', filename=fingerprinted)
+    return url_for('static', filename=filename)
+
+
+def init_assets(app):
+    """Build the manifest and expose static_url to templates"""
+    AssetService.load(app)
+    app.jinja_env.globals['static_url'] = static_url
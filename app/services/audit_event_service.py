@@ -0,0 +1,142 @@
+"""Request-scoped audit accumulator.
+
+A single write request used to produce one log line per layer (permission
+check, controller operation, model change, tracked-table statement, commit and
+API access), each one rebuilding the request context and serializing its own
+JSON. While a request is being accumulated those calls append plain dicts to
+the request event instead, and one correlated record is written when the
+request ends: one context lookup, one serialization and one write.
+"""
+import json
+import time
+import uuid
+from datetime import datetime
+from flask import g, has_request_context, request
+
+
+class RequestAuditEvent:
+    """Audit facts gathered during a single request"""
+
+    def __init__(self):
+        self.request_id = uuid.uuid4().hex
+        self.started_at = time.perf_counter()
+        self.timestamp = datetime.utcnow().isoformat()
+        self.events = []
+        self.failed = False
+        self.status_code = None
+
+    def add(self, source: str, operation: str, resource: str, success: bool = True, details: dict = None):
+        """Append a sub-event; details are kept as-is and serialized once on emit"""
+        entry = {
+            'offset_ms': round((time.perf_counter() - self.started_at) * 1000, 2),
+            'source': source,
+            'operation': operation,
+            'resource': resource,
+        }
+        if not success:
+            entry['success'] = False
+            self.failed = True
+        if details:
+            entry['details'] = details
+        self.events.append(entry)
+
+
+class AuditEvents:
+    """Collapse the audit calls of a request into one correlated record"""
+
+    @staticmethod
+    def is_active() -> bool:
+        """True when the current request accumulates its audit records"""
+        return has_request_context() and getattr(g, 'audit_event', None) is not None
+
+    @staticmethod
+    def start_request():
+        """Attach a fresh accumulator to the current request"""
+        g.audit_event = RequestAuditEvent()
+
+    @staticmethod
+    def current():
+        """Return the accumulator of the current request, if any"""
+        if not has_request_context():
+            return None
+        return getattr(g, 'audit_event', None)
+
+    @staticmethod
+    def record(source: str, operation: str, resource: str, success: bool = True, details: dict = None) -> bool:
+        """Add a sub-event to the current request; False when nothing is being accumulated"""
+        event = AuditEvents.current()
+        if event is None:
+            return False
+        event.add(source, operation, resource, success, details)
+        return True
+
+    @staticmethod
+    def finish_request(error=None):
+        """Write the accumulated event (called once, when the request is torn down)"""
+        event = AuditEvents.current()
+        if event is None:
+            return
+        g.audit_event = None
+        # A streamed body closed early (the client went away) is not a failed request
+        disconnected = isinstance(error, GeneratorExit)
+        if disconnected:
+            error = None
+        if not event.events and error is None:
+            return
+
+        from app.services.security_audit_service import SecurityAudit, security_logger
+
+        context = SecurityAudit._get_request_context()
+        status = event.status_code
+        failed = event.failed or error is not None or (status is not None and status >= 400)
+        payload = {
+            'request_id': event.request_id,
+            'started_at': event.timestamp,
+            'duration_ms': round((time.perf_counter() - event.started_at) * 1000, 2),
+            'status_code': status,
+            'event_count': len(event.events),
+            'events': event.events,
+        }
+        if disconnected:
+            payload['client_disconnected'] = True
+        if error is not None:
+            payload['error'] = str(error)
+            payload['error_type'] = type(error).__name__
+
+        log_data = dict(context)
+        log_data['operation'] = 'REQUEST'
+        log_data['resource'] = request.endpoint or request.path
+        log_data['details'] = json.dumps(payload, default=str, ensure_ascii=False)
+
+        message = f"REQUEST - {request.method} {request.path} ({len(event.events)} eventos)"
+        if failed:
+            log_data['error'] = True
+            security_logger.error(f"FAILED: {message}", extra=log_data)
+        else:
+            security_logger.info(message, extra=log_data)
+
+
+def init_audit_events(app):
+    """Register the request hooks of the audit accumulator.
+
+    Controlled by AUDIT_EVENT_AGGREGATION; when disabled every audit call
+    writes its own line as before.
+    """
+    @app.before_request
+    def start_audit_event():
+        if app.config.get('AUDIT_EVENT_AGGREGATION', True) and not request.path.startswith('/static'):
+            AuditEvents.start_request()
+
+    @app.after_request
+    def capture_audit_status(response):
+        event = AuditEvents.current()
+        if event is not None:
+            event.status_code = response.status_code
+        return response
+
+    # Teardown runs after every after_request hook (including the API access
+    # log in app.main) and also when the request failed; for a streamed page
+    # (stream_with_context) it runs once the body is sent or abandoned
+    @app.teardown_request
+    def emit_audit_event(error=None):
+        AuditEvents.finish_request(error)
@@ -0,0 +1,439 @@
+"""Bulk import of vehicles, drivers and compliance records from CSV/XLSX.
+
+The file is read as a stream of rows (``read_rows``) and processed in chunks:
+
+1. every column of the chunk is parsed and validated with the same rules as
+   the forms (``InputValidator`` for plates, emails, documents and phones,
+   ``parse_money`` for amounts, enums by value or name);
+2. references (organization unit code, vehicle plate) are resolved with one
+   ``IN`` query per column;
+3. each unique key (plate, VIN, email, document, policy number...) is
+   checked against the rest of the file and against the database with one
+   ``IN`` query for the whole chunk;
+4. the valid rows are added and committed together: SQLAlchemy batches them
+   into multi-row INSERTs and the flush hooks (compliance alerts, costs,
+   mileage readings) run as for a form post.
+
+Invalid rows are skipped and reported as ``{'row', 'field', 'message'}``
+(``row`` is the line in the file, the header being line 1). With
+``dry_run`` nothing is written.
+"""
+import csv
+import io
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.services.input_validation_service import InputValidator
+from app.services.security_audit_service import SecurityAudit
+from app.utils.helpers import parse_money
+from app.models import (Vehicle, VehicleType, OwnershipType, Driver, DriverType, DriverStatus, OrganizationUnit,
+                        ITVRecord, ITVResult, VehicleInsurance, InsuranceType, VehicleTax, TaxType)
+
+DEFAULT_CHUNK_SIZE = 500
+CSV_DELIMITERS = ',;\t'
+
+
+# ---------------------------------------------------------------------------
+# Column parsers: return the value or raise ValueError with the message shown
+# ---------------------------------------------------------------------------
+
+def _validated(validator):
+    def parse(value):
+        ok, result = validator(str(value))
+        if not ok:
+            raise ValueError(result)
+        return result
+    return parse
+
+
+def _text(max_length: int):
+    def parse(value):
+        return InputValidator.sanitize_string(str(value), max_length)
+    return parse
+
+
+def _integer(minimum: Optional[int] = None, maximum: Optional[int] = None):
+    def parse(value):
+        try:
+            number = int(float(value)) if isinstance(value, (int, float)) else int(str(value).strip())
+        except ValueError:
+            raise ValueError(f'Número entero no válido: {value}')
+        if (minimum is not None and number < minimum) or (maximum is not None and number > maximum):
+            raise ValueError(f'Fuera de rango: {number}')
+        return number
+    return parse
+
+
+def _money(value):
+    return value if isinstance(value, (int, float)) else parse_money(str(value))
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    for fmt in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(str(value).strip(), fmt)
+        except ValueError:
+            pass
+    raise ValueError(f'Fecha no válida (AAAA-MM-DD o DD/MM/AAAA): {value}')
+
+
+def _enum(enum_class):
+    members = {}
+    for member in enum_class:
+        members[member.value.lower()] = member
+        members[member.name.lower()] = member
+
+    def parse(value):
+        member = members.get(str(value).strip().lower())
+        if member is None:
+            raise ValueError(f"Valor no válido: {value} (admitidos: {', '.join(m.value for m in enum_class)})")
+        return member
+    return parse
+
+
+def _vin(value):
+    vin = str(value).strip().upper()
+    if len(vin) != 17:
+        raise ValueError('El VIN debe tener 17 caracteres')
+    return vin
+
+
+def _document(value):
+    return str(value).strip().upper()
+
+
+_plate = _validated(InputValidator.validate_license_plate)
+_email = _validated(InputValidator.validate_email)
+_phone = _validated(InputValidator.validate_phone)
+
+
+def _dni_format(row):
+    if row.get('document_type', '').upper() == 'DNI':
+        ok, message = InputValidator.validate_document_number(row['document_number'])
+        if not ok:
+            return message
+    return None
+
+
+def _after(first: str, second: str, message: str):
+    def check(row):
+        if row.get(first) and row.get(second) and row[second] <= row[first]:
+            return message
+        return None
+    return check
+
+
+# ---------------------------------------------------------------------------
+# Entities. fields: column -> (parser, required); references: column ->
+# (lookup column, id column, model attribute, organization column or None);
+# unique: model attribute tuples; checks: (field, row check) pairs
+# ---------------------------------------------------------------------------
+
+_ORGANIZATION = (OrganizationUnit.code, OrganizationUnit.id, 'organization_unit_id', None)
+_VEHICLE = (Vehicle.license_plate, Vehicle.id, 'vehicle_id', Vehicle.organization_unit_id)
+
+ENTITIES = {
+    'vehicles': {
+        'model': Vehicle,
+        'fields': {
+            'license_plate': (_plate, True),
+            'make': (_text(50), True),
+            'model': (_text(50), True),
+            'year': (_integer(1900, datetime.utcnow().year + 1), True),
+            'vehicle_type': (_enum(VehicleType), True),
+            'ownership_type': (_enum(OwnershipType), True),
+            'vin': (_vin, False),
+            'color': (_text(30), False),
+            'fuel_type': (_text(20), False),
+            'fuel_capacity': (_integer(0), False),
+            'current_mileage': (_integer(0), False),
+            'organization_unit_code': (_text(20), False),
+            'notes': (_text(1000), False),
+        },
+        'references': {'organization_unit_code': _ORGANIZATION},
+        'unique': [('license_plate',), ('vin',)],
+        'checks': [],
+    },
+    'drivers': {
+        'model': Driver,
+        'fields': {
+            'first_name': (_text(50), True),
+            'last_name': (_text(50), True),
+            'document_type': (_text(20), True),
+            'document_number': (_document, True),
+            'driver_license_number': (_document, True),
+            'driver_license_expiry': (_date, True),
+            'driver_type': (_enum(DriverType), True),
+            'email': (_email, True),
+            'phone': (_phone, False),
+            'address': (_text(500), False),
+            'organization_unit_code': (_text(20), False),
+            'notes': (_text(1000), False),
+        },
+        'references': {'organization_unit_code': _ORGANIZATION},
+        'unique': [('email',), ('document_number',), ('driver_license_number',)],
+        'checks': [('document_number', _dni_format)],
+        'defaults': {'status': DriverStatus.ACTIVE},
+    },
+    'itv': {
+        'model': ITVRecord,
+        'fields': {
+            'license_plate': (_plate, True),
+            'inspection_date': (_date, True),
+            'expiry_date': (_date, True),
+            'next_inspection_date': (_date, False),
+            'result': (_enum(ITVResult), True),
+            'inspection_center': (_text(200), False),
+            'inspector_name': (_text(100), False),
+            'certificate_number': (_text(100), False),
+            'cost': (_money, False),
+            'mileage_at_inspection': (_integer(0), False),
+            'defects_severity': (_text(50), False),
+            'defects_found': (_text(1000), False),
+            'notes': (_text(1000), False),
+        },
+        'references': {'license_plate': _VEHICLE},
+        'unique': [('certificate_number',)],
+        'checks': [('expiry_date', _after('inspection_date', 'expiry_date',
+                                          'La caducidad debe ser posterior a la inspección'))],
+    },
+    'insurances': {
+        'model': VehicleInsurance,
+        'fields': {
+            'license_plate': (_plate, True),
+            'insurance_type': (_enum(InsuranceType), True),
+            'insurance_company': (_text(100), True),
+            'policy_number': (_text(100), True),
+            'premium_amount': (_money, True),
+            'start_date': (_date, True),
+            'end_date': (_date, True),
+            'coverage_details': (_text(1000), False),
+            'notes': (_text(1000), False),
+        },
+        'references': {'license_plate': _VEHICLE},
+        'unique': [('policy_number',)],
+        'checks': [('end_date', _after('start_date', 'end_date', 'La fecha de fin debe ser posterior al inicio'))],
+    },
+    'taxes': {
+        'model': VehicleTax,
+        'fields': {
+            'license_plate': (_plate, True),
+            'tax_type': (_enum(TaxType), True),
+            'tax_year': (_integer(1900, 2100), True),
+            'amount': (_money, True),
+            'due_date': (_date, True),
+            'notes': (_text(1000), False),
+        },
+        'references': {'license_plate': _VEHICLE},
+        # One tax of each type per vehicle and year: re-importing a file does not duplicate them
+        'unique': [('vehicle_id', 'tax_type', 'tax_year')],
+        'checks': [],
+    },
+}
+
+
+def _normalize_header(value) -> str:
+    return str(value or '').strip().lower().replace(' ', '_')
+
+
+def read_rows(stream, filename: str) -> Iterator[Dict]:
+    """Rows of a CSV (comma, semicolon or tab separated; UTF-8) or XLSX file as {column: value}"""
+    if filename.lower().endswith('.xlsx'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError('La importación de XLSX requiere el paquete openpyxl; use CSV')
+        sheet = load_workbook(stream, read_only=True, data_only=True).active
+        rows = sheet.iter_rows(values_only=True)
+        header = [_normalize_header(value) for value in next(rows, ())]
+        for values in rows:
+            yield dict(zip(header, values))
+        return
+    if not filename.lower().endswith('.csv'):
+        raise ValueError('Formato no admitido: use un fichero .csv o .xlsx')
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    sample = text.readline()
+    delimiter = max(CSV_DELIMITERS, key=sample.count)
+    header = [_normalize_header(value) for value in next(csv.reader([sample], delimiter=delimiter), [])]
+    for values in csv.reader(text, delimiter=delimiter):
+        yield dict(zip(header, values))
+
+
+def template_header(entity: str) -> List[str]:
+    return list(ENTITIES[entity]['fields'])
+
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+class BulkImportService:
+    """Chunked, set-validated imports with a per-row error report"""
+
+    @staticmethod
+    def _parse_chunk(spec: Dict, records: List[Dict], errors: Dict[int, List]) -> List[Dict]:
+        """Column by column parse of the chunk; failures are added to errors[position]"""
+        parsed = [{} for _ in records]
+        for column, (parse, required) in spec['fields'].items():
+            for position, record in enumerate(records):
+                raw = record.get(column)
+                if _blank(raw):
+                    if required:
+                        errors.setdefault(position, []).append((column, 'Campo obligatorio'))
+                    continue
+                try:
+                    parsed[position][column] = parse(raw)
+                except ValueError as e:
+                    errors.setdefault(position, []).append((column, str(e)))
+        for column, check in spec['checks']:
+            for position, row in enumerate(parsed):
+                if position not in errors:
+                    message = check(row)
+                    if message:
+                        errors.setdefault(position, []).append((column, message))
+        return parsed
+
+    @staticmethod
+    def _resolve(spec: Dict, parsed: List[Dict], errors: Dict[int, List], organization_unit_id: Optional[int],
+                 lock_organization_unit: bool):
+        """Replace reference columns by ids with one query per column"""
+        for column, (lookup, id_column, attribute, organization) in spec['references'].items():
+            if lock_organization_unit and attribute == 'organization_unit_id':
+                continue  # every row goes to the locked unit
+            wanted = {row[column] for position, row in enumerate(parsed) if column in row and position not in errors}
+            if not wanted:
+                continue
+            stmt = select(lookup, id_column).where(lookup.in_(wanted))
+            if lock_organization_unit and organization is not None:
+                stmt = stmt.where(organization == organization_unit_id)
+            ids = dict(db.session.execute(stmt).all())
+            for position, row in enumerate(parsed):
+                if column in row and position not in errors:
+                    if row[column] not in ids:
+                        errors.setdefault(position, []).append((column, f'No existe: {row[column]}'))
+                    else:
+                        row[attribute] = ids[row[column]]
+
+    @staticmethod
+    def _check_unique(spec: Dict, parsed: List[Dict], errors: Dict[int, List], seen: Dict[tuple, set]):
+        """Duplicates within the file and against the database, one query per key for the whole chunk"""
+        model = spec['model']
+        # Rows that failed parsing are skipped; every key is checked for the rest so all conflicts are reported
+        invalid = set(errors)
+        accepted = {}
+        for key in spec['unique']:
+            candidates = {}
+            in_chunk = set()
+            for position, row in enumerate(parsed):
+                if position in invalid or any(_blank(row.get(attribute)) for attribute in key):
+                    continue
+                value = tuple(row[attribute] for attribute in key)
+                if value in seen[key] or value in in_chunk:
+                    errors.setdefault(position, []).append((key[-1], 'Duplicado en el fichero'))
+                else:
+                    candidates[position] = value
+                    in_chunk.add(value)
+            if not candidates:
+                continue
+            columns = [getattr(model, attribute) for attribute in key]
+            if len(columns) == 1:
+                stmt = select(columns[0]).where(columns[0].in_([value[0] for value in candidates.values()]))
+            else:
+                stmt = select(*columns).where(tuple_(*columns).in_(list(candidates.values())))
+            existing = {tuple(row) for row in db.session.execute(stmt).all()}
+            for position, value in candidates.items():
+                if value in existing:
+                    errors.setdefault(position, []).append((key[-1], f"Ya existe: {' / '.join(map(str, value))}"))
+                else:
+                    accepted.setdefault(position, []).append((key, value))
+        # Only rows that will be inserted claim their values for the rest of the file
+        for position, values in accepted.items():
+            if position not in errors:
+                for key, value in values:
+                    seen[key].add(value)
+
+    @staticmethod
+    def import_rows(entity: str, rows: Iterable[Dict], organization_unit_id: Optional[int] = None,
+                    lock_organization_unit: bool = False, dry_run: bool = False,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, created_by: Optional[int] = None) -> Dict:
+        """Import rows of `entity`; returns {'entity', 'rows', 'valid', 'created', 'errors': [...], 'dry_run'}
+
+        ``organization_unit_id`` is the unit of rows without ``organization_unit_code``. With
+        ``lock_organization_unit`` every row goes to that unit and plates must belong to it.
+        """
+        if entity not in ENTITIES:
+            raise ValueError(f'Tipo de importación no válido: {entity}')
+        spec = ENTITIES[entity]
+        model = spec['model']
+        report = {'entity': entity, 'rows': 0, 'valid': 0, 'created': 0, 'errors': [], 'dry_run': dry_run}
+        seen = {key: set() for key in spec['unique']}
+        rows = iter(rows)
+        line = 1
+        while True:
+            records = []
+            for record in rows:
+                line += 1
+                if all(_blank(value) for value in record.values()):
+                    continue
+                records.append((line, record))
+                if len(records) >= chunk_size:
+                    break
+            if not records:
+                break
+            report['rows'] += len(records)
+            if report['rows'] == len(records):
+                missing = [column for column, (_, required) in spec['fields'].items()
+                           if required and column not in records[0][1]]
+                if missing:
+                    raise ValueError(f"Faltan columnas obligatorias: {', '.join(missing)}")
+
+            errors = {}
+            parsed = BulkImportService._parse_chunk(spec, [record for _, record in records], errors)
+            BulkImportService._resolve(spec, parsed, errors, organization_unit_id, lock_organization_unit)
+            BulkImportService._check_unique(spec, parsed, errors, seen)
+
+            valid = []
+            for position, row in enumerate(parsed):
+                if position in errors:
+                    continue
+                # Reference columns (plate of an ITV, unit code) are not model attributes
+                row = {attribute: value for attribute, value in row.items() if hasattr(model, attribute)}
+                valid.append(row)
+                if hasattr(model, 'organization_unit_id') and (
+                        lock_organization_unit or row.get('organization_unit_id') is None):
+                    row['organization_unit_id'] = organization_unit_id
+                if hasattr(model, 'created_by'):
+                    row['created_by'] = created_by
+                for attribute, value in spec.get('defaults', {}).items():
+                    row.setdefault(attribute, value)
+
+            report['valid'] += len(valid)
+            if valid and not dry_run:
+                db.session.add_all([model(**row) for row in valid])
+                try:
+                    db.session.commit()
+                except IntegrityError as e:
+                    # Concurrent write of the same key: the chunk is rolled back as a whole
+                    db.session.rollback()
+                    for position, _ in enumerate(parsed):
+                        if position not in errors:
+                            errors[position] = [('', f'No guardado, conflicto al insertar el bloque: {e.orig}')]
+                    report['valid'] -= len(valid)
+                    valid = []
+            if not dry_run:
+                report['created'] += len(valid)
+            for position in sorted(errors):
+                report['errors'].extend({'row': records[position][0], 'field': field, 'message': message}
+                                        for field, message in errors[position])
+
+        if not dry_run:
+            SecurityAudit.log_operation('BULK_IMPORT', entity, True, {
+                'rows': report['rows'], 'created': report['created'], 'errors': len(report['errors']),
+            })
+        return report
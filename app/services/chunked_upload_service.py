@@ -0,0 +1,180 @@
+"""Resumable chunked uploads of large documents.
+
+A single POST caps documents at INSURANCE_MAX_BYTES and a dropped connection
+restarts the upload from zero. Here the client:
+
+1. starts an upload (kind, file name, total size, optionally the record to
+   attach it to) and gets an id;
+2. sends the bytes in order, one request per chunk, each stating the offset
+   it starts at. Every chunk is copied in CHUNK_SIZE pieces straight to
+   ``<FILE_STORAGE_ROOT>/uploads/<id>.part``, so memory stays bounded whatever
+   the chunk or file size. After a failure the client asks for the offset
+   (the size of the part file: bytes of a cut-off chunk that did arrive are
+   kept) and resumes from there;
+3. finalizes: the size and the file signature are checked and the part file
+   moves into the content-addressed store (FileStorageService.store_file).
+   The document path is returned and, if the upload names a record, written
+   to its document column.
+
+Unfinished uploads are discarded by the ``files.expire_uploads`` job after
+CHUNKED_UPLOAD_EXPIRY_HOURS without a chunk.
+"""
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import BinaryIO, Optional
+from flask import current_app
+from app.extensions import db
+from app.models import UploadSession, VehicleInsurance, Fine, MaintenanceRecord, VehiclePickup
+from app.services.file_storage_service import CHUNK_SIZE, FileStorageService
+from app.services.job_service import job
+from app.utils.exceptions import UploadError, UploadOffsetError
+
+logger = logging.getLogger(__name__)
+
+# kind -> (record model, document column, config key of the allowed extensions)
+UPLOAD_TARGETS = {
+    'insurance': (VehicleInsurance, 'document_path', 'INSURANCE_ALLOWED_EXTENSIONS'),
+    'fine': (Fine, 'document_path', 'DOCUMENT_ALLOWED_EXTENSIONS'),
+    'maintenance': (MaintenanceRecord, 'document_path', 'DOCUMENT_ALLOWED_EXTENSIONS'),
+    'pickup': (VehiclePickup, 'not_taken_attachment', 'DOCUMENT_ALLOWED_EXTENSIONS'),
+}
+
+# Leading bytes of each allowed type, checked on finalize
+SIGNATURES = {
+    '.pdf': b'%PDF-',
+    '.jpg': b'\xff\xd8\xff',
+    '.jpeg': b'\xff\xd8\xff',
+    '.png': b'\x89PNG\r\n\x1a\n',
+}
+
+
+class ChunkedUploadService:
+    """Start, receive, finalize and expire chunked uploads"""
+
+    @staticmethod
+    def part_path(upload_id: str) -> str:
+        return os.path.join(FileStorageService.root(), 'uploads', f'{upload_id}.part')
+
+    @staticmethod
+    def offset(upload: UploadSession) -> int:
+        """Bytes received so far: where the next chunk must start"""
+        try:
+            return os.path.getsize(ChunkedUploadService.part_path(upload.id))
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def get_upload(upload_id: str, user_id: int) -> Optional[UploadSession]:
+        """An upload of the user (None for unknown ids and other users' uploads)"""
+        upload = db.session.get(UploadSession, upload_id)
+        return upload if upload is not None and upload.user_id == user_id else None
+
+    @staticmethod
+    def get_target(kind: str, record_id: int):
+        """Record a document of this kind would be attached to; None if it does not exist"""
+        model = UPLOAD_TARGETS[kind][0]
+        return db.session.get(model, record_id)
+
+    @staticmethod
+    def start(user_id: int, kind: str, filename: str, size: int, record_id: Optional[int] = None) -> UploadSession:
+        """Validate the declared document and open an upload for it"""
+        if kind not in UPLOAD_TARGETS:
+            raise UploadError(f'Tipo de documento desconocido: {kind}')
+        allowed_ext = current_app.config.get(UPLOAD_TARGETS[kind][2])
+        extension = FileStorageService.check_extension(filename, allowed_ext)
+        max_bytes = current_app.config.get('CHUNKED_UPLOAD_MAX_BYTES')
+        if size <= 0:
+            raise UploadError('El fichero está vacío')
+        if size > max_bytes:
+            raise UploadError(f'El fichero excede el tamaño máximo permitido ({max_bytes} bytes)')
+
+        upload = UploadSession(id=uuid.uuid4().hex, user_id=user_id, kind=kind, record_id=record_id,
+                               filename=os.path.basename(filename)[:255], extension=extension, size=size)
+        part_path = ChunkedUploadService.part_path(upload.id)
+        os.makedirs(os.path.dirname(part_path), exist_ok=True)
+        open(part_path, 'wb').close()
+        db.session.add(upload)
+        db.session.commit()
+        return upload
+
+    @staticmethod
+    def write_chunk(upload: UploadSession, offset: int, stream: BinaryIO, length: int) -> int:
+        """Append a chunk starting at ``offset``; returns the new offset.
+
+        Copies at most ``length`` bytes in CHUNK_SIZE pieces; a chunk cut short
+        keeps what arrived and the client resumes from the returned offset.
+        """
+        current = ChunkedUploadService.offset(upload)
+        if offset != current:
+            raise UploadOffsetError(f'La subida va por el byte {current}', current)
+        if length > current_app.config.get('CHUNKED_UPLOAD_CHUNK_BYTES'):
+            raise UploadError('El fragmento excede el tamaño máximo permitido')
+        if offset + length > upload.size:
+            raise UploadError('El fragmento excede el tamaño declarado del fichero')
+
+        remaining = length
+        with open(ChunkedUploadService.part_path(upload.id), 'ab') as out:
+            while remaining > 0:
+                chunk = stream.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                out.write(chunk)
+                remaining -= len(chunk)
+        upload.updated_at = datetime.utcnow()
+        db.session.commit()
+        return offset + length - remaining
+
+    @staticmethod
+    def finalize(upload: UploadSession) -> str:
+        """Check the complete file, store it and attach it to its record; returns the document path"""
+        received = ChunkedUploadService.offset(upload)
+        if received != upload.size:
+            raise UploadOffsetError(f'Subida incompleta: {received} de {upload.size} bytes', received)
+        part_path = ChunkedUploadService.part_path(upload.id)
+        signature = SIGNATURES.get(upload.extension)
+        if signature:
+            with open(part_path, 'rb') as part:
+                if part.read(len(signature)) != signature:
+                    ChunkedUploadService.abort(upload)
+                    raise UploadError(f'El contenido no corresponde a un fichero {upload.extension}')
+
+        document_path = FileStorageService.store_file(part_path, upload.extension)
+        if upload.record_id is not None:
+            model, column, _ = UPLOAD_TARGETS[upload.kind]
+            record = db.session.get(model, upload.record_id)
+            if record is not None:
+                setattr(record, column, document_path)
+        db.session.delete(upload)
+        db.session.commit()
+        logger.info('Upload %s finalized as %s', upload.id, document_path)
+        return document_path
+
+    @staticmethod
+    def abort(upload: UploadSession):
+        """Discard an upload and the bytes received"""
+        try:
+            os.remove(ChunkedUploadService.part_path(upload.id))
+        except FileNotFoundError:
+            pass
+        db.session.delete(upload)
+        db.session.commit()
+
+    @staticmethod
+    def expire(now: Optional[datetime] = None) -> int:
+        """Discard the uploads without a chunk for CHUNKED_UPLOAD_EXPIRY_HOURS; returns how many"""
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(hours=current_app.config.get('CHUNKED_UPLOAD_EXPIRY_HOURS', 24))
+        stale = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+        for upload in stale:
+            ChunkedUploadService.abort(upload)
+        if stale:
+            logger.info('Discarded %d unfinished uploads', len(stale))
+        return len(stale)
+
+
+@job('files.expire_uploads', schedule='0 * * * *')
+def expire_uploads():
+    """Hourly: discard abandoned chunked uploads"""
+    ChunkedUploadService.expire()
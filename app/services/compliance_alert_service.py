@@ -0,0 +1,282 @@
+"""Compliance alert service.
+
+Expiry checks used to be computed on every dashboard view with one range scan
+per source table. The scanner below materializes them in ``compliance_alerts``
+(one row per expiring or expired document, upserted on (alert_type,
+entity_id)) so dashboards read them with a single indexed query.
+
+Rows are refreshed:
+
+- by a full scan (``ComplianceAlertService.scan``), run hourly by the
+  ``compliance_alerts.scan`` job, from scripts/scan_compliance_alerts.py and
+  lazily by the dashboard once COMPLIANCE_ALERT_SCAN_SECONDS have passed, so
+  documents entering their alert window show up and severities move on;
+- on writes: flushing an ITV, insurance, authorization, renting contract,
+  driver or vehicle reconciles the alerts of that vehicle/driver in the same
+  transaction.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from flask import current_app
+from sqlalchemy import and_, case, event, func, inspect, literal, null, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+from app.services.job_service import job
+from app.models import (ComplianceAlert, ComplianceAlertType, AlertSeverity, Vehicle, Driver, ITVRecord,
+                        VehicleInsurance, InsurancePaymentStatus, UrbanAccessAuthorization, RentingContract)
+
+# Days before expiry for sources without their own alert_days column
+DEFAULT_ALERT_DAYS = 30
+# Expiring within this many days is CRITICAL instead of WARNING
+CRITICAL_DAYS = 7
+# Longest alert window a source can configure (schemas cap it at 365)
+MAX_ALERT_DAYS = 365
+
+_UPSERT_BATCH = 500
+_UPDATED_COLUMNS = ('vehicle_id', 'driver_id', 'organization_unit_id', 'due_date', 'severity', 'description',
+                    'scanned_at')
+
+# Source records whose writes refresh the alerts of their vehicle
+_VEHICLE_SOURCES = {
+    ITVRecord: ComplianceAlertType.ITV,
+    VehicleInsurance: ComplianceAlertType.INSURANCE,
+    UrbanAccessAuthorization: ComplianceAlertType.AUTHORIZATION,
+    RentingContract: ComplianceAlertType.RENTING,
+}
+_VEHICLE_ATTRIBUTES = ('organization_unit_id', 'is_active', 'license_plate')
+_DRIVER_ATTRIBUTES = ('organization_unit_id', 'is_active', 'driver_license_expiry', 'first_name', 'last_name')
+
+
+def _itv_query(horizon):
+    # Only the latest ITV of each vehicle matters: older ones are superseded
+    latest = (select(ITVRecord.vehicle_id, func.max(ITVRecord.expiry_date).label('expiry_date'))
+              .group_by(ITVRecord.vehicle_id).subquery())
+    return (select(ITVRecord.id.label('entity_id'), ITVRecord.vehicle_id, null().label('driver_id'),
+                   Vehicle.organization_unit_id, ITVRecord.expiry_date.label('due_date'),
+                   literal(DEFAULT_ALERT_DAYS).label('alert_days'),
+                   ('ITV ' + Vehicle.license_plate).label('description'))
+            .join(latest, and_(latest.c.vehicle_id == ITVRecord.vehicle_id,
+                               latest.c.expiry_date == ITVRecord.expiry_date))
+            .join(Vehicle, Vehicle.id == ITVRecord.vehicle_id)
+            .where(Vehicle.is_active == True, ITVRecord.expiry_date <= horizon))  # noqa: E712
+
+
+def _insurance_query(horizon):
+    # Latest policy of each type per vehicle; cancelled policies do not alert
+    active = or_(VehicleInsurance.payment_status.is_(None),
+                 VehicleInsurance.payment_status != InsurancePaymentStatus.CANCELLED)
+    latest = (select(VehicleInsurance.vehicle_id, VehicleInsurance.insurance_type,
+                     func.max(VehicleInsurance.end_date).label('end_date'))
+              .where(active)
+              .group_by(VehicleInsurance.vehicle_id, VehicleInsurance.insurance_type).subquery())
+    return (select(VehicleInsurance.id.label('entity_id'), VehicleInsurance.vehicle_id,
+                   null().label('driver_id'), Vehicle.organization_unit_id,
+                   VehicleInsurance.end_date.label('due_date'),
+                   func.coalesce(VehicleInsurance.alert_days_before, DEFAULT_ALERT_DAYS).label('alert_days'),
+                   ('Seguro ' + VehicleInsurance.insurance_company + ' ' + Vehicle.license_plate)
+                   .label('description'))
+            .join(latest, and_(latest.c.vehicle_id == VehicleInsurance.vehicle_id,
+                               latest.c.insurance_type == VehicleInsurance.insurance_type,
+                               latest.c.end_date == VehicleInsurance.end_date))
+            .join(Vehicle, Vehicle.id == VehicleInsurance.vehicle_id)
+            .where(active, Vehicle.is_active == True, VehicleInsurance.end_date <= horizon))  # noqa: E712
+
+
+def _authorization_query(horizon):
+    model = UrbanAccessAuthorization
+    return (select(model.id.label('entity_id'), model.vehicle_id, null().label('driver_id'),
+                   Vehicle.organization_unit_id, model.end_date.label('due_date'),
+                   func.coalesce(model.alert_days_before_expiry, DEFAULT_ALERT_DAYS).label('alert_days'),
+                   (model.authorization_type + ' ' + Vehicle.license_plate).label('description'))
+            .join(Vehicle, Vehicle.id == model.vehicle_id)
+            .where(model.is_active == True, Vehicle.is_active == True, model.end_date <= horizon))  # noqa: E712
+
+
+def _renting_query(horizon):
+    model = RentingContract
+    return (select(model.id.label('entity_id'), model.vehicle_id, null().label('driver_id'),
+                   Vehicle.organization_unit_id, model.end_date.label('due_date'),
+                   func.coalesce(model.alert_days_before_expiry, DEFAULT_ALERT_DAYS).label('alert_days'),
+                   ('Renting ' + model.company_name + ' ' + Vehicle.license_plate).label('description'))
+            .join(Vehicle, Vehicle.id == model.vehicle_id)
+            .where(model.is_active == True, Vehicle.is_active == True, model.end_date <= horizon))  # noqa: E712
+
+
+def _driver_license_query(horizon):
+    return (select(Driver.id.label('entity_id'), null().label('vehicle_id'), Driver.id.label('driver_id'),
+                   Driver.organization_unit_id, Driver.driver_license_expiry.label('due_date'),
+                   literal(DEFAULT_ALERT_DAYS).label('alert_days'),
+                   ('Permiso de conducir ' + Driver.first_name + ' ' + Driver.last_name).label('description'))
+            .where(Driver.is_active == True, Driver.driver_license_expiry <= horizon))  # noqa: E712
+
+
+# alert type -> (query builder, source column used to scope a partial refresh)
+_SOURCES = {
+    ComplianceAlertType.ITV: (_itv_query, ITVRecord.vehicle_id),
+    ComplianceAlertType.INSURANCE: (_insurance_query, VehicleInsurance.vehicle_id),
+    ComplianceAlertType.AUTHORIZATION: (_authorization_query, UrbanAccessAuthorization.vehicle_id),
+    ComplianceAlertType.RENTING: (_renting_query, RentingContract.vehicle_id),
+    ComplianceAlertType.DRIVER_LICENSE: (_driver_license_query, Driver.id),
+}
+
+
+def severity_for(due_date: datetime, now: datetime) -> AlertSeverity:
+    if due_date < now:
+        return AlertSeverity.EXPIRED
+    if due_date <= now + timedelta(days=CRITICAL_DAYS):
+        return AlertSeverity.CRITICAL
+    return AlertSeverity.WARNING
+
+
+def _upsert(connection, rows: List[dict]):
+    table = ComplianceAlert.__table__
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    for start in range(0, len(rows), _UPSERT_BATCH):
+        stmt = dialect.insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['alert_type', 'entity_id'],
+            set_={column: stmt.excluded[column] for column in _UPDATED_COLUMNS},
+        )
+        connection.execute(stmt, rows[start:start + _UPSERT_BATCH])
+
+
+class ComplianceAlertService:
+    """Materialized expiry alerts for ITV, insurance, authorizations, renting and licenses"""
+
+    _last_scan = None
+
+    @staticmethod
+    def _reconcile(connection, alert_type: ComplianceAlertType, now: datetime,
+                   scope_ids: Optional[Iterable[int]] = None) -> int:
+        """Upsert the current alerts of one type (optionally of some vehicles/drivers) and drop stale ones"""
+        build_query, scope_column = _SOURCES[alert_type]
+        query = build_query(now + timedelta(days=MAX_ALERT_DAYS))
+        table = ComplianceAlert.__table__
+        existing_query = select(table.c.entity_id).where(table.c.alert_type == alert_type)
+        if scope_ids is not None:
+            scope_ids = list(scope_ids)
+            query = query.where(scope_column.in_(scope_ids))
+            alert_column = table.c.driver_id if alert_type == ComplianceAlertType.DRIVER_LICENSE else table.c.vehicle_id
+            existing_query = existing_query.where(alert_column.in_(scope_ids))
+
+        rows = {}
+        for row in connection.execute(query).mappings():
+            if row['due_date'] > now + timedelta(days=row['alert_days']):
+                continue
+            # Two latest ITVs with the same date: keep one alert per vehicle
+            key = row['vehicle_id'] if alert_type == ComplianceAlertType.ITV else row['entity_id']
+            if key in rows and rows[key]['entity_id'] > row['entity_id']:
+                continue
+            rows[key] = {
+                'alert_type': alert_type,
+                'entity_id': row['entity_id'],
+                'vehicle_id': row['vehicle_id'],
+                'driver_id': row['driver_id'],
+                'organization_unit_id': row['organization_unit_id'],
+                'due_date': row['due_date'],
+                'severity': severity_for(row['due_date'], now),
+                'description': (row['description'] or '')[:200],
+                'scanned_at': now,
+            }
+
+        current_ids = {row['entity_id'] for row in rows.values()}
+        stale = [entity_id for entity_id in connection.execute(existing_query).scalars() if entity_id not in current_ids]
+        for start in range(0, len(stale), _UPSERT_BATCH):
+            connection.execute(table.delete().where(table.c.alert_type == alert_type,
+                                                    table.c.entity_id.in_(stale[start:start + _UPSERT_BATCH])))
+        if rows:
+            _upsert(connection, list(rows.values()))
+        return len(rows)
+
+    @staticmethod
+    def scan(now: Optional[datetime] = None) -> Dict[str, int]:
+        """Recompute every alert; returns the number of alerts per type"""
+        now = now or datetime.now()
+        connection = db.session.connection()
+        counts = {alert_type.value: ComplianceAlertService._reconcile(connection, alert_type, now)
+                  for alert_type in _SOURCES}
+        db.session.commit()
+        ComplianceAlertService._last_scan = time.monotonic()
+        return counts
+
+    @staticmethod
+    def scan_if_due():
+        """Full scan at most once per COMPLIANCE_ALERT_SCAN_SECONDS in this process (0 disables it)"""
+        interval = current_app.config.get('COMPLIANCE_ALERT_SCAN_SECONDS', 3600)
+        last = ComplianceAlertService._last_scan
+        if interval and (last is None or time.monotonic() - last >= interval):
+            ComplianceAlertService.scan()
+
+    @staticmethod
+    def refresh(connection, vehicle_ids: Iterable[int] = (), driver_ids: Iterable[int] = (),
+                now: Optional[datetime] = None):
+        """Reconcile the alerts of some vehicles and drivers"""
+        now = now or datetime.now()
+        vehicle_ids, driver_ids = set(vehicle_ids), set(driver_ids)
+        if vehicle_ids:
+            for alert_type in _VEHICLE_SOURCES.values():
+                ComplianceAlertService._reconcile(connection, alert_type, now, vehicle_ids)
+        if driver_ids:
+            ComplianceAlertService._reconcile(connection, ComplianceAlertType.DRIVER_LICENSE, now, driver_ids)
+
+    @staticmethod
+    def get_alerts(organization_unit_id: Optional[int] = None, alert_type: Optional[ComplianceAlertType] = None,
+                   days: int = DEFAULT_ALERT_DAYS, limit: Optional[int] = None) -> List[ComplianceAlert]:
+        """Expired alerts and those due within `days`, soonest first"""
+        query = ComplianceAlert.query.filter(ComplianceAlert.due_date <= datetime.now() + timedelta(days=days))
+        if organization_unit_id is not None:
+            query = query.filter(ComplianceAlert.organization_unit_id == organization_unit_id)
+        if alert_type is not None:
+            query = query.filter(ComplianceAlert.alert_type == alert_type)
+        query = query.order_by(ComplianceAlert.due_date)
+        return query.limit(limit).all() if limit else query.all()
+
+    @staticmethod
+    def summary(organization_unit_id: Optional[int] = None, days: int = DEFAULT_ALERT_DAYS) -> Dict[str, Dict[str, int]]:
+        """{alert type: {'expired': n, 'expiring': n}} with one grouped query"""
+        now = datetime.now()
+        expired = ComplianceAlert.due_date < now
+        query = (db.session.query(ComplianceAlert.alert_type,
+                                  func.sum(case((expired, 1), else_=0)),
+                                  func.sum(case((expired, 0), else_=1)))
+                 .filter(ComplianceAlert.due_date <= now + timedelta(days=days)))
+        if organization_unit_id is not None:
+            query = query.filter(ComplianceAlert.organization_unit_id == organization_unit_id)
+        result = {alert_type.value: {'expired': 0, 'expiring': 0} for alert_type in ComplianceAlertType}
+        for alert_type, expired_count, expiring_count in query.group_by(ComplianceAlert.alert_type):
+            result[alert_type.value] = {'expired': int(expired_count or 0), 'expiring': int(expiring_count or 0)}
+        return result
+
+
+@job('compliance_alerts.scan', schedule='0 * * * *')
+def scan_compliance_alerts():
+    """Hourly full scan by the job workers"""
+    ComplianceAlertService.scan()
+
+
+# ---- refresh on writes -----------------------------------------------------
+
+def _changed(obj, attributes) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in attributes)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_compliance_alerts(session, flush_context):
+    vehicle_ids, driver_ids = set(), set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if type(obj) in _VEHICLE_SOURCES:
+            vehicle_ids.add(obj.vehicle_id)
+            # Moving a record to another vehicle leaves an alert behind on the old one
+            history = inspect(obj).attrs.vehicle_id.history
+            vehicle_ids.update(v for v in history.deleted or () if v is not None)
+        elif isinstance(obj, Vehicle) and obj not in session.new and _changed(obj, _VEHICLE_ATTRIBUTES):
+            vehicle_ids.add(obj.id)
+        elif isinstance(obj, Driver) and (obj in session.new or obj in session.deleted
+                                          or _changed(obj, _DRIVER_ATTRIBUTES)):
+            driver_ids.add(obj.id)
+    vehicle_ids.discard(None)
+    driver_ids.discard(None)
+    if vehicle_ids or driver_ids:
+        ComplianceAlertService.refresh(session.connection(), vehicle_ids, driver_ids)
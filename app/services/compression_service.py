@@ -0,0 +1,110 @@
+"""Response compression for HTML and JSON.
+
+An after_request hook compresses text responses (COMPRESSION_MIMETYPES) when
+the client accepts it: Brotli if the Brotli package is installed and the
+request accepts ``br``, gzip otherwise. Buffered bodies under
+COMPRESSION_MIN_BYTES are left alone (the headers would outweigh the
+saving). Streamed responses (``stream_template``) are compressed chunk by
+chunk with a flush after each one, so the browser still gets the first part
+of the page while the rest renders.
+
+Responses that are already encoded, partial (206), file transfers
+(``send_file``) or marked ``Cache-Control: no-transform`` are not touched.
+Set COMPRESSION_ENABLED=False when a proxy in front already compresses.
+"""
+import gzip
+import zlib
+from typing import Iterable, Iterator
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only without it
+    brotli = None
+
+DEFAULT_MIMETYPES = ('text/html', 'application/json', 'text/plain', 'text/csv')
+# A flush costs a few bytes and ends a compression block: flush streams every ~8 KB
+STREAM_BLOCK_BYTES = 8 * 1024
+
+
+def _choose_encoding(accept_encodings) -> str:
+    if brotli is not None and 'br' in accept_encodings:
+        return 'br'
+    if 'gzip' in accept_encodings:
+        return 'gzip'
+    return ''
+
+
+def _compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level)
+
+
+def _coalesce(chunks: Iterable[bytes], size: int) -> Iterator[bytes]:
+    """Group the small pieces a template stream yields into blocks of about ``size`` bytes"""
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield b''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _compress_stream(chunks: Iterable[bytes], encoding: str, level: int) -> Iterator[bytes]:
+    """Compress a streamed body, flushing after every block so nothing is held back"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(level, 11))
+        for block in _coalesce(chunks, STREAM_BLOCK_BYTES):
+            yield compressor.process(block) + compressor.flush()
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    for block in _coalesce(chunks, STREAM_BLOCK_BYTES):
+        yield compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def compress_response(response, min_bytes: int, level: int, mimetypes: Iterable[str]):
+    """Compress a response in place when worthwhile and accepted"""
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in mimetypes
+            or response.cache_control.no_transform):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding(request.accept_encodings)
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+        response.set_data(_compress(data, encoding, level))
+    response.headers['Content-Encoding'] = encoding
+    # The encoded body is a different representation of the same resource
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+
+def init_compression(app):
+    """Register the compression hook"""
+    mimetypes = tuple(app.config.get('COMPRESSION_MIMETYPES', DEFAULT_MIMETYPES))
+
+    @app.after_request
+    def compress(response):
+        if not app.config.get('COMPRESSION_ENABLED', True):
+            return response
+        return compress_response(response, app.config.get('COMPRESSION_MIN_BYTES', 1024),
+                                 app.config.get('COMPRESSION_LEVEL', 6), mimetypes)
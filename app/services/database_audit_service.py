@@ -7,6 +7,9 @@ from sqlalchemy import event
 from sqlalchemy.engine import Engine
 from flask import g, has_request_context
 from app.services.security_audit_service import SecurityAudit
+from app.services.query_profiler_service import QueryProfiler
+from app.services.metrics_service import Metrics, record_db_statement
+from app.services.audit_event_service import AuditEvents
 from app.extensions import db
 
 # Configure database logger
@@ -76,6 +79,13 @@ class DatabaseAudit:
         if not DatabaseAudit._enabled:
             return
 
+        if AuditEvents.is_active():
+            event_details = dict(details or {})
+            if execution_time:
+                event_details['execution_time_ms'] = round(execution_time * 1000, 2)
+            AuditEvents.record('database', operation, table, True, event_details)
+            return
+
         context = DatabaseAudit._get_request_context()
 
         log_data = {**context}
@@ -114,7 +124,10 @@ class DatabaseAudit:
     @staticmethod
     def log_transaction_start():
         """Log transaction start"""
-        if not DatabaseAudit._enabled:
+        if not DatabaseAudit._enabled or not db_logger.isEnabledFor(logging.DEBUG):
+            return
+
+        if AuditEvents.record('database', 'TRANSACTION_START', 'system'):
             return
 
         context = DatabaseAudit._get_request_context()
@@ -135,6 +148,9 @@ class DatabaseAudit:
         if changes:
             details['changes'] = changes
 
+        if AuditEvents.record('database', 'TRANSACTION_COMMIT', 'system', True, details):
+            return
+
         context = DatabaseAudit._get_request_context()
         db_logger.info("TRANSACTION_COMMIT", extra={
             **context,
@@ -153,6 +169,9 @@ class DatabaseAudit:
         if reason:
             details['reason'] = str(reason)
 
+        if AuditEvents.record('database', 'TRANSACTION_ROLLBACK', 'system', True, details):
+            return
+
         context = DatabaseAudit._get_request_context()
         db_logger.warning("TRANSACTION_ROLLBACK", extra={
             **context,
@@ -166,7 +185,7 @@ class DatabaseAudit:
 @event.listens_for(Engine, "before_execute")
 def before_execute(conn, clauseelement, multiparams, params):
     """Log before query execution"""
-    if not DatabaseAudit._enabled:
+    if not DatabaseAudit._enabled and not QueryProfiler.is_active() and not Metrics.is_enabled():
         return
 
     # Store start time for performance monitoring
@@ -175,11 +194,14 @@ def before_execute(conn, clauseelement, multiparams, params):
 @event.listens_for(Engine, "after_execute")
 def after_execute(conn, clauseelement, multiparams, params, result):
     """Log after query execution"""
-    if not DatabaseAudit._enabled:
+    if not DatabaseAudit._enabled and not QueryProfiler.is_active() and not Metrics.is_enabled():
         return
 
     execution_time = time.time() - getattr(conn, '_query_start_time', time.time())
 
+    # Feed the request-scoped profiler (no-op outside profiled requests)
+    QueryProfiler.record(clauseelement, execution_time)
+
     # Extract table name from query
     table_name = 'unknown'
     try:
@@ -203,6 +225,11 @@ def after_execute(conn, clauseelement, multiparams, params, result):
     else:
         operation = 'QUERY'
 
+    record_db_statement(table_name, operation, execution_time)
+
+    if not DatabaseAudit._enabled:
+        return
+
     # Log detailed operations for tracked tables
     if table_name.lower() in DatabaseAudit._tracked_tables:
         details = {
@@ -262,7 +289,7 @@ def after_rollback(session):
 @event.listens_for(db.session, "before_flush")
 def before_flush(session, flush_context, instances):
     """Log before session flush"""
-    if not DatabaseAudit._enabled:
+    if not DatabaseAudit._enabled or not db_logger.isEnabledFor(logging.DEBUG):
         return
 
     # This captures the actual changes being made
@@ -273,6 +300,8 @@ def before_flush(session, flush_context, instances):
     }
 
     if any(changes.values()):  # Only log if there are actual changes
+        if AuditEvents.record('database', 'SESSION_FLUSH', 'system', True, changes):
+            return
         context = DatabaseAudit._get_request_context()
         db_logger.debug("SESSION_FLUSH", extra={
             **context,
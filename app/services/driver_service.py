@@ -1,9 +1,9 @@
 """Driver service"""
 from typing import List, Optional
-from sqlalchemy import or_
 from app.extensions import db
 from app.models.driver import Driver, DriverType, DriverStatus
 from app.utils.audit_decorators import audit_model_change, audit_operation
+from app.services.search_service import SearchService
 
 class DriverService:
     """Service for driver operations"""
@@ -159,18 +159,13 @@ class DriverService:
         return driver
     
     @staticmethod
-    def search_drivers(search_term: str) -> List[Driver]:
-        """Search drivers by name or document"""
-        search_pattern = f"%{search_term}%"
-        return Driver.query.filter(
-            Driver.is_active == True,
-            or_(
-                Driver.first_name.ilike(search_pattern),
-                Driver.last_name.ilike(search_pattern),
-                Driver.document_number.ilike(search_pattern),
-                Driver.driver_license_number.ilike(search_pattern)
-            )
-        ).all()
+    def search_drivers(search_term: str, organization_unit_id: Optional[int] = None) -> List[Driver]:
+        """Search drivers by name or document (full-text index, best matches first)"""
+        ids = SearchService.search_ids('driver', search_term, organization_unit_id)
+        if not ids:
+            return []
+        drivers = {d.id: d for d in Driver.query.filter(Driver.id.in_(ids)).all()}
+        return [drivers[i] for i in ids if i in drivers]
     
     @staticmethod
     def get_active_drivers() -> List[Driver]:
@@ -0,0 +1,276 @@
+"""Content-addressed storage for uploaded documents.
+
+Uploads are streamed once, in CHUNK_SIZE pieces, into a temporary file under
+FILE_STORAGE_ROOT while the SHA-256 and the size are computed (an upload over
+the limit stops at the first chunk past it). The file is then renamed to
+``<root>/<sha[:2]>/<sha[2:4]>/<sha>``: the same PDF uploaded for 200 vehicles
+is stored once and the records all hold the same ``files/<sha><ext>`` path.
+
+``stored_files.ref_count`` counts the records pointing at each blob. It is
+kept on writes: flushing a record whose document column gains or loses a
+stored path adjusts the counts in the same transaction. The nightly
+``files.collect`` job recounts from the document columns (catching writes
+that bypass the ORM) and deletes the blobs left unreferenced for
+FILE_STORAGE_GC_GRACE_HOURS.
+
+Downloads go through ``/files/<sha><ext>`` (login required) with the hash as
+ETag, conditional requests and Range; with FILE_STORAGE_ACCEL_REDIRECT the
+body is left to nginx (``X-Accel-Redirect``), with USE_X_SENDFILE to the
+server's X-Sendfile. Paths written before the store (``uploads/...``) keep
+being served as static files; templates link both with ``document_url``.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, Iterable, Optional
+from flask import current_app, url_for
+from sqlalchemy import delete, event, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from werkzeug.utils import secure_filename
+from app.extensions import db
+from app.models import (StoredFile, VehicleInsurance, Fine, MaintenanceRecord, RentingContract, VehicleTax,
+                        UrbanAccessAuthorization, VehicleAssignment, VehiclePickup)
+from app.services.job_service import job
+from app.utils.exceptions import UploadError
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+REF_PREFIX = 'files/'
+_REF_PATTERN = re.compile(r'^files/([0-9a-f]{64})(\.[a-z0-9]{1,9})?$')
+
+# Record columns holding a document path (stored reference or legacy static path)
+DOCUMENT_COLUMNS = {
+    VehicleInsurance: ('document_path',),
+    Fine: ('document_path', 'payment_receipt_path'),
+    MaintenanceRecord: ('document_path',),
+    RentingContract: ('document_path',),
+    VehicleTax: ('document_path',),
+    UrbanAccessAuthorization: ('document_path',),
+    VehicleAssignment: ('document_path',),
+    VehiclePickup: ('not_taken_attachment',),
+}
+
+
+def _upload_error(message: str, log_message: str, *args) -> UploadError:
+    err_id = uuid.uuid4().hex[:8]
+    logger.error('[%s] ' + log_message, err_id, *args)
+    return UploadError(f'{message} (id={err_id})')
+
+
+def parse_reference(value: Optional[str]) -> Optional[str]:
+    """SHA-256 of a ``files/<sha><ext>`` document path; None for other values"""
+    match = _REF_PATTERN.match(value or '')
+    return match.group(1) if match else None
+
+
+class FileStorageService:
+    """Store, reference-count and locate uploaded documents"""
+
+    @staticmethod
+    def root() -> str:
+        return os.path.abspath(current_app.config['FILE_STORAGE_ROOT'])
+
+    @staticmethod
+    def blob_path(sha256: str) -> str:
+        return os.path.join(FileStorageService.root(), sha256[:2], sha256[2:4], sha256)
+
+    @staticmethod
+    def relative_path(sha256: str) -> str:
+        """Location of the blob below the storage root, '/'-separated (X-Accel-Redirect)"""
+        return f'{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+    @staticmethod
+    def check_extension(filename: Optional[str], allowed_ext: set) -> str:
+        """Lower-case extension of an upload name; raises UploadError if missing or not allowed"""
+        if not filename:
+            raise _upload_error('No se proporcionó archivo', 'No file provided for upload')
+        extension = os.path.splitext(secure_filename(filename))[1].lower()
+        if extension not in allowed_ext:
+            raise _upload_error('Tipo de archivo no permitido', 'Disallowed extension: %s', extension)
+        return extension
+
+    @staticmethod
+    def store(file_storage, allowed_ext: set, max_bytes: int) -> str:
+        """Validate and store an uploaded file (werkzeug FileStorage); returns its document path"""
+        extension = FileStorageService.check_extension(getattr(file_storage, 'filename', None), allowed_ext)
+        return FileStorageService.store_stream(file_storage.stream, extension, max_bytes)
+
+    @staticmethod
+    def store_stream(stream: BinaryIO, extension: str, max_bytes: int) -> str:
+        """Copy a stream to the store, hashing and size-checking in the same pass"""
+        tmp_dir = os.path.join(FileStorageService.root(), 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise _upload_error('El fichero excede el tamaño máximo permitido',
+                                            'File too large: more than %d bytes', max_bytes)
+                    digest.update(chunk)
+                    out.write(chunk)
+            return FileStorageService._add_blob(tmp_path, digest.hexdigest(), size, extension)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def store_file(path: str, extension: str) -> str:
+        """Move a complete file already on disk (same filesystem as the root) into the store"""
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as source:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                size += len(chunk)
+                digest.update(chunk)
+        return FileStorageService._add_blob(path, digest.hexdigest(), size, extension)
+
+    @staticmethod
+    def _add_blob(tmp_path: str, sha256: str, size: int, extension: str) -> str:
+        """Record the blob and move the temporary file into place (a duplicate just replaces it)"""
+        now = datetime.utcnow()
+        table = StoredFile.__table__
+        # Own short transaction: the caller's unit of work (the record being saved) is left uncommitted
+        with db.engine.begin() as connection:
+            insert = (postgresql if connection.dialect.name == 'postgresql' else sqlite).insert(table)
+            connection.execute(insert.values(sha256=sha256, size=size, extension=extension, ref_count=0,
+                                             created_at=now, updated_at=now)
+                               .on_conflict_do_nothing(index_elements=['sha256']))
+            # A fresh upload keeps the blob out of garbage collection until it is referenced
+            connection.execute(update(table).where(table.c.sha256 == sha256).values(updated_at=now))
+
+        final_path = FileStorageService.blob_path(sha256)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+        logger.info('Stored %s (%d bytes)', sha256, size)
+        return f'{REF_PREFIX}{sha256}{extension}'
+
+    @staticmethod
+    def get(sha256: str) -> Optional[StoredFile]:
+        return StoredFile.query.filter_by(sha256=sha256).first()
+
+    @staticmethod
+    def check_reference(path: str, allowed_ext: set) -> str:
+        """Validate a document path uploaded beforehand (chunked upload); returns it"""
+        sha256 = parse_reference(path)
+        if not sha256 or FileStorageService.get(sha256) is None:
+            raise _upload_error('Documento subido no encontrado', 'Unknown stored file reference: %s', path)
+        if os.path.splitext(path)[1] not in allowed_ext:
+            raise _upload_error('Tipo de archivo no permitido', 'Disallowed extension: %s', path)
+        return path
+
+    @staticmethod
+    def adjust_references(connection, deltas: Dict[str, int]):
+        """Add each delta to the ref_count of its blob"""
+        table = StoredFile.__table__
+        now = datetime.utcnow()
+        for sha256, delta in deltas.items():
+            if delta:
+                connection.execute(update(table).where(table.c.sha256 == sha256)
+                                   .values(ref_count=table.c.ref_count + delta, updated_at=now))
+
+    @staticmethod
+    def recount() -> int:
+        """Recompute every ref_count from the document columns; returns the rows corrected"""
+        counts = {}
+        for model, columns in DOCUMENT_COLUMNS.items():
+            for column in columns:
+                attribute = getattr(model, column)
+                for value in db.session.execute(select(attribute).where(attribute.like(f'{REF_PREFIX}%'))).scalars():
+                    sha256 = parse_reference(value)
+                    if sha256:
+                        counts[sha256] = counts.get(sha256, 0) + 1
+        table = StoredFile.__table__
+        corrected = 0
+        now = datetime.utcnow()
+        for sha256, ref_count in db.session.execute(select(table.c.sha256, table.c.ref_count)).all():
+            if counts.get(sha256, 0) != ref_count:
+                db.session.execute(update(table).where(table.c.sha256 == sha256)
+                                   .values(ref_count=counts.get(sha256, 0), updated_at=now))
+                corrected += 1
+        db.session.commit()
+        return corrected
+
+    @staticmethod
+    def collect(now: Optional[datetime] = None, grace_hours: Optional[int] = None) -> int:
+        """Delete the blobs unreferenced for longer than the grace period; returns how many"""
+        now = now or datetime.utcnow()
+        if grace_hours is None:
+            grace_hours = current_app.config.get('FILE_STORAGE_GC_GRACE_HOURS', 24)
+        table = StoredFile.__table__
+        condition = (table.c.ref_count <= 0) & (table.c.updated_at < now - timedelta(hours=grace_hours))
+        hashes = list(db.session.execute(select(table.c.sha256).where(condition)).scalars())
+        if not hashes:
+            return 0
+        db.session.execute(delete(table).where(condition, table.c.sha256.in_(hashes)))
+        db.session.commit()
+        # Uploaded again meanwhile: the new row owns the file
+        revived = set(db.session.execute(select(table.c.sha256).where(table.c.sha256.in_(hashes))).scalars())
+        for sha256 in set(hashes) - revived:
+            try:
+                os.remove(FileStorageService.blob_path(sha256))
+            except FileNotFoundError:
+                pass
+        logger.info('Removed %d unreferenced stored files', len(hashes) - len(revived))
+        return len(hashes) - len(revived)
+
+
+def document_url(path: Optional[str]) -> Optional[str]:
+    """URL of a record's document: the download route for stored files, static otherwise"""
+    if not path:
+        return None
+    if parse_reference(path):
+        return url_for('files.download', name=path[len(REF_PREFIX):])
+    return url_for('static', filename=path)
+
+
+def init_file_storage(app):
+    """Expose document_url to templates"""
+    app.jinja_env.globals['document_url'] = document_url
+
+
+@job('files.collect', schedule='15 4 * * *')
+def collect_stored_files():
+    """Nightly: fix reference counts and delete unreferenced blobs"""
+    FileStorageService.recount()
+    FileStorageService.collect()
+
+
+# ---- reference counting on writes --------------------------------------------
+
+def _references(values: Iterable) -> Iterable[str]:
+    return filter(None, (parse_reference(value) for value in values or ()))
+
+
+@event.listens_for(db.session, 'before_flush')
+def _count_document_references(session, flush_context, instances):
+    deltas = {}
+    for obj in session.new:
+        for column in DOCUMENT_COLUMNS.get(type(obj), ()):
+            for sha256 in _references([getattr(obj, column)]):
+                deltas[sha256] = deltas.get(sha256, 0) + 1
+    for obj in session.dirty:
+        columns = DOCUMENT_COLUMNS.get(type(obj), ())
+        for column in columns:
+            history = inspect(obj).attrs[column].history
+            if history.has_changes():
+                for sha256 in _references(history.added):
+                    deltas[sha256] = deltas.get(sha256, 0) + 1
+                for sha256 in _references(history.deleted):
+                    deltas[sha256] = deltas.get(sha256, 0) - 1
+    for obj in session.deleted:
+        for column in DOCUMENT_COLUMNS.get(type(obj), ()):
+            # The original value: a change made before deleting is not a reference
+            history = inspect(obj).attrs[column].history
+            for sha256 in _references(history.deleted or history.unchanged or [getattr(obj, column)]):
+                deltas[sha256] = deltas.get(sha256, 0) - 1
+    if any(deltas.values()):
+        FileStorageService.adjust_references(session.connection(), deltas)
@@ -1,14 +1,18 @@
 """Fine service"""
 from typing import List, Optional
 from datetime import datetime
+from sqlalchemy import and_, or_
 from app.extensions import db
 from app.models.fine import Fine, FineStatus, FineType
 
 class FineService:
     @staticmethod
-    def get_all_fines() -> List[Fine]:
-        """Get all fines"""
-        return Fine.query.order_by(Fine.fine_date.desc()).all()
+    def get_all_fines(status: Optional[FineStatus] = None) -> List[Fine]:
+        """Get all fines, optionally only those in `status`"""
+        query = Fine.query
+        if status is not None:
+            query = query.filter(Fine.status == status)
+        return query.order_by(Fine.fine_date.desc()).all()
     
     @staticmethod
     def get_fine_by_id(fine_id: int) -> Optional[Fine]:
@@ -27,16 +31,16 @@ class FineService:
     
     @staticmethod
     def get_pending_fines() -> List[Fine]:
-        """Get all pending fines"""
-        return Fine.query.filter_by(status=FineStatus.PENDING).all()
+        """Get all unpaid fines (pending or already overdue)"""
+        return Fine.query.filter(Fine.status.in_((FineStatus.PENDING, FineStatus.OVERDUE))).all()
     
     @staticmethod
     def get_overdue_fines() -> List[Fine]:
-        """Get all overdue fines"""
-        return Fine.query.filter(
-            Fine.status == FineStatus.PENDING,
-            Fine.payment_deadline < datetime.now()
-        ).all()
+        """Get all overdue fines, including pending ones the status sweeper has not reached yet"""
+        return Fine.query.filter(or_(
+            Fine.status == FineStatus.OVERDUE,
+            and_(Fine.status == FineStatus.PENDING, Fine.payment_deadline < datetime.now())
+        )).all()
     
     @staticmethod
     def create_fine(
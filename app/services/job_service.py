@@ -0,0 +1,371 @@
+"""Background jobs without an external broker.
+
+Jobs are rows of the ``jobs`` table (SQLite or PostgreSQL). Functions become
+jobs with the ``@job`` decorator::
+
+    @job('reports.monthly', priority=5, max_attempts=5)
+    def build_monthly_report(year, month):
+        ...
+
+    build_monthly_report.delay(2025, 1)          # queue it (on the caller's commit)
+    build_monthly_report(2025, 1)                # still callable synchronously
+
+    @job('compliance_alerts.scan', schedule='0 * * * *')   # cron-like
+    def scan():
+        ...
+
+Workers (scripts/run_jobs.py, or JOB_INPROCESS_WORKERS threads inside the web
+process) claim ready jobs by priority with a compare-and-set UPDATE (plus
+``FOR UPDATE SKIP LOCKED`` on PostgreSQL), run them inside an application
+context and retry failures with exponential backoff. While a job runs, the
+worker renews its lock every JOB_HEARTBEAT_SECONDS, so only jobs of dead
+workers are requeued after JOB_LOCK_TIMEOUT_SECONDS. Scheduled jobs are
+enqueued once per slot: the slot is a unique key, so several workers running
+the scheduler do not duplicate runs.
+
+Arguments must be JSON serializable; cron schedules use local time.
+"""
+import functools
+import importlib
+import json
+import logging
+import os
+import pkgutil
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from app.extensions import db
+from app.models import Job, JobStatus
+from app.services.metrics_service import Metrics
+from app.utils.cron import CronSchedule
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 3600
+
+# name -> JobDefinition
+JOB_REGISTRY: Dict[str, 'JobDefinition'] = {}
+
+
+class JobDefinition:
+    """A function registered as a job; calling it runs it synchronously"""
+
+    def __init__(self, func: Callable, name: str, priority: int = 0, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 backoff_seconds: int = DEFAULT_BACKOFF_SECONDS, schedule: Optional[str] = None):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.schedule = CronSchedule(schedule) if schedule else None
+        functools.update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs) -> Job:
+        """Queue a run with these arguments (part of the current transaction)"""
+        return JobService.enqueue(self.name, args, kwargs)
+
+    def delay_until(self, run_at: datetime, *args, **kwargs) -> Job:
+        """Queue a run that does not start before `run_at` (UTC)"""
+        return JobService.enqueue(self.name, args, kwargs, run_at=run_at)
+
+
+def job(name: Optional[str] = None, priority: int = 0, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        backoff_seconds: int = DEFAULT_BACKOFF_SECONDS, schedule: Optional[str] = None):
+    """Register a function as a background job (see module docstring)"""
+    def decorator(func):
+        definition = JobDefinition(func, name or f'{func.__module__}.{func.__name__}', priority=priority,
+                                   max_attempts=max_attempts, backoff_seconds=backoff_seconds, schedule=schedule)
+        JOB_REGISTRY[definition.name] = definition
+        return definition
+    return decorator
+
+
+def load_job_modules():
+    """Import every service module so that their @job functions are registered"""
+    import app.services as services
+    for module in pkgutil.iter_modules(services.__path__):
+        importlib.import_module(f'{services.__name__}.{module.name}')
+
+
+def _insert(connection):
+    return (postgresql if connection.dialect.name == 'postgresql' else sqlite).insert(Job.__table__)
+
+
+class JobService:
+    """Queue operations on the jobs table"""
+
+    @staticmethod
+    def enqueue(name: str, args=(), kwargs: Optional[dict] = None, priority: Optional[int] = None,
+                run_at: Optional[datetime] = None, unique_key: Optional[str] = None) -> Optional[Job]:
+        """Insert a pending job in the current transaction; the caller commits.
+
+        With `unique_key` returns None when that key is already queued.
+        """
+        definition = JOB_REGISTRY.get(name)
+        if definition is None:
+            raise ValueError(f'Trabajo no registrado: {name}')
+        values = {
+            'name': name,
+            'payload': json.dumps({'args': list(args), 'kwargs': kwargs or {}}),
+            'status': JobStatus.PENDING,
+            'priority': definition.priority if priority is None else priority,
+            'run_at': run_at or datetime.utcnow(),
+            'attempts': 0,
+            'max_attempts': definition.max_attempts,
+            'unique_key': unique_key,
+            'created_at': datetime.utcnow(),
+        }
+        connection = db.session.connection()
+        stmt = _insert(connection).values(**values)
+        if unique_key is not None:
+            stmt = stmt.on_conflict_do_nothing(index_elements=['unique_key'])
+        result = connection.execute(stmt)
+        if not result.rowcount:
+            return None
+        return db.session.get(Job, result.inserted_primary_key[0])
+
+    @staticmethod
+    def claim(worker_id: str) -> Optional[Job]:
+        """Lock the next ready job for this worker (highest priority, oldest first)"""
+        now = datetime.utcnow()
+        table = Job.__table__
+        for _ in range(5):
+            query = (select(table.c.id)
+                     .where(table.c.status == JobStatus.PENDING, table.c.run_at <= now)
+                     .order_by(table.c.priority.desc(), table.c.run_at, table.c.id)
+                     .limit(1))
+            if db.engine.dialect.name == 'postgresql':
+                query = query.with_for_update(skip_locked=True)
+            job_id = db.session.execute(query).scalar()
+            if job_id is None:
+                db.session.commit()
+                return None
+            # Compare-and-set: another worker may have claimed it meanwhile
+            claimed = db.session.execute(
+                update(table)
+                .where(table.c.id == job_id, table.c.status == JobStatus.PENDING)
+                .values(status=JobStatus.RUNNING, locked_by=worker_id, locked_at=now,
+                        attempts=table.c.attempts + 1)
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return db.session.get(Job, job_id, populate_existing=True)
+        return None
+
+    @staticmethod
+    def execute(job_row: Job) -> bool:
+        """Run a claimed job and record the outcome; returns True on success"""
+        job_id, name = job_row.id, job_row.name
+        attempts, max_attempts = job_row.attempts, job_row.max_attempts
+        payload = json.loads(job_row.payload or '{}')
+        definition = JOB_REGISTRY.get(name)
+        table = Job.__table__
+
+        start = time.perf_counter()
+        try:
+            if definition is None:
+                raise LookupError(f'Trabajo no registrado en este proceso: {name}')
+            definition.func(*payload.get('args', []), **payload.get('kwargs', {}))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            backoff = definition.backoff_seconds if definition else DEFAULT_BACKOFF_SECONDS
+            retry = attempts < max_attempts
+            values = {'status': JobStatus.PENDING if retry else JobStatus.FAILED, 'locked_by': None,
+                      'locked_at': None, 'last_error': f'{e!r}\n{traceback.format_exc()}'[-4000:]}
+            if retry:
+                values['run_at'] = datetime.utcnow() + timedelta(
+                    seconds=min(backoff * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS))
+            else:
+                values['finished_at'] = datetime.utcnow()
+            db.session.execute(update(table).where(table.c.id == job_id).values(**values))
+            db.session.commit()
+            logger.warning('Job %s (%s) failed on attempt %s/%s: %r', job_id, name, attempts, max_attempts, e)
+            Metrics.inc('jobs', {'name': name, 'status': 'retry' if retry else 'failed'})
+            return False
+        finally:
+            Metrics.observe('job_duration_seconds', time.perf_counter() - start, {'name': name})
+
+        db.session.execute(update(table).where(table.c.id == job_id).values(
+            status=JobStatus.SUCCEEDED, locked_by=None, locked_at=None, finished_at=datetime.utcnow()))
+        db.session.commit()
+        Metrics.inc('jobs', {'name': name, 'status': 'succeeded'})
+        return True
+
+    @staticmethod
+    def recover_stale(timeout_seconds: int) -> int:
+        """Requeue running jobs whose worker stopped answering (locked for longer than the timeout)"""
+        table = Job.__table__
+        count = db.session.execute(
+            update(table)
+            .where(table.c.status == JobStatus.RUNNING,
+                   table.c.locked_at < datetime.utcnow() - timedelta(seconds=timeout_seconds))
+            .values(status=JobStatus.PENDING, locked_by=None, locked_at=None)
+        ).rowcount
+        db.session.commit()
+        return count
+
+    @staticmethod
+    def enqueue_scheduled(next_runs: Dict[str, datetime], now: Optional[datetime] = None):
+        """Queue the scheduled jobs whose slot has arrived; `next_runs` keeps the next slot per job"""
+        now = now or datetime.now()
+        for name, definition in JOB_REGISTRY.items():
+            if definition.schedule is None:
+                continue
+            slot = next_runs.get(name)
+            if slot is None:
+                next_runs[name] = definition.schedule.next_after(now)
+                continue
+            if now >= slot:
+                JobService.enqueue(name, unique_key=f'{name}@{slot:%Y-%m-%dT%H:%M}')
+                next_runs[name] = definition.schedule.next_after(now)
+        db.session.commit()
+
+    @staticmethod
+    def queue_depth() -> int:
+        """Pending jobs ready to run"""
+        return db.session.query(func.count(Job.id)).filter(
+            Job.status == JobStatus.PENDING, Job.run_at <= datetime.utcnow()).scalar()
+
+    @staticmethod
+    def purge_finished(retention_days: int) -> int:
+        """Delete succeeded jobs (and failed ones) finished more than `retention_days` ago"""
+        count = Job.query.filter(
+            Job.status.in_([JobStatus.SUCCEEDED, JobStatus.FAILED]),
+            Job.finished_at < datetime.utcnow() - timedelta(days=retention_days),
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return count
+
+
+class JobHeartbeat:
+    """Renews the lock of a running job from a side thread until the block exits"""
+
+    def __init__(self, app, job_id: int, worker_id: str, interval: float):
+        self.app = app
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'job-heartbeat-{job_id}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def beat(self) -> bool:
+        """Set locked_at to now, on its own connection; False once the job is no longer ours"""
+        table = Job.__table__
+        with db.engine.begin() as connection:
+            return bool(connection.execute(
+                update(table)
+                .where(table.c.id == self.job_id, table.c.status == JobStatus.RUNNING,
+                       table.c.locked_by == self.worker_id)
+                .values(locked_at=datetime.utcnow())
+            ).rowcount)
+
+    def _run(self):
+        with self.app.app_context():
+            while not self._stop.wait(self.interval):
+                try:
+                    if not self.beat():
+                        return
+                except SQLAlchemyError as e:
+                    # A missed beat only matters if they keep failing past the lock timeout
+                    logger.warning('Heartbeat of job %s failed: %s', self.job_id, e)
+
+
+class JobWorker:
+    """Claims and runs jobs in a loop; optionally also enqueues scheduled jobs"""
+
+    # How often a worker requeues jobs left RUNNING by a dead worker
+    RECOVERY_INTERVAL = 60
+
+    def __init__(self, app, worker_id: Optional[str] = None, run_scheduler: bool = True):
+        self.app = app
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+        self.run_scheduler = run_scheduler
+        self.poll_seconds = app.config.get('JOB_POLL_SECONDS', 1.0)
+        self.lock_timeout = app.config.get('JOB_LOCK_TIMEOUT_SECONDS', 600)
+        self.heartbeat = app.config.get('JOB_HEARTBEAT_SECONDS', 60)
+        self._next_runs = {}
+        self._last_recovery = 0.0
+
+    def _housekeeping(self):
+        if self.run_scheduler:
+            JobService.enqueue_scheduled(self._next_runs)
+        if time.monotonic() - self._last_recovery >= self.RECOVERY_INTERVAL:
+            self._last_recovery = time.monotonic()
+            recovered = JobService.recover_stale(self.lock_timeout)
+            if recovered:
+                logger.warning('Requeued %s job(s) locked for more than %ss', recovered, self.lock_timeout)
+
+    def run_once(self) -> bool:
+        """Run housekeeping and at most one job; returns whether a job ran"""
+        with self.app.app_context():
+            try:
+                self._housekeeping()
+                claimed = JobService.claim(self.worker_id)
+                if claimed is None:
+                    return False
+                with JobHeartbeat(self.app, claimed.id, self.worker_id, self.heartbeat):
+                    JobService.execute(claimed)
+                return True
+            finally:
+                db.session.remove()
+
+    def run(self, stop_event: Optional[threading.Event] = None, max_jobs: Optional[int] = None):
+        """Loop until `stop_event` is set (or `max_jobs` jobs ran)"""
+        processed = 0
+        while not (stop_event and stop_event.is_set()):
+            try:
+                ran = self.run_once()
+            except Exception:
+                # Database unavailable or similar: keep the worker alive
+                logger.exception('Job worker %s loop error', self.worker_id)
+                ran = False
+            if ran:
+                processed += 1
+                if max_jobs and processed >= max_jobs:
+                    break
+                continue
+            if stop_event:
+                stop_event.wait(self.poll_seconds)
+            else:
+                time.sleep(self.poll_seconds)
+
+
+@job('jobs.purge', schedule='30 3 * * *')
+def purge_finished_jobs():
+    """Daily cleanup of finished jobs older than JOB_RETENTION_DAYS"""
+    from flask import current_app
+    JobService.purge_finished(current_app.config.get('JOB_RETENTION_DAYS', 7))
+
+
+def init_jobs(app):
+    """Queue depth gauge and, with JOB_INPROCESS_WORKERS > 0, worker threads inside this process"""
+    Metrics.register_gauge_callback('jobs_queue_depth', 'Pending jobs ready to run', JobService.queue_depth)
+
+    workers = app.config.get('JOB_INPROCESS_WORKERS', 0)
+    if not workers or app.testing:
+        return
+    load_job_modules()
+    for index in range(workers):
+        # A single thread runs the scheduler; slot keys dedupe across processes anyway
+        worker = JobWorker(app, run_scheduler=index == 0)
+        threading.Thread(target=worker.run, name=f'job-worker-{index}', daemon=True).start()
@@ -0,0 +1,414 @@
+"""In-process metrics registry with Prometheus text exposition.
+
+Samples live in a plain dictionary for single-process servers. When
+METRICS_MULTIPROC_DIR is configured (gunicorn with several workers) every
+worker writes its samples to its own memory-mapped file in that directory and
+the worker answering /metrics merges all files, so the scrape reflects the
+whole server and not just one worker.
+"""
+import glob
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_INITIAL_MMAP_SIZE = 1024 * 1024
+
+
+class _MmapedDict:
+    """Append-only key -> float map stored in a memory-mapped file.
+
+    Layout: an int32 with the used size, 4 bytes of padding and then entries of
+    (int32 key length, utf-8 key padded to 8 bytes, float64 value).
+    """
+
+    def __init__(self, filename: str, read_mode: bool = False):
+        self._f = open(filename, 'rb' if read_mode else 'a+b')
+        self._fname = filename
+        capacity = os.fstat(self._f.fileno()).st_size
+        if capacity == 0 and read_mode:
+            self._f.close()
+            raise ValueError(f'Metrics file not initialized yet: {filename}')
+        if capacity == 0:
+            self._f.truncate(_INITIAL_MMAP_SIZE)
+            capacity = _INITIAL_MMAP_SIZE
+        self._capacity = capacity
+        self._m = mmap.mmap(self._f.fileno(), self._capacity,
+                            access=mmap.ACCESS_READ if read_mode else mmap.ACCESS_WRITE)
+        self._positions = {}
+        self._used = struct.unpack_from('i', self._m, 0)[0]
+        if self._used == 0:
+            self._used = 8
+            if not read_mode:
+                struct.pack_into('i', self._m, 0, self._used)
+        elif not read_mode:
+            for key, _, pos in self._read_all_values():
+                self._positions[key] = pos
+
+    def _read_all_values(self):
+        pos = 8
+        while pos < self._used:
+            encoded_len = struct.unpack_from('i', self._m, pos)[0]
+            pos += 4
+            encoded = self._m[pos:pos + encoded_len]
+            pos += encoded_len + (8 - (encoded_len + 4) % 8)
+            value = struct.unpack_from('d', self._m, pos)[0]
+            yield encoded.decode('utf-8'), value, pos
+            pos += 8
+
+    def _init_value(self, key: str):
+        encoded = key.encode('utf-8')
+        padded = encoded + b' ' * (8 - (len(encoded) + 4) % 8)
+        entry = struct.pack(f'i{len(padded)}sd', len(encoded), padded, 0.0)
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._f.truncate(self._capacity)
+            self._m.close()
+            self._m = mmap.mmap(self._f.fileno(), self._capacity)
+        self._m[self._used:self._used + len(entry)] = entry
+        self._positions[key] = self._used + 4 + len(padded)
+        self._used += len(entry)
+        struct.pack_into('i', self._m, 0, self._used)
+
+    def items(self):
+        return [(key, value) for key, value, _ in self._read_all_values()]
+
+    def read(self, key: str) -> float:
+        if key not in self._positions:
+            self._init_value(key)
+        return struct.unpack_from('d', self._m, self._positions[key])[0]
+
+    def write(self, key: str, value: float):
+        if key not in self._positions:
+            self._init_value(key)
+        struct.pack_into('d', self._m, self._positions[key], value)
+
+    def close(self):
+        if self._f:
+            self._m.close()
+            self._f.close()
+            self._f = None
+
+
+class _DictStore:
+    """Single-process sample storage"""
+
+    def __init__(self):
+        self._values = {}
+
+    def add(self, kind: str, key: str, amount: float):
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, kind: str, key: str, value: float):
+        self._values[key] = value
+
+    def collect(self):
+        return dict(self._values)
+
+
+class _MmapStore:
+    """Per-process mmap files merged at collection time"""
+
+    def __init__(self, directory: str):
+        self._dir = directory
+        self._pid = None
+        self._files = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _file(self, kind: str) -> _MmapedDict:
+        pid = os.getpid()
+        if pid != self._pid:
+            # Forked worker: never share the parent's files
+            self._files = {}
+            self._pid = pid
+        if kind not in self._files:
+            self._files[kind] = _MmapedDict(os.path.join(self._dir, f'{kind}_{pid}.db'))
+        return self._files[kind]
+
+    def add(self, kind: str, key: str, amount: float):
+        f = self._file(kind)
+        f.write(key, f.read(key) + amount)
+
+    def set(self, kind: str, key: str, value: float):
+        self._file(kind).write(key, value)
+
+    def collect(self):
+        merged = {}
+        for path in glob.glob(os.path.join(self._dir, '*.db')):
+            try:
+                f = _MmapedDict(path, read_mode=True)
+            except (OSError, ValueError):
+                continue
+            try:
+                for key, value in f.items():
+                    merged[key] = merged.get(key, 0.0) + value
+            finally:
+                f.close()
+        return merged
+
+
+def _sample_key(name: str, suffix: str, labels: dict) -> str:
+    return json.dumps([name, suffix, sorted((labels or {}).items())], separators=(',', ':'))
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label(v)}"' for k, v in labels) + '}'
+
+
+class Metrics:
+    """Metrics registry shared by the request, database and audit pipelines"""
+
+    _enabled = True
+    _lock = threading.Lock()
+    _definitions = {}
+    _gauge_callbacks = {}
+    _store = _DictStore()
+
+    @staticmethod
+    def configure(multiproc_dir: str = None, enabled: bool = True):
+        """Select the storage backend (mmap files when a directory is given)"""
+        Metrics._enabled = enabled
+        Metrics._store = _MmapStore(multiproc_dir) if multiproc_dir else _DictStore()
+
+    @staticmethod
+    def mark_process_dead(pid: int, multiproc_dir: str):
+        """Drop gauge samples of a dead worker (call from gunicorn's child_exit hook)"""
+        path = os.path.join(multiproc_dir, f'gauge_{pid}.db')
+        if os.path.exists(path):
+            os.remove(path)
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return Metrics._enabled
+
+    # ---- definitions -----------------------------------------------------
+
+    @staticmethod
+    def counter(name: str, help_text: str):
+        Metrics._definitions[name] = {'type': 'counter', 'help': help_text}
+
+    @staticmethod
+    def gauge(name: str, help_text: str):
+        Metrics._definitions[name] = {'type': 'gauge', 'help': help_text}
+
+    @staticmethod
+    def histogram(name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        Metrics._definitions[name] = {
+            'type': 'histogram',
+            'help': help_text,
+            'buckets': tuple(sorted(buckets)) + (float('inf'),)
+        }
+
+    @staticmethod
+    def register_gauge_callback(name: str, help_text: str, callback):
+        """Register a gauge evaluated at scrape time by the answering worker"""
+        Metrics._gauge_callbacks[name] = {'help': help_text, 'callback': callback}
+
+    # ---- recording -------------------------------------------------------
+
+    @staticmethod
+    def inc(name: str, labels: dict = None, amount: float = 1.0):
+        if not Metrics._enabled:
+            return
+        with Metrics._lock:
+            Metrics._store.add('counter', _sample_key(name, '_total', labels), amount)
+
+    @staticmethod
+    def set(name: str, value: float, labels: dict = None):
+        if not Metrics._enabled:
+            return
+        with Metrics._lock:
+            Metrics._store.set('gauge', _sample_key(name, '', labels), value)
+
+    @staticmethod
+    def observe(name: str, value: float, labels: dict = None):
+        if not Metrics._enabled:
+            return
+        buckets = Metrics._definitions[name]['buckets']
+        bucket = next(b for b in buckets if value <= b)
+        with Metrics._lock:
+            bucket_labels = dict(labels or {})
+            bucket_labels['le'] = _format_value(bucket)
+            Metrics._store.add('counter', _sample_key(name, '_bucket', bucket_labels), 1.0)
+            Metrics._store.add('counter', _sample_key(name, '_sum', labels), value)
+            Metrics._store.add('counter', _sample_key(name, '_count', labels), 1.0)
+
+    @staticmethod
+    def record_cache_access(cache: str, hit: bool):
+        """Count a cache lookup; hit rate = hits / (hits + misses)"""
+        Metrics.inc('cache_requests', {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+    # ---- exposition ------------------------------------------------------
+
+    @staticmethod
+    def render() -> str:
+        """Render every metric in Prometheus text exposition format"""
+        with Metrics._lock:
+            values = Metrics._store.collect()
+
+        samples = {}
+        for key, value in values.items():
+            name, suffix, labels = json.loads(key)
+            samples.setdefault(name, []).append((suffix, [tuple(l) for l in labels], value))
+
+        lines = []
+        for name, definition in sorted(Metrics._definitions.items()):
+            metric_samples = samples.get(name, [])
+            lines.append(f'# HELP {name} {definition["help"]}')
+            lines.append(f'# TYPE {name} {definition["type"]}')
+            if definition['type'] == 'histogram':
+                lines.extend(Metrics._render_histogram(name, definition['buckets'], metric_samples))
+                continue
+            for suffix, labels, value in sorted(metric_samples):
+                lines.append(f'{name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+
+        for name, entry in sorted(Metrics._gauge_callbacks.items()):
+            try:
+                value = entry['callback']()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            lines.append(f'# HELP {name} {entry["help"]}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histogram(name, buckets, metric_samples):
+        series = {}
+        for suffix, labels, value in metric_samples:
+            base = tuple(l for l in labels if l[0] != 'le')
+            entry = series.setdefault(base, {'buckets': {}, 'sum': 0.0, 'count': 0.0})
+            if suffix == '_bucket':
+                le = dict(labels)['le']
+                entry['buckets'][le] = entry['buckets'].get(le, 0.0) + value
+            elif suffix == '_sum':
+                entry['sum'] = value
+            elif suffix == '_count':
+                entry['count'] = value
+
+        lines = []
+        for base, entry in sorted(series.items()):
+            cumulative = 0.0
+            for bucket in buckets:
+                le = _format_value(bucket)
+                cumulative += entry['buckets'].get(le, 0.0)
+                lines.append(f'{name}_bucket{_format_labels(base + (("le", le),))} {_format_value(cumulative)}')
+            lines.append(f'{name}_sum{_format_labels(base)} {_format_value(entry["sum"])}')
+            lines.append(f'{name}_count{_format_labels(base)} {_format_value(entry["count"])}')
+        return lines
+
+
+# Metric definitions
+Metrics.histogram('http_request_duration_seconds', 'Request latency by blueprint endpoint')
+Metrics.counter('http_requests', 'Requests served by blueprint endpoint and status')
+Metrics.histogram('db_statement_duration_seconds', 'SQL statement latency by table')
+Metrics.counter('db_statements', 'SQL statements executed by table and operation')
+Metrics.gauge('db_pool_connections', 'Connection pool state per worker (summed across workers)')
+Metrics.counter('audit_events', 'Audit log records written by logger and level')
+Metrics.counter('cache_requests', 'Cache lookups by cache and result')
+Metrics.counter('jobs', 'Background jobs run by job name and outcome')
+Metrics.histogram('job_duration_seconds', 'Background job run time by job name')
+Metrics.counter('status_transitions', 'Rows moved between PENDING and OVERDUE by the status sweeper')
+Metrics.counter('maintenance_forecasts', 'Maintenance records scheduled from mileage forecasts')
+Metrics.counter('vehicle_allocations', 'Vehicle requests processed by the allocator by outcome')
+
+
+class AuditMetricsFilter(logging.Filter):
+    """Logging filter counting records flowing through the audit loggers"""
+
+    def filter(self, record):
+        Metrics.inc('audit_events', {'logger': record.name, 'level': record.levelname})
+        return True
+
+
+def record_db_statement(table: str, operation: str, execution_time: float):
+    """Account an executed SQL statement (called from the execute listener)"""
+    if not Metrics._enabled:
+        return
+    Metrics.inc('db_statements', {'table': table, 'operation': operation})
+    Metrics.observe('db_statement_duration_seconds', execution_time, {'table': table})
+
+
+def record_pool_stats(engine):
+    """Publish connection pool gauges for the current worker"""
+    pool = getattr(engine, 'pool', None)
+    for state in ('size', 'checkedin', 'checkedout', 'overflow'):
+        getter = getattr(pool, state, None)
+        if not callable(getter):
+            continue
+        try:
+            Metrics.set('db_pool_connections', float(getter()), {'state': state})
+        except Exception:
+            pass
+
+
+def init_metrics(app):
+    """Configure the registry and register the /metrics request hooks"""
+    Metrics.configure(
+        multiproc_dir=app.config.get('METRICS_MULTIPROC_DIR'),
+        enabled=app.config.get('METRICS_ENABLED', True)
+    )
+    if not Metrics.is_enabled():
+        return
+
+    for logger_name in ('security', 'database'):
+        audit_logger = logging.getLogger(logger_name)
+        if not any(isinstance(f, AuditMetricsFilter) for f in audit_logger.filters):
+            audit_logger.addFilter(AuditMetricsFilter())
+
+    from flask import g, request
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start_time = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        start = getattr(g, 'metrics_start_time', None)
+        if start is None or request.path.startswith('/static') or request.endpoint == 'metrics.metrics':
+            return response
+
+        endpoint = request.endpoint or 'unknown'
+        labels = {
+            'blueprint': request.blueprint or 'app',
+            'endpoint': endpoint,
+            'method': request.method
+        }
+        status = str(response.status_code)
+
+        def observe():
+            Metrics.observe('http_request_duration_seconds', time.perf_counter() - start, labels)
+            Metrics.inc('http_requests', {**labels, 'status': status})
+
+        if response.is_streamed:
+            # The body is rendered while it is sent: time the request up to its close
+            response.call_on_close(observe)
+        else:
+            observe()
+
+        from app.extensions import db
+        try:
+            record_pool_stats(db.engine)
+        except Exception:
+            pass
+        return response
@@ -0,0 +1,283 @@
+"""Mileage time series and predictive service scheduling.
+
+Odometer values are scattered over pickups (start/end), reservations (actual
+start/end), maintenance (``mileage_at_service``) and ITV
+(``mileage_at_inspection``). ``mileage_readings`` collects them as one series
+per vehicle, one row per source value:
+
+- flushing any of those records replaces its readings in the same
+  transaction (a corrected odometer value replaces the old reading, a deleted
+  record takes its readings with it);
+- ``MileageService.rebuild`` recreates the table from the source records.
+
+For analysis the readings are loaded into a ``MileageSeries``: three parallel
+NumPy arrays (vehicle, day, km) sorted by vehicle and time. The daily rate of
+every vehicle is a least-squares slope over the readings of the last
+MILEAGE_RATE_WINDOW_DAYS, computed for the whole fleet at once with
+``bincount`` sums.
+
+``MileageService.schedule`` projects, for every active vehicle whose last
+service set a ``next_service_mileage``, the day that mileage will be reached
+and creates a SCHEDULED ``MaintenanceRecord`` when it falls within
+MAINTENANCE_FORECAST_HORIZON_DAYS. Vehicles that already have scheduled or
+in-progress maintenance are left alone, so runs are idempotent. It also
+raises ``Vehicle.current_mileage`` to the latest reading. Runs nightly as the
+``mileage.schedule_maintenance`` job and from
+scripts/schedule_predicted_maintenance.py.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from flask import current_app
+from sqlalchemy import Float, bindparam, cast, delete, event, func, insert, literal, select, update
+from app.extensions import db
+from app.services.job_service import job
+from app.services.metrics_service import Metrics
+from app.services.security_audit_service import SecurityAudit
+from app.models import (MileageReading, MileageSource, Vehicle, VehiclePickup, PickupStatus, Reservation,
+                        MaintenanceRecord, MaintenanceStatus, ITVRecord)
+
+DEFAULT_RATE_WINDOW_DAYS = 180
+DEFAULT_HORIZON_DAYS = 30
+# Readings must span at least this many days before a rate is trusted
+MIN_SPAN_DAYS = 7
+
+_EPOCH = datetime(1970, 1, 1)
+_PARTITION_ROWS = 50000
+_BATCH = 500
+
+# source -> (model, reading time, odometer value, extra conditions)
+_SOURCES = {
+    MileageSource.PICKUP_START: (VehiclePickup, VehiclePickup.pickup_time, VehiclePickup.start_mileage,
+                                 (VehiclePickup.pickup_status == PickupStatus.TAKEN,)),
+    MileageSource.PICKUP_END: (VehiclePickup, VehiclePickup.return_time, VehiclePickup.end_mileage,
+                               (VehiclePickup.pickup_status == PickupStatus.TAKEN,)),
+    MileageSource.RESERVATION_START: (Reservation, Reservation.actual_start_date, Reservation.actual_start_mileage,
+                                      ()),
+    MileageSource.RESERVATION_END: (Reservation, Reservation.actual_end_date, Reservation.actual_end_mileage, ()),
+    MileageSource.MAINTENANCE: (MaintenanceRecord,
+                                func.coalesce(MaintenanceRecord.completed_date, MaintenanceRecord.scheduled_date),
+                                MaintenanceRecord.mileage_at_service,
+                                (MaintenanceRecord.status != MaintenanceStatus.CANCELLED,)),
+    MileageSource.ITV: (ITVRecord, ITVRecord.inspection_date, ITVRecord.mileage_at_inspection, ()),
+}
+_MODEL_SOURCES = {}
+for _source, (_model, *_) in _SOURCES.items():
+    _MODEL_SOURCES.setdefault(_model, []).append(_source)
+
+
+def _days(column, dialect: str):
+    """Days since the epoch of a naive timestamp column, computed in SQL"""
+    if dialect == 'postgresql':
+        return cast(func.extract('epoch', column), Float) / 86400.0
+    return cast(func.julianday(column), Float) - 2440587.5
+
+
+def _day(moment: datetime) -> float:
+    return (moment - _EPOCH).total_seconds() / 86400.0
+
+
+def _copy(connection, source: MileageSource, source_ids: Optional[Iterable[int]] = None) -> int:
+    """INSERT ... SELECT the readings of `source` (optionally only some source rows)"""
+    model, moment, mileage, conditions = _SOURCES[source]
+    table = MileageReading.__table__
+    stmt = select(model.vehicle_id, literal(source, table.c.source.type), model.id, moment, mileage).where(
+        moment.isnot(None), mileage > 0, *conditions)
+    if source_ids is not None:
+        stmt = stmt.where(model.id.in_(source_ids))
+    result = connection.execute(insert(table).from_select(
+        ['vehicle_id', 'source', 'source_id', 'read_at', 'mileage'], stmt))
+    return result.rowcount
+
+
+class MileageSeries:
+    """Readings of many vehicles in parallel arrays, grouped by vehicle and sorted by day"""
+
+    def __init__(self, vehicles: np.ndarray, days: np.ndarray, mileage: np.ndarray):
+        self.vehicle_ids, self.starts, counts = np.unique(vehicles, return_index=True, return_counts=True)
+        self.index = np.repeat(np.arange(len(self.vehicle_ids)), counts)
+        self.days = days
+        self.mileage = mileage
+
+    def __len__(self):
+        return len(self.vehicle_ids)
+
+    @classmethod
+    def load(cls, vehicle_ids: Optional[Iterable[int]] = None) -> 'MileageSeries':
+        dialect = db.session.get_bind().dialect.name
+        stmt = (select(MileageReading.vehicle_id, _days(MileageReading.read_at, dialect), MileageReading.mileage)
+                .order_by(MileageReading.vehicle_id, MileageReading.read_at))
+        if vehicle_ids is not None:
+            stmt = stmt.where(MileageReading.vehicle_id.in_(list(vehicle_ids)))
+        # Core execution and plain tuples: NumPy probes Row objects attribute by attribute
+        result = db.session.connection().execute(stmt.execution_options(yield_per=_PARTITION_ROWS))
+        parts = [np.array([tuple(row) for row in rows], dtype=float) for rows in result.partitions()]
+        data = np.concatenate(parts) if parts else np.empty((0, 3))
+        return cls(data[:, 0].astype(int), data[:, 1], data[:, 2])
+
+    def latest(self):
+        """(day of the last reading, highest km) per vehicle"""
+        if not len(self):
+            return np.empty(0), np.empty(0)
+        ends = np.append(self.starts[1:], len(self.days)) - 1
+        return self.days[ends], np.maximum.reduceat(self.mileage, self.starts)
+
+    def daily_rates(self, now: datetime, window_days: int = DEFAULT_RATE_WINDOW_DAYS) -> np.ndarray:
+        """Least-squares km/day per vehicle over the last `window_days`; NaN without enough readings"""
+        size = len(self)
+        recent = self.days >= _day(now) - window_days
+        group = self.index[recent]
+        # Centered on now: keeps the sums small and the slope numerically stable
+        x = self.days[recent] - _day(now)
+        y = self.mileage[recent]
+        n = np.bincount(group, minlength=size).astype(float)
+        sx = np.bincount(group, weights=x, minlength=size)
+        sy = np.bincount(group, weights=y, minlength=size)
+        sxx = np.bincount(group, weights=x * x, minlength=size)
+        sxy = np.bincount(group, weights=x * y, minlength=size)
+        first = np.full(size, np.inf)
+        last = np.full(size, -np.inf)
+        np.minimum.at(first, group, x)
+        np.maximum.at(last, group, x)
+        denominator = n * sxx - sx * sx
+        enough = (n >= 2) & (last - first >= MIN_SPAN_DAYS) & (denominator > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = (n * sxy - sx * sy) / np.where(enough, denominator, 1)
+        return np.where(enough, np.clip(rates, 0, None), np.nan)
+
+
+class MileageService:
+    """Odometer readings, daily rates and mileage-based maintenance scheduling"""
+
+    @staticmethod
+    def refresh(connection, changes: Dict[type, Iterable[int]]):
+        """Replace the readings of the given source records ({model: ids})"""
+        table = MileageReading.__table__
+        for model, source_ids in changes.items():
+            source_ids = list(source_ids)
+            for source in _MODEL_SOURCES[model]:
+                connection.execute(delete(table).where(table.c.source == source, table.c.source_id.in_(source_ids)))
+                _copy(connection, source, source_ids)
+
+    @staticmethod
+    def rebuild() -> Dict[str, int]:
+        """Recreate mileage_readings from the source records; returns readings per source"""
+        connection = db.session.connection()
+        connection.execute(delete(MileageReading.__table__))
+        counts = {source.value: _copy(connection, source) for source in _SOURCES}
+        db.session.commit()
+        return counts
+
+    @staticmethod
+    def _service_targets():
+        """Active vehicles whose last completed service set a next_service_mileage and have nothing pending"""
+        moment = func.coalesce(MaintenanceRecord.completed_date, MaintenanceRecord.scheduled_date)
+        pending = select(MaintenanceRecord.vehicle_id).where(
+            MaintenanceRecord.status.in_([MaintenanceStatus.SCHEDULED, MaintenanceStatus.IN_PROGRESS]))
+        rows = db.session.execute(
+            select(MaintenanceRecord.vehicle_id, MaintenanceRecord.next_service_mileage,
+                   MaintenanceRecord.maintenance_type)
+            .join(Vehicle, Vehicle.id == MaintenanceRecord.vehicle_id)
+            .where(MaintenanceRecord.status == MaintenanceStatus.COMPLETED,
+                   Vehicle.is_active == True,  # noqa: E712
+                   MaintenanceRecord.vehicle_id.not_in(pending))
+            .order_by(MaintenanceRecord.vehicle_id, moment.desc(), MaintenanceRecord.id.desc())
+        ).all()
+        targets = {}
+        for vehicle_id, next_service_mileage, maintenance_type in rows:
+            targets.setdefault(vehicle_id, (next_service_mileage, maintenance_type))
+        return {vehicle_id: target for vehicle_id, target in targets.items() if target[0]}
+
+    @staticmethod
+    def forecast(now: Optional[datetime] = None, window_days: Optional[int] = None) -> List[Dict]:
+        """Predicted date each pending service mileage is reached, soonest first"""
+        now = now or datetime.utcnow()
+        if window_days is None:
+            window_days = current_app.config.get('MILEAGE_RATE_WINDOW_DAYS', DEFAULT_RATE_WINDOW_DAYS)
+        targets = MileageService._service_targets()
+        if not targets:
+            return []
+        series = MileageSeries.load(targets)
+        rates = series.daily_rates(now, window_days)
+        last_day, last_mileage = series.latest()
+
+        vehicle_ids = np.array(sorted(targets))
+        target_mileage = np.array([targets[v][0] for v in vehicle_ids], dtype=float)
+        index = np.searchsorted(series.vehicle_ids, vehicle_ids)
+        known = index < len(series)
+        known[known] = series.vehicle_ids[index[known]] == vehicle_ids[known]
+        vehicle_ids, target_mileage, index = vehicle_ids[known], target_mileage[known], index[known]
+        rate = rates[index]
+        estimated = last_mileage[index] + np.nan_to_num(rate) * np.clip(_day(now) - last_day[index], 0, None)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            days_left = np.where(estimated >= target_mileage, 0.0, (target_mileage - estimated) / rate)
+
+        forecasts = [
+            {'vehicle_id': int(vehicle_id), 'maintenance_type': targets[vehicle_id][1],
+             'next_service_mileage': int(target_mileage[i]), 'estimated_mileage': int(estimated[i]),
+             'daily_km': round(float(rate[i]), 1),
+             'due_date': (now + timedelta(days=float(days_left[i]))).replace(hour=0, minute=0, second=0,
+                                                                              microsecond=0)}
+            for i, vehicle_id in enumerate(vehicle_ids)
+            if np.isfinite(days_left[i])
+        ]
+        return sorted(forecasts, key=lambda item: (item['due_date'], item['vehicle_id']))
+
+    @staticmethod
+    def _sync_current_mileage() -> int:
+        latest = (select(MileageReading.vehicle_id, func.max(MileageReading.mileage).label('mileage'))
+                  .group_by(MileageReading.vehicle_id).subquery())
+        rows = db.session.execute(
+            select(Vehicle.id, latest.c.mileage).join(latest, latest.c.vehicle_id == Vehicle.id)
+            .where(func.coalesce(Vehicle.current_mileage, 0) < latest.c.mileage)
+        ).all()
+        if rows:
+            table = Vehicle.__table__
+            db.session.connection().execute(
+                update(table).where(table.c.id == bindparam('vehicle_id')).values(current_mileage=bindparam('km')),
+                [{'vehicle_id': vehicle_id, 'km': mileage} for vehicle_id, mileage in rows])
+        return len(rows)
+
+    @staticmethod
+    def schedule(now: Optional[datetime] = None, horizon_days: Optional[int] = None) -> Dict[str, int]:
+        """Create SCHEDULED maintenance for services due within the horizon"""
+        now = now or datetime.utcnow()
+        if horizon_days is None:
+            horizon_days = current_app.config.get('MAINTENANCE_FORECAST_HORIZON_DAYS', DEFAULT_HORIZON_DAYS)
+        updated = MileageService._sync_current_mileage()
+        db.session.commit()
+
+        due = [item for item in MileageService.forecast(now)
+               if item['due_date'] <= now + timedelta(days=horizon_days)]
+        for start in range(0, len(due), _BATCH):
+            batch = due[start:start + _BATCH]
+            db.session.add_all([
+                MaintenanceRecord(
+                    vehicle_id=item['vehicle_id'], maintenance_type=item['maintenance_type'],
+                    status=MaintenanceStatus.SCHEDULED, scheduled_date=item['due_date'],
+                    description=(f"Servicio previsto a {item['next_service_mileage']} km "
+                                 f"(estimado {item['estimated_mileage']} km, {item['daily_km']} km/día)"))
+                for item in batch
+            ])
+            db.session.commit()
+            Metrics.inc('maintenance_forecasts', amount=len(batch))
+            SecurityAudit.log_operation('MAINTENANCE_FORECAST', 'maintenance_records', True, {
+                'count': len(batch), 'vehicle_ids': [item['vehicle_id'] for item in batch],
+            })
+        return {'scheduled': len(due), 'mileage_updated': updated}
+
+
+@job('mileage.schedule_maintenance', schedule='30 4 * * *')
+def schedule_predicted_maintenance():
+    """Nightly mileage forecast"""
+    MileageService.schedule()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_mileage_readings(session, flush_context):
+    changes = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if type(obj) in _MODEL_SOURCES and obj.id is not None:
+            changes.setdefault(type(obj), set()).add(obj.id)
+    if changes:
+        MileageService.refresh(session.connection(), changes)
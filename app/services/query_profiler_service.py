@@ -0,0 +1,172 @@
+"""Per-request SQL query profiler and N+1 detector"""
+import logging
+import re
+import time
+from collections import defaultdict
+from flask import g, has_request_context, request
+
+# Configure profiler logger (one summary line per profiled request)
+profiler_logger = logging.getLogger('query_profiler')
+profiler_logger.setLevel(logging.INFO)
+
+profiler_handler = logging.FileHandler('query_profiler.log')
+profiler_handler.setFormatter(logging.Formatter(
+    '%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+))
+profiler_logger.addHandler(profiler_handler)
+
+# Patterns used to collapse literal values so that statements that only differ
+# in their parameters share the same template
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*(?:\?|:[\w_]+|%\([\w_]+\)s)(?:\s*,\s*(?:\?|:[\w_]+|%\([\w_]+\)s))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RequestQueryProfile:
+    """Statement counters collected for a single request"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.statement_count = 0
+        self.total_time = 0.0
+        self.templates = defaultdict(lambda: {'count': 0, 'total_time': 0.0})
+
+    def record(self, template: str, execution_time: float):
+        """Account one executed statement"""
+        self.statement_count += 1
+        self.total_time += execution_time
+        entry = self.templates[template]
+        entry['count'] += 1
+        entry['total_time'] += execution_time
+
+    def repeated_templates(self, threshold: int):
+        """Return (template, stats) pairs executed more than `threshold` times, most frequent first"""
+        repeated = [(tpl, stats) for tpl, stats in self.templates.items() if stats['count'] > threshold]
+        return sorted(repeated, key=lambda item: item[1]['count'], reverse=True)
+
+    def summary(self, threshold: int) -> dict:
+        """Build a serializable summary of the request profile"""
+        return {
+            'statements': self.statement_count,
+            'db_time_ms': round(self.total_time * 1000, 2),
+            'distinct_templates': len(self.templates),
+            'n_plus_one': [
+                {
+                    'template': tpl,
+                    'count': stats['count'],
+                    'total_time_ms': round(stats['total_time'] * 1000, 2)
+                }
+                for tpl, stats in self.repeated_templates(threshold)
+            ]
+        }
+
+
+class QueryProfiler:
+    """Request-scoped profiler fed by the database audit execute listeners"""
+
+    @staticmethod
+    def normalize_statement(statement) -> str:
+        """Reduce a SQL statement to its template (literals and IN lists collapsed)"""
+        sql = str(statement)
+        sql = _STRING_LITERAL.sub('?', sql)
+        sql = _NUMBER_LITERAL.sub('?', sql)
+        sql = _IN_LIST.sub('(?)', sql)
+        return _WHITESPACE.sub(' ', sql).strip()
+
+    @staticmethod
+    def is_active() -> bool:
+        """True when the current request is being profiled"""
+        return has_request_context() and getattr(g, 'query_profile', None) is not None
+
+    @staticmethod
+    def start_request():
+        """Attach a fresh profile to the current request"""
+        g.query_profile = RequestQueryProfile()
+
+    @staticmethod
+    def record(statement, execution_time: float):
+        """Record an executed statement against the current request profile"""
+        if not QueryProfiler.is_active():
+            return
+        g.query_profile.record(QueryProfiler.normalize_statement(statement), execution_time)
+
+    @staticmethod
+    def current_profile():
+        """Return the profile for the current request, if any"""
+        if not has_request_context():
+            return None
+        return getattr(g, 'query_profile', None)
+
+    @staticmethod
+    def server_timing_header(profile: RequestQueryProfile) -> str:
+        """Format the profile as a Server-Timing header value"""
+        app_ms = (time.perf_counter() - profile.started_at) * 1000
+        return (
+            f'db;dur={profile.total_time * 1000:.2f};desc="{profile.statement_count} queries", '
+            f'app;dur={app_ms:.2f}'
+        )
+
+    @staticmethod
+    def finish_request(response, threshold: int):
+        """Emit the Server-Timing header and the summary line for the current request.
+
+        A streamed body is rendered after the headers are sent and can still
+        run queries: it gets no Server-Timing, and its summary is logged when
+        the response is closed.
+        """
+        profile = QueryProfiler.current_profile()
+        if profile is None:
+            return response
+
+        label = (
+            f"{request.method} {request.path} endpoint={request.endpoint or 'unknown'} "
+            f"status={response.status_code}"
+        )
+        target = request.endpoint or request.path
+        if response.is_streamed:
+            response.call_on_close(lambda: QueryProfiler.log_summary(profile, label, target, threshold))
+            return response
+
+        response.headers['Server-Timing'] = QueryProfiler.server_timing_header(profile)
+        QueryProfiler.log_summary(profile, label, target, threshold)
+        return response
+
+    @staticmethod
+    def log_summary(profile: RequestQueryProfile, label: str, target: str, threshold: int):
+        """Write the summary line (and the N+1 suspects) of a finished request"""
+        summary = profile.summary(threshold)
+        message = (
+            f"{label} statements={summary['statements']} "
+            f"db_time_ms={summary['db_time_ms']} templates={summary['distinct_templates']}"
+        )
+
+        if summary['n_plus_one']:
+            profiler_logger.warning(f"{message} n_plus_one={len(summary['n_plus_one'])}")
+            for item in summary['n_plus_one']:
+                profiler_logger.warning(
+                    f"N+1 suspect on {target}: "
+                    f"{item['count']}x ({item['total_time_ms']} ms) {item['template']}"
+                )
+        else:
+            profiler_logger.info(message)
+
+
+def init_query_profiler(app):
+    """Register the request hooks of the SQL profiler.
+
+    Profiling is controlled by SQL_PROFILER_ENABLED, so it can be toggled per
+    environment (or per test) without restarting the listeners.
+    """
+    @app.before_request
+    def start_query_profile():
+        if app.config.get('SQL_PROFILER_ENABLED', False):
+            QueryProfiler.start_request()
+
+    @app.after_request
+    def finish_query_profile(response):
+        if request.path.startswith('/static'):
+            return response
+        threshold = app.config.get('SQL_PROFILER_N_PLUS_ONE_THRESHOLD', 5)
+        return QueryProfiler.finish_request(response, threshold)
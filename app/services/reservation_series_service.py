@@ -0,0 +1,346 @@
+"""Recurring reservations.
+
+A ``ReservationSeries`` stores its rule (daily, weekly on some weekdays or
+monthly, every N periods, until a date or for COUNT occurrences), never its
+occurrences. Whoever needs occurrences asks for a window and gets them
+expanded on the fly (``ReservationSeries.occurrences``), so a series running
+every weekday for years costs one row:
+
+- calendars merge the occurrences of the month with the concrete reservations
+  (``with_occurrences``); occurrences are ``SeriesOccurrence`` objects with
+  the attributes the templates read from a Reservation;
+- overlap checks for single and batch reservations include the occurrences
+  of the vehicle in the requested window;
+- creating a series checks all of its occurrences (up to
+  RESERVATION_SERIES_CHECK_DAYS for endless series) against the reservations
+  and other series of the vehicle in one sorted sweep.
+
+An occurrence that is skipped, or turned into a real reservation, gets a
+``ReservationSeriesOverride`` row and is no longer expanded. The nightly
+``reservation_series.materialize`` job creates the reservations of the
+occurrences starting within RESERVATION_SERIES_MATERIALIZE_DAYS, so pickups
+and the rest of the reservation workflow work unchanged.
+"""
+import heapq
+from datetime import datetime, timedelta
+from itertools import count as counter, islice
+from typing import Dict, Iterable, List, Optional
+from flask import current_app
+from sqlalchemy import or_, select
+from app.extensions import db
+from app.models import (ReservationSeries, ReservationSeriesOverride, SeriesFrequency, Reservation,
+                        ReservationStatus, Vehicle, Driver)
+from app.services.job_service import job
+from app.services.security_audit_service import SecurityAudit
+
+DEFAULT_CHECK_DAYS = 365
+DEFAULT_MATERIALIZE_DAYS = 2
+# Longest occurrence; bounds how far back a window looks for occurrences still running
+MAX_OCCURRENCE_DAYS = 7
+# Conflicts listed in the error of a rejected series
+_REPORTED_CONFLICTS = 5
+
+
+class SeriesOccurrence:
+    """One expanded occurrence; reads like a Reservation (vehicle, driver, purpose...) for calendars"""
+    is_occurrence = True
+    id = None
+
+    def __init__(self, series: ReservationSeries, start_date: datetime, end_date: datetime):
+        self.series = series
+        self.start_date = start_date
+        self.end_date = end_date
+
+    @property
+    def series_id(self) -> int:
+        return self.series.id
+
+    def __getattr__(self, name):
+        if name == 'series':
+            raise AttributeError(name)
+        return getattr(self.series, name)
+
+    def __repr__(self):
+        return f"<SeriesOccurrence Series:{self.series.id} {self.start_date}>"
+
+
+def _min_gap(series: ReservationSeries) -> timedelta:
+    """Shortest time between two consecutive occurrence starts"""
+    interval = series.interval or 1
+    if series.frequency == SeriesFrequency.DAILY:
+        return timedelta(days=interval)
+    if series.frequency == SeriesFrequency.WEEKLY:
+        days = series.weekday_list
+        gaps = [b - a for a, b in zip(days, days[1:])] + [days[0] + 7 * interval - days[-1]]
+        return timedelta(days=min(gaps))
+    return timedelta(days=28)
+
+
+class ReservationSeriesService:
+    """Create, expand and maintain recurring reservations"""
+
+    @staticmethod
+    def get_series_by_id(series_id: int) -> Optional[ReservationSeries]:
+        return db.session.get(ReservationSeries, series_id)
+
+    @staticmethod
+    def list_series(organization_unit_id: Optional[int] = None, driver_id: Optional[int] = None,
+                    active_only: bool = True) -> List[ReservationSeries]:
+        query = ReservationSeries.query
+        if active_only:
+            query = query.filter(ReservationSeries.is_active == True)  # noqa: E712
+        if organization_unit_id is not None:
+            query = query.filter(ReservationSeries.organization_unit_id == organization_unit_id)
+        if driver_id is not None:
+            query = query.filter(ReservationSeries.driver_id == driver_id)
+        return query.order_by(ReservationSeries.start_date).all()
+
+    @staticmethod
+    def _series_in_window(start: datetime, end: datetime, vehicle_ids: Optional[Iterable[int]] = None,
+                          driver_id: Optional[int] = None,
+                          exclude_series_id: Optional[int] = None) -> List[ReservationSeries]:
+        query = ReservationSeries.query.filter(
+            ReservationSeries.is_active == True,  # noqa: E712
+            ReservationSeries.start_date < end,
+            or_(ReservationSeries.until.is_(None),
+                ReservationSeries.until > start - timedelta(days=MAX_OCCURRENCE_DAYS)))
+        if vehicle_ids is not None:
+            query = query.filter(ReservationSeries.vehicle_id.in_(set(vehicle_ids)))
+        if driver_id is not None:
+            query = query.filter(ReservationSeries.driver_id == driver_id)
+        if exclude_series_id is not None:
+            query = query.filter(ReservationSeries.id != exclude_series_id)
+        return query.all()
+
+    @staticmethod
+    def _overrides(series_ids: Iterable[int], start: datetime, end: datetime) -> Dict:
+        """{(series_id, occurrence_start): reservation_id or None} within the window"""
+        series_ids = set(series_ids)
+        if not series_ids:
+            return {}
+        rows = db.session.execute(
+            select(ReservationSeriesOverride.series_id, ReservationSeriesOverride.occurrence_start,
+                   ReservationSeriesOverride.reservation_id)
+            .where(ReservationSeriesOverride.series_id.in_(series_ids),
+                   ReservationSeriesOverride.occurrence_start >= start - timedelta(days=MAX_OCCURRENCE_DAYS),
+                   ReservationSeriesOverride.occurrence_start < end)
+        ).all()
+        return {(series_id, start): reservation_id for series_id, start, reservation_id in rows}
+
+    @staticmethod
+    def occurrences_between(start: datetime, end: datetime, vehicle_ids: Optional[Iterable[int]] = None,
+                            driver_id: Optional[int] = None,
+                            exclude_series_id: Optional[int] = None) -> List[SeriesOccurrence]:
+        """Pending occurrences overlapping [start, end) of the active series, sorted by start"""
+        series = ReservationSeriesService._series_in_window(start, end, vehicle_ids, driver_id, exclude_series_id)
+        overridden = ReservationSeriesService._overrides([s.id for s in series], start, end)
+        occurrences = [
+            SeriesOccurrence(s, occurrence_start, occurrence_end)
+            for s in series
+            for occurrence_start, occurrence_end in s.occurrences(start, end)
+            if (s.id, occurrence_start) not in overridden
+        ]
+        occurrences.sort(key=lambda o: (o.start_date, o.series.id))
+        return occurrences
+
+    @staticmethod
+    def with_occurrences(reservations: List, start: datetime, end: datetime,
+                         driver_id: Optional[int] = None) -> List:
+        """Reservations plus the occurrences starting in [start, end), by start date (calendars)"""
+        occurrences = [o for o in ReservationSeriesService.occurrences_between(start, end, driver_id=driver_id)
+                       if o.start_date >= start]
+        return sorted(list(reservations) + occurrences, key=lambda item: item.start_date)
+
+    @staticmethod
+    def first_vehicle_conflict(vehicle_id: int, start: datetime, end: datetime) -> Optional[SeriesOccurrence]:
+        """First pending occurrence of the vehicle overlapping [start, end), if any"""
+        occurrences = ReservationSeriesService.occurrences_between(start, end, vehicle_ids=[vehicle_id])
+        return occurrences[0] if occurrences else None
+
+    @staticmethod
+    def find_conflicts(series: ReservationSeries, window_end: datetime) -> List[Dict]:
+        """Occurrences of `series` up to `window_end` overlapping other bookings of its vehicle.
+
+        The reservations of the vehicle (one query, sorted) and the occurrences of its other
+        series are merged into one start-ordered stream and swept together with the
+        occurrences of `series`; a heap keyed by end date holds the bookings that started
+        before the current occurrence ends. Each result is
+        {'start', 'end', 'conflict': {'reservation_id'} | {'series_id'}}.
+        """
+        window_start = series.start_date
+        if series.until:
+            window_end = min(window_end, series.until + series.duration)
+        reservations = db.session.execute(
+            select(Reservation.start_date, Reservation.end_date, Reservation.id)
+            .where(Reservation.vehicle_id == series.vehicle_id,
+                   Reservation.status != ReservationStatus.CANCELLED,
+                   Reservation.start_date < window_end,
+                   Reservation.end_date > window_start)
+            .order_by(Reservation.start_date)
+        ).all()
+        busy = heapq.merge(
+            ((s, e, {'reservation_id': reservation_id}) for s, e, reservation_id in reservations),
+            ((o.start_date, o.end_date, {'series_id': o.series.id})
+             for o in ReservationSeriesService.occurrences_between(
+                 window_start, window_end, vehicle_ids=[series.vehicle_id], exclude_series_id=series.id)),
+            key=lambda item: item[0])
+
+        conflicts, running, order = [], [], counter()
+        pending = next(busy, None)
+        for start, end in series.occurrences(window_start, window_end):
+            while pending is not None and pending[0] < end:
+                heapq.heappush(running, (pending[1], next(order), pending[2]))
+                pending = next(busy, None)
+            # Bookings over before this occurrence starts cannot reach later ones either
+            while running and running[0][0] <= start:
+                heapq.heappop(running)
+            if running:
+                conflicts.append({'start': start, 'end': end, 'conflict': running[0][2]})
+        return conflicts
+
+    @staticmethod
+    def create_series(vehicle_id: int, driver_id: int, start_date: datetime, end_date: datetime,
+                      frequency, purpose: str, user_id: int, interval: int = 1,
+                      weekdays: Optional[Iterable[int]] = None, until: Optional[datetime] = None,
+                      count: Optional[int] = None, destination: Optional[str] = None,
+                      notes: Optional[str] = None, organization_unit_id: Optional[int] = None,
+                      skip_conflicts: bool = False) -> ReservationSeries:
+        """Create a series whose first occurrence is [start_date, end_date).
+
+        Raises ValueError on an invalid rule or, unless ``skip_conflicts``, when any
+        occurrence overlaps another booking of the vehicle; with ``skip_conflicts`` those
+        occurrences are skipped (overrides without reservation).
+        """
+        frequency = SeriesFrequency(frequency)
+        if end_date <= start_date:
+            raise ValueError('La fecha de fin debe ser posterior a la de inicio')
+        if not purpose:
+            raise ValueError('El propósito es obligatorio')
+        if interval < 1:
+            raise ValueError('El intervalo debe ser 1 o mayor')
+        if until and count:
+            raise ValueError('Indique una fecha final o un número de repeticiones, no ambos')
+        if count is not None and count < 1:
+            raise ValueError('El número de repeticiones debe ser 1 o mayor')
+        weekdays = sorted(set(weekdays or []))
+        if any(day < 0 or day > 6 for day in weekdays):
+            raise ValueError('Días de la semana no válidos (0 = lunes ... 6 = domingo)')
+        if weekdays and frequency != SeriesFrequency.WEEKLY:
+            raise ValueError('Los días de la semana solo aplican a series semanales')
+        if weekdays and start_date.weekday() not in weekdays:
+            raise ValueError('La primera ocurrencia debe caer en uno de los días elegidos')
+
+        series = ReservationSeries(
+            vehicle_id=vehicle_id, driver_id=driver_id, user_id=user_id,
+            organization_unit_id=organization_unit_id or 0,
+            start_date=start_date, duration_minutes=int((end_date - start_date).total_seconds() // 60),
+            frequency=frequency, interval=interval, weekdays=','.join(map(str, weekdays)) or None,
+            until=until, count=count, purpose=purpose, destination=destination, notes=notes, is_active=True)
+        if series.duration > min(_min_gap(series), timedelta(days=MAX_OCCURRENCE_DAYS)):
+            raise ValueError('Cada ocurrencia debe terminar antes de que empiece la siguiente '
+                             f'(y durar como máximo {MAX_OCCURRENCE_DAYS} días)')
+        if count:
+            series.until = next(islice(series.starts_from(start_date), count - 1, None))
+        if series.until and series.until < start_date:
+            raise ValueError('La fecha final es anterior a la primera ocurrencia')
+        if not db.session.get(Vehicle, vehicle_id) or not db.session.get(Driver, driver_id):
+            raise ValueError('Vehículo o conductor no encontrado')
+
+        check_days = current_app.config.get('RESERVATION_SERIES_CHECK_DAYS', DEFAULT_CHECK_DAYS)
+        conflicts = ReservationSeriesService.find_conflicts(
+            series, max(start_date, datetime.utcnow()) + timedelta(days=check_days))
+        if conflicts and not skip_conflicts:
+            listed = ', '.join(item['start'].strftime('%d/%m/%Y %H:%M') for item in conflicts[:_REPORTED_CONFLICTS])
+            more = len(conflicts) - _REPORTED_CONFLICTS
+            raise ValueError(f'{len(conflicts)} ocurrencias solapan con otras reservas del vehículo: {listed}'
+                             + (f' y {more} más' if more > 0 else ''))
+        series.overrides = [ReservationSeriesOverride(occurrence_start=item['start']) for item in conflicts]
+
+        db.session.add(series)
+        db.session.commit()
+        SecurityAudit.log_operation('CREATE', 'reservation_series', True, {
+            'series_id': series.id, 'vehicle_id': vehicle_id, 'frequency': frequency.name,
+            'skipped_conflicts': len(conflicts),
+        })
+        return series
+
+    @staticmethod
+    def upcoming(series: ReservationSeries, start: datetime, end: datetime) -> List[Dict]:
+        """Occurrences in [start, end) with their state: {'start', 'end', 'skipped', 'reservation_id'}"""
+        overridden = ReservationSeriesService._overrides([series.id], start, end)
+        result = []
+        for occurrence_start, occurrence_end in series.occurrences(start, end):
+            key = (series.id, occurrence_start)
+            result.append({'start': occurrence_start, 'end': occurrence_end,
+                           'skipped': key in overridden and overridden[key] is None,
+                           'reservation_id': overridden.get(key)})
+        return result
+
+    @staticmethod
+    def skip_occurrence(series_id: int, occurrence_start: datetime) -> ReservationSeriesOverride:
+        """Stop expanding one pending occurrence (frees the vehicle for that slot)"""
+        series = ReservationSeriesService.get_series_by_id(series_id)
+        if not series or not series.is_active:
+            raise ValueError('Serie no encontrada o cancelada')
+        occurrence = next(series.occurrences(occurrence_start, occurrence_start + timedelta(seconds=1)), None)
+        if not occurrence or occurrence[0] != occurrence_start:
+            raise ValueError('La fecha no corresponde a ninguna ocurrencia de la serie')
+        overridden = ReservationSeriesService._overrides([series.id], occurrence_start,
+                                                         occurrence_start + timedelta(seconds=1))
+        if (series.id, occurrence_start) in overridden:
+            raise ValueError('Esa ocurrencia ya fue omitida o convertida en reserva')
+        override = ReservationSeriesOverride(series_id=series.id, occurrence_start=occurrence_start)
+        db.session.add(override)
+        db.session.commit()
+        return override
+
+    @staticmethod
+    def cancel_series(series_id: int, now: Optional[datetime] = None) -> Optional[ReservationSeries]:
+        """Deactivate the series and cancel its materialized reservations that have not started"""
+        series = ReservationSeriesService.get_series_by_id(series_id)
+        if not series:
+            return None
+        now = now or datetime.utcnow()
+        series.is_active = False
+        series.cancelled_at = now
+        Reservation.query.filter(
+            Reservation.id.in_(select(ReservationSeriesOverride.reservation_id)
+                               .where(ReservationSeriesOverride.series_id == series.id)),
+            Reservation.status.in_([ReservationStatus.PENDING, ReservationStatus.CONFIRMED]),
+            Reservation.start_date > now,
+        ).update({Reservation.status: ReservationStatus.CANCELLED, Reservation.cancelled_at: now,
+                  Reservation.cancellation_reason: 'Serie de reservas cancelada'}, synchronize_session=False)
+        db.session.commit()
+        SecurityAudit.log_operation('CANCEL', 'reservation_series', True, {'series_id': series.id})
+        return series
+
+    @staticmethod
+    def materialize(now: Optional[datetime] = None, days: Optional[int] = None) -> int:
+        """Create the reservations of the pending occurrences overlapping the next `days` days"""
+        now = now or datetime.utcnow()
+        if days is None:
+            days = current_app.config.get('RESERVATION_SERIES_MATERIALIZE_DAYS', DEFAULT_MATERIALIZE_DAYS)
+        occurrences = ReservationSeriesService.occurrences_between(now, now + timedelta(days=days))
+        if not occurrences:
+            return 0
+        db.session.add_all([
+            ReservationSeriesOverride(
+                series_id=o.series.id, occurrence_start=o.start_date,
+                reservation=Reservation(
+                    vehicle_id=o.vehicle_id, driver_id=o.driver_id, user_id=o.user_id,
+                    organization_unit_id=o.organization_unit_id, start_date=o.start_date, end_date=o.end_date,
+                    purpose=o.purpose, destination=o.destination, notes=o.notes,
+                    status=ReservationStatus.PENDING))
+            for o in occurrences
+        ])
+        db.session.commit()
+        SecurityAudit.log_operation('MATERIALIZE', 'reservation_series', True, {
+            'reservations': len(occurrences), 'series_ids': sorted({o.series.id for o in occurrences}),
+        })
+        return len(occurrences)
+
+
+@job('reservation_series.materialize', schedule='15 2 * * *')
+def materialize_reservation_series():
+    """Nightly: reservations for the occurrences of the next days"""
+    ReservationSeriesService.materialize()
@@ -1,9 +1,24 @@
 """Reservation service"""
-from typing import List, Optional
-from datetime import datetime
+import re
+from bisect import bisect_left
+from contextlib import contextmanager
+from itertools import groupby
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from app.db.reservation_overlap import begin_booking_write, is_overlap_violation
 from app.extensions import db
 from app.models.reservation import Reservation, ReservationStatus
+from app.models.vehicle import Vehicle
+from app.models.driver import Driver
+from app.services.reservation_series_service import ReservationSeriesService
+from app.services.security_audit_service import SecurityAudit
 from app.utils.audit_decorators import audit_model_change
+from app.utils.exceptions import ReservationConflictError
+
+# Largest batch accepted by create_reservations_batch
+MAX_BATCH_SIZE = 5000
 
 class ReservationService:
     """Service for reservation operations"""
@@ -78,7 +93,7 @@ class ReservationService:
 
     @staticmethod
     def _check_vehicle_overlap(vehicle_id: int, start_date, end_date, exclude_reservation_id: int = None):
-        """Raise ValueError if the vehicle has an existing reservation that overlaps the given range."""
+        """Raise ReservationConflictError (a ValueError) if the vehicle is booked within the given range."""
         q = Reservation.query.filter(
             Reservation.vehicle_id == vehicle_id,
             Reservation.status != ReservationStatus.CANCELLED,
@@ -90,8 +105,38 @@ class ReservationService:
 
         conflict = q.first()
         if conflict:
-            raise ValueError(f'El vehículo tiene una reserva solapada (id={conflict.id})')
+            raise ReservationConflictError(f'El vehículo tiene una reserva solapada (id={conflict.id})',
+                                           reservation_id=conflict.id)
+        occurrence = ReservationSeriesService.first_vehicle_conflict(vehicle_id, start_date, end_date)
+        if occurrence:
+            raise ReservationConflictError(f'El vehículo tiene una reserva periódica solapada '
+                                           f'(serie {occurrence.series_id}, {occurrence.start_date:%d/%m/%Y %H:%M})',
+                                           series_id=occurrence.series_id)
     
+    @staticmethod
+    @contextmanager
+    def _booking_transaction(vehicle_id: int, start_date, end_date, exclude_reservation_id: int = None):
+        """Overlap check plus the writes of the block, committed as one unit safe against concurrent bookings.
+
+        SQLite takes the write lock before the check; on PostgreSQL the exclusion constraint
+        rejects what a concurrent transaction slipped in between check and commit, and the
+        violation is reported as the ReservationConflictError the check would have raised.
+        """
+        begin_booking_write(db.session)
+        try:
+            ReservationService._check_vehicle_overlap(vehicle_id, start_date, end_date, exclude_reservation_id)
+            yield
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_overlap_violation(e):
+                raise
+            ReservationService._check_vehicle_overlap(vehicle_id, start_date, end_date, exclude_reservation_id)
+            raise ReservationConflictError('El vehículo tiene una reserva solapada') from e
+        except Exception:
+            db.session.rollback()
+            raise
+
     @staticmethod
     @audit_model_change('Reservation', 'CREATE')
     def create_reservation(vehicle_id: int, driver_id: int, start_date,
@@ -100,9 +145,6 @@ class ReservationService:
                           notes: Optional[str] = None,
                           organization_unit_id: Optional[int] = None) -> Reservation:
         """Create a new reservation"""
-        # Validate overlap for the selected vehicle
-        ReservationService._check_vehicle_overlap(vehicle_id, start_date, end_date)
-
         reservation = Reservation(
             vehicle_id=vehicle_id,
             driver_id=driver_id,
@@ -115,13 +157,172 @@ class ReservationService:
             organization_unit_id=organization_unit_id or 0,
             status=ReservationStatus.PENDING
         )
-        
-        db.session.add(reservation)
-        db.session.commit()
+
+        with ReservationService._booking_transaction(vehicle_id, start_date, end_date):
+            db.session.add(reservation)
         db.session.refresh(reservation)
         
         return reservation
     
+    @staticmethod
+    def _parse_batch_item(item) -> Dict:
+        """Validated fields of one batch item; raises ValueError with the reason"""
+        if not isinstance(item, dict):
+            raise ValueError('Cada reserva debe ser un objeto')
+        try:
+            fields = {'vehicle_id': int(item['vehicle_id']), 'driver_id': int(item['driver_id'])}
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('vehicle_id y driver_id son obligatorios y numéricos')
+        for name in ('start_date', 'end_date'):
+            value = item.get(name)
+            try:
+                # fromisoformat only reads a "Z" suffix from Python 3.11 on
+                moment = (value if isinstance(value, datetime)
+                          else datetime.fromisoformat(re.sub(r'[zZ]$', '+00:00', str(value))))
+            except ValueError:
+                raise ValueError(f'{name} debe ser una fecha ISO 8601 (AAAA-MM-DDTHH:MM)')
+            if moment.tzinfo is not None:
+                # Stored dates are naive UTC: an offset (or Z) is converted, not compared as is
+                moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+            fields[name] = moment
+        if fields['end_date'] <= fields['start_date']:
+            raise ValueError('end_date debe ser posterior a start_date')
+        purpose = (item.get('purpose') or '').strip()
+        if not purpose:
+            raise ValueError('purpose es obligatorio')
+        fields.update(purpose=purpose, destination=item.get('destination'), notes=item.get('notes'))
+        if item.get('organization_unit_id') is not None:
+            try:
+                fields['organization_unit_id'] = int(item['organization_unit_id'])
+            except (TypeError, ValueError):
+                raise ValueError('organization_unit_id debe ser numérico')
+        return fields
+
+    @staticmethod
+    def create_reservations_batch(items: List[dict], user_id: int, organization_unit_id: Optional[int] = None,
+                                  all_or_nothing: bool = False) -> Dict:
+        """Create many reservations with one overlap pass; returns {'created', 'rejected', 'results': [...]}
+
+        Items are checked against the database and against each other: existing reservations of
+        the batch vehicles (and the occurrences of their recurring series) are read with one
+        query, each item is tested against them with a binary search, and the remaining items of
+        a vehicle are swept in start order (an item overlapping an earlier-starting accepted one
+        is rejected). Accepted items are inserted in one transaction; with ``all_or_nothing`` any
+        rejection discards the whole batch. Each result is {'index', 'status':
+        created|conflict|invalid|skipped, 'id'|'conflict'|'error'}; a conflict names the
+        reservation_id, series_id or batch index it overlaps.
+        """
+        if len(items) > MAX_BATCH_SIZE:
+            raise ValueError(f'Como máximo {MAX_BATCH_SIZE} reservas por lote')
+        results = [{'index': index} for index in range(len(items))]
+        parsed = {}
+        for index, item in enumerate(items):
+            try:
+                fields = ReservationService._parse_batch_item(item)
+            except ValueError as e:
+                results[index].update(status='invalid', error=str(e))
+                continue
+            fields.setdefault('organization_unit_id', organization_unit_id)
+            if fields['organization_unit_id'] is None:
+                results[index].update(status='invalid', error='organization_unit_id es obligatorio')
+                continue
+            parsed[index] = fields
+
+        # Unknown or inactive vehicles and drivers, one query each
+        vehicles = {f['vehicle_id'] for f in parsed.values()}
+        drivers = {f['driver_id'] for f in parsed.values()}
+        active_vehicles = set(db.session.execute(
+            select(Vehicle.id).where(Vehicle.id.in_(vehicles), Vehicle.is_active == True)).scalars())  # noqa: E712
+        active_drivers = set(db.session.execute(
+            select(Driver.id).where(Driver.id.in_(drivers), Driver.is_active == True)).scalars())  # noqa: E712
+        for index, fields in list(parsed.items()):
+            if fields['vehicle_id'] not in active_vehicles:
+                results[index].update(status='invalid', error=f"Vehículo {fields['vehicle_id']} no encontrado")
+            elif fields['driver_id'] not in active_drivers:
+                results[index].update(status='invalid', error=f"Conductor {fields['driver_id']} no encontrado")
+            else:
+                continue
+            del parsed[index]
+
+        # Existing reservations and series occurrences of the batch vehicles within the batch
+        # window, sorted by vehicle and start (read under the booking write lock on SQLite)
+        existing = {}
+        if parsed:
+            begin_booking_write(db.session)
+            batch_vehicles = {f['vehicle_id'] for f in parsed.values()}
+            window_start = min(f['start_date'] for f in parsed.values())
+            window_end = max(f['end_date'] for f in parsed.values())
+            rows = [
+                (vehicle_id, start, end, {'reservation_id': reservation_id})
+                for vehicle_id, start, end, reservation_id in db.session.execute(
+                    select(Reservation.vehicle_id, Reservation.start_date, Reservation.end_date, Reservation.id)
+                    .where(Reservation.vehicle_id.in_(batch_vehicles),
+                           Reservation.status != ReservationStatus.CANCELLED,
+                           Reservation.start_date < window_end,
+                           Reservation.end_date > window_start))
+            ]
+            rows.extend((o.vehicle_id, o.start_date, o.end_date, {'series_id': o.series_id})
+                        for o in ReservationSeriesService.occurrences_between(window_start, window_end,
+                                                                              vehicle_ids=batch_vehicles))
+            rows.sort(key=lambda row: (row[0], row[1]))
+            for vehicle_id, group in groupby(rows, key=lambda row: row[0]):
+                group = list(group)
+                # Running maximum of end dates: the rows starting before t overlap [s, t) iff it is > s
+                reach, reach_conflicts = [], []
+                for _, _, end, conflict in group:
+                    if not reach or end > reach[-1]:
+                        reach.append(end)
+                        reach_conflicts.append(conflict)
+                    else:
+                        reach.append(reach[-1])
+                        reach_conflicts.append(reach_conflicts[-1])
+                existing[vehicle_id] = ([row[1] for row in group], reach, reach_conflicts)
+
+        ordered = sorted(parsed, key=lambda i: (parsed[i]['vehicle_id'], parsed[i]['start_date'], i))
+        accepted = []
+        for vehicle_id, indexes in groupby(ordered, key=lambda i: parsed[i]['vehicle_id']):
+            starts, reach, reach_conflicts = existing.get(vehicle_id, ([], [], []))
+            batch_reach, batch_holder = None, None
+            for index in indexes:
+                fields = parsed[index]
+                position = bisect_left(starts, fields['end_date'])
+                if position and reach[position - 1] > fields['start_date']:
+                    results[index].update(status='conflict', conflict=reach_conflicts[position - 1])
+                elif batch_reach is not None and batch_reach > fields['start_date']:
+                    results[index].update(status='conflict', conflict={'index': batch_holder})
+                else:
+                    accepted.append(index)
+                    if batch_reach is None or fields['end_date'] > batch_reach:
+                        batch_reach, batch_holder = fields['end_date'], index
+
+        rejected = len(items) - len(accepted)
+        if all_or_nothing and rejected:
+            for index in accepted:
+                results[index].update(status='skipped', error='Lote descartado: hay reservas rechazadas')
+            accepted = []
+        if accepted:
+            reservations = {index: Reservation(user_id=user_id, status=ReservationStatus.PENDING, **parsed[index])
+                            for index in sorted(accepted)}
+            db.session.add_all(reservations.values())
+            try:
+                db.session.flush()
+                # Read ids before the commit expires the objects (one refresh query each otherwise)
+                for index, reservation in reservations.items():
+                    results[index].update(status='created', id=reservation.id)
+                db.session.commit()
+            except IntegrityError as e:
+                db.session.rollback()
+                if is_overlap_violation(e):
+                    raise ReservationConflictError('Otra reserva simultánea ocupa alguno de los vehículos del '
+                                                   'lote; vuelve a enviarlo') from e
+                raise
+        else:
+            db.session.rollback()  # Release the booking write lock
+        SecurityAudit.log_operation('BATCH_CREATE', 'reservation', True, {
+            'items': len(items), 'created': len(accepted), 'rejected': rejected,
+        })
+        return {'created': len(accepted), 'rejected': rejected, 'results': results}
+
     @staticmethod
     @audit_model_change('Reservation', 'UPDATE')
     def update_reservation(reservation_id: int, **kwargs) -> Optional[Reservation]:
@@ -130,25 +331,21 @@ class ReservationService:
         if not reservation:
             return None
 
-        # If changing vehicle or dates, ensure no overlap
-        new_vehicle = kwargs.get('vehicle_id', reservation.vehicle_id)
-        new_start = kwargs.get('start_date', reservation.start_date)
-        new_end = kwargs.get('end_date', reservation.end_date)
-        ReservationService._check_vehicle_overlap(new_vehicle, new_start, new_end, exclude_reservation_id=reservation_id)
-
-        updated_fields = []
-        for key, value in kwargs.items():
-            if hasattr(reservation, key) and value is not None:
-                current_value = getattr(reservation, key)
-                if current_value != value:
-                    setattr(reservation, key, value)
-                    updated_fields.append(key)
-
-        if updated_fields:  # Only commit and log if something actually changed
-            db.session.commit()
-            db.session.refresh(reservation)
-        else:
+        changes = {key: value for key, value in kwargs.items()
+                   if hasattr(reservation, key) and value is not None and getattr(reservation, key) != value}
+        if not changes:
             db.session.rollback()  # No changes made
+            return reservation
+
+        # Changing vehicle or dates must not overlap another booking
+        new_vehicle = changes.get('vehicle_id', reservation.vehicle_id)
+        new_start = changes.get('start_date', reservation.start_date)
+        new_end = changes.get('end_date', reservation.end_date)
+        with ReservationService._booking_transaction(new_vehicle, new_start, new_end,
+                                                     exclude_reservation_id=reservation_id):
+            for key, value in changes.items():
+                setattr(reservation, key, value)
+        db.session.refresh(reservation)
 
         return reservation
     
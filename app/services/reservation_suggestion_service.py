@@ -0,0 +1,78 @@
+"""Alternatives for a booking that conflicts with another one.
+
+For the requested vehicle and window, the busy intervals of the vehicle and
+of its equivalent fleet (same unit and type, bookable) around the window are
+loaded at once with ``AllocationService.load_timelines`` -- one reservation
+query plus the recurring series lookup -- and:
+
+- nearest free slots: the free gaps of the requested vehicle within
+  SUGGESTION_SEARCH_DAYS either side are scanned in order; every gap long
+  enough for the booking yields the placement closest to the requested start,
+  and the closest placements are returned;
+- alternative vehicles: equivalent vehicles free over the requested window,
+  tightest fit first (the allocator's criterion, so suggestions do not break
+  up long free blocks).
+"""
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from flask import current_app
+from sqlalchemy import select
+from app.extensions import db
+from app.models import Vehicle
+from app.services.allocation_service import AllocationService, UNAVAILABLE_STATUSES
+
+DEFAULT_SEARCH_DAYS = 7
+DEFAULT_SLOTS = 3
+DEFAULT_VEHICLES = 5
+
+
+class ReservationSuggestionService:
+    """Nearest free slots and alternative vehicles for a booking request"""
+
+    @staticmethod
+    def suggest(vehicle_id: int, start: datetime, end: datetime, exclude_reservation_id: Optional[int] = None,
+                now: Optional[datetime] = None, slots: int = DEFAULT_SLOTS, vehicles: int = DEFAULT_VEHICLES,
+                search_days: Optional[int] = None) -> Dict:
+        """{'slots': [{'start', 'end'}] nearest first, 'vehicles': [{'vehicle_id', 'license_plate', ...}]}
+
+        `exclude_reservation_id` is the reservation being edited (its own slot counts as free).
+        """
+        vehicle = db.session.get(Vehicle, vehicle_id)
+        if not vehicle or end <= start:
+            return {'slots': [], 'vehicles': []}
+        now = now or datetime.utcnow()
+        if search_days is None:
+            search_days = current_app.config.get('SUGGESTION_SEARCH_DAYS', DEFAULT_SEARCH_DAYS)
+        duration = end - start
+        lower = max(start - timedelta(days=search_days), now)
+        upper = end + timedelta(days=search_days)
+
+        fleet = db.session.execute(
+            select(Vehicle.id, Vehicle.license_plate, Vehicle.make, Vehicle.model)
+            .where(Vehicle.id != vehicle.id,
+                   Vehicle.organization_unit_id == vehicle.organization_unit_id,
+                   Vehicle.vehicle_type == vehicle.vehicle_type,
+                   Vehicle.is_active == True,  # noqa: E712
+                   Vehicle.status.notin_(UNAVAILABLE_STATUSES))
+            .order_by(Vehicle.license_plate)
+        ).all()
+        timelines = AllocationService.load_timelines([vehicle.id] + [row.id for row in fleet],
+                                                     min(lower, start), upper, exclude_reservation_id)
+
+        placements = []
+        for gap_start, gap_end in timelines[vehicle.id].gaps(lower, upper):
+            if gap_end - gap_start >= duration:
+                slot_start = min(max(start, gap_start), gap_end - duration)
+                placements.append((abs(slot_start - start), slot_start))
+        free = []
+        for position, row in enumerate(fleet):
+            fit = timelines[row.id].fit(start, end)
+            if fit is not None:
+                free.append((fit, position, row))
+        return {
+            'slots': [{'start': slot_start, 'end': slot_start + duration}
+                      for _, slot_start in heapq.nsmallest(slots, placements)],
+            'vehicles': [{'vehicle_id': row.id, 'license_plate': row.license_plate, 'make': row.make,
+                          'model': row.model} for _, _, row in heapq.nsmallest(vehicles, free)],
+        }
@@ -0,0 +1,128 @@
+"""Search service (vehicles, drivers and providers)"""
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import text
+from app.extensions import db
+from app.db.search_index import SEARCH_SOURCES, fts_table
+
+# FTS5 trigram queries need at least three characters
+MIN_TRIGRAM_LENGTH = 3
+
+# Per source: label and description of a result row (table alias "s") and the
+# columns whose prefix matches rank first
+_DISPLAY = {
+    'vehicle': ("s.license_plate", "s.make || ' ' || s.model", ('license_plate',)),
+    'driver': ("s.first_name || ' ' || s.last_name", "s.document_number", ('document_number', 'last_name')),
+    'provider': ("s.name", "COALESCE(s.contact_person, s.email, '')", ('name',)),
+}
+
+
+class SearchService:
+    """Ranked search over the full-text indexes (see app/db/search_index.py)"""
+
+    @staticmethod
+    def _escape_like(term: str) -> str:
+        return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    @staticmethod
+    def _source_query(source: str, dialect: str, short_term: bool, organization_unit_id: Optional[int]) -> str:
+        """SELECT of one source returning (type, id, label, description, prefix_match, rank)"""
+        table = SEARCH_SOURCES[source]['table'].name
+        columns = SEARCH_SOURCES[source]['columns']
+        label, description, prefix_columns = _DISPLAY[source]
+        like = 'LIKE' if dialect == 'sqlite' else 'ILIKE'
+        prefix_match = 'CASE WHEN ' + ' OR '.join(
+            f"s.{c} {like} :prefix ESCAPE '\\'" for c in prefix_columns) + ' THEN 1 ELSE 0 END'
+
+        if dialect == 'sqlite':
+            fts = fts_table(source)
+            if short_term:
+                # Below the trigram length FTS5 scans its own rows
+                match = ' OR '.join(f"{fts}.{c} LIKE :pattern ESCAPE '\\'" for c in columns)
+                rank = '0.0'
+            else:
+                match = f'{fts} MATCH :match'
+                rank = f'bm25({fts})'
+            source_from = f'{fts} JOIN {table} s ON s.id = {fts}.rowid'
+        else:
+            match = ' OR '.join(f"s.{c} ILIKE :pattern ESCAPE '\\'" for c in columns)
+            if dialect == 'postgresql':
+                # Higher trigram similarity first (ascending, like bm25)
+                rank = '-GREATEST(' + ', '.join(f"similarity(COALESCE(s.{c}, ''), :term)" for c in columns) + ')'
+            else:
+                rank = '0.0'
+            source_from = f'{table} s'
+
+        sql = (f"SELECT '{source}' AS type, s.id AS id, {label} AS label, {description} AS description, "
+               f"{prefix_match} AS prefix_match, {rank} AS rank "
+               f"FROM {source_from} WHERE ({match}) AND s.is_active = :active")
+        if organization_unit_id is not None:
+            sql += ' AND s.organization_unit_id = :organization_unit_id'
+        return sql
+
+    @staticmethod
+    def _execute(term: str, types: List[str], organization_unit_id: Optional[int], limit: Optional[int], offset: int,
+                 with_total: bool = True):
+        dialect = db.engine.dialect.name
+        short_term = len(term) < MIN_TRIGRAM_LENGTH
+        union = ' UNION ALL '.join(
+            SearchService._source_query(source, dialect, short_term, organization_unit_id) for source in types
+        )
+        escaped = SearchService._escape_like(term)
+        params = {
+            'term': term,
+            # FTS5 phrase query: substring match with the trigram tokenizer
+            'match': '"' + term.replace('"', '""') + '"',
+            'pattern': f'%{escaped}%',
+            'prefix': f'{escaped}%',
+            'active': True,
+            'organization_unit_id': organization_unit_id,
+            'limit': limit,
+            'offset': offset,
+        }
+        total = None
+        if with_total:
+            total = db.session.execute(text(f'SELECT COUNT(*) FROM ({union}) AS matches'), params).scalar()
+        sql = f'SELECT * FROM ({union}) AS matches ORDER BY prefix_match DESC, rank, label'
+        if limit is not None:
+            sql += ' LIMIT :limit OFFSET :offset'
+        rows = db.session.execute(text(sql), params).mappings().all()
+        return total, rows
+
+    @staticmethod
+    def search(query: str, types: Optional[Iterable[str]] = None, organization_unit_id: Optional[int] = None,
+               page: int = 1, per_page: int = 20) -> Dict:
+        """Ranked, paginated search across entity types.
+
+        Prefix matches on the main fields (plate, document or last name,
+        provider name) come first, then the index rank.
+        """
+        term = (query or '').strip()
+        types = [t for t in (types or SEARCH_SOURCES) if t in SEARCH_SOURCES]
+        page, per_page = max(1, page), max(1, min(per_page, 100))
+        result = {'query': term, 'types': types, 'page': page, 'per_page': per_page, 'total': 0, 'results': []}
+        if not term or not types:
+            return result
+
+        total, rows = SearchService._execute(term, types, organization_unit_id, per_page, (page - 1) * per_page)
+        result['total'] = total
+        result['results'] = [
+            {
+                'type': row['type'],
+                'id': row['id'],
+                'label': row['label'],
+                'description': row['description'],
+                'rank': round(float(row['rank'] or 0.0), 4),
+            }
+            for row in rows
+        ]
+        return result
+
+    @staticmethod
+    def search_ids(source: str, query: str, organization_unit_id: Optional[int] = None,
+                   limit: Optional[int] = None) -> List[int]:
+        """Ids of the matches of one source, best first (all of them unless limited)"""
+        term = (query or '').strip()
+        if not term:
+            return []
+        _, rows = SearchService._execute(term, [source], organization_unit_id, limit, 0, with_total=False)
+        return [row['id'] for row in rows]
@@ -6,6 +6,7 @@ from flask import request, g
 from flask_login import current_user
 from app.extensions import db
 from app.models.user import User
+from app.services.audit_event_service import AuditEvents
 
 # Configure security logger with enhanced formatting
 security_logger = logging.getLogger('security')
@@ -81,6 +82,10 @@ class SecurityAudit:
     @staticmethod
     def log_operation(operation: str, resource: str, success: bool = True, details: dict = None, **extra_fields):
         """Log a general operation with full context"""
+        # Inside an accumulated request this becomes a sub-event of the request record
+        if AuditEvents.record('security', operation, resource, success, dict(details or {}, **extra_fields)):
+            return
+
         message, log_data = SecurityAudit._format_log_message(operation, resource, details, **extra_fields)
 
         if success:
@@ -0,0 +1,88 @@
+"""Status sweeper for unpaid fines, vehicle taxes and assignments.
+
+Overdue state used to be recomputed row by row (template checks, model
+properties, date scans in ``get_overdue_*``). The sweeper persists it instead:
+set-based ``UPDATE ... WHERE status = PENDING AND deadline < now`` transitions
+applied in batches of ids, so listings can filter on the indexed status
+column. Each batch is committed and recorded in the security audit log.
+
+A row whose deadline has been moved past ``now`` goes back from OVERDUE to
+PENDING. The sweep runs every 15 minutes as the ``status_sweeper.sweep`` job
+and from scripts/sweep_payment_status.py.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import select, update
+from app.extensions import db
+from app.services.job_service import job
+from app.services.metrics_service import Metrics
+from app.services.security_audit_service import SecurityAudit
+from app.models.fine import Fine, FineStatus
+from app.models.tax import VehicleTax, PaymentStatus as TaxPaymentStatus
+from app.models.vehicle_assignment import VehicleAssignment, PaymentStatus as AssignmentPaymentStatus
+
+DEFAULT_BATCH_SIZE = 500
+
+# name -> (model, status column, deadline column, pending, overdue, extra conditions, clock)
+# Fines and taxes store local deadlines, assignments UTC ones (see their services)
+_SOURCES = {
+    'fines': (Fine, Fine.status, Fine.payment_deadline, FineStatus.PENDING, FineStatus.OVERDUE, (), datetime.now),
+    'taxes': (VehicleTax, VehicleTax.payment_status, VehicleTax.due_date,
+              TaxPaymentStatus.PENDING, TaxPaymentStatus.OVERDUE, (), datetime.now),
+    'assignments': (VehicleAssignment, VehicleAssignment.payment_status, VehicleAssignment.end_date,
+                    AssignmentPaymentStatus.PENDING, AssignmentPaymentStatus.OVERDUE,
+                    (VehicleAssignment.is_active == True,), datetime.utcnow),
+}
+
+
+class StatusSweeperService:
+    """Batched PENDING <-> OVERDUE transitions"""
+
+    @staticmethod
+    def _transition(name: str, model, status_column, from_status, to_status, conditions,
+                    batch_size: int) -> int:
+        total = 0
+        where = (status_column == from_status, *conditions)
+        while True:
+            ids = db.session.execute(
+                select(model.id).where(*where).order_by(model.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return total
+            # The guard is repeated so a row paid or edited meanwhile is left alone
+            result = db.session.execute(
+                update(model).where(model.id.in_(ids), *where).values({status_column.key: to_status}),
+                execution_options={'synchronize_session': False},
+            )
+            db.session.commit()
+            changed = result.rowcount
+            total += changed
+            Metrics.inc('status_transitions', {'table': name, 'status': to_status.name.lower()}, changed)
+            SecurityAudit.log_operation('STATUS_SWEEP', name, True, {
+                'from': from_status.name, 'to': to_status.name, 'count': changed, 'ids': ids,
+            })
+            if len(ids) < batch_size:
+                return total
+
+    @staticmethod
+    def sweep(now: Optional[datetime] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+              sources: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+        """Apply due transitions; returns {source: {'overdue': n, 'reopened': n}}"""
+        counts = {}
+        for name in sources or _SOURCES:
+            model, status_column, deadline, pending, overdue, extra, clock = _SOURCES[name]
+            moment = now or clock()
+            counts[name] = {
+                'overdue': StatusSweeperService._transition(
+                    name, model, status_column, pending, overdue, (deadline < moment, *extra), batch_size),
+                # Deadline extended after the row was marked overdue
+                'reopened': StatusSweeperService._transition(
+                    name, model, status_column, overdue, pending, (deadline >= moment,), batch_size),
+            }
+        return counts
+
+
+@job('status_sweeper.sweep', schedule='*/15 * * * *')
+def sweep_payment_status():
+    """Overdue transitions every 15 minutes"""
+    StatusSweeperService.sweep()
@@ -1,14 +1,18 @@
 """Tax service"""
 from typing import List, Optional
 from datetime import datetime
+from sqlalchemy import and_, or_
 from app.extensions import db
 from app.models.tax import VehicleTax, TaxType, PaymentStatus
 
 class TaxService:
     @staticmethod
-    def get_all_taxes() -> List[VehicleTax]:
-        """Get all tax records"""
-        return VehicleTax.query.order_by(VehicleTax.tax_year.desc()).all()
+    def get_all_taxes(payment_status: Optional[PaymentStatus] = None) -> List[VehicleTax]:
+        """Get all tax records, optionally only those in `payment_status`"""
+        query = VehicleTax.query
+        if payment_status is not None:
+            query = query.filter(VehicleTax.payment_status == payment_status)
+        return query.order_by(VehicleTax.tax_year.desc()).all()
     
     @staticmethod
     def get_tax_by_id(tax_id: int) -> Optional[VehicleTax]:
@@ -22,16 +26,18 @@ class TaxService:
     
     @staticmethod
     def get_pending_taxes() -> List[VehicleTax]:
-        """Get all pending tax payments"""
-        return VehicleTax.query.filter_by(payment_status=PaymentStatus.PENDING).all()
+        """Get all unpaid tax payments (pending or already overdue)"""
+        return VehicleTax.query.filter(
+            VehicleTax.payment_status.in_((PaymentStatus.PENDING, PaymentStatus.OVERDUE))
+        ).all()
     
     @staticmethod
     def get_overdue_taxes() -> List[VehicleTax]:
-        """Get all overdue tax payments"""
-        return VehicleTax.query.filter(
-            VehicleTax.payment_status == PaymentStatus.PENDING,
-            VehicleTax.due_date < datetime.now()
-        ).all()
+        """Get all overdue tax payments, including pending ones the status sweeper has not reached yet"""
+        return VehicleTax.query.filter(or_(
+            VehicleTax.payment_status == PaymentStatus.OVERDUE,
+            and_(VehicleTax.payment_status == PaymentStatus.PENDING, VehicleTax.due_date < datetime.now())
+        )).all()
     
     @staticmethod
     def create_tax(
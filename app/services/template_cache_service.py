@@ -0,0 +1,203 @@
+"""Template compilation caching and fragment caching.
+
+Bytecode cache: compiled templates are written to JINJA_BYTECODE_CACHE_DIR,
+shared by every worker (and kept across restarts), so a template is compiled
+from source once per change instead of once per worker. With
+TEMPLATE_PRECOMPILE every template is loaded at startup: a fresh worker does
+not pay for compilation on its first requests.
+
+Fragment cache: ``{% cache key, ttl, depends %}...{% endcache %}`` keeps the
+rendered body in the worker for ``ttl`` seconds::
+
+    {% cache ('grid', month.isoformat()), 600, ['reservations', 'vehicles'] %}
+        {% set grid = load_grid() %}  {# only called on a miss #}
+        ...
+    {% endcache %}
+
+``depends`` names tables (VERSIONED_TABLES). Each has a version counter in
+``cache_versions``, bumped after every commit that wrote to it, from any
+worker; the versions are part of the key, so a write makes the fragments
+that depend on the table miss at once. Writes that bypass the ORM session
+are only picked up when the ttl runs out. Lookups are counted in the
+``cache_requests`` metric (cache="fragment").
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from itertools import chain
+from typing import Iterable, Optional, Tuple
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache, TemplateError, nodes
+from jinja2.ext import Extension
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from app.extensions import db
+from app.models import CacheVersion
+from app.services.metrics_service import Metrics
+
+logger = logging.getLogger(__name__)
+
+# Tables cached fragments may depend on: commits writing to them bump their version
+VERSIONED_TABLES = frozenset({
+    'reservations', 'reservation_series', 'reservation_series_overrides', 'vehicles', 'drivers',
+})
+
+DEFAULT_MAX_ENTRIES = 512
+
+
+class FragmentCache:
+    """Rendered fragments of this worker, least recently used evicted first"""
+
+    _entries: 'OrderedDict[tuple, Tuple[float, str]]' = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get(key: tuple) -> Optional[str]:
+        with FragmentCache._lock:
+            entry = FragmentCache._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del FragmentCache._entries[key]
+                return None
+            FragmentCache._entries.move_to_end(key)
+            return value
+
+    @staticmethod
+    def set(key: tuple, value: str, ttl: float, max_entries: int):
+        with FragmentCache._lock:
+            FragmentCache._entries[key] = (time.monotonic() + ttl, value)
+            FragmentCache._entries.move_to_end(key)
+            while len(FragmentCache._entries) > max_entries:
+                FragmentCache._entries.popitem(last=False)
+
+    @staticmethod
+    def clear():
+        with FragmentCache._lock:
+            FragmentCache._entries.clear()
+
+
+class TemplateCacheService:
+    """Table versions and template precompilation"""
+
+    @staticmethod
+    def versions(namespaces: Iterable[str]) -> Tuple[int, ...]:
+        """Current version of each table, in the given order (0 for tables never written)"""
+        namespaces = tuple(namespaces)
+        rows = dict(db.session.execute(
+            select(CacheVersion.namespace, CacheVersion.version).where(CacheVersion.namespace.in_(namespaces))).all())
+        return tuple(rows.get(namespace, 0) for namespace in namespaces)
+
+    @staticmethod
+    def bump(namespaces: Iterable[str]):
+        """Increment the version of each table, in its own short transaction"""
+        table = CacheVersion.__table__
+        now = datetime.utcnow()
+        with db.engine.begin() as connection:
+            insert = (postgresql if connection.dialect.name == 'postgresql' else sqlite).insert(table)
+            for namespace in sorted(namespaces):
+                connection.execute(insert.values(namespace=namespace, version=1, updated_at=now)
+                                   .on_conflict_do_update(index_elements=['namespace'],
+                                                          set_={'version': table.c.version + 1, 'updated_at': now}))
+
+    @staticmethod
+    def precompile(app) -> int:
+        """Load every template (compiling it or reading its bytecode); returns how many"""
+        compiled = 0
+        for name in app.jinja_env.list_templates(extensions=('html',)):
+            try:
+                app.jinja_env.get_template(name)
+                compiled += 1
+            except TemplateError as e:
+                logger.warning('Template %s not precompiled: %s', name, e)
+        return compiled
+
+
+class FragmentCacheExtension(Extension):
+    """``{% cache key, ttl[, depends] %}...{% endcache %}``"""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        # Keys are per template: the same key in two templates is two fragments
+        args = [nodes.Const(parser.name), parser.parse_expression()]
+        parser.stream.expect('comma')
+        args.append(parser.parse_expression())
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(()))
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, template_name, key, ttl, depends, caller):
+        config = current_app.config
+        if not config.get('FRAGMENT_CACHE_ENABLED', True):
+            return caller()
+        depends = tuple(sorted(depends))
+        unknown = set(depends) - VERSIONED_TABLES
+        if unknown:
+            raise ValueError(f'Fragment cache dependencies without version tracking: {sorted(unknown)}')
+        key = tuple(key) if isinstance(key, list) else key
+        full_key = (template_name, key, depends, TemplateCacheService.versions(depends))
+
+        value = FragmentCache.get(full_key)
+        Metrics.record_cache_access('fragment', value is not None)
+        if value is None:
+            value = caller()
+            FragmentCache.set(full_key, value, ttl, config.get('FRAGMENT_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+        return value
+
+
+def init_template_cache(app):
+    """Shared bytecode cache and fragment cache tag"""
+    directory = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+    if directory:
+        directory = os.path.abspath(directory)
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+
+
+def precompile_templates(app):
+    """With TEMPLATE_PRECOMPILE, compile every template; call once filters and blueprints are registered"""
+    if not app.config.get('TEMPLATE_PRECOMPILE', False):
+        return
+    started = time.perf_counter()
+    compiled = TemplateCacheService.precompile(app)
+    logger.info('Precompiled %d templates in %.0f ms', compiled, (time.perf_counter() - started) * 1000)
+
+
+# ---- table versions ----------------------------------------------------------
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_written_tables(session, flush_context):
+    # Still the pre-flush new/dirty/deleted collections here
+    written = {getattr(obj, '__tablename__', None) for obj in chain(session.new, session.dirty, session.deleted)}
+    written &= VERSIONED_TABLES
+    if written:
+        session.info.setdefault('cache_written_tables', set()).update(written)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _bump_written_tables(session):
+    written = session.info.pop('cache_written_tables', None)
+    if written:
+        try:
+            TemplateCacheService.bump(written)
+        except SQLAlchemyError as e:
+            # The write is committed; dependent fragments expire with their ttl
+            logger.warning('Cache versions of %s not bumped: %s', sorted(written), e)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _forget_written_tables(session, previous_transaction):
+    # The whole transaction, not a savepoint inside it
+    if previous_transaction.parent is None:
+        session.info.pop('cache_written_tables', None)
@@ -0,0 +1,252 @@
+"""In-memory typeahead index for license plates and driver names.
+
+Each worker keeps, per entity kind, a sorted list of normalized keys (plate;
+"first last", "last first" and document for drivers) for the whole fleet and
+for every organization unit. A prefix lookup is a bisect plus a short scan, so
+answers take microseconds regardless of fleet size.
+
+The index is built lazily on the first lookup and kept current by session
+events: rows flushed in a transaction are applied when it commits. Writes that
+bypass the ORM session (bulk SQL) and writes made by other workers are picked
+up by a full rebuild once the index is older than TYPEAHEAD_TTL_SECONDS.
+"""
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional
+from sqlalchemy import event, select
+from app.extensions import db
+from app.models import Vehicle, VehicleStatus, Driver
+from app.services.metrics_service import Metrics
+
+DEFAULT_TTL_SECONDS = 300
+
+
+def normalize(value: str) -> str:
+    """Case- and accent-insensitive key without spaces or punctuation ('12-34 abc' -> '1234abc')"""
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    return ''.join(ch for ch in decomposed.casefold() if ch.isalnum())
+
+
+def _vehicle_entry(row) -> dict:
+    status = row['status']
+    return {
+        'id': row['id'],
+        'label': f"{row['license_plate']} - {row['make']} {row['model']}",
+        'organization_unit_id': row['organization_unit_id'],
+        'status': status.name if hasattr(status, 'name') else status,
+        'keys': [normalize(row['license_plate'])],
+    }
+
+
+def _driver_entry(row) -> dict:
+    return {
+        'id': row['id'],
+        'label': f"{row['first_name']} {row['last_name']} ({row['document_number']})",
+        'organization_unit_id': row['organization_unit_id'],
+        'status': None,
+        'keys': sorted({
+            normalize(f"{row['first_name']} {row['last_name']}"),
+            normalize(f"{row['last_name']} {row['first_name']}"),
+            normalize(row['document_number']),
+        }),
+    }
+
+
+_KINDS = {
+    'vehicle': {
+        'model': Vehicle,
+        'columns': ('id', 'license_plate', 'make', 'model', 'organization_unit_id', 'status'),
+        'entry': _vehicle_entry,
+    },
+    'driver': {
+        'model': Driver,
+        'columns': ('id', 'first_name', 'last_name', 'document_number', 'organization_unit_id'),
+        'entry': _driver_entry,
+    },
+}
+
+
+class _KindIndex:
+    """Sorted (key, id) lists for the whole fleet (scope None) and per organization unit"""
+
+    def __init__(self):
+        self.entries = {}
+        self.scopes = {None: []}
+        self.built_at = time.monotonic()
+
+    def _scopes_of(self, entry):
+        scopes = [None]
+        if entry['organization_unit_id'] is not None:
+            scopes.append(entry['organization_unit_id'])
+        return scopes
+
+    def add(self, entry: dict):
+        self.remove(entry['id'])
+        self.entries[entry['id']] = entry
+        for scope in self._scopes_of(entry):
+            keys = self.scopes.setdefault(scope, [])
+            for key in entry['keys']:
+                insort(keys, (key, entry['id']))
+
+    def remove(self, entry_id: int):
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for scope in self._scopes_of(entry):
+            keys = self.scopes.get(scope, [])
+            for key in entry['keys']:
+                pos = bisect_left(keys, (key, entry_id))
+                if pos < len(keys) and keys[pos] == (key, entry_id):
+                    del keys[pos]
+
+    def lookup(self, prefix: str, scope: Optional[int], limit: int, status: Optional[str]) -> List[dict]:
+        keys = self.scopes.get(scope, [])
+        pos = bisect_left(keys, (prefix,))
+        found, seen = [], set()
+        while pos < len(keys) and len(found) < limit:
+            key, entry_id = keys[pos]
+            if not key.startswith(prefix):
+                break
+            pos += 1
+            if entry_id in seen:
+                continue
+            seen.add(entry_id)
+            entry = self.entries[entry_id]
+            if status is None or entry['status'] == status:
+                found.append(entry)
+        return found
+
+
+class TypeaheadService:
+    """Prefix lookups for the vehicle and driver pickers of the forms"""
+
+    _lock = threading.Lock()
+    _indexes: Dict[str, _KindIndex] = {}
+    ttl_seconds = DEFAULT_TTL_SECONDS
+
+    @staticmethod
+    def configure(ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        TypeaheadService.ttl_seconds = ttl_seconds
+        TypeaheadService.invalidate()
+
+    @staticmethod
+    def invalidate():
+        """Drop every index; the next lookup rebuilds it"""
+        with TypeaheadService._lock:
+            TypeaheadService._indexes = {}
+
+    @staticmethod
+    def _load(kind: str) -> _KindIndex:
+        spec = _KINDS[kind]
+        model = spec['model']
+        columns = [getattr(model, name) for name in spec['columns']]
+        rows = db.session.execute(select(*columns).where(model.is_active == True)).mappings()  # noqa: E712
+
+        index = _KindIndex()
+        pairs = {None: []}
+        for row in rows:
+            entry = spec['entry'](row)
+            index.entries[entry['id']] = entry
+            for scope in index._scopes_of(entry):
+                pairs.setdefault(scope, []).extend((key, entry['id']) for key in entry['keys'])
+        # One sort per scope instead of one insort per row
+        index.scopes = {scope: sorted(keys) for scope, keys in pairs.items()}
+        return index
+
+    @staticmethod
+    def _index(kind: str) -> _KindIndex:
+        index = TypeaheadService._indexes.get(kind)
+        fresh = index is not None and time.monotonic() - index.built_at < TypeaheadService.ttl_seconds
+        Metrics.record_cache_access('typeahead', fresh)
+        if not fresh:
+            index = TypeaheadService._load(kind)
+            with TypeaheadService._lock:
+                TypeaheadService._indexes[kind] = index
+        return index
+
+    @staticmethod
+    def lookup(kind: str, query: str, organization_unit_id: Optional[int] = None, limit: int = 10,
+               available_only: bool = False) -> List[dict]:
+        """Top `limit` entries whose key starts with the normalized query"""
+        if kind not in _KINDS:
+            raise ValueError(f'Tipo de búsqueda no soportado: {kind}')
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        status = VehicleStatus.AVAILABLE.name if available_only and kind == 'vehicle' else None
+        index = TypeaheadService._index(kind)
+        with TypeaheadService._lock:
+            found = index.lookup(prefix, organization_unit_id, max(1, min(limit, 50)), status)
+        return [{'id': e['id'], 'label': e['label']} for e in found]
+
+    @staticmethod
+    def label_for(obj) -> str:
+        """Label shown for an already selected vehicle or driver"""
+        if obj is None:
+            return ''
+        kind = 'vehicle' if isinstance(obj, Vehicle) else 'driver'
+        row = {name: getattr(obj, name) for name in _KINDS[kind]['columns']}
+        return _KINDS[kind]['entry'](row)['label']
+
+    @staticmethod
+    def apply_changes(changes: Dict):
+        """Apply committed rows ({(kind, id): entry or None}) to the built indexes"""
+        with TypeaheadService._lock:
+            for (kind, entry_id), entry in changes.items():
+                index = TypeaheadService._indexes.get(kind)
+                if index is None:
+                    continue
+                if entry is None:
+                    index.remove(entry_id)
+                else:
+                    index.add(entry)
+
+
+# ---- incremental refresh ---------------------------------------------------
+
+def _kind_of(obj) -> Optional[str]:
+    if isinstance(obj, Vehicle):
+        return 'vehicle'
+    if isinstance(obj, Driver):
+        return 'driver'
+    return None
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_typeahead_changes(session, flush_context):
+    """Snapshot flushed vehicles/drivers; applied only if the transaction commits"""
+    if not TypeaheadService._indexes:
+        return
+    pending = session.info.setdefault('typeahead_pending', {})
+    for obj in list(session.new) + list(session.dirty):
+        kind = _kind_of(obj)
+        if kind is None:
+            continue
+        if obj.is_active is False:
+            pending[(kind, obj.id)] = None
+        else:
+            row = {name: getattr(obj, name) for name in _KINDS[kind]['columns']}
+            pending[(kind, obj.id)] = _KINDS[kind]['entry'](row)
+    for obj in session.deleted:
+        kind = _kind_of(obj)
+        if kind is not None:
+            pending[(kind, obj.id)] = None
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_typeahead_changes(session):
+    pending = session.info.pop('typeahead_pending', None)
+    if pending:
+        TypeaheadService.apply_changes(pending)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_typeahead_changes(session, previous_transaction):
+    session.info.pop('typeahead_pending', None)
+
+
+def init_typeahead(app):
+    """Configure the index lifetime (TYPEAHEAD_TTL_SECONDS)"""
+    TypeaheadService.configure(app.config.get('TYPEAHEAD_TTL_SECONDS', DEFAULT_TTL_SECONDS))
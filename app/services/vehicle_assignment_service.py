@@ -1,14 +1,21 @@
 """Vehicle Assignment service"""
 from typing import List, Optional
 from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
 from app.extensions import db
 from app.models.vehicle_assignment import VehicleAssignment, AssignmentType, PaymentStatus
 
 class VehicleAssignmentService:
     @staticmethod
-    def get_all_assignments() -> List[VehicleAssignment]:
-        """Get all vehicle assignment records"""
-        return VehicleAssignment.query.order_by(VehicleAssignment.end_date.desc()).all()
+    def get_all_assignments(payment_status: Optional[PaymentStatus] = None,
+                            organization_unit_id: Optional[int] = None) -> List[VehicleAssignment]:
+        """Get all vehicle assignment records, optionally filtered by payment status and organization unit"""
+        query = VehicleAssignment.query
+        if payment_status is not None:
+            query = query.filter(VehicleAssignment.payment_status == payment_status)
+        if organization_unit_id is not None:
+            query = query.filter(VehicleAssignment.organization_unit_id == organization_unit_id)
+        return query.order_by(VehicleAssignment.end_date.desc()).all()
 
     @staticmethod
     def get_assignment_by_id(assignment_id: int) -> Optional[VehicleAssignment]:
@@ -27,15 +34,21 @@ class VehicleAssignmentService:
 
     @staticmethod
     def get_pending_assignments() -> List[VehicleAssignment]:
-        """Get all pending assignment payments"""
-        return VehicleAssignment.query.filter_by(payment_status=PaymentStatus.PENDING, is_active=True).all()
+        """Get all unpaid assignment payments (pending or already overdue)"""
+        return VehicleAssignment.query.filter(
+            VehicleAssignment.payment_status.in_((PaymentStatus.PENDING, PaymentStatus.OVERDUE)),
+            VehicleAssignment.is_active == True
+        ).all()
 
     @staticmethod
     def get_overdue_assignments() -> List[VehicleAssignment]:
-        """Get all overdue assignment payments"""
+        """Get all overdue assignment payments, including pending ones the status sweeper has not reached yet"""
         return VehicleAssignment.query.filter(
-            VehicleAssignment.payment_status == PaymentStatus.PENDING,
-            VehicleAssignment.end_date < datetime.utcnow(),
+            or_(
+                VehicleAssignment.payment_status == PaymentStatus.OVERDUE,
+                and_(VehicleAssignment.payment_status == PaymentStatus.PENDING,
+                     VehicleAssignment.end_date < datetime.utcnow())
+            ),
             VehicleAssignment.is_active == True
         ).all()
 
@@ -0,0 +1,260 @@
+"""Vehicle cost service (total cost of ownership).
+
+Costs live in six tables; ``vehicle_cost_monthly`` keeps them summed per
+vehicle, month and category so TCO per vehicle, organization unit or month
+is one indexed read. Attribution:
+
+- maintenance: ``cost`` in the month it was completed (or scheduled), except
+  cancelled work;
+- tax: ``amount`` in the month of ``due_date``, except exempted taxes;
+- insurance: ``premium_amount`` in the month the policy starts, except
+  cancelled policies;
+- fine: amount paid (or ``amount``) in the month of the fine, except
+  dismissed fines;
+- renting: ``monthly_cost`` for every month billed between start and end;
+- assignment: ``assignment_fee`` in the month it starts (active ones).
+
+Rows carry the vehicle's current organization unit. Flushing any of those
+records recomputes the category of the affected vehicles in the same
+transaction; ``VehicleCostService.rebuild`` (nightly ``vehicle_costs.rebuild``
+job, scripts/rebuild_vehicle_costs.py) recomputes everything.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import event, func, inspect, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+from app.services.job_service import job
+from app.models import (VehicleCostMonthly, CostCategory, Vehicle, OrganizationUnit, MaintenanceRecord,
+                        MaintenanceStatus, VehicleTax, PaymentStatus, VehicleInsurance, InsurancePaymentStatus, Fine,
+                        FineStatus, RentingContract, VehicleAssignment)
+
+_UPSERT_BATCH = 500
+_CENT = Decimal('0.01')
+
+# Breakdowns accepted by VehicleCostService.totals
+GROUPINGS = ('month', 'vehicle', 'organization_unit')
+
+
+def _month_start(column, dialect: str):
+    if dialect == 'postgresql':
+        return func.date_trunc('month', column)
+    return func.strftime('%Y-%m-01', column)
+
+
+def _as_month(value) -> date:
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date().replace(day=1)
+    return value.replace(day=1)
+
+
+def _not(column, value):
+    return or_(column.is_(None), column != value)
+
+
+# category -> (model, date expression, amount expression, conditions)
+_SOURCES = {
+    CostCategory.MAINTENANCE: (
+        MaintenanceRecord, func.coalesce(MaintenanceRecord.completed_date, MaintenanceRecord.scheduled_date),
+        MaintenanceRecord.cost,
+        (MaintenanceRecord.cost.isnot(None), _not(MaintenanceRecord.status, MaintenanceStatus.CANCELLED))),
+    CostCategory.TAX: (
+        VehicleTax, VehicleTax.due_date, VehicleTax.amount,
+        (_not(VehicleTax.payment_status, PaymentStatus.EXEMPTED),)),
+    CostCategory.INSURANCE: (
+        VehicleInsurance, VehicleInsurance.start_date, VehicleInsurance.premium_amount,
+        (_not(VehicleInsurance.payment_status, InsurancePaymentStatus.CANCELLED),)),
+    CostCategory.FINE: (
+        Fine, Fine.fine_date, func.coalesce(Fine.payment_amount, Fine.amount),
+        (_not(Fine.status, FineStatus.DISMISSED),)),
+    CostCategory.ASSIGNMENT: (
+        VehicleAssignment, VehicleAssignment.start_date, VehicleAssignment.assignment_fee,
+        (VehicleAssignment.is_active == True,)),  # noqa: E712
+    CostCategory.RENTING: (RentingContract, None, None, (RentingContract.monthly_cost.isnot(None),)),
+}
+_MODEL_CATEGORIES = {model: category for category, (model, *_rest) in _SOURCES.items()}
+
+
+def _billed_months(start: datetime, end: datetime) -> Iterable[date]:
+    """Months of a renting contract: one charge per month on the start day, before `end`"""
+    year, month = start.year, start.month
+    while datetime(year, month, min(start.day, 28)) < end:
+        yield date(year, month, 1)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _source_rows(connection, category: CostCategory, vehicle_ids: Optional[List[int]]) -> Dict:
+    """{(vehicle_id, month): [organization_unit_id, amount]} from the source table"""
+    model, when, amount, conditions = _SOURCES[category]
+    totals = {}
+    if category == CostCategory.RENTING:
+        query = (select(model.vehicle_id, Vehicle.organization_unit_id, model.start_date, model.end_date,
+                        model.monthly_cost)
+                 .join(Vehicle, Vehicle.id == model.vehicle_id).where(*conditions))
+        if vehicle_ids is not None:
+            query = query.where(model.vehicle_id.in_(vehicle_ids))
+        for vehicle_id, organization_unit_id, start, end, monthly_cost in connection.execute(query):
+            for month in _billed_months(start, end):
+                entry = totals.setdefault((vehicle_id, month), [organization_unit_id, Decimal(0)])
+                entry[1] += Decimal(str(monthly_cost))
+        return totals
+
+    month = _month_start(when, connection.dialect.name).label('month')
+    query = (select(model.vehicle_id, Vehicle.organization_unit_id, month, func.sum(amount))
+             .join(Vehicle, Vehicle.id == model.vehicle_id)
+             .where(when.isnot(None), *conditions)
+             .group_by(model.vehicle_id, Vehicle.organization_unit_id, month))
+    if vehicle_ids is not None:
+        query = query.where(model.vehicle_id.in_(vehicle_ids))
+    for vehicle_id, organization_unit_id, month_value, total in connection.execute(query):
+        totals[(vehicle_id, _as_month(month_value))] = [organization_unit_id, Decimal(str(total or 0))]
+    return totals
+
+
+def _upsert(connection, rows: List[dict]):
+    table = VehicleCostMonthly.__table__
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    for start in range(0, len(rows), _UPSERT_BATCH):
+        stmt = dialect.insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['vehicle_id', 'month', 'category'],
+            set_={column: stmt.excluded[column] for column in ('organization_unit_id', 'amount', 'updated_at')},
+        )
+        connection.execute(stmt, rows[start:start + _UPSERT_BATCH])
+
+
+class VehicleCostService:
+    """Monthly TCO rollup: maintenance and reads"""
+
+    @staticmethod
+    def _reconcile(connection, category: CostCategory, vehicle_ids: Optional[Iterable[int]] = None) -> int:
+        """Rewrite the rows of one category (optionally of some vehicles) from its source table"""
+        vehicle_ids = list(vehicle_ids) if vehicle_ids is not None else None
+        totals = _source_rows(connection, category, vehicle_ids)
+
+        table = VehicleCostMonthly.__table__
+        existing = select(table.c.id, table.c.vehicle_id, table.c.month).where(table.c.category == category)
+        if vehicle_ids is not None:
+            existing = existing.where(table.c.vehicle_id.in_(vehicle_ids))
+        stale = [row.id for row in connection.execute(existing) if (row.vehicle_id, row.month) not in totals]
+        for start in range(0, len(stale), _UPSERT_BATCH):
+            connection.execute(table.delete().where(table.c.id.in_(stale[start:start + _UPSERT_BATCH])))
+
+        now = datetime.utcnow()
+        rows = [{'vehicle_id': vehicle_id, 'month': month, 'category': category,
+                 'organization_unit_id': organization_unit_id, 'amount': amount.quantize(_CENT), 'updated_at': now}
+                for (vehicle_id, month), (organization_unit_id, amount) in totals.items()]
+        if rows:
+            _upsert(connection, rows)
+        return len(rows)
+
+    @staticmethod
+    def rebuild() -> Dict[str, int]:
+        """Recompute the whole rollup; returns the number of rows per category"""
+        connection = db.session.connection()
+        counts = {category.value: VehicleCostService._reconcile(connection, category) for category in _SOURCES}
+        db.session.commit()
+        return counts
+
+    @staticmethod
+    def refresh(connection, changes: Dict[CostCategory, Iterable[int]]):
+        """Recompute some categories of some vehicles ({category: vehicle ids})"""
+        for category, vehicle_ids in changes.items():
+            if vehicle_ids:
+                VehicleCostService._reconcile(connection, category, vehicle_ids)
+
+    @staticmethod
+    def totals(start_month: date, end_month: date, by: str = 'month', organization_unit_id: Optional[int] = None,
+               vehicle_id: Optional[int] = None) -> List[Dict]:
+        """Costs between two months (inclusive) grouped by `by` and category, with one grouped query
+
+        Returns [{'key': month | vehicle id | unit id, 'categories': {category: amount}, 'total': amount}]
+        sorted by key.
+        """
+        if by not in GROUPINGS:
+            raise ValueError(f'Agrupación no soportada: {by}')
+        key = {'month': VehicleCostMonthly.month, 'vehicle': VehicleCostMonthly.vehicle_id,
+               'organization_unit': VehicleCostMonthly.organization_unit_id}[by]
+        query = (db.session.query(key, VehicleCostMonthly.category, func.sum(VehicleCostMonthly.amount))
+                 .filter(VehicleCostMonthly.month >= _as_month(start_month),
+                         VehicleCostMonthly.month <= _as_month(end_month)))
+        if organization_unit_id is not None:
+            query = query.filter(VehicleCostMonthly.organization_unit_id == organization_unit_id)
+        if vehicle_id is not None:
+            query = query.filter(VehicleCostMonthly.vehicle_id == vehicle_id)
+
+        groups = {}
+        for group_key, category, amount in query.group_by(key, VehicleCostMonthly.category):
+            entry = groups.setdefault(group_key, {'key': group_key, 'categories': {}, 'total': Decimal(0)})
+            amount = Decimal(str(amount or 0)).quantize(_CENT)
+            entry['categories'][category.value] = amount
+            entry['total'] += amount
+        return [groups[k] for k in sorted(groups, key=lambda k: (k is None, k or 0))]
+
+
+    @staticmethod
+    def report(start_month: date, end_month: date, by: str = 'month', organization_unit_id: Optional[int] = None,
+               vehicle_id: Optional[int] = None) -> Dict:
+        """`totals` with labels (month, plate or unit name) and amounts as floats, for pages and the API"""
+        rows = VehicleCostService.totals(start_month, end_month, by, organization_unit_id, vehicle_id)
+        keys = [row['key'] for row in rows if row['key'] is not None]
+        if by == 'vehicle':
+            labels = dict(db.session.query(Vehicle.id, Vehicle.license_plate).filter(Vehicle.id.in_(keys)))
+        elif by == 'organization_unit':
+            labels = dict(db.session.query(OrganizationUnit.id, OrganizationUnit.name)
+                          .filter(OrganizationUnit.id.in_(keys)))
+        else:
+            labels = {key: key.strftime('%Y-%m') for key in keys}
+
+        categories = {}
+        for row in rows:
+            for category, amount in row['categories'].items():
+                categories[category] = categories.get(category, Decimal(0)) + amount
+        return {
+            'start': _as_month(start_month).strftime('%Y-%m'),
+            'end': _as_month(end_month).strftime('%Y-%m'),
+            'by': by,
+            'rows': [{'key': row['key'].strftime('%Y-%m') if by == 'month' else row['key'],
+                      'label': labels.get(row['key'], 'Sin unidad' if row['key'] is None else str(row['key'])),
+                      'categories': {c: float(a) for c, a in row['categories'].items()},
+                      'total': float(row['total'])}
+                     for row in rows],
+            'categories': {c: float(a) for c, a in categories.items()},
+            'total': float(sum(categories.values(), Decimal(0))),
+        }
+
+
+@job('vehicle_costs.rebuild', schedule='45 3 * * *')
+def rebuild_vehicle_costs():
+    """Nightly full rebuild; catches writes that bypass the ORM"""
+    VehicleCostService.rebuild()
+
+
+# ---- refresh on writes -----------------------------------------------------
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_vehicle_costs(session, flush_context):
+    changes = {}
+    moved = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        category = _MODEL_CATEGORIES.get(type(obj))
+        if category is not None:
+            vehicle_ids = changes.setdefault(category, set())
+            vehicle_ids.add(obj.vehicle_id)
+            # A record moved to another vehicle leaves cost behind on the old one
+            vehicle_ids.update(v for v in inspect(obj).attrs.vehicle_id.history.deleted or () if v is not None)
+        elif isinstance(obj, Vehicle) and obj not in session.new and obj not in session.deleted:
+            history = inspect(obj).attrs.organization_unit_id.history
+            if history.has_changes():
+                moved[obj.id] = obj.organization_unit_id
+    for vehicle_ids in changes.values():
+        vehicle_ids.discard(None)
+    if changes:
+        VehicleCostService.refresh(session.connection(), changes)
+    table = VehicleCostMonthly.__table__
+    for vehicle_id, organization_unit_id in moved.items():
+        session.connection().execute(update(table).where(table.c.vehicle_id == vehicle_id)
+                                     .values(organization_unit_id=organization_unit_id))
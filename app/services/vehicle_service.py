@@ -1,9 +1,9 @@
 """Vehicle service"""
 from typing import List, Optional
-from sqlalchemy import or_
 from app.extensions import db
 from app.models.vehicle import Vehicle, VehicleStatus, VehicleType, OwnershipType
 from app.utils.audit_decorators import audit_model_change, audit_operation
+from app.services.search_service import SearchService
 from sqlalchemy.exc import IntegrityError
 
 class VehicleService:
@@ -120,17 +120,13 @@ class VehicleService:
         return vehicle
     
     @staticmethod
-    def search_vehicles(search_term: str) -> List[Vehicle]:
-        """Search vehicles by license plate, make, or model"""
-        search_pattern = f"%{search_term}%"
-        return Vehicle.query.filter(
-            Vehicle.is_active == True,
-            or_(
-                Vehicle.license_plate.ilike(search_pattern),
-                Vehicle.make.ilike(search_pattern),
-                Vehicle.model.ilike(search_pattern)
-            )
-        ).all()
+    def search_vehicles(search_term: str, organization_unit_id: Optional[int] = None) -> List[Vehicle]:
+        """Search vehicles by license plate, make, or model (full-text index, best matches first)"""
+        ids = SearchService.search_ids('vehicle', search_term, organization_unit_id)
+        if not ids:
+            return []
+        vehicles = {v.id: v for v in Vehicle.query.filter(Vehicle.id.in_(ids)).all()}
+        return [vehicles[i] for i in ids if i in vehicles]
     
     @staticmethod
     def get_available_vehicles() -> List[Vehicle]:
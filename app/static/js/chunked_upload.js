@@ -0,0 +1,92 @@
+// Resumable chunked upload of document inputs (see app/services/chunked_upload_service.py).
+//
+// <input type="file" data-chunked-upload="insurance" data-ref-field="document_ref">
+// On submit the selected file is sent to /files/uploads in chunks; a failed
+// chunk is retried from the offset the server reports, so a dropped mobile
+// connection resumes instead of starting over. The stored document path goes
+// into the hidden field and the form is submitted without the file.
+document.addEventListener('DOMContentLoaded', function() {
+    const inputs = document.querySelectorAll('input[type="file"][data-chunked-upload]');
+    if (!inputs.length) return;
+
+    const csrfToken = document.querySelector('meta[name="csrf-token"]')?.getAttribute('content');
+    const MAX_RETRIES = 8;
+
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    async function request(method, url, options = {}) {
+        const headers = Object.assign({'X-CSRFToken': csrfToken}, options.headers || {});
+        const response = await fetch(url, {method: method, headers: headers, body: options.body,
+                                           credentials: 'same-origin'});
+        const data = response.status === 204 ? {} : await response.json().catch(() => ({}));
+        return {status: response.status, data: data};
+    }
+
+    async function upload(file, kind, progress) {
+        const started = await request('POST', '/files/uploads', {
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({kind: kind, filename: file.name, size: file.size})
+        });
+        if (started.status !== 201) throw new Error(started.data.error || 'No se pudo iniciar la subida');
+        const url = started.data.url;
+        const chunkSize = started.data.chunk_size;
+        let offset = 0;
+        let retries = 0;
+
+        while (offset < file.size) {
+            try {
+                const result = await request('PUT', url, {
+                    headers: {'Upload-Offset': String(offset)},
+                    body: file.slice(offset, offset + chunkSize)
+                });
+                if (result.status === 200 || result.status === 409) {
+                    offset = result.data.offset;
+                    retries = 0;
+                    progress(offset / file.size);
+                    continue;
+                }
+                throw new Error(result.data.error || 'Error al subir el fichero');
+            } catch (error) {
+                if (++retries > MAX_RETRIES) throw error;
+                await sleep(Math.min(1000 * 2 ** retries, 30000));
+                // Resume from what the server actually kept
+                const status = await request('GET', url).catch(() => null);
+                if (status && status.status === 200) offset = status.data.offset;
+            }
+        }
+
+        const finalized = await request('POST', url + '/finalize');
+        if (finalized.status !== 200) throw new Error(finalized.data.error || 'No se pudo completar la subida');
+        return finalized.data.path;
+    }
+
+    inputs.forEach(input => {
+        const form = input.form;
+        const refField = form.querySelector(`input[name="${input.dataset.refField || 'document_ref'}"]`);
+        const status = document.createElement('small');
+        status.className = 'form-text';
+        input.insertAdjacentElement('afterend', status);
+
+        form.addEventListener('submit', async function(event) {
+            const file = input.files[0];
+            if (!file || refField.value) return;
+            event.preventDefault();
+            const submit = form.querySelector('[type="submit"]');
+            if (submit) submit.disabled = true;
+            try {
+                refField.value = await upload(file, input.dataset.chunkedUpload, fraction => {
+                    status.textContent = `Subiendo documento: ${Math.floor(fraction * 100)}%`;
+                });
+                status.textContent = 'Documento subido';
+                input.value = '';
+                form.submit();
+            } catch (error) {
+                status.textContent = error.message;
+                status.classList.add('text-danger');
+                if (submit) submit.disabled = false;
+            }
+        });
+    });
+});
@@ -0,0 +1,85 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Vehicle/driver pickers rendered by the typeahead_field macro
+    document.querySelectorAll('.typeahead').forEach(function(container) {
+        const hidden = container.querySelector('input[type="hidden"]');
+        const input = container.querySelector('.typeahead-input');
+        const results = container.querySelector('.typeahead-results');
+        let timer = null;
+        let controller = null;
+        let selectedLabel = input.value;
+
+        function clearResults() {
+            results.innerHTML = '';
+        }
+
+        function choose(item) {
+            hidden.value = item.id;
+            input.value = item.label;
+            selectedLabel = item.label;
+            input.setCustomValidity('');
+            clearResults();
+        }
+
+        function render(items) {
+            clearResults();
+            if (!items.length) {
+                const empty = document.createElement('div');
+                empty.className = 'list-group-item text-muted small';
+                empty.textContent = 'Sin resultados';
+                results.appendChild(empty);
+                return;
+            }
+            items.forEach(function(item) {
+                const button = document.createElement('button');
+                button.type = 'button';
+                button.className = 'list-group-item list-group-item-action';
+                button.textContent = item.label;
+                button.addEventListener('mousedown', function(event) {
+                    event.preventDefault();
+                    choose(item);
+                });
+                results.appendChild(button);
+            });
+        }
+
+        function lookup() {
+            const query = input.value.trim();
+            if (!query) {
+                clearResults();
+                return;
+            }
+            if (controller) controller.abort();
+            controller = new AbortController();
+            const url = new URL(container.dataset.typeaheadUrl, window.location.origin);
+            url.searchParams.set('q', query);
+            if (container.dataset.typeaheadAvailable) url.searchParams.set('available', '1');
+            fetch(url, {signal: controller.signal, headers: {'Accept': 'application/json'}})
+                .then(response => response.ok ? response.json() : {results: []})
+                .then(data => render(data.results || []))
+                .catch(() => {});
+        }
+
+        input.addEventListener('input', function() {
+            // Typing invalidates the previous choice until an item is picked again
+            if (input.value !== selectedLabel) {
+                hidden.value = '';
+                input.setCustomValidity('Seleccione un elemento de la lista');
+            }
+            clearTimeout(timer);
+            timer = setTimeout(lookup, 150);
+        });
+
+        input.addEventListener('keydown', function(event) {
+            if (event.key === 'Enter' && results.querySelector('button')) {
+                event.preventDefault();
+                results.querySelector('button').dispatchEvent(new MouseEvent('mousedown'));
+            } else if (event.key === 'Escape') {
+                clearResults();
+            }
+        });
+
+        input.addEventListener('blur', function() {
+            setTimeout(clearResults, 150);
+        });
+    });
+});
@@ -0,0 +1,82 @@
+"""Minimal cron expressions for scheduled jobs.
+
+Five fields: minute hour day-of-month month day-of-week (0 = Sunday). Each
+field accepts ``*``, numbers, ranges (``1-5``), lists (``1,15``) and steps
+(``*/10``, ``0-30/5``). As in cron, when both day fields are restricted a day
+matches if either does.
+"""
+from datetime import datetime, timedelta
+
+_FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 6),
+)
+
+# Give up looking for the next run after this many days (e.g. "0 0 30 2 *")
+_MAX_DAYS = 366 * 5
+
+
+def _parse_field(text: str, low: int, high: int) -> set:
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f'Paso de cron no válido: {text}')
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(v) for v in part.split('-', 1))
+        else:
+            start = end = int(part)
+        if start < low or end > high or start > end:
+            raise ValueError(f'Valor de cron fuera de rango: {text}')
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Parsed cron expression; ``next_after`` gives the following run time"""
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f'La expresión cron necesita 5 campos: {expression!r}')
+        self.expression = expression
+        parsed = {name: _parse_field(part, low, high) for part, (name, low, high) in zip(parts, _FIELDS)}
+        self.minutes = sorted(parsed['minute'])
+        self.hours = sorted(parsed['hour'])
+        self.days = parsed['day']
+        self.months = parsed['month']
+        self.weekdays = parsed['weekday']
+        self._any_day = parts[2] == '*'
+        self._any_weekday = parts[4] == '*'
+
+    def _day_matches(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        day_ok = day.day in self.days
+        weekday_ok = (day.isoweekday() % 7) in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after `moment`"""
+        start = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for offset in range(_MAX_DAYS):
+            candidate_day = day + timedelta(days=offset)
+            if not self._day_matches(candidate_day):
+                continue
+            for hour in self.hours:
+                for minute in self.minutes:
+                    candidate = candidate_day.replace(hour=hour, minute=minute)
+                    if candidate >= start:
+                        return candidate
+        raise ValueError(f'La expresión cron no se cumple nunca: {self.expression!r}')
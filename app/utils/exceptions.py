@@ -1,3 +1,24 @@
 class UploadError(Exception):
     """Raised when an uploaded file is invalid (type/size/etc)."""
     pass
+
+
+class UploadOffsetError(UploadError):
+    """Raised when a chunk does not start where the upload stands; carries that offset."""
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+class ReservationConflictError(ValueError):
+    """Raised when a booking overlaps another one of the same vehicle.
+
+    Carries the conflicting reservation or recurring series so callers do not
+    have to parse the message.
+    """
+
+    def __init__(self, message, reservation_id=None, series_id=None):
+        super().__init__(message)
+        self.reservation_id = reservation_id
+        self.series_id = series_id
@@ -15,6 +15,32 @@ def _current_user_org_id():
     return None
 
 
+def _resource_org_id(instance):
+    """Organization of a resource, directly or through a related vehicle/driver/provider"""
+    resource_org = getattr(instance, 'organization_unit_id', None)
+    if resource_org is None:
+        # Try common related attributes
+        for rel in ('vehicle', 'driver', 'provider', 'organization', 'organization_unit'):
+            related = getattr(instance, rel, None)
+            if related is not None:
+                resource_org = getattr(related, 'organization_unit_id', None) or getattr(related, 'organization_unit_id', None) or getattr(related, 'organization_unit', None)
+                # If related is an organization object, break with its id if available
+                if hasattr(resource_org, 'id'):
+                    resource_org = resource_org.id
+                if resource_org is not None:
+                    break
+    return resource_org
+
+
+def can_access(instance) -> bool:
+    """Whether the current_user may access a resource (same rules as organization_protect)"""
+    if getattr(current_user, 'role', None) == UserRole.ADMIN:
+        return True
+    user_org = _current_user_org_id()
+    resource_org = _resource_org_id(instance)
+    return user_org is not None and resource_org is not None and int(resource_org) == int(user_org)
+
+
 def organization_protect(model=None, id_arg='id', loader=None):
     """Decorator to ensure the current_user may access a resource by organization.
 
@@ -55,19 +81,7 @@ def organization_protect(model=None, id_arg='id', loader=None):
                 flash('Recurso no encontrado', 'error')
                 return redirect(request.referrer or url_for('main.index'))
 
-            # Try to obtain organization id from instance
-            resource_org = getattr(instance, 'organization_unit_id', None)
-            if resource_org is None:
-                # Try common related attributes
-                for rel in ('vehicle', 'driver', 'provider', 'organization', 'organization_unit'):
-                    related = getattr(instance, rel, None)
-                    if related is not None:
-                        resource_org = getattr(related, 'organization_unit_id', None) or getattr(related, 'organization_unit_id', None) or getattr(related, 'organization_unit', None)
-                        # If related is an organization object, break with its id if available
-                        if hasattr(resource_org, 'id'):
-                            resource_org = resource_org.id
-                        if resource_org is not None:
-                            break
+            resource_org = _resource_org_id(instance)
 
             user_org = _current_user_org_id()
 
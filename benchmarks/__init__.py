@@ -0,0 +1,4 @@
+"""Performance benchmarks for the application's hot paths.
+
+Run with ``python -m benchmarks.run`` (see docs/BENCHMARKS.md).
+"""
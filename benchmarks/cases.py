@@ -0,0 +1,214 @@
+"""Benchmark cases for the application's hot paths.
+
+Each case is a callable ``case(ctx, iteration)`` that performs one operation
+and returns the number of SQL statements it issued (or None when unknown).
+HTTP cases read the whole body (streamed pages render while it is sent) and
+count the statements issued meanwhile; service-level cases profile
+themselves.
+"""
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import g
+from flask_login import login_user
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import User, UserRole
+from app.services.query_profiler_service import QueryProfiler
+from benchmarks.fleet import BENCHMARK_PASSWORD
+
+CASES = {}
+
+_CSRF_TOKEN = re.compile(r'name="csrf_token" value="([^"]+)"')
+
+
+def benchmark(name: str, group: str):
+    """Register a benchmark case"""
+    def decorator(func):
+        CASES[name] = {'func': func, 'group': group, 'doc': (func.__doc__ or '').strip()}
+        return func
+    return decorator
+
+
+class BenchmarkContext:
+    """Application, fleet summary and one logged-in test client per role"""
+
+    def __init__(self, app, fleet: dict):
+        self.app = app
+        self.fleet = fleet
+        self._clients = {}
+
+    def client(self, role: UserRole):
+        if role not in self._clients:
+            client = self.app.test_client()
+            with client.session_transaction() as session:
+                session['_user_id'] = str(self.fleet['user_ids'][role.value])
+                session['_fresh'] = True
+            self._clients[role] = client
+        return self._clients[role]
+
+    @contextmanager
+    def count_statements(self):
+        """Yield a list whose length is the number of statements run inside the block"""
+        with self.app.app_context():
+            engine = db.engine
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, 'after_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'after_cursor_execute', record)
+
+    def vehicle_id(self, iteration: int) -> int:
+        vehicle_ids = self.fleet['vehicle_ids']
+        return vehicle_ids[(iteration * 7919) % len(vehicle_ids)]
+
+
+def _get(ctx: BenchmarkContext, role: UserRole, url: str):
+    client = ctx.client(role)
+    with ctx.count_statements() as statements:
+        # Reading and closing the body includes the rendering of streamed pages
+        with client.get(url, base_url='https://localhost') as response:
+            response.get_data()
+    if response.status_code != 200:
+        raise RuntimeError(f'GET {url} as {role.value} returned {response.status_code}')
+    return len(statements)
+
+
+# ---- Reservations --------------------------------------------------------
+
+@benchmark('reservation_create', group='reservations')
+def reservation_create(ctx, iteration):
+    """ReservationService.create_reservation including the overlap check"""
+    from app.services.reservation_service import ReservationService
+
+    fleet = ctx.fleet
+    vehicle_id = ctx.vehicle_id(iteration)
+    # Future slots never collide with the generated history nor with each other
+    start = datetime(2030, 1, 1) + timedelta(hours=3 * iteration)
+    with ctx.app.test_request_context():
+        login_user(db.session.get(User, fleet['user_ids'][UserRole.DRIVER.value]))
+        QueryProfiler.start_request()
+        ReservationService.create_reservation(
+            vehicle_id=vehicle_id,
+            driver_id=fleet['driver_ids'][0],
+            start_date=start,
+            end_date=start + timedelta(hours=2),
+            purpose='Benchmark',
+            user_id=fleet['user_ids'][UserRole.DRIVER.value],
+            organization_unit_id=fleet['org_unit_ids'][0]
+        )
+        return g.query_profile.statement_count
+
+
+@benchmark('reservation_list', group='lists')
+def reservation_list(ctx, iteration):
+    """Reservation list page (admin)"""
+    return _get(ctx, UserRole.ADMIN, '/reservations/')
+
+
+# ---- Vehicles ------------------------------------------------------------
+
+@benchmark('vehicle_detail_history', group='vehicles')
+def vehicle_detail_history(ctx, iteration):
+    """Vehicle detail page with its full history timeline"""
+    return _get(ctx, UserRole.ADMIN, f'/vehicles/{ctx.vehicle_id(iteration)}')
+
+
+@benchmark('vehicle_list', group='lists')
+def vehicle_list(ctx, iteration):
+    """Vehicle list page (admin)"""
+    return _get(ctx, UserRole.ADMIN, '/vehicles/')
+
+
+@benchmark('driver_list', group='lists')
+def driver_list(ctx, iteration):
+    """Driver list page (admin)"""
+    return _get(ctx, UserRole.ADMIN, '/drivers/')
+
+
+# ---- Compliance ----------------------------------------------------------
+
+@benchmark('compliance_dashboard', group='compliance')
+def compliance_dashboard(ctx, iteration):
+    """Compliance dashboard (ITV, taxes, fines, insurances, authorizations)"""
+    return _get(ctx, UserRole.FLEET_MANAGER, '/compliance/')
+
+
+@benchmark('itv_list', group='lists')
+def itv_list(ctx, iteration):
+    """ITV records list page"""
+    return _get(ctx, UserRole.FLEET_MANAGER, '/compliance/itv')
+
+
+@benchmark('fine_list', group='lists')
+def fine_list(ctx, iteration):
+    """Fines list page"""
+    return _get(ctx, UserRole.FLEET_MANAGER, '/compliance/fines')
+
+
+# ---- Organizations -------------------------------------------------------
+
+@benchmark('org_tree_json', group='organizations')
+def org_tree_json(ctx, iteration):
+    """Organization tree serialized for jsTree"""
+    return _get(ctx, UserRole.ADMIN, '/organizations/tree.json')
+
+
+# ---- REST API ------------------------------------------------------------
+
+@benchmark('api_vehicle_list', group='api')
+def api_vehicle_list(ctx, iteration):
+    """/api/v1/vehicles page: endpoint query plus response model serialization"""
+    from app.api.endpoints.vehicles import read_vehicles
+    from app.schemas.vehicle import Vehicle as VehicleSchema
+
+    with ctx.app.test_request_context():
+        QueryProfiler.start_request()
+        user = db.session.get(User, ctx.fleet['user_ids'][UserRole.ADMIN.value])
+        vehicles = read_vehicles(skip=(iteration % 5) * 100, limit=100, db=db.session, current_user=user)
+        [VehicleSchema.model_validate(v, from_attributes=True).model_dump(mode='json') for v in vehicles]
+        return g.query_profile.statement_count
+
+
+@benchmark('api_driver_list', group='api')
+def api_driver_list(ctx, iteration):
+    """/api/v1/drivers page: endpoint query plus response model serialization"""
+    from app.api.endpoints.drivers import read_drivers
+    from app.schemas.driver import Driver as DriverSchema
+
+    with ctx.app.test_request_context():
+        QueryProfiler.start_request()
+        user = db.session.get(User, ctx.fleet['user_ids'][UserRole.ADMIN.value])
+        drivers = read_drivers(skip=0, limit=100, db=db.session, current_user=user)
+        [DriverSchema.model_validate(d, from_attributes=True).model_dump(mode='json') for d in drivers]
+        return g.query_profile.statement_count
+
+
+# ---- Authentication ------------------------------------------------------
+
+@benchmark('login', group='auth')
+def login(ctx, iteration):
+    """Web form login: login page, then POST (bcrypt verification, audit logging, redirect)"""
+    client = ctx.app.test_client()
+    page = client.get('/auth/login', base_url='https://localhost')
+    token = _CSRF_TOKEN.search(page.get_data(as_text=True))
+    # CSRF is enabled as in production: send the form token, and over HTTPS
+    # Flask-WTF also requires a same-origin Referer
+    with ctx.count_statements() as statements:
+        response = client.post('/auth/login', base_url='https://localhost', headers={
+            'Referer': 'https://localhost/auth/login'
+        }, data={
+            'csrf_token': token.group(1) if token else '',
+            'username': f'demo_{UserRole.FLEET_MANAGER.value}',
+            'password': BENCHMARK_PASSWORD
+        })
+    if response.status_code != 302:
+        raise RuntimeError(f'Login returned {response.status_code}')
+    return len(statements)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 10]
+
+Exits with status 1 when a benchmark's median got slower than the threshold
+(percentage) or when it issues more SQL statements than before.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def compare(baseline: dict, candidate: dict, threshold: float):
+    """Yield (name, old, new, change_pct, regression) for benchmarks present in both files"""
+    for name, new in candidate['benchmarks'].items():
+        old = baseline['benchmarks'].get(name)
+        if not old:
+            continue
+        change = (new['median_ms'] - old['median_ms']) / old['median_ms'] * 100 if old['median_ms'] else 0.0
+        more_statements = (
+            old.get('statements') is not None and new.get('statements') is not None
+            and new['statements'] > old['statements']
+        )
+        yield name, old, new, change, change > threshold or more_statements
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Allowed median slowdown in percent (default 10)')
+    args = parser.parse_args(argv)
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    if baseline['meta'].get('sizes') != candidate['meta'].get('sizes'):
+        print('WARNING: the result files were produced with different fleet sizes')
+
+    print(f"{'benchmark':28s} {baseline['meta']['revision']:>12s} {candidate['meta']['revision']:>12s} "
+          f"{'change':>9s}  statements")
+    regressions = []
+    for name, old, new, change, regression in compare(baseline, candidate, args.threshold):
+        flag = '  REGRESSION' if regression else ''
+        print(f"{name:28s} {old['median_ms']:10.2f}ms {new['median_ms']:10.2f}ms {change:+8.1f}%  "
+              f"{old.get('statements')} -> {new.get('statements')}{flag}")
+        if regression:
+            regressions.append(name)
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""Synthetic fleet used by the benchmarks.
+
+Thin wrapper over app.db.fleet_generator with sizes suited to a benchmark run.
+The generated data is deterministic for a given seed and sizes, so two runs of
+the suite (e.g. on two different commits) measure exactly the same workload.
+"""
+from app.db.fleet_generator import FleetGenerator, license_plate  # noqa: F401
+from app.extensions import db
+from app.services.auth_service import AuthService
+
+BENCHMARK_PASSWORD = 'Benchmark123!'
+
+DEFAULT_SIZES = {
+    'org_units': 20,
+    'vehicles': 200,
+    'drivers': 150,
+    'years': 2,
+    'reservations_per_vehicle_year': 24,
+    'fines_per_vehicle_year': 1,
+    'maintenance_per_vehicle_year': 2,
+}
+
+
+def generate_fleet(seed: int = 42, **sizes) -> dict:
+    """Populate the current database with a synthetic fleet.
+
+    Returns a summary with the row counts and the ids the benchmark cases need
+    (users per role, vehicles, drivers and organization units).
+    """
+    generator = FleetGenerator(
+        db.engine,
+        seed=seed,
+        password_hash=AuthService.get_password_hash(BENCHMARK_PASSWORD),
+        **dict(DEFAULT_SIZES, **sizes)
+    )
+    return generator.run()
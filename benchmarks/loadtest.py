@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Load-testing harness with a request mix modelled on the application's roles.
+
+Virtual users run concurrently (one thread and one keep-alive connection
+each) against a running server loaded with the synthetic fleet
+(scripts/generate_fleet_data.py). Every virtual user plays one scenario:
+
+    driver         UserRole.DRIVER: driver dashboard, own reservations, new reservations
+    fleet_manager  UserRole.FLEET_MANAGER: compliance dashboard, vehicle detail, vehicle list
+    api            REST API client paging /api/v1/vehicles with a bearer token
+
+    python -m benchmarks.loadtest --web-url http://127.0.0.1:5000 --api-url http://127.0.0.1:8000 \\
+        --users 50 --duration 120 --mix driver=6,fleet_manager=3,api=1 --output loadtest.json
+
+The server must run with RATELIMIT_ENABLED=false, otherwise Flask-Limiter
+rejects most of the traffic coming from a single address.
+"""
+import argparse
+import http.client
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+from app.models.user import UserRole
+from benchmarks.run import percentile
+
+_CSRF_TOKEN = re.compile(r'name="csrf_token" value="([^"]+)"')
+_VEHICLE_LINK = re.compile(r'href="/vehicles/(\d+)"')
+# The overlap page (reservations/conflict.html) offers to force the reservation
+_CONFLICT_PAGE = re.compile(r'action="/reservations/force"')
+
+
+class HttpSession:
+    """Minimal keep-alive HTTP client with a cookie jar (no redirect following)"""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        parts = urlsplit(base_url)
+        self.base_url = base_url.rstrip('/')
+        self._host = parts.netloc
+        self._secure = parts.scheme == 'https'
+        self._timeout = timeout
+        self._conn = None
+        self.cookies = {}
+        self.headers = {}
+
+    def _connection(self):
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self._secure else http.client.HTTPConnection
+            self._conn = cls(self._host, timeout=self._timeout)
+        return self._conn
+
+    def request(self, method: str, path: str, data: dict = None, headers: dict = None):
+        """Send a request and return (status, headers, body)"""
+        all_headers = dict(self.headers, **(headers or {}))
+        if self.cookies:
+            all_headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            all_headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            conn = self._connection()
+            conn.request(method, path, body=body, headers=all_headers)
+            response = conn.getresponse()
+            payload = response.read()
+        except (http.client.HTTPException, OSError):
+            # Drop the broken keep-alive connection; the next request reconnects
+            self.close()
+            raise
+        for header, value in response.getheaders():
+            if header.lower() == 'set-cookie':
+                name, _, rest = value.partition('=')
+                self.cookies[name.strip()] = rest.split(';', 1)[0]
+        return response.status, dict(response.getheaders()), payload
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class Stats:
+    """Thread-safe collection of request samples"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.events = defaultdict(int)
+
+    def record(self, name: str, elapsed: float, error: str = None):
+        with self._lock:
+            self.samples[name].append(elapsed)
+            if error:
+                self.errors[name][error] += 1
+
+    def count(self, event: str):
+        """Count a functional outcome that is not a request (kept out of the latency samples)"""
+        with self._lock:
+            self.events[event] += 1
+
+    def report(self, wall_time: float) -> dict:
+        def summarize(timings, errors):
+            ordered = sorted(timings)
+            ms = lambda seconds: round(seconds * 1000, 2)
+            return {
+                'requests': len(ordered),
+                'errors': errors,
+                'error_rate': round(errors / len(ordered), 4) if ordered else 0.0,
+                'throughput_rps': round(len(ordered) / wall_time, 2) if wall_time else 0.0,
+                'p50_ms': ms(percentile(ordered, 50)),
+                'p90_ms': ms(percentile(ordered, 90)),
+                'p95_ms': ms(percentile(ordered, 95)),
+                'p99_ms': ms(percentile(ordered, 99)),
+                'max_ms': ms(ordered[-1]) if ordered else 0.0,
+            }
+
+        with self._lock:
+            requests = {
+                name: dict(summarize(timings, sum(self.errors[name].values())),
+                           error_breakdown=dict(self.errors[name]))
+                for name, timings in sorted(self.samples.items())
+            }
+            all_timings = [t for timings in self.samples.values() for t in timings]
+            all_errors = sum(sum(e.values()) for e in self.errors.values())
+            events = dict(sorted(self.events.items()))
+        return {'total': summarize(all_timings, all_errors), 'requests': requests, 'events': events}
+
+
+class Scenario:
+    """Behaviour of one kind of virtual user (locust-style weighted tasks)"""
+
+    name = None
+    role = None
+    tasks = {}
+
+    def __init__(self, runner, user_index: int):
+        self.runner = runner
+        self.user_index = user_index
+        self.rng = random.Random(runner.seed * 100003 + user_index)
+        self.session = HttpSession(self.base_url)
+
+    @property
+    def base_url(self):
+        return self.runner.web_url
+
+    def call(self, name: str, method: str, path: str, expect=(200,), check=None, **kwargs):
+        """Timed request; unexpected status codes and network errors count as errors
+
+        ``check(status, body)`` may return an error label for responses whose
+        status is expected but whose content shows a failure.
+        """
+        started = time.perf_counter()
+        try:
+            status, headers, body = self.session.request(method, path, **kwargs)
+        except Exception as e:
+            self.runner.stats.record(name, time.perf_counter() - started, type(e).__name__)
+            return None, {}, b''
+        error = None if status in expect else f'HTTP {status}'
+        if error is None and check is not None:
+            error = check(status, body)
+        self.runner.stats.record(name, time.perf_counter() - started, error)
+        return status, headers, body
+
+    def csrf_token(self, body: bytes) -> str:
+        match = _CSRF_TOKEN.search(body.decode('utf-8', 'replace'))
+        return match.group(1) if match else ''
+
+    def web_login(self, username: str):
+        _, _, page = self.call('GET /auth/login', 'GET', '/auth/login')
+        self.call('POST /auth/login', 'POST', '/auth/login', expect=(302,), data={
+            'csrf_token': self.csrf_token(page),
+            'username': username,
+            'password': self.runner.password,
+        }, headers={'Referer': f'{self.base_url}/auth/login'})
+
+    def on_start(self):
+        pass
+
+    def run_task(self):
+        names = list(self.tasks)
+        task = self.rng.choices(names, weights=[self.tasks[n] for n in names])[0]
+        getattr(self, task)()
+
+    def vehicle_id(self) -> int:
+        return self.rng.randint(1, self.runner.vehicles)
+
+
+class DriverScenario(Scenario):
+    """Driver checking the dashboard and booking vehicles"""
+
+    name = 'driver'
+    role = UserRole.DRIVER
+    tasks = {'dashboard': 5, 'my_reservations': 2, 'create_reservation': 1}
+
+    def on_start(self):
+        # Generated driver accounts: demo_driver owns driver 1, driver_<n> owns driver n
+        self.driver_id = 1 + self.user_index % max(1, self.runner.drivers)
+        username = 'demo_driver' if self.driver_id == 1 else f'driver_{self.driver_id}'
+        self.web_login(username)
+
+    def dashboard(self):
+        self.call('GET /drivers/dashboard', 'GET', '/drivers/dashboard')
+
+    def my_reservations(self):
+        self.call('GET /drivers/my-reservations', 'GET', '/drivers/my-reservations')
+
+    def create_reservation(self):
+        _, _, form = self.call('GET /reservations/new', 'GET', '/reservations/new')
+        start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(
+            days=self.rng.randint(1, 60), hours=self.rng.randint(0, 10))
+        data = {
+            'csrf_token': self.csrf_token(form),
+            'vehicle_id': self.vehicle_id(),
+            'driver_id': self.driver_id,
+            'start_date': start.strftime('%Y-%m-%dT%H:%M'),
+            'end_date': (start + timedelta(hours=self.rng.randint(1, 8))).strftime('%Y-%m-%dT%H:%M'),
+            'purpose': 'Prueba de carga',
+            'destination': 'Sede central',
+        }
+        status, _, body = self.call('POST /reservations/new', 'POST', '/reservations/new', expect=(200, 302),
+                                    check=self._check_reservation, data=data,
+                                    headers={'Referer': f'{self.base_url}/reservations/new'})
+        if status == 302:
+            self.runner.stats.count('reservation created')
+        elif status == 200 and self._is_conflict_page(body):
+            self.runner.stats.count('reservation overlap')
+
+    @staticmethod
+    def _is_conflict_page(body: bytes) -> bool:
+        return bool(_CONFLICT_PAGE.search(body.decode('utf-8', 'replace')))
+
+    def _check_reservation(self, status, body):
+        # A 200 is either the overlap page (expected under contention) or the
+        # form re-rendered with a flashed error, which is a real failure
+        if status == 200 and not self._is_conflict_page(body):
+            return 'form re-rendered'
+        return None
+
+
+class FleetManagerScenario(Scenario):
+    """Fleet manager reviewing compliance and vehicles"""
+
+    name = 'fleet_manager'
+    role = UserRole.FLEET_MANAGER
+    tasks = {'compliance_dashboard': 3, 'vehicle_detail': 5, 'vehicle_list': 1}
+
+    def on_start(self):
+        self.visible_vehicles = []
+        self.web_login(f'demo_{self.role.value}')
+        self.vehicle_list(page=1)
+
+    def compliance_dashboard(self):
+        self.call('GET /compliance/', 'GET', '/compliance/')
+
+    def vehicle_detail(self):
+        # Open vehicles the manager has seen in the list: the detail page is
+        # organization-protected and redirects for vehicles of other units.
+        if not self.visible_vehicles:
+            return self.vehicle_list(page=1)
+        vehicle_id = self.rng.choice(self.visible_vehicles)
+        self.call('GET /vehicles/<id>', 'GET', f'/vehicles/{vehicle_id}')
+
+    def vehicle_list(self, page=None):
+        page = page or self.rng.randint(1, 20)
+        _, _, body = self.call('GET /vehicles/', 'GET', f'/vehicles/?page={page}')
+        ids = {int(match) for match in _VEHICLE_LINK.findall(body.decode('utf-8', 'replace'))}
+        if ids:
+            self.visible_vehicles = sorted(set(self.visible_vehicles) | ids)
+
+
+class ApiClientScenario(Scenario):
+    """Integration paging through the REST API"""
+
+    name = 'api'
+    role = UserRole.VIEWER
+    tasks = {'vehicle_page': 4, 'vehicle_detail': 1}
+
+    @property
+    def base_url(self):
+        return self.runner.api_url
+
+    def on_start(self):
+        self.page = 0
+        status, _, body = self.call('POST /api/v1/auth/login', 'POST', '/api/v1/auth/login', data={
+            'username': f'demo_{self.role.value}',
+            'password': self.runner.password,
+        })
+        if status == 200:
+            token = json.loads(body)['access_token']
+            self.session.headers['Authorization'] = f'Bearer {token}'
+
+    def vehicle_page(self):
+        _, _, body = self.call('GET /api/v1/vehicles/', 'GET', f'/api/v1/vehicles/?skip={self.page * 100}&limit=100')
+        # Walk the pages and start over after the last one
+        self.page = self.page + 1 if body and body != b'[]' else 0
+
+    def vehicle_detail(self):
+        self.call('GET /api/v1/vehicles/<id>', 'GET', f'/api/v1/vehicles/{self.vehicle_id()}')
+
+
+SCENARIOS = {cls.name: cls for cls in (DriverScenario, FleetManagerScenario, ApiClientScenario)}
+
+
+class LoadTestRunner:
+    """Start the virtual users, keep them busy until the deadline and collect stats"""
+
+    def __init__(self, web_url, api_url, users, duration, ramp_up, mix, think_time,
+                 password, vehicles, drivers, seed=42):
+        self.web_url = web_url.rstrip('/')
+        self.api_url = (api_url or web_url).rstrip('/')
+        self.users = users
+        self.duration = duration
+        self.ramp_up = ramp_up
+        self.mix = mix
+        self.think_time = think_time
+        self.password = password
+        self.vehicles = vehicles
+        self.drivers = drivers
+        self.seed = seed
+        self.stats = Stats()
+        self._deadline = None
+
+    def assign_scenarios(self):
+        """Deterministic split of the virtual users following the weighted mix"""
+        total = sum(self.mix.values())
+        assigned, credit = [], {name: 0.0 for name in self.mix}
+        for _ in range(self.users):
+            for name, weight in self.mix.items():
+                credit[name] += weight / total
+            name = max(credit, key=credit.get)
+            credit[name] -= 1
+            assigned.append(name)
+        return assigned
+
+    def _virtual_user(self, index, scenario_name):
+        scenario = SCENARIOS[scenario_name](self, index)
+        try:
+            scenario.on_start()
+            while time.monotonic() < self._deadline:
+                scenario.run_task()
+                time.sleep(scenario.rng.uniform(*self.think_time))
+        finally:
+            scenario.session.close()
+
+    def run(self) -> dict:
+        assigned = self.assign_scenarios()
+        started = time.monotonic()
+        self._deadline = started + self.duration
+        threads = []
+        for index, scenario_name in enumerate(assigned):
+            thread = threading.Thread(target=self._virtual_user, args=(index, scenario_name), daemon=True)
+            thread.start()
+            threads.append(thread)
+            if self.ramp_up:
+                time.sleep(self.ramp_up / self.users)
+        for thread in threads:
+            thread.join()
+        wall_time = time.monotonic() - started
+
+        report = self.stats.report(wall_time)
+        report['meta'] = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'web_url': self.web_url,
+            'api_url': self.api_url,
+            'users': self.users,
+            'duration_s': round(wall_time, 1),
+            'mix': self.mix,
+            'scenarios': {name: assigned.count(name) for name in self.mix},
+            'roles': {name: SCENARIOS[name].role.value for name in self.mix},
+        }
+        return report
+
+
+def print_report(report: dict):
+    header = f"{'request':40s} {'reqs':>7s} {'err%':>6s} {'rps':>7s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s}"
+    print(header)
+    print('-' * len(header))
+    rows = list(report['requests'].items()) + [('TOTAL', report['total'])]
+    for name, r in rows:
+        print(f"{name:40s} {r['requests']:7d} {r['error_rate'] * 100:5.1f}% {r['throughput_rps']:7.1f} "
+              f"{r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f} {r['max_ms']:8.1f}")
+    for name, r in report['requests'].items():
+        for error, count in r.get('error_breakdown', {}).items():
+            print(f'  {name}: {error} x{count}')
+    for event, count in report.get('events', {}).items():
+        print(f'{event}: {count}')
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}' (available: {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Load test the web application and the REST API')
+    parser.add_argument('--web-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--api-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=60, help='Test duration in seconds')
+    parser.add_argument('--ramp-up', type=float, default=10, help='Seconds to start every virtual user')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('driver=6,fleet_manager=3,api=1'),
+                        help='Weighted scenarios, e.g. driver=6,fleet_manager=3,api=1')
+    parser.add_argument('--think-time', type=float, nargs=2, default=(0.5, 2.0), metavar=('MIN', 'MAX'))
+    parser.add_argument('--password', default='Flota123!', help='Password of the generated users')
+    parser.add_argument('--vehicles', type=int, default=1000, help='Vehicles in the synthetic fleet')
+    parser.add_argument('--drivers', type=int, default=600, help='Drivers in the synthetic fleet')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the report as JSON')
+    args = parser.parse_args(argv)
+
+    runner = LoadTestRunner(
+        web_url=args.web_url, api_url=args.api_url, users=args.users, duration=args.duration,
+        ramp_up=args.ramp_up, mix=args.mix, think_time=tuple(args.think_time), password=args.password,
+        vehicles=args.vehicles, drivers=args.drivers, seed=args.seed
+    )
+    print(f'Running {args.users} virtual users for {args.duration:.0f}s '
+          f"({', '.join(f'{k}={v:g}' for k, v in args.mix.items())})")
+    report = runner.run()
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+        print(f'Report written to {args.output}')
+    return 1 if report['total']['error_rate'] > 0.05 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
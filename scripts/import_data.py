@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Importa vehículos, conductores o documentación desde un fichero CSV o XLSX
+
+La primera fila contiene los nombres de columna (ver las plantillas en
+/imports o docs/IMPORTACION.md). Las filas con errores se omiten y se listan
+al final; el resto se guarda por bloques.
+
+Uso:
+    python scripts/import_data.py vehicles flota.xlsx [--org-unit CODIGO] [--dry-run]
+
+Tipos: vehicles, drivers, itv, insurances, taxes
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import create_app
+from app.models import OrganizationUnit
+from app.services.bulk_import_service import BulkImportService, ENTITIES, read_rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Importación masiva desde CSV/XLSX')
+    parser.add_argument('entity', choices=sorted(ENTITIES))
+    parser.add_argument('path')
+    parser.add_argument('--org-unit', help='código de la unidad para las filas sin organization_unit_code')
+    parser.add_argument('--dry-run', action='store_true', help='solo validar, sin guardar')
+    args = parser.parse_args()
+
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        organization_unit_id = None
+        if args.org_unit:
+            unit = OrganizationUnit.query.filter_by(code=args.org_unit).first()
+            if unit is None:
+                print(f'No existe la unidad {args.org_unit}')
+                return 1
+            organization_unit_id = unit.id
+        with open(args.path, 'rb') as stream:
+            try:
+                report = BulkImportService.import_rows(args.entity, read_rows(stream, args.path),
+                                                       organization_unit_id=organization_unit_id,
+                                                       dry_run=args.dry_run)
+            except ValueError as e:
+                print(e)
+                return 1
+
+    for error in report['errors']:
+        print(f"Fila {error['row']} [{error['field']}]: {error['message']}")
+    created = f"{report['valid']} válida(s), sin guardar" if report['dry_run'] else f"{report['created']} creada(s)"
+    print(f"{report['rows']} fila(s): {created}, {len(report['errors'])} error(es)")
+    return 0 if not report['errors'] else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
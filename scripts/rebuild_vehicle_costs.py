@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Reconstruye el resumen mensual de costes por vehículo (tabla vehicle_cost_monthly)
+
+Recalcula desde cero los costes de mantenimiento, impuestos, seguros, multas,
+renting y cesiones por vehículo, mes y categoría. Las escrituras de la
+aplicación ya lo mantienen al día; este comando sirve para la carga inicial y
+para corregir cambios hechos fuera del ORM. Es idempotente.
+
+Uso:
+    python scripts/rebuild_vehicle_costs.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import create_app
+from app.extensions import db
+from app.models import VehicleCostMonthly
+from app.services.vehicle_cost_service import VehicleCostService
+
+
+def main() -> int:
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        VehicleCostMonthly.__table__.create(db.engine, checkfirst=True)
+        counts = VehicleCostService.rebuild()
+    for category, count in counts.items():
+        print(f'{category}: {count} fila(s)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
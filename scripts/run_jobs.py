@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Ejecuta los trabajos en segundo plano (tabla jobs)
+
+Arranca un pool de procesos trabajadores que reclaman trabajos pendientes por
+prioridad, los reintentan con espera exponencial y encolan los trabajos
+programados (cron). No necesita broker externo: la cola es la base de datos.
+Los procesos que terminan inesperadamente se reinician; SIGTERM/SIGINT
+detienen el pool tras terminar el trabajo en curso.
+
+Uso:
+    python scripts/run_jobs.py --processes 4
+    python scripts/run_jobs.py --once        # procesa lo pendiente y termina
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import create_app
+from app.extensions import db
+from app.models import Job
+from app.services.job_service import JobWorker, load_job_modules
+
+
+def _build_app():
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    load_job_modules()
+    return app
+
+
+def _worker(index: int, stop_event):
+    # The parent handles signals and tells the workers through stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    JobWorker(_build_app(), run_scheduler=index == 0).run(stop_event)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Ejecuta los trabajos en segundo plano')
+    parser.add_argument('--processes', type=int, default=2, help='Procesos trabajadores (por defecto 2)')
+    parser.add_argument('--once', action='store_true', help='Procesa los trabajos listos y termina')
+    args = parser.parse_args(argv)
+
+    app = _build_app()
+    with app.app_context():
+        Job.__table__.create(db.engine, checkfirst=True)
+
+    if args.once:
+        worker = JobWorker(app, run_scheduler=False)
+        count = 0
+        while worker.run_once():
+            count += 1
+        print(f'{count} trabajo(s) ejecutado(s)')
+        return 0
+
+    stop_event = multiprocessing.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    processes = {}
+    while not stop_event.is_set():
+        for index in range(args.processes):
+            process = processes.get(index)
+            if process is None or not process.is_alive():
+                if process is not None:
+                    print(f'Trabajador {index} terminó (código {process.exitcode}); reiniciando', file=sys.stderr)
+                process = multiprocessing.Process(target=_worker, args=(index, stop_event), daemon=True)
+                process.start()
+                processes[index] = process
+        stop_event.wait(5)
+
+    for process in processes.values():
+        process.join(timeout=60)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Recalcula las alertas de cumplimiento (tabla compliance_alerts)
+
+Recorre ITV, seguros, autorizaciones, contratos de renting y permisos de
+conducir y actualiza las alertas de vencimiento. Es idempotente; pensado para
+ejecutarse periódicamente (cron), por ejemplo cada hora:
+
+    0 * * * * cd /ruta/app && python scripts/scan_compliance_alerts.py
+
+Uso:
+    python scripts/scan_compliance_alerts.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import create_app
+from app.extensions import db
+from app.models import ComplianceAlert
+from app.services.compliance_alert_service import ComplianceAlertService
+
+
+def main() -> int:
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        ComplianceAlert.__table__.create(db.engine, checkfirst=True)
+        counts = ComplianceAlertService.scan()
+    for alert_type, count in counts.items():
+        print(f'{alert_type}: {count} alerta(s)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Programa el mantenimiento previsto por kilometraje
+
+Estima los km/día de cada vehículo a partir de sus lecturas de cuentakilómetros
+(tabla mileage_readings) y crea revisiones en estado programado para los
+vehículos que vayan a alcanzar su next_service_mileage dentro del horizonte
+configurado. Con --rebuild recrea antes las lecturas desde recogidas, reservas,
+mantenimientos e ITV (carga inicial). Es idempotente.
+
+Uso:
+    python scripts/schedule_predicted_maintenance.py [--rebuild]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import create_app
+from app.extensions import db
+from app.models import MileageReading
+from app.services.mileage_service import MileageService
+
+
+def main() -> int:
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        MileageReading.__table__.create(db.engine, checkfirst=True)
+        if '--rebuild' in sys.argv[1:]:
+            for source, count in MileageService.rebuild().items():
+                print(f'{source}: {count} lectura(s)')
+        counts = MileageService.schedule()
+    print(f"Mantenimientos programados: {counts['scheduled']}")
+    print(f"Vehículos con kilometraje actualizado: {counts['mileage_updated']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Marca como vencidos (OVERDUE) los pagos pendientes fuera de plazo
+
+Aplica por lotes las transiciones de estado de multas, impuestos y cesiones
+(PENDING -> OVERDUE al pasar el plazo; OVERDUE -> PENDING si se amplía) y
+crea los índices de estado en bases de datos existentes. Es idempotente; el
+trabajo status_sweeper.sweep hace lo mismo cada 15 minutos.
+
+Uso:
+    python scripts/sweep_payment_status.py
+    python scripts/sweep_payment_status.py --batch-size 1000
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import create_app
+from app.extensions import db
+from app.models import Fine, VehicleTax, VehicleAssignment
+from app.services.status_sweeper_service import StatusSweeperService, DEFAULT_BATCH_SIZE
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Marca como vencidos los pagos pendientes fuera de plazo')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Filas por lote (por defecto {DEFAULT_BATCH_SIZE})')
+    args = parser.parse_args(argv)
+
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        for model in (Fine, VehicleTax, VehicleAssignment):
+            for index in model.__table__.indexes:
+                index.create(db.engine, checkfirst=True)
+        counts = StatusSweeperService.sweep(batch_size=args.batch_size)
+    for name, transitions in counts.items():
+        print(f"{name}: {transitions['overdue']} vencido(s), {transitions['reopened']} reabierto(s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
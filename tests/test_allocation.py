@@ -0,0 +1,93 @@
+"""
+Tests for automatic vehicle allocation
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import (Vehicle, VehicleType, VehicleStatus, OwnershipType, Driver, DriverType, OrganizationUnit,
+                        Reservation, User, UserRole, VehicleRequest, VehicleRequestStatus)
+from app.services.allocation_service import AllocationService, assign, VehicleTimeline
+
+DAY = datetime(2025, 9, 1)
+
+
+def _at(hour):
+    return DAY + timedelta(hours=hour)
+
+
+def _request(start, end, vehicle_type=None):
+    return {'driver_id': 1, 'start_date': _at(start).isoformat(), 'end_date': _at(end).isoformat(),
+            'purpose': 'Visita', 'organization_unit_id': 1, 'vehicle_type': vehicle_type}
+
+
+class TestAllocation:
+    """Test the greedy allocation, its repair pass and the request workflow"""
+
+    @pytest.fixture
+    def app(self):
+        """Unit 1 has two cars and a van (car 1 is booked 08-10h) plus a car in maintenance"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                User(id=1, username='admin', email='admin@example.com', hashed_password='x', role=UserRole.ADMIN),
+                Driver(id=1, first_name='Ana', last_name='Abad', document_type='DNI', document_number='12345678Z',
+                       driver_license_number='L1', driver_license_expiry=datetime(2030, 1, 1),
+                       driver_type=DriverType.OFFICIAL, email='ana@example.com'),
+            ])
+            for vehicle_id, vehicle_type, status in [(1, VehicleType.CAR, VehicleStatus.AVAILABLE),
+                                                     (2, VehicleType.CAR, VehicleStatus.AVAILABLE),
+                                                     (3, VehicleType.VAN, VehicleStatus.AVAILABLE),
+                                                     (4, VehicleType.CAR, VehicleStatus.MAINTENANCE)]:
+                db.session.add(Vehicle(id=vehicle_id, license_plate=f'000{vehicle_id}ABC', make='Seat', model='Leon',
+                                       year=2020, vehicle_type=vehicle_type, ownership_type=OwnershipType.OWNED,
+                                       status=status, organization_unit_id=1))
+            db.session.add(Reservation(vehicle_id=1, driver_id=1, user_id=1, organization_unit_id=1, purpose='Ruta',
+                                       start_date=_at(8), end_date=_at(10)))
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_assign_packs_and_repairs(self):
+        """Requests pack against existing bookings; a blocked request displaces a movable one"""
+        timelines = {1: VehicleTimeline([(_at(8), _at(10))]), 2: VehicleTimeline([])}
+        slots = [(_at(10), _at(12)), (_at(14), _at(15))]
+        assert assign(slots, [[1, 2], [1, 2]], timelines) == {0: 1, 1: 1}
+
+        # Slot 0 ends first and fits tightest on vehicle 2, which slot 1 (a van request, say) needs;
+        # the repair pass moves slot 0 to the idle vehicle 1
+        timelines = {1: VehicleTimeline([]), 2: VehicleTimeline([(_at(6), _at(9))])}
+        slots = [(_at(9), _at(10)), (_at(9.5), _at(12))]
+        assert assign(slots, [[1, 2], [2]], timelines) == {0: 1, 1: 2}
+
+    def test_allocate_pending_requests(self, app):
+        """Pending requests get reservations on compatible vehicles; the rest stay pending or unfulfilled"""
+        with app.app_context():
+            requests = AllocationService.create_requests([
+                _request(9, 11),                # car 2 (car 1 is booked)
+                _request(10, 12),               # car 1, right after its booking
+                _request(9, 10, 'furgoneta'),   # the van
+                _request(9, 10, 'VAN'),         # no second van
+            ], user_id=1)
+            result = AllocationService.allocate_pending(now=DAY)
+            assert result['allocated'] == 3 and result['unassigned'] == 1 and result['unfulfilled'] == 0
+            vehicles = {r.id: (r.reservation.vehicle_id if r.reservation else None) for r in requests}
+            assert vehicles == {requests[0].id: 2, requests[1].id: 1, requests[2].id: 3, requests[3].id: None}
+            assert Reservation.query.count() == 4
+
+            # Once started, a request without vehicle is given up
+            result = AllocationService.allocate_pending(now=_at(9))
+            assert result['unfulfilled'] == 1
+            assert db.session.get(VehicleRequest, requests[3].id).status == VehicleRequestStatus.UNFULFILLED
+
+            app.config['WTF_CSRF_ENABLED'] = False
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session['_user_id'] = '1'
+            response = client.post('/reservations/allocation/requests', json={'requests': [_request(13, 14)]})
+            body = response.get_json()
+            assert response.status_code == 200 and body['allocation']['allocated'] == 1
+            assert client.post('/reservations/allocation/requests', json={'requests': [{}]}).status_code == 400
@@ -0,0 +1,48 @@
+"""
+Tests for fingerprinted, precompressed static assets
+"""
+import gzip
+import os
+import pytest
+from app.main import create_app
+from app.services.asset_service import AssetService, static_url
+
+
+class TestAssets:
+    """Test the manifest, the immutable asset route and precompressed variants"""
+
+    @pytest.fixture
+    def app(self, tmp_path):
+        app = create_app('testing')
+        app.config['ASSET_CACHE_DIR'] = str(tmp_path / 'assets')
+        AssetService.load(app)
+        yield app
+
+    def test_fingerprinted_asset_served_immutable_and_compressed(self, app):
+        """static_url points at a content-hash name, served gzip-encoded when accepted and cached a year"""
+        source = open(os.path.join(app.static_folder, 'css', 'custom.css'), 'rb').read()
+        with app.test_request_context():
+            url = static_url('css/custom.css')
+        assert url.startswith('/assets/css/custom.') and url.endswith('.css')
+
+        client = app.test_client()
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.data == source
+        assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+        assert 'Accept-Encoding' in response.headers['Vary']
+
+        response = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.data) == source
+
+        assert client.get('/assets/css/custom.000000000000.css').status_code == 404
+        assert url.encode() in client.get('/auth/login').data
+
+    def test_plain_static_urls_without_fingerprinting(self, app):
+        """Files outside the manifest, or all of them with fingerprinting off, keep /static/ URLs"""
+        with app.test_request_context():
+            assert static_url('img/logo.png') == '/static/img/logo.png'
+            app.config['ASSET_FINGERPRINTING'] = False
+            AssetService.load(app)
+            assert static_url('js/main.js') == '/static/js/main.js'
@@ -0,0 +1,69 @@
+"""
+Tests for the per-request audit accumulator
+"""
+import json
+import logging
+import pytest
+from app.main import create_app
+from app.services.security_audit_service import SecurityAudit
+from app.services.database_audit_service import DatabaseAudit
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestAuditEvents:
+    """Test that a request writes one correlated audit record"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application with a route auditing several layers"""
+        app = create_app('testing')
+
+        @app.route('/_audit_probe')
+        def audit_probe():
+            SecurityAudit.log_permission_check('audit_probe', 'vehicles.create', True)
+            SecurityAudit.log_data_operation('CREATE', 'vehicle', '7')
+            DatabaseAudit._log_database_operation('INSERT', 'vehicle', {'record_id': 7}, 0.002)
+            return 'ok'
+
+        return app
+
+    @pytest.fixture
+    def captured(self):
+        handler = _ListHandler()
+        loggers = [logging.getLogger('security'), logging.getLogger('database')]
+        for logger in loggers:
+            logger.addHandler(handler)
+        yield handler.records
+        for logger in loggers:
+            logger.removeHandler(handler)
+
+    def test_request_writes_single_event(self, app, captured):
+        """Permission, operation, statement and API access collapse into one record"""
+        response = app.test_client().get('/_audit_probe')
+        assert response.status_code == 200
+
+        assert len(captured) == 1
+        record = captured[0]
+        assert record.name == 'security'
+        assert record.operation == 'REQUEST'
+        payload = json.loads(record.details)
+        assert payload['status_code'] == 200
+        assert [e['operation'] for e in payload['events']] == [
+            'PERMISSION_CHECK', 'CREATE', 'INSERT', 'API_GET'
+        ]
+        assert payload['events'][2]['details']['execution_time_ms'] == 2.0
+
+    def test_aggregation_can_be_disabled(self, app, captured):
+        """Without aggregation every layer writes its own line"""
+        app.config['AUDIT_EVENT_AGGREGATION'] = False
+        app.test_client().get('/_audit_probe')
+
+        assert [r.operation for r in captured] == ['PERMISSION_CHECK', 'CREATE', 'INSERT', 'API_GET']
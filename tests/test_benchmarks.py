@@ -0,0 +1,139 @@
+"""
+Tests for the benchmark suite helpers
+"""
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import Vehicle, Reservation
+from benchmarks.fleet import generate_fleet, license_plate
+from benchmarks.compare import compare
+from benchmarks.loadtest import LoadTestRunner, Stats
+
+
+class TestBenchmarkFleet:
+    """Test the synthetic fleet and result comparison"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application with an empty schema"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_fleet_is_deterministic_for_a_seed(self, app):
+        """Same seed and sizes produce the same rows"""
+        fleet = generate_fleet(seed=7, org_units=4, vehicles=5, drivers=4, years=1,
+                               reservations_per_vehicle_year=3)
+
+        assert fleet['counts']['vehicles'] == 5
+        assert Reservation.query.count() == 15
+        plates = [v.license_plate for v in Vehicle.query.order_by(Vehicle.id)]
+        assert plates == [license_plate(i) for i in range(5)]
+        first = [(r.vehicle_id, r.start_date) for r in Reservation.query.order_by(Reservation.id)]
+
+        db.drop_all()
+        db.create_all()
+        generate_fleet(seed=7, org_units=4, vehicles=5, drivers=4, years=1,
+                       reservations_per_vehicle_year=3)
+        second = [(r.vehicle_id, r.start_date) for r in Reservation.query.order_by(Reservation.id)]
+        assert first == second
+
+    def test_compare_flags_regressions(self):
+        """Slower medians and extra statements are reported as regressions"""
+        baseline = {'benchmarks': {
+            'a': {'median_ms': 10.0, 'statements': 4},
+            'b': {'median_ms': 10.0, 'statements': 4},
+        }}
+        candidate = {'benchmarks': {
+            'a': {'median_ms': 10.5, 'statements': 4},
+            'b': {'median_ms': 10.0, 'statements': 9},
+        }}
+
+        flagged = {name: regression for name, _, _, _, regression in compare(baseline, candidate, 10.0)}
+        assert flagged == {'a': False, 'b': True}
+
+    def test_loadtest_mix_and_report(self):
+        """Virtual users follow the weighted mix and errors are counted per request"""
+        runner = LoadTestRunner('http://localhost', None, users=10, duration=1, ramp_up=0,
+                                mix={'driver': 6, 'fleet_manager': 3, 'api': 1}, think_time=(0, 0),
+                                password='x', vehicles=10, drivers=10)
+        assigned = runner.assign_scenarios()
+        assert [assigned.count(name) for name in ('driver', 'fleet_manager', 'api')] == [6, 3, 1]
+
+        stats = Stats()
+        for elapsed in (0.01, 0.02, 0.03):
+            stats.record('GET /', elapsed)
+        stats.record('GET /', 0.5, 'HTTP 500')
+        stats.count('reservation overlap')
+        report = stats.report(wall_time=2.0)
+        assert report['total']['requests'] == 4
+        assert report['events'] == {'reservation overlap': 1}
+        assert report['total']['error_rate'] == 0.25
+        assert report['requests']['GET /']['error_breakdown'] == {'HTTP 500': 1}
+
+
+class TestFleetGenerator:
+    """Test the bulk fleet generator"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application with an empty schema"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_bulk_generation_is_referentially_consistent(self, app):
+        """Small batches still write parents before children"""
+        from datetime import date
+        from app.db.fleet_generator import FleetGenerator
+        from app.models import OrganizationUnit, Driver
+
+        summary = FleetGenerator(db.engine, seed=3, batch_size=7, reference_date=date(2026, 1, 1),
+                                 org_units=15, org_depth=4, vehicles=6, drivers=5, years=1,
+                                 reservations_per_vehicle_year=4).run()
+
+        assert summary['counts']['reservations'] == 24
+        assert OrganizationUnit.query.filter(OrganizationUnit.parent_id.is_(None)).count() < 15
+        vehicle = db.session.get(Vehicle, 1)
+        assert vehicle.organization_unit is not None
+        assert all(r.driver is not None and r.vehicle_id == 1 for r in vehicle.reservations)
+        assert Driver.query.filter(Driver.user_id.is_(None)).count() == 0
+
+    def test_generator_refuses_non_empty_database(self, app):
+        """Generated ids would collide with existing rows"""
+        from app.db.fleet_generator import FleetGenerator
+
+        FleetGenerator(db.engine, vehicles=1, drivers=1, org_units=1, years=1,
+                       reservations_per_vehicle_year=1).run()
+        with pytest.raises(ValueError):
+            FleetGenerator(db.engine, vehicles=1, drivers=1, org_units=1, years=1).run()
+
+    def test_generator_refuses_database_with_users_only(self, app):
+        """Any populated table aborts the run before anything is written"""
+        from app.db.fleet_generator import FleetGenerator
+        from app.models import User, OrganizationUnit
+
+        db.session.add(User(username='admin', email='admin@example.com', hashed_password='x'))
+        db.session.commit()
+
+        with pytest.raises(ValueError, match='users'):
+            FleetGenerator(db.engine, vehicles=1, drivers=1, org_units=1, years=1).run()
+        assert OrganizationUnit.query.count() == 0
+
+    def test_generator_restores_sqlite_synchronous(self, app):
+        """The pooled connection keeps its durability setting after a run"""
+        from sqlalchemy import text
+        from app.db.fleet_generator import FleetGenerator
+
+        with db.engine.connect() as conn:
+            before = conn.exec_driver_sql('PRAGMA synchronous').scalar()
+        FleetGenerator(db.engine, vehicles=1, drivers=1, org_units=1, years=1,
+                       reservations_per_vehicle_year=1).run()
+        with db.engine.connect() as conn:
+            assert conn.execute(text('PRAGMA synchronous')).scalar() == before
@@ -0,0 +1,120 @@
+"""
+Tests for the CSV/XLSX bulk import
+"""
+import io
+from datetime import datetime
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import (Vehicle, VehicleType, OwnershipType, Driver, DriverType, OrganizationUnit, ITVRecord,
+                        VehicleTax, TaxType, User, UserRole)
+from app.services.bulk_import_service import BulkImportService, read_rows
+
+VEHICLES_CSV = """license_plate;make;model;year;vehicle_type;ownership_type;vin;organization_unit_code
+1111AAA;Seat;Leon;2020;coche;propiedad;;SUR
+2222bbb;Seat;Ibiza;2021;CAR;OWNED;VSSZZZ1JZ2R000001;
+1234ABC;Seat;Arona;2022;coche;propiedad;;
+3333CCC;Seat;Ateca;1800;coche;propiedad;;
+4444DDD;Seat;Tarraco;2022;barco;propiedad;;
+1111AAA;Seat;Leon;2020;coche;propiedad;;
+5555EEE;Seat;Mii;2019;coche;propiedad;;XX
+"""
+
+
+class TestBulkImport:
+    """Test validation, set-based uniqueness checks and chunked inserts"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application with two units and an existing vehicle"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='NORTE'),
+                OrganizationUnit(id=2, name='Sur', code='SUR'),
+                User(id=1, username='admin', email='admin@example.com', hashed_password='x', role=UserRole.ADMIN),
+                Vehicle(id=1, license_plate='1234ABC', make='Seat', model='Leon', year=2020,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED, organization_unit_id=1),
+                Driver(id=1, first_name='Ana', last_name='Abad', document_type='DNI', document_number='12345678Z',
+                       driver_license_number='L1', driver_license_expiry=datetime(2030, 1, 1),
+                       driver_type=DriverType.OFFICIAL, email='ana@example.com'),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_vehicle_import_reports_errors_per_row(self, app):
+        """Valid rows are created across chunks; each invalid row is reported with its line"""
+        rows = read_rows(io.BytesIO(VEHICLES_CSV.encode('utf-8-sig')), 'flota.csv')
+        report = BulkImportService.import_rows('vehicles', rows, organization_unit_id=1, chunk_size=3)
+
+        assert (report['rows'], report['created']) == (7, 2)
+        assert [(e['row'], e['field']) for e in report['errors']] == [
+            (4, 'license_plate'), (5, 'year'), (6, 'vehicle_type'), (7, 'license_plate'),
+            (8, 'organization_unit_code')]
+        assert report['errors'][0]['message'] == 'Ya existe: 1234ABC'
+        assert report['errors'][3]['message'] == 'Duplicado en el fichero'
+        units = dict(db.session.query(Vehicle.license_plate, Vehicle.organization_unit_id).all())
+        assert units == {'1234ABC': 1, '1111AAA': 2, '2222BBB': 1}
+
+        # Nothing is written on a dry run
+        rows = read_rows(io.BytesIO(b'license_plate,make,model,year,vehicle_type,ownership_type\n'
+                                    b'6666FFF,Seat,Leon,2020,coche,propiedad\n'), 'flota.csv')
+        report = BulkImportService.import_rows('vehicles', rows, dry_run=True)
+        assert (report['valid'], report['created']) == (1, 0)
+        assert Vehicle.query.count() == 3
+
+    def test_driver_and_compliance_imports(self, app):
+        """Drivers check email/document/license uniqueness; compliance rows resolve plates"""
+        report = BulkImportService.import_rows('drivers', [
+            {'first_name': 'Luis', 'last_name': 'Gil', 'document_type': 'DNI', 'document_number': '87654321x',
+             'driver_license_number': 'L2', 'driver_license_expiry': '31/12/2030', 'driver_type': 'oficial',
+             'email': 'Luis@Example.com'},
+            {'first_name': 'Eva', 'last_name': 'Sanz', 'document_type': 'DNI', 'document_number': '1234',
+             'driver_license_number': 'L3', 'driver_license_expiry': '2030-01-01', 'driver_type': 'oficial',
+             'email': 'eva@example.com'},
+            {'first_name': 'Pio', 'last_name': 'Diaz', 'document_type': 'NIE', 'document_number': 'X1234567L',
+             'driver_license_number': 'L1', 'driver_license_expiry': '2030-01-01', 'driver_type': 'autorizado',
+             'email': 'ANA@example.com'},
+        ])
+        assert report['created'] == 1
+        assert [(e['row'], e['field']) for e in report['errors']] == [
+            (3, 'document_number'), (4, 'email'), (4, 'driver_license_number')]
+        assert Driver.query.filter_by(email='luis@example.com').one().document_number == '87654321X'
+
+        report = BulkImportService.import_rows('itv', [
+            {'license_plate': '1234ABC', 'inspection_date': datetime(2025, 1, 10), 'expiry_date': '2026-01-10',
+             'result': 'favorable', 'mileage_at_inspection': '42000'},
+            {'license_plate': '9999ZZZ', 'inspection_date': '2025-01-10', 'expiry_date': '2024-01-10',
+             'result': 'favorable'},
+        ])
+        assert report['created'] == 1
+        assert [e['field'] for e in report['errors']] == ['expiry_date']
+        assert ITVRecord.query.one().mileage_at_inspection == 42000
+
+        tax = {'license_plate': '1234ABC', 'tax_type': 'IVTM', 'tax_year': 2025, 'amount': '95,50',
+               'due_date': '2025-03-31'}
+        assert BulkImportService.import_rows('taxes', [tax])['created'] == 1
+        assert BulkImportService.import_rows('taxes', [tax])['errors'][0]['message'].startswith('Ya existe')
+        assert VehicleTax.query.one().tax_type == TaxType.IVTM
+
+        with pytest.raises(ValueError):
+            BulkImportService.import_rows('drivers', [{'first_name': 'X'}])
+
+    def test_upload_page(self, app):
+        """The upload form imports a CSV and shows the report"""
+        app.config['WTF_CSRF_ENABLED'] = False
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+        assert client.get('/imports/').status_code == 200
+        assert client.get('/imports/template/vehicles.csv').data.startswith(b'license_plate,make,model')
+        response = client.post('/imports/', data={
+            'entity': 'vehicles', 'organization_unit_id': '2',
+            'file': (io.BytesIO(b'license_plate,make,model,year,vehicle_type,ownership_type\n'
+                                b'7777GGG,Seat,Leon,2020,coche,propiedad\n'), 'flota.csv'),
+        }, content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert Vehicle.query.filter_by(license_plate='7777GGG').one().organization_unit_id == 2
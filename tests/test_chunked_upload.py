@@ -0,0 +1,108 @@
+"""
+Tests for resumable chunked uploads
+"""
+import os
+from datetime import datetime, timedelta
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import (Vehicle, VehicleType, VehicleStatus, OwnershipType, OrganizationUnit, User, UserRole,
+                        MaintenanceRecord, MaintenanceType, UploadSession)
+from app.services.chunked_upload_service import ChunkedUploadService
+from app.services.file_storage_service import FileStorageService, parse_reference
+
+SCAN = b'%PDF-1.4\n' + os.urandom(300 * 1024)
+
+
+class TestChunkedUpload:
+    """Test the init / chunk / finalize protocol, resuming and validation"""
+
+    @pytest.fixture
+    def app(self, tmp_path):
+        app = create_app('testing')
+        app.config['FILE_STORAGE_ROOT'] = str(tmp_path / 'files')
+        app.config['CHUNKED_UPLOAD_CHUNK_BYTES'] = 128 * 1024
+        app.config['WTF_CSRF_ENABLED'] = False
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                User(id=1, username='admin', email='admin@example.com', hashed_password='x', role=UserRole.ADMIN),
+                User(id=2, username='otro', email='otro@example.com', hashed_password='x', role=UserRole.ADMIN),
+                Vehicle(id=1, license_plate='0001ABC', make='Seat', model='Leon', year=2020,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED,
+                        status=VehicleStatus.AVAILABLE, organization_unit_id=1),
+                MaintenanceRecord(id=1, vehicle_id=1, maintenance_type=MaintenanceType.OIL_CHANGE,
+                                  scheduled_date=datetime(2025, 3, 1)),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    @staticmethod
+    def _client(app, user_id=1):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+        return client
+
+    def test_resumed_upload_attached_to_record(self, app):
+        """Chunks resume from the server offset and finalize stores the file and attaches it"""
+        client = self._client(app)
+        response = client.post('/files/uploads', json={'kind': 'maintenance', 'filename': 'factura.pdf',
+                                                        'size': len(SCAN), 'record_id': 1})
+        assert response.status_code == 201
+        url = response.json['url']
+        chunk = response.json['chunk_size']
+
+        assert client.put(url, data=SCAN[:chunk], headers={'Upload-Offset': '0'}).json['offset'] == chunk
+        # A retried chunk the server already has: told where to continue
+        response = client.put(url, data=SCAN[:chunk], headers={'Upload-Offset': '0'})
+        assert response.status_code == 409
+        assert response.json['offset'] == chunk
+        # Too early to finalize
+        assert client.post(url + '/finalize').status_code == 409
+
+        offset = client.get(url).json['offset']
+        while offset < len(SCAN):
+            offset = client.put(url, data=SCAN[offset:offset + chunk],
+                                headers={'Upload-Offset': str(offset)}).json['offset']
+        # Another user cannot see or finish it (own app context: flask-login caches the user in g)
+        with app.app_context():
+            assert self._client(app, 2).post(url + '/finalize').status_code == 404
+
+        response = client.post(url + '/finalize')
+        assert response.status_code == 200
+        path = response.json['path']
+        sha256 = parse_reference(path)
+        assert open(FileStorageService.blob_path(sha256), 'rb').read() == SCAN
+        assert db.session.get(MaintenanceRecord, 1).document_path == path
+        assert FileStorageService.get(sha256).ref_count == 1
+        assert UploadSession.query.count() == 0
+        assert os.listdir(os.path.join(FileStorageService.root(), 'uploads')) == []
+
+    def test_validation_and_expiry(self, app):
+        """Oversized, oversized chunks and wrong contents are refused; abandoned uploads expire"""
+        client = self._client(app)
+        app.config['CHUNKED_UPLOAD_MAX_BYTES'] = len(SCAN)
+        too_big = {'kind': 'fine', 'filename': 'multa.pdf', 'size': len(SCAN) + 1}
+        assert client.post('/files/uploads', json=too_big).status_code == 400
+        assert client.post('/files/uploads', json=dict(too_big, size=10, filename='multa.exe')).status_code == 400
+
+        fake = b'MZ' + b'\0' * 98
+        url = client.post('/files/uploads', json={'kind': 'fine', 'filename': 'multa.pdf',
+                                                  'size': len(fake)}).json['url']
+        app.config['CHUNKED_UPLOAD_CHUNK_BYTES'] = 50
+        assert client.put(url, data=fake, headers={'Upload-Offset': '0'}).status_code == 400
+        app.config['CHUNKED_UPLOAD_CHUNK_BYTES'] = 128 * 1024
+        client.put(url, data=fake, headers={'Upload-Offset': '0'})
+        response = client.post(url + '/finalize')
+        assert response.status_code == 400
+        assert client.get(url).status_code == 404
+
+        with app.app_context():
+            upload = ChunkedUploadService.start(1, 'pickup', 'foto.jpg', 100)
+            assert ChunkedUploadService.expire() == 0
+            assert ChunkedUploadService.expire(now=datetime.utcnow() + timedelta(hours=25)) == 1
+            assert not os.path.exists(ChunkedUploadService.part_path(upload.id))
@@ -0,0 +1,109 @@
+"""
+Tests for the materialized compliance alerts
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import (Vehicle, VehicleType, OwnershipType, Driver, DriverType, OrganizationUnit, ITVRecord,
+                        ITVResult, VehicleInsurance, InsuranceType, UrbanAccessAuthorization, ComplianceAlert,
+                        ComplianceAlertType, AlertSeverity, User, UserRole)
+from app.services.compliance_alert_service import ComplianceAlertService
+
+
+def _itv(id, vehicle_id, expiry):
+    return ITVRecord(id=id, vehicle_id=vehicle_id, inspection_date=expiry - timedelta(days=365),
+                     expiry_date=expiry, result=ITVResult.FAVORABLE)
+
+
+class TestComplianceAlerts:
+    """Test the expiry scanner and the write hooks"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application with a small fleet and its documents"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            now = datetime.now()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                OrganizationUnit(id=2, name='Sur', code='S'),
+                Vehicle(id=1, license_plate='1234ABC', make='Seat', model='Leon', year=2020,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED, organization_unit_id=1),
+                Vehicle(id=2, license_plate='5678DEF', make='Seat', model='Ibiza', year=2021,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED, organization_unit_id=2),
+                # Superseded ITV (expired) and the current one, due in 10 days
+                _itv(1, 1, now - timedelta(days=355)),
+                _itv(2, 1, now + timedelta(days=10)),
+                _itv(3, 2, now + timedelta(days=200)),
+                VehicleInsurance(id=1, vehicle_id=2, insurance_type=InsuranceType.TODO_RIESGO,
+                                 insurance_company='Mapfre', policy_number='P-1', premium_amount=500,
+                                 start_date=now - timedelta(days=360), end_date=now + timedelta(days=5)),
+                UrbanAccessAuthorization(id=1, vehicle_id=2, authorization_type='ZBE', issuing_authority='Ayto',
+                                         authorization_number='A-1', start_date=now - timedelta(days=30),
+                                         end_date=now + timedelta(days=100), alert_days_before_expiry=30),
+                Driver(id=1, first_name='Ana', last_name='Abad', document_type='DNI', document_number='12345678Z',
+                       driver_license_number='L1', driver_license_expiry=now - timedelta(days=1),
+                       driver_type=DriverType.OFFICIAL, email='ana@example.com', organization_unit_id=1),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_scan_materializes_current_alerts(self, app):
+        """Only documents inside their alert window alert, with severity by due date"""
+        db.session.query(ComplianceAlert).delete()
+        db.session.commit()
+
+        counts = ComplianceAlertService.scan()
+        assert counts == {'itv': 1, 'insurance': 1, 'authorization': 0, 'renting': 0, 'driver_license': 1}
+        # Idempotent: a second scan upserts the same rows
+        assert ComplianceAlertService.scan() == counts
+        assert ComplianceAlert.query.count() == 3
+
+        alerts = {a.alert_type: a for a in ComplianceAlertService.get_alerts()}
+        assert alerts[ComplianceAlertType.ITV].entity_id == 2
+        assert alerts[ComplianceAlertType.ITV].severity == AlertSeverity.WARNING
+        assert alerts[ComplianceAlertType.INSURANCE].severity == AlertSeverity.CRITICAL
+        assert alerts[ComplianceAlertType.INSURANCE].organization_unit_id == 2
+        assert alerts[ComplianceAlertType.DRIVER_LICENSE].severity == AlertSeverity.EXPIRED
+
+        summary = ComplianceAlertService.summary(organization_unit_id=1)
+        assert summary['itv'] == {'expired': 0, 'expiring': 1}
+        assert summary['driver_license'] == {'expired': 1, 'expiring': 0}
+        assert summary['insurance'] == {'expired': 0, 'expiring': 0}
+
+    def test_writes_refresh_alerts_in_the_same_transaction(self, app):
+        """New ITVs, renewed licenses and vehicle transfers update the alerts without a scan"""
+        assert ComplianceAlert.query.filter_by(alert_type=ComplianceAlertType.ITV, vehicle_id=1).count() == 1
+
+        db.session.add(_itv(4, 1, datetime.now() + timedelta(days=730)))
+        db.session.get(Driver, 1).driver_license_expiry = datetime.now() + timedelta(days=3650)
+        db.session.get(Vehicle, 2).organization_unit_id = 1
+        db.session.commit()
+
+        assert ComplianceAlert.query.filter_by(alert_type=ComplianceAlertType.ITV).count() == 0
+        assert ComplianceAlert.query.filter_by(alert_type=ComplianceAlertType.DRIVER_LICENSE).count() == 0
+        insurance = ComplianceAlert.query.filter_by(alert_type=ComplianceAlertType.INSURANCE).one()
+        assert insurance.organization_unit_id == 1
+
+        db.session.delete(db.session.get(VehicleInsurance, 1))
+        db.session.commit()
+        assert ComplianceAlert.query.count() == 0
+
+    def test_dashboard_reads_alert_counts(self, app):
+        """The compliance dashboard shows the materialized counts"""
+        db.session.add(User(id=1, username='admin', email='admin@example.com', hashed_password='x',
+                            role=UserRole.ADMIN))
+        db.session.commit()
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+
+        response = client.get('/compliance/')
+        page = response.get_data(as_text=True)
+        assert response.status_code == 200
+        assert '1 vehículo(s) con ITV próxima a vencer' in page
+        assert 'Permiso de conducir Ana Abad' in page
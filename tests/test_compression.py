@@ -0,0 +1,90 @@
+"""
+Tests for response compression and streamed pages
+"""
+import gzip
+import logging
+import re
+import pytest
+from flask import flash, jsonify
+from app.main import create_app
+from app.extensions import db
+from app.models import Vehicle, VehicleType, VehicleStatus, OwnershipType, OrganizationUnit, User, UserRole
+
+
+class TestCompression:
+    """Test the compression thresholds and compressed streaming of heavy pages"""
+
+    @pytest.fixture
+    def app(self):
+        app = create_app('testing')
+        app.add_url_rule('/_test/json/<int:items>', 'test_json',
+                         lambda items: jsonify([{'license_plate': f'{n:04d}ABC'} for n in range(items)]))
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                User(id=1, username='admin', email='admin@example.com', hashed_password='x', role=UserRole.ADMIN,
+                     organization_unit_id=1),
+                Vehicle(id=1, license_plate='0001ABC', make='Seat', model='Leon', year=2020,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED,
+                        status=VehicleStatus.AVAILABLE, organization_unit_id=1),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_json_compressed_above_threshold(self, app):
+        """Large bodies are gzipped when accepted; small ones and clients without gzip get them as they are"""
+        client = app.test_client()
+        response = client.get('/_test/json/500', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert b'0499ABC' in gzip.decompress(response.data)
+        assert int(response.headers['Content-Length']) == len(response.data)
+
+        assert 'Content-Encoding' not in client.get('/_test/json/500').headers
+        assert 'Content-Encoding' not in client.get('/_test/json/1', headers={'Accept-Encoding': 'gzip'}).headers
+
+    def test_streamed_vehicle_page_compressed(self, app):
+        """The vehicle page streams gzip blocks; flashed messages are shown once"""
+        app.config['WTF_CSRF_ENABLED'] = False
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+            session['_flashes'] = [('success', 'Vehículo actualizado')]
+
+        response = client.get('/vehicles/1', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.headers['Content-Encoding'] == 'gzip'
+        page = gzip.decompress(response.data).decode()
+        assert '0001ABC' in page and 'Vehículo actualizado' in page
+
+        with client.session_transaction() as session:
+            assert '_flashes' not in session
+
+    def test_streamed_page_instrumented_on_close(self, app, caplog):
+        """Queries run by the streamed template reach the profiler; an abandoned stream is not a failure"""
+        app.config['SQL_PROFILER_ENABLED'] = True
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+
+        with caplog.at_level(logging.INFO):
+            response = client.get('/vehicles/')
+            assert 'Server-Timing' not in response.headers
+            assert not [r for r in caplog.records if r.name == 'query_profiler']
+            response.get_data()
+            response.close()
+        summary = [r.getMessage() for r in caplog.records if r.name == 'query_profiler']
+        assert len(summary) == 1 and 'endpoint=vehicles.list_vehicles' in summary[0]
+        assert int(re.search(r'statements=(\d+)', summary[0]).group(1)) >= 3
+
+        caplog.clear()
+        with app.app_context(), caplog.at_level(logging.INFO):
+            response = client.get('/vehicles/1')
+            next(iter(response.response))
+            response.close()  # the client went away mid-page
+        audit = [r for r in caplog.records if r.name == 'security' and 'REQUEST - GET /vehicles/1' in r.getMessage()]
+        assert audit and all(r.levelno == logging.INFO for r in audit)
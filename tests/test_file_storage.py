@@ -0,0 +1,120 @@
+"""
+Tests for the content-addressed document store
+"""
+import io
+import os
+from datetime import datetime, timedelta
+import pytest
+from werkzeug.datastructures import FileStorage
+from app.main import create_app
+from app.extensions import db
+from app.models import (Vehicle, VehicleType, VehicleStatus, OwnershipType, OrganizationUnit, User, UserRole,
+                        VehicleInsurance, InsuranceType, StoredFile)
+from app.services.file_storage_service import FileStorageService, parse_reference
+from app.utils.exceptions import UploadError
+
+PDF = b'%PDF-1.4\n' + b'poliza ' * 20000
+
+
+def _upload(content=PDF, filename='poliza.pdf'):
+    return FileStorage(stream=io.BytesIO(content), filename=filename)
+
+
+def _insurance(policy_number, document_path):
+    return VehicleInsurance(vehicle_id=1, insurance_type=InsuranceType.TODO_RIESGO, insurance_company='Mapfre',
+                            policy_number=policy_number, premium_amount=300, start_date=datetime(2025, 1, 1),
+                            end_date=datetime(2025, 12, 31), document_path=document_path)
+
+
+class TestFileStorage:
+    """Test deduplication, reference counting, garbage collection and downloads"""
+
+    @pytest.fixture
+    def app(self, tmp_path):
+        app = create_app('testing')
+        app.config['FILE_STORAGE_ROOT'] = str(tmp_path / 'files')
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                User(id=1, username='admin', email='admin@example.com', hashed_password='x', role=UserRole.ADMIN),
+                Vehicle(id=1, license_plate='0001ABC', make='Seat', model='Leon', year=2020,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED,
+                        status=VehicleStatus.AVAILABLE, organization_unit_id=1),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_duplicates_stored_once_and_reference_counted(self, app):
+        """The same PDF for two policies is one blob with two references; unreferenced blobs are collected"""
+        with app.app_context():
+            first = FileStorageService.store(_upload(), {'.pdf'}, len(PDF))
+            second = FileStorageService.store(_upload(), {'.pdf'}, len(PDF))
+            assert first == second
+            sha256 = parse_reference(first)
+            assert open(FileStorageService.blob_path(sha256), 'rb').read() == PDF
+            with pytest.raises(UploadError):
+                FileStorageService.store(_upload(), {'.pdf'}, len(PDF) - 1)
+            with pytest.raises(UploadError):
+                FileStorageService.store(_upload(filename='poliza.exe'), {'.pdf'}, len(PDF))
+            assert os.listdir(os.path.join(FileStorageService.root(), 'tmp')) == []
+
+            db.session.add_all([_insurance('P-1', first), _insurance('P-2', second)])
+            db.session.commit()
+            assert FileStorageService.get(sha256).ref_count == 2
+
+            policy = VehicleInsurance.query.filter_by(policy_number='P-1').first()
+            policy.document_path = None
+            db.session.delete(VehicleInsurance.query.filter_by(policy_number='P-2').first())
+            db.session.commit()
+            assert FileStorageService.get(sha256).ref_count == 0
+
+            # Within the grace period the blob stays (an upload may be about to reference it)
+            assert FileStorageService.collect(grace_hours=1) == 0
+            assert FileStorageService.collect(now=datetime.utcnow() + timedelta(hours=2), grace_hours=1) == 1
+            assert StoredFile.query.count() == 0
+            assert not os.path.exists(FileStorageService.blob_path(sha256))
+
+    def test_store_leaves_caller_transaction_open(self, app):
+        """Storing a document does not commit what the caller has pending"""
+        db.session.add(_insurance('P-3', None))
+        path = FileStorageService.store(_upload(), {'.pdf'}, len(PDF))
+        db.session.rollback()
+
+        assert VehicleInsurance.query.count() == 0
+        assert FileStorageService.get(parse_reference(path)) is not None
+
+    def test_download_with_etag_and_range(self, app):
+        """Downloads need a session, carry the hash as ETag and answer Range and If-None-Match"""
+        path = FileStorageService.store(_upload(), {'.pdf'}, len(PDF))
+        sha256 = parse_reference(path)
+        url = '/' + path
+        # Own app context: flask-login caches the anonymous user in g
+        with app.app_context():
+            assert app.test_client().get(url).status_code == 302
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.data == PDF
+        assert response.headers['ETag'] == f'"{sha256}"'
+        assert response.headers['Accept-Ranges'] == 'bytes'
+        assert response.cache_control.private and response.cache_control.max_age == 31536000
+        assert not response.cache_control.public and not response.cache_control.no_cache
+
+        response = client.get(url, headers={'Range': 'bytes=0-7'})
+        assert response.status_code == 206
+        assert response.data == PDF[:8]
+        assert response.headers['Content-Range'] == f'bytes 0-7/{len(PDF)}'
+
+        assert client.get(url, headers={'If-None-Match': f'"{sha256}"'}).status_code == 304
+        assert client.get('/files/' + '0' * 64 + '.pdf').status_code == 404
+
+        app.config['FILE_STORAGE_ACCEL_REDIRECT'] = '/protected-files/'
+        response = client.get(url)
+        assert response.headers['X-Accel-Redirect'] == '/protected-files/' + FileStorageService.relative_path(sha256)
+        assert response.data == b''
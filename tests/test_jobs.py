@@ -0,0 +1,136 @@
+"""
+Tests for the database-backed job queue
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import Job, JobStatus
+from app.services.job_service import JobHeartbeat, JobService, JobWorker, job
+from app.utils.cron import CronSchedule
+
+CALLS = []
+
+
+@job('tests.record', priority=0)
+def record_call(value):
+    CALLS.append(value)
+
+
+@job('tests.urgent', priority=10)
+def urgent_call(value):
+    CALLS.append(value)
+
+
+@job('tests.flaky', max_attempts=2, backoff_seconds=60)
+def flaky_call():
+    raise RuntimeError('boom')
+
+
+@job('tests.hourly', schedule='0 * * * *')
+def hourly_call():
+    CALLS.append('hourly')
+
+
+class TestJobs:
+    """Test enqueueing, claiming, retries and schedules"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            CALLS.clear()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_jobs_run_by_priority(self, app):
+        """Higher priority jobs are claimed first; the decorated function stays callable"""
+        record_call.delay('low')
+        urgent_call.delay('high')
+        db.session.commit()
+        record_call('sync')
+
+        worker = JobWorker(app, run_scheduler=False)
+        assert worker.run_once() and worker.run_once()
+        assert not worker.run_once()
+        assert CALLS == ['sync', 'high', 'low']
+        assert {j.status for j in Job.query.all()} == {JobStatus.SUCCEEDED}
+
+    def test_failures_retry_with_backoff_then_fail(self, app):
+        """A failing job is requeued with a delay until max_attempts is reached"""
+        queued = flaky_call.delay()
+        db.session.commit()
+        worker = JobWorker(app, run_scheduler=False)
+        assert worker.run_once()
+
+        retried = db.session.get(Job, queued.id, populate_existing=True)
+        assert retried.status == JobStatus.PENDING
+        assert retried.attempts == 1
+        assert retried.run_at > datetime.utcnow() + timedelta(seconds=50)
+        assert 'boom' in retried.last_error
+        assert not worker.run_once()  # not ready yet
+
+        retried.run_at = datetime.utcnow()
+        db.session.commit()
+        assert worker.run_once()
+        failed = db.session.get(Job, queued.id, populate_existing=True)
+        assert failed.status == JobStatus.FAILED
+        assert failed.attempts == 2
+
+    def test_scheduled_slot_is_enqueued_once(self, app):
+        """Two schedulers reaching the same slot enqueue a single run"""
+        start = datetime(2025, 1, 1, 9, 30)
+        first, second = {}, {}
+        for next_runs in (first, second):
+            JobService.enqueue_scheduled(next_runs, now=start)
+            JobService.enqueue_scheduled(next_runs, now=start + timedelta(minutes=31))
+
+        hourly = Job.query.filter_by(name='tests.hourly').all()
+        assert [j.unique_key for j in hourly] == ['tests.hourly@2025-01-01T10:00']
+        assert first['tests.hourly'] == datetime(2025, 1, 1, 11, 0)
+
+    def test_stale_running_jobs_are_requeued(self, app):
+        """Jobs left RUNNING by a dead worker go back to the queue"""
+        queued = record_call.delay('again')
+        db.session.commit()
+        assert JobService.claim('dead-worker').id == queued.id
+        db.session.get(Job, queued.id).locked_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+
+        assert JobService.recover_stale(600) == 1
+        assert JobWorker(app, run_scheduler=False).run_once()
+        assert CALLS == ['again']
+
+    def test_enqueue_joins_the_caller_transaction(self, app):
+        """delay() commits nothing: a rollback drops the job with the caller's other changes"""
+        record_call.delay('dropped')
+        db.session.rollback()
+        assert Job.query.count() == 0
+
+        record_call.delay('kept')
+        db.session.commit()
+        assert Job.query.count() == 1
+
+    def test_heartbeat_keeps_long_jobs_locked(self, app):
+        """A running job whose worker renews the lock is not requeued as stale"""
+        queued = record_call.delay('long')
+        db.session.commit()
+        JobService.claim('busy-worker')
+        db.session.get(Job, queued.id).locked_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+
+        assert JobHeartbeat(app, queued.id, 'busy-worker', 60).beat()
+        assert JobService.recover_stale(600) == 0
+        assert not JobHeartbeat(app, queued.id, 'other-worker', 60).beat()
+
+    def test_cron_expressions(self):
+        """Steps, ranges and weekday restrictions"""
+        moment = datetime(2025, 1, 1, 10, 7)  # Wednesday
+        assert CronSchedule('*/15 * * * *').next_after(moment) == datetime(2025, 1, 1, 10, 15)
+        assert CronSchedule('30 3 * * *').next_after(moment) == datetime(2025, 1, 2, 3, 30)
+        assert CronSchedule('0 9 * * 1-5').next_after(datetime(2025, 1, 3, 10, 0)) == datetime(2025, 1, 6, 9, 0)
+        with pytest.raises(ValueError):
+            CronSchedule('61 * * * *')
@@ -0,0 +1,95 @@
+"""
+Tests for the metrics registry and the /metrics endpoint
+"""
+import os
+import subprocess
+import sys
+import pytest
+from app.main import create_app
+from app.services.metrics_service import Metrics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Another gunicorn worker recording into the shared multiprocess directory
+WORKER_SCRIPT = """
+import os, sys
+from app.services.metrics_service import Metrics
+Metrics.configure(multiproc_dir=sys.argv[1])
+Metrics.inc('http_requests', {'endpoint': 'merge', 'status': '200'}, 3.0)
+Metrics.set('db_pool_connections', 4.0, {'state': 'checkedout'})
+print(os.getpid())
+"""
+
+
+class TestMetrics:
+    """Test metrics recording and Prometheus exposition"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application"""
+        app = create_app('testing')
+        app.config['METRICS_TOKEN'] = None
+        return app
+
+    def test_histogram_buckets_are_cumulative(self, app):
+        """Observations render as cumulative buckets with sum and count"""
+        Metrics.observe('http_request_duration_seconds', 0.003, {'blueprint': 't', 'endpoint': 'hist', 'method': 'GET'})
+        Metrics.observe('http_request_duration_seconds', 0.2, {'blueprint': 't', 'endpoint': 'hist', 'method': 'GET'})
+
+        output = Metrics.render()
+        labels = 'blueprint="t",endpoint="hist",method="GET"'
+        assert f'http_request_duration_seconds_bucket{{{labels},le="0.005"}} 1.0' in output
+        assert f'http_request_duration_seconds_bucket{{{labels},le="0.25"}} 2.0' in output
+        assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2.0' in output
+        assert f'http_request_duration_seconds_count{{{labels}}} 2.0' in output
+
+    def test_multiprocess_render_merges_worker_files(self, tmp_path):
+        """Samples written by another worker process are summed in the scrape"""
+        worker = subprocess.run([sys.executable, '-c', WORKER_SCRIPT, str(tmp_path)],
+                                cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+        worker_pid = int(worker.stdout)
+
+        Metrics.configure(multiproc_dir=str(tmp_path))
+        try:
+            Metrics.inc('http_requests', {'endpoint': 'merge', 'status': '200'}, 2.0)
+            output = Metrics.render()
+            assert 'http_requests_total{endpoint="merge",status="200"} 5.0' in output
+            assert 'db_pool_connections{state="checkedout"} 4.0' in output
+
+            # Gauges of a dead worker stop being reported, counters are kept
+            Metrics.mark_process_dead(worker_pid, str(tmp_path))
+            output = Metrics.render()
+            assert 'db_pool_connections{state="checkedout"}' not in output
+            assert 'http_requests_total{endpoint="merge",status="200"} 5.0' in output
+        finally:
+            Metrics.configure()
+
+    def test_metrics_endpoint_exposes_requests(self, app):
+        """Served requests show up in the scrape output"""
+        client = app.test_client()
+        client.get('/auth/login')
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        body = response.get_data(as_text=True)
+        assert '# TYPE http_requests counter' in body
+        assert 'endpoint="auth.login"' in body
+        assert 'db_pool_connections' in body
+
+    def test_metrics_endpoint_requires_token_when_configured(self, app):
+        """A configured METRICS_TOKEN must be sent as bearer token"""
+        app.config['METRICS_TOKEN'] = 'secret'
+        client = app.test_client()
+
+        assert client.get('/metrics').status_code == 403
+        response = client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        assert response.status_code == 200
+
+    def test_metrics_endpoint_hidden_without_token_in_production(self, app):
+        """Outside development and testing the endpoint needs METRICS_TOKEN"""
+        app.testing = False
+        app.debug = False
+        client = app.test_client()
+
+        assert client.get('/metrics', base_url='https://localhost').status_code == 404
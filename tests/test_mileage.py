@@ -0,0 +1,93 @@
+"""
+Tests for the mileage series and predictive maintenance scheduling
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import (Vehicle, VehicleType, OwnershipType, MaintenanceRecord, MaintenanceType, MaintenanceStatus,
+                        ITVRecord, ITVResult, MileageReading, MileageSource)
+from app.services.mileage_service import MileageService, MileageSeries
+
+NOW = datetime(2025, 6, 1)
+
+
+def _vehicle(id, plate):
+    return Vehicle(id=id, license_plate=plate, make='Seat', model='Leon', year=2020, vehicle_type=VehicleType.CAR,
+                   ownership_type=OwnershipType.OWNED, current_mileage=0)
+
+
+def _service(id, vehicle_id, days_ago, mileage, next_mileage, status=MaintenanceStatus.COMPLETED):
+    moment = NOW - timedelta(days=days_ago)
+    return MaintenanceRecord(id=id, vehicle_id=vehicle_id, maintenance_type=MaintenanceType.OIL_CHANGE, status=status,
+                             scheduled_date=moment, completed_date=moment, mileage_at_service=mileage,
+                             next_service_mileage=next_mileage, description='Aceite')
+
+
+def _itv(id, vehicle_id, days_ago, mileage):
+    moment = NOW - timedelta(days=days_ago)
+    return ITVRecord(id=id, vehicle_id=vehicle_id, inspection_date=moment, expiry_date=moment + timedelta(days=365),
+                     result=ITVResult.FAVORABLE, mileage_at_inspection=mileage)
+
+
+class TestMileage:
+    """Test readings collection, daily rates and scheduling"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application: vehicle 1 drives 100 km/day, vehicle 2 10 km/day, vehicle 3 has one reading"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                _vehicle(1, '1111AAA'), _vehicle(2, '2222BBB'), _vehicle(3, '3333CCC'),
+                # Vehicle 1: 20 000 km 60 days ago, now ~26 000; service due at 27 000 -> in ~10 days
+                _service(1, 1, 60, 20000, 27000),
+                _itv(1, 1, 30, 23000),
+                _itv(2, 1, 10, 25000),
+                # Vehicle 2: due at 15 000 from ~10 600 -> in ~440 days
+                _service(2, 2, 60, 10000, 15000),
+                _itv(3, 2, 20, 10400),
+                _service(3, 3, 60, 5000, 6000),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_readings_follow_source_writes(self, app):
+        """Flushing a source record adds, replaces or drops its readings"""
+        readings = {(r.source, r.source_id): r.mileage for r in MileageReading.query.all()}
+        assert readings[(MileageSource.ITV, 2)] == 25000
+        assert len(readings) == 6
+
+        db.session.get(ITVRecord, 2).mileage_at_inspection = 25100
+        db.session.delete(db.session.get(ITVRecord, 1))
+        db.session.commit()
+        readings = {(r.source, r.source_id): r.mileage for r in MileageReading.query.populate_existing().all()}
+        assert readings[(MileageSource.ITV, 2)] == 25100
+        assert (MileageSource.ITV, 1) not in readings
+
+        MileageReading.query.delete()
+        db.session.commit()
+        assert MileageService.rebuild()['itv'] == 2
+
+    def test_rates_and_scheduling(self, app):
+        """Vectorized rates; only services due within the horizon are scheduled, once"""
+        series = MileageSeries.load()
+        rates = dict(zip(series.vehicle_ids.tolist(), series.daily_rates(NOW).tolist()))
+        assert rates[1] == pytest.approx(100.0)
+        assert rates[2] == pytest.approx(10.0)
+        assert rates[3] != rates[3]  # NaN: a single reading
+
+        forecast = MileageService.forecast(NOW)
+        assert [item['vehicle_id'] for item in forecast] == [1, 2]
+        assert forecast[0]['estimated_mileage'] == 26000
+        assert forecast[0]['due_date'] == NOW + timedelta(days=10)
+
+        assert MileageService.schedule(NOW, horizon_days=30) == {'scheduled': 1, 'mileage_updated': 3}
+        scheduled = MaintenanceRecord.query.filter_by(status=MaintenanceStatus.SCHEDULED).all()
+        assert [(m.vehicle_id, m.scheduled_date) for m in scheduled] == [(1, NOW + timedelta(days=10))]
+        assert db.session.get(Vehicle, 1).current_mileage == 25000
+
+        assert MileageService.schedule(NOW, horizon_days=30)['scheduled'] == 0
@@ -0,0 +1,64 @@
+"""
+Tests for the per-request SQL profiler
+"""
+import pytest
+from sqlalchemy import text
+from app.main import create_app
+from app.extensions import db
+from app.services.query_profiler_service import QueryProfiler, RequestQueryProfile
+
+
+class TestQueryProfiler:
+    """Test request-scoped query profiling"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application with a route issuing repeated statements"""
+        app = create_app('testing')
+        app.config['SQL_PROFILER_ENABLED'] = True
+        app.config['SQL_PROFILER_N_PLUS_ONE_THRESHOLD'] = 3
+
+        @app.route('/_profiler_probe')
+        def profiler_probe():
+            for i in range(5):
+                db.session.execute(text('SELECT :value'), {'value': i})
+            return 'ok'
+
+        return app
+
+    def test_normalize_statement_collapses_literals(self):
+        """Statements differing only in literals share a template"""
+        a = QueryProfiler.normalize_statement("SELECT * FROM vehicles WHERE id = 12 AND plate = 'ABC'")
+        b = QueryProfiler.normalize_statement("SELECT *  FROM vehicles WHERE id = 7 AND plate = 'XYZ'")
+        assert a == b
+        assert 'vehicles_1' in QueryProfiler.normalize_statement('SELECT vehicles_1.id FROM vehicles AS vehicles_1')
+
+    def test_repeated_templates_threshold(self):
+        """Only templates above the threshold are reported"""
+        profile = RequestQueryProfile()
+        for _ in range(4):
+            profile.record('SELECT ? FROM drivers', 0.001)
+        profile.record('SELECT ? FROM vehicles', 0.001)
+
+        repeated = profile.repeated_templates(3)
+        assert [tpl for tpl, _ in repeated] == ['SELECT ? FROM drivers']
+        assert profile.summary(3)['statements'] == 5
+
+    def test_server_timing_header_emitted(self, app):
+        """Profiled requests expose DB time through Server-Timing"""
+        client = app.test_client()
+        response = client.get('/_profiler_probe')
+
+        assert response.status_code == 200
+        header = response.headers.get('Server-Timing')
+        assert header is not None
+        assert header.startswith('db;dur=')
+        assert '5 queries' in header
+
+    def test_disabled_profiler_has_no_header(self, app):
+        """The profiler can be toggled off per environment"""
+        app.config['SQL_PROFILER_ENABLED'] = False
+        client = app.test_client()
+        response = client.get('/_profiler_probe')
+
+        assert 'Server-Timing' not in response.headers
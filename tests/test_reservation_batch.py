@@ -0,0 +1,111 @@
+"""
+Tests for batch reservation creation
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import (Vehicle, VehicleType, OwnershipType, Driver, DriverType, OrganizationUnit, Reservation,
+                        ReservationStatus, User, UserRole)
+from app.services.reservation_service import ReservationService
+
+DAY = datetime(2025, 9, 1)
+
+
+def _at(hour, minutes=0):
+    return (DAY + timedelta(hours=hour, minutes=minutes)).isoformat()
+
+
+def _item(vehicle_id, start, end):
+    return {'vehicle_id': vehicle_id, 'driver_id': 1, 'start_date': start, 'end_date': end, 'purpose': 'Ruta'}
+
+
+class TestReservationBatch:
+    """Test the single-pass overlap checks of batch creation"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application with two vehicles; vehicle 1 is booked 10-12h and 16-17h"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                User(id=1, username='admin', email='admin@example.com', hashed_password='x', role=UserRole.ADMIN),
+                Vehicle(id=1, license_plate='1234ABC', make='Seat', model='Leon', year=2020,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED),
+                Vehicle(id=2, license_plate='5678DEF', make='Seat', model='Ibiza', year=2021,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED),
+                Driver(id=1, first_name='Ana', last_name='Abad', document_type='DNI', document_number='12345678Z',
+                       driver_license_number='L1', driver_license_expiry=datetime(2030, 1, 1),
+                       driver_type=DriverType.OFFICIAL, email='ana@example.com'),
+                Reservation(id=1, vehicle_id=1, driver_id=1, user_id=1, organization_unit_id=1, purpose='Visita',
+                            start_date=DAY + timedelta(hours=10), end_date=DAY + timedelta(hours=12)),
+                Reservation(id=2, vehicle_id=1, driver_id=1, user_id=1, organization_unit_id=1, purpose='Visita',
+                            start_date=DAY + timedelta(hours=16), end_date=DAY + timedelta(hours=17)),
+                Reservation(id=3, vehicle_id=2, driver_id=1, user_id=1, organization_unit_id=1, purpose='Anulada',
+                            start_date=DAY, end_date=DAY + timedelta(days=1), status=ReservationStatus.CANCELLED),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_batch_checks_database_and_batch(self, app):
+        """Conflicts with stored and with earlier-starting batch items are rejected per item"""
+        result = ReservationService.create_reservations_batch([
+            _item(1, _at(9), _at(10, 30)),    # overlaps reservation 1
+            _item(1, _at(12), _at(14)),       # fits right after it
+            _item(1, _at(13), _at(15)),       # overlaps item 1
+            _item(2, _at(9), _at(10)),        # vehicle 2 only has a cancelled booking
+            _item(1, _at(9), _at(8)),         # ends before it starts
+            _item(99, _at(9), _at(10)),       # unknown vehicle
+            _item(1, _at(8), _at(9)),         # free slot
+            _item(1, _at(7), _at(13)),        # covers reservation 1 entirely
+            _item(1, _at(15, 30), _at(16, 30)),  # overlaps reservation 2, which starts later
+        ], user_id=1, organization_unit_id=1)
+
+        statuses = [r['status'] for r in result['results']]
+        assert statuses == ['conflict', 'created', 'conflict', 'created', 'invalid', 'invalid', 'created',
+                            'conflict', 'conflict']
+        conflicts = [r.get('conflict') for r in result['results']]
+        assert conflicts[0] == {'reservation_id': 1}
+        assert conflicts[2] == {'index': 1}
+        assert conflicts[7] == {'reservation_id': 1}
+        assert conflicts[8] == {'reservation_id': 2}
+        assert (result['created'], result['rejected']) == (3, 6)
+        created = db.session.get(Reservation, result['results'][1]['id'])
+        assert (created.vehicle_id, created.status, created.organization_unit_id) == (1, ReservationStatus.PENDING, 1)
+
+    def test_all_or_nothing_and_endpoint(self, app):
+        """A rejected item discards the whole batch when requested; the JSON endpoint returns per-item results"""
+        result = ReservationService.create_reservations_batch(
+            [_item(2, _at(9), _at(10)), _item(1, _at(11), _at(13))], user_id=1, organization_unit_id=1,
+            all_or_nothing=True)
+        assert [r['status'] for r in result['results']] == ['skipped', 'conflict']
+        assert Reservation.query.count() == 3
+
+        app.config['WTF_CSRF_ENABLED'] = False
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+        response = client.post('/reservations/batch', json={'reservations': [
+            dict(_item(2, _at(9), _at(10)), organization_unit_id=1),
+            dict(_item(2, _at(9, 30), _at(11)), organization_unit_id=1),
+            _item(2, _at(12), _at(13))]})  # the admin has no unit of their own to default to
+        assert response.status_code == 200
+        assert [r['status'] for r in response.get_json()['results']] == ['created', 'conflict', 'invalid']
+        assert client.post('/reservations/batch', json={'reservations': 'x'}).status_code == 400
+
+    def test_offset_dates_are_converted_to_utc(self, app):
+        """ISO dates with an offset or Z are compared as naive UTC instead of raising"""
+        day = DAY.strftime('%Y-%m-%d')
+        result = ReservationService.create_reservations_batch([
+            _item(1, f'{day}T11:00:00+02:00', f'{day}T12:00:00+02:00'),  # 09-10 UTC: free
+            _item(1, f'{day}T10:30:00Z', f'{day}T11:00:00Z'),            # inside reservation 1
+        ], user_id=1, organization_unit_id=1)
+
+        assert [r['status'] for r in result['results']] == ['created', 'conflict']
+        created = db.session.get(Reservation, result['results'][0]['id'])
+        assert (created.start_date, created.end_date) == (DAY + timedelta(hours=9), DAY + timedelta(hours=10))
+        assert created.start_date.tzinfo is None
@@ -0,0 +1,88 @@
+"""
+Tests for the concurrency-safe reservation booking path
+"""
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.main import create_app
+from app.extensions import db
+from app.db.reservation_overlap import OVERLAP_CONSTRAINT, begin_booking_write
+from app.models import (Vehicle, VehicleType, VehicleStatus, OwnershipType, Driver, DriverType, OrganizationUnit,
+                        Reservation, User, UserRole)
+from app.services.reservation_service import ReservationService
+from app.utils.exceptions import ReservationConflictError
+
+
+class TestReservationOverlap:
+    """Test the SQLite write lock and the translation of constraint violations into conflicts"""
+
+    @pytest.fixture
+    def app(self):
+        """One vehicle booked 2030-09-02 10-12h"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                User(id=1, username='admin', email='admin@example.com', hashed_password='x', role=UserRole.ADMIN),
+                Driver(id=1, first_name='Ana', last_name='Abad', document_type='DNI', document_number='12345678Z',
+                       driver_license_number='L1', driver_license_expiry=datetime(2035, 1, 1),
+                       driver_type=DriverType.OFFICIAL, email='ana@example.com'),
+                Vehicle(id=1, license_plate='0001ABC', make='Seat', model='Leon', year=2020,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED,
+                        status=VehicleStatus.AVAILABLE, organization_unit_id=1),
+                Reservation(id=1, vehicle_id=1, driver_id=1, user_id=1, organization_unit_id=1, purpose='Ruta',
+                            start_date=datetime(2030, 9, 2, 10), end_date=datetime(2030, 9, 2, 12)),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_sqlite_booking_write_waits_for_the_first_writer(self, tmp_path):
+        """A second booking transaction cannot start its check until the first one commits"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'fleet.db'}", connect_args={'timeout': 0.1})
+        db.metadata.create_all(engine)
+        first, second = Session(engine), Session(engine)
+        try:
+            begin_booking_write(first)
+            with pytest.raises(OperationalError, match='locked'):
+                begin_booking_write(second)
+            second.rollback()
+            first.commit()
+            begin_booking_write(second)
+            second.commit()
+        finally:
+            first.close()
+            second.close()
+            engine.dispose()
+
+    def test_constraint_violation_becomes_conflict(self, app, monkeypatch):
+        """A booking slipped in between check and commit is reported with the id of the winner"""
+        with app.app_context():
+            # Stand-in for the PostgreSQL exclusion constraint, with the same name in the error
+            db.session.execute(db.text(
+                "CREATE TRIGGER reservations_overlap BEFORE INSERT ON reservations "
+                "WHEN EXISTS (SELECT 1 FROM reservations WHERE vehicle_id = NEW.vehicle_id "
+                "AND status <> 'CANCELLED' AND start_date < NEW.end_date AND end_date > NEW.start_date) "
+                f"BEGIN SELECT RAISE(ABORT, '{OVERLAP_CONSTRAINT}'); END"))
+            db.session.commit()
+
+            # The first check runs before the competing booking committed
+            check = ReservationService._check_vehicle_overlap
+            calls = []
+
+            def racing_check(*args, **kwargs):
+                calls.append(args)
+                if len(calls) > 1:
+                    check(*args, **kwargs)
+            monkeypatch.setattr(ReservationService, '_check_vehicle_overlap', staticmethod(racing_check))
+            with pytest.raises(ReservationConflictError) as error:
+                ReservationService.create_reservation(
+                    vehicle_id=1, driver_id=1, start_date=datetime(2030, 9, 2, 11),
+                    end_date=datetime(2030, 9, 2, 13), purpose='Visita', user_id=1, organization_unit_id=1)
+            assert error.value.reservation_id == 1
+            assert len(calls) == 2
+            assert Reservation.query.count() == 1
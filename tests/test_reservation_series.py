@@ -0,0 +1,118 @@
+"""
+Tests for recurring reservations (lazy occurrence expansion)
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import (Vehicle, VehicleType, OwnershipType, Driver, DriverType, OrganizationUnit, Reservation,
+                        ReservationStatus, ReservationSeries, SeriesFrequency, User, UserRole)
+from app.services.reservation_series_service import ReservationSeriesService
+from app.services.reservation_service import ReservationService
+
+MONDAY = datetime(2025, 9, 1)
+
+
+def _weekly(**kwargs):
+    """Mondays and Wednesdays 08:00-10:00 on vehicle 1"""
+    fields = dict(vehicle_id=1, driver_id=1, start_date=MONDAY + timedelta(hours=8),
+                  end_date=MONDAY + timedelta(hours=10), frequency=SeriesFrequency.WEEKLY, weekdays=[0, 2],
+                  purpose='Ruta escolar', user_id=1, organization_unit_id=1)
+    fields.update(kwargs)
+    return ReservationSeriesService.create_series(**fields)
+
+
+class TestReservationSeries:
+    """Test expansion, conflict detection and materialization of reservation series"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application with one vehicle booked on Wednesday 3 September 09:00-11:00"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                User(id=1, username='admin', email='admin@example.com', hashed_password='x', role=UserRole.ADMIN),
+                Vehicle(id=1, license_plate='1234ABC', make='Seat', model='Leon', year=2020,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED),
+                Driver(id=1, first_name='Ana', last_name='Abad', document_type='DNI', document_number='12345678Z',
+                       driver_license_number='L1', driver_license_expiry=datetime(2030, 1, 1),
+                       driver_type=DriverType.OFFICIAL, email='ana@example.com'),
+                Reservation(id=1, vehicle_id=1, driver_id=1, user_id=1, organization_unit_id=1, purpose='Visita',
+                            start_date=MONDAY + timedelta(days=2, hours=9),
+                            end_date=MONDAY + timedelta(days=2, hours=11)),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_rule_expansion(self, app):
+        """Occurrences are computed for the requested window only"""
+        with app.app_context():
+            series = ReservationSeries(start_date=MONDAY + timedelta(hours=8), duration_minutes=120,
+                                       frequency=SeriesFrequency.WEEKLY, interval=2, weekdays='0,2',
+                                       until=datetime(2025, 9, 29, 8))
+            assert [s for s, _ in series.occurrences(datetime(2025, 9, 10), datetime(2025, 12, 1))] == [
+                datetime(2025, 9, 15, 8), datetime(2025, 9, 17, 8), datetime(2025, 9, 29, 8)]
+            # A window starting mid-occurrence still returns it
+            assert list(series.occurrences(datetime(2025, 9, 15, 9), datetime(2025, 9, 15, 12))) == [
+                (datetime(2025, 9, 15, 8), datetime(2025, 9, 15, 10))]
+
+            # Months without a 31st are skipped; far windows need no walk from the first occurrence
+            monthly = ReservationSeries(start_date=datetime(2025, 1, 31, 8), duration_minutes=60,
+                                        frequency=SeriesFrequency.MONTHLY, interval=1)
+            assert [s.month for s, _ in monthly.occurrences(datetime(2030, 1, 1), datetime(2030, 7, 1))] == [1, 3, 5]
+
+    def test_conflicts_in_one_pass(self, app):
+        """A series overlapping a reservation is rejected or skips that occurrence; it then blocks other bookings"""
+        with app.app_context():
+            with pytest.raises(ValueError, match='1 ocurrencias solapan'):
+                _weekly(count=4)
+            series = _weekly(count=4, skip_conflicts=True)
+            assert series.until == datetime(2025, 9, 10, 8)
+            assert [o.occurrence_start for o in series.overrides] == [datetime(2025, 9, 3, 8)]
+            starts = [o.start_date for o in ReservationSeriesService.occurrences_between(MONDAY, MONDAY + timedelta(days=30))]
+            assert starts == [datetime(2025, 9, 1, 8), datetime(2025, 9, 8, 8), datetime(2025, 9, 10, 8)]
+
+            with pytest.raises(ValueError, match='serie'):
+                ReservationService.create_reservation(1, 1, datetime(2025, 9, 8, 9), datetime(2025, 9, 8, 12),
+                                                      'Visita', user_id=1, organization_unit_id=1)
+            result = ReservationService.create_reservations_batch([
+                {'vehicle_id': 1, 'driver_id': 1, 'start_date': '2025-09-10T07:00', 'end_date': '2025-09-10T08:30',
+                 'purpose': 'Ruta', 'organization_unit_id': 1},
+                {'vehicle_id': 1, 'driver_id': 1, 'start_date': '2025-09-03T08:00', 'end_date': '2025-09-03T09:00',
+                 'purpose': 'Ruta', 'organization_unit_id': 1},
+            ], user_id=1)
+            assert result['results'][0]['conflict'] == {'series_id': series.id}
+            assert result['results'][1]['status'] == 'created'
+
+    def test_materialize_calendar_and_cancel(self, app):
+        """Near occurrences become reservations, calendars show the rest, cancelling cancels both"""
+        with app.app_context():
+            series = _weekly(until=datetime(2025, 9, 30), skip_conflicts=True)
+            assert ReservationSeriesService.materialize(now=MONDAY, days=2) == 1
+            reservation = Reservation.query.filter(Reservation.start_date == datetime(2025, 9, 1, 8)).one()
+            assert reservation.status == ReservationStatus.PENDING
+            # The materialized occurrence is now a reservation, not an expanded occurrence
+            entries = ReservationSeriesService.with_occurrences([reservation], MONDAY, MONDAY + timedelta(days=10))
+            assert [getattr(e, 'is_occurrence', False) for e in entries] == [False, True, True]
+
+            app.config['WTF_CSRF_ENABLED'] = False
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session['_user_id'] = '1'
+            response = client.get('/calendar?year=2025&month=9')
+            assert response.status_code == 200
+            assert f'/reservations/series/{series.id}'.encode() in response.data
+
+            response = client.post(f'/reservations/series/{series.id}/skip', data={'occurrence': '2025-09-08T08:00'})
+            assert response.status_code == 302
+            starts = [o.start_date for o in ReservationSeriesService.occurrences_between(MONDAY, MONDAY + timedelta(days=10))]
+            assert starts == [datetime(2025, 9, 10, 8)]
+
+            ReservationSeriesService.cancel_series(series.id, now=MONDAY)
+            db.session.expire_all()
+            assert db.session.get(Reservation, reservation.id).status == ReservationStatus.CANCELLED
+            assert ReservationSeriesService.occurrences_between(MONDAY, MONDAY + timedelta(days=30)) == []
@@ -0,0 +1,80 @@
+"""
+Tests for the suggestions shown on the reservation conflict page
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import (Vehicle, VehicleType, VehicleStatus, OwnershipType, Driver, DriverType, OrganizationUnit,
+                        Reservation, User, UserRole)
+from app.services.reservation_suggestion_service import ReservationSuggestionService
+
+DAY = datetime(2030, 9, 2)
+
+
+def _at(hour):
+    return DAY + timedelta(hours=hour)
+
+
+class TestReservationSuggestions:
+    """Test nearest free slots, equivalent vehicles and the conflict page"""
+
+    @pytest.fixture
+    def app(self):
+        """Car 1 is booked 10-12h and 13-16h, car 2 at 10-11h, car 3 is free and vehicle 4 is a van"""
+        app = create_app('testing')
+        app.config['WTF_CSRF_ENABLED'] = False
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                User(id=1, username='admin', email='admin@example.com', hashed_password='x', role=UserRole.ADMIN),
+                Driver(id=1, first_name='Ana', last_name='Abad', document_type='DNI', document_number='12345678Z',
+                       driver_license_number='L1', driver_license_expiry=datetime(2035, 1, 1),
+                       driver_type=DriverType.OFFICIAL, email='ana@example.com'),
+            ])
+            for vehicle_id, vehicle_type in [(1, VehicleType.CAR), (2, VehicleType.CAR), (3, VehicleType.CAR),
+                                             (4, VehicleType.VAN)]:
+                db.session.add(Vehicle(id=vehicle_id, license_plate=f'000{vehicle_id}ABC', make='Seat', model='Leon',
+                                       year=2020, vehicle_type=vehicle_type, ownership_type=OwnershipType.OWNED,
+                                       status=VehicleStatus.AVAILABLE, organization_unit_id=1))
+            for vehicle_id, start, end in [(1, 10, 12), (1, 13, 16), (2, 10, 11)]:
+                db.session.add(Reservation(vehicle_id=vehicle_id, driver_id=1, user_id=1, organization_unit_id=1,
+                                           purpose='Ruta', start_date=_at(start), end_date=_at(end)))
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_suggest_slots_and_vehicles(self, app):
+        """Each gap long enough offers its closest slot, nearest first; free cars come tightest fit first"""
+        with app.app_context():
+            result = ReservationSuggestionService.suggest(1, _at(11), _at(13), now=DAY - timedelta(days=30),
+                                                          search_days=1)
+            assert [slot['start'] for slot in result['slots']] == [_at(8), _at(16)]
+            assert all(slot['end'] - slot['start'] == timedelta(hours=2) for slot in result['slots'])
+            # Car 2 is free right after its 10-11h booking: the tightest fit comes first; the van is not offered
+            assert [vehicle['vehicle_id'] for vehicle in result['vehicles']] == [2, 3]
+
+            # Editing the 10-12h booking frees its own slot
+            own = Reservation.query.filter_by(vehicle_id=1, start_date=_at(10)).first()
+            result = ReservationSuggestionService.suggest(1, _at(11), _at(13), exclude_reservation_id=own.id,
+                                                          now=DAY - timedelta(days=30), search_days=1)
+            assert result['slots'][0]['start'] == _at(11)
+
+    def test_conflict_page_shows_suggestions(self, app):
+        """A rejected booking renders the conflict page with slots and alternative vehicles"""
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+        response = client.post('/reservations/new', data={
+            'vehicle_id': '1', 'driver_id': '1', 'organization_unit_id': '1', 'purpose': 'Visita',
+            'start_date': _at(11).strftime('%Y-%m-%dT%H:%M'), 'end_date': _at(13).strftime('%Y-%m-%dT%H:%M'),
+        })
+        body = response.get_data(as_text=True)
+        assert response.status_code == 200
+        assert 'Horarios libres más cercanos' in body
+        assert '0003ABC' in body
+        assert 'value="%s"' % _at(16).strftime('%Y-%m-%dT%H:%M') in body
+        with app.app_context():
+            assert Reservation.query.count() == 3
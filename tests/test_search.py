@@ -0,0 +1,104 @@
+"""
+Tests for the full-text search service and endpoint
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import Vehicle, VehicleType, OwnershipType, Driver, DriverType, OrganizationUnit, User, UserRole
+from app.services.search_service import SearchService
+from app.services.vehicle_service import VehicleService
+
+
+class TestSearch:
+    """Test ranked search over the FTS5 index"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application with two organization units"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                OrganizationUnit(id=2, name='Sur', code='S'),
+            ])
+            for i, (plate, org) in enumerate([('1234ABC', 1), ('5678ABD', 1), ('9999XAB', 2)], start=1):
+                db.session.add(Vehicle(id=i, license_plate=plate, make='Seat', model='Leon', year=2020,
+                                       vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED,
+                                       organization_unit_id=org))
+            db.session.add(Driver(id=1, first_name='Ana', last_name='Abad', document_type='DNI',
+                                  document_number='12345678Z', driver_license_number='L1',
+                                  driver_license_expiry=datetime.now() + timedelta(days=365),
+                                  driver_type=DriverType.OFFICIAL, email='ana@example.com',
+                                  organization_unit_id=1))
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_partial_plate_matches_and_prefix_ranks_first(self, app):
+        """Substring matches are found; plates starting with the term come first"""
+        result = SearchService.search('AB', types=['vehicle'])
+        assert result['total'] == 3
+        # Two-letter terms are below the trigram length: no rank, ordered by label
+        assert [r['label'] for r in result['results']] == ['1234ABC', '5678ABD', '9999XAB']
+
+        result = SearchService.search('678', types=['vehicle', 'driver'])
+        assert {(r['type'], r['label']) for r in result['results']} == {
+            ('vehicle', '5678ABD'), ('driver', 'Ana Abad')
+        }
+
+        prefix = SearchService.search('123', types=['vehicle', 'driver'])
+        assert prefix['results'][0]['label'] == '1234ABC'
+
+    def test_index_follows_writes_and_org_filter(self, app):
+        """Triggers keep the index in sync; results can be scoped to an org unit"""
+        vehicle = db.session.get(Vehicle, 3)
+        vehicle.license_plate = '0000ZZZ'
+        db.session.commit()
+
+        assert SearchService.search('XAB')['total'] == 0
+        assert [v.id for v in VehicleService.search_vehicles('ZZZ')] == [3]
+        assert SearchService.search('ABC', organization_unit_id=2)['total'] == 0
+
+        scoped = SearchService.search('AB', types=['vehicle'], organization_unit_id=1, page=2, per_page=1)
+        assert scoped['total'] == 2
+        assert len(scoped['results']) == 1
+
+    def test_search_endpoint_is_scoped_to_user_org(self, app):
+        """Non-admin users only get results from their organization unit"""
+        user = User(id=1, username='gestor', email='gestor@example.com', hashed_password='x',
+                    role=UserRole.FLEET_MANAGER, organization_unit_id=2)
+        db.session.add(user)
+        db.session.commit()
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+        response = client.get('/search/?q=AB&types=vehicle')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [r['label'] for r in data['results']] == ['9999XAB']
+        assert data['results'][0]['url'] == '/vehicles/3'
+
+    def test_list_search_returns_every_match(self, app):
+        """The list pages get all matches, not just the first thousand; unscoped users get none"""
+        db.session.add_all([
+            Vehicle(license_plate=f'{n:04d}FLT', make='Seat', model='Ibiza', year=2021,
+                    vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED, organization_unit_id=1)
+            for n in range(1005)
+        ])
+        db.session.add(User(id=1, username='usuario', email='usuario@example.com', hashed_password='x',
+                            role=UserRole.OPERATIONS_MANAGER))
+        db.session.commit()
+
+        assert len(VehicleService.search_vehicles('FLT')) == 1005
+        assert len(SearchService.search_ids('vehicle', 'FLT', limit=10)) == 10
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+        data = client.get('/search/?q=FLT&types=vehicle').get_json()
+        assert data['total'] == 0 and data['results'] == []
@@ -0,0 +1,96 @@
+"""
+Tests for the overdue status sweeper
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import (Vehicle, VehicleType, OwnershipType, Driver, DriverType, Fine, FineStatus, FineType,
+                        VehicleTax, TaxType, PaymentStatus, VehicleAssignment, AssignmentType, User, UserRole)
+from app.models.vehicle_assignment import PaymentStatus as AssignmentPaymentStatus
+from app.services.fine_service import FineService
+from app.services.status_sweeper_service import StatusSweeperService
+
+
+def _fine(id, deadline, status=FineStatus.PENDING):
+    return Fine(id=id, vehicle_id=1, fine_number=f'M-{id}', fine_type=FineType.PARKING, fine_date=deadline,
+                description='Multa', amount=100, payment_deadline=deadline, status=status)
+
+
+class TestStatusSweeper:
+    """Test the batched PENDING/OVERDUE transitions"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application with unpaid fines, taxes and assignments"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            now = datetime.now()
+            past, future = now - timedelta(days=3), now + timedelta(days=30)
+            db.session.add_all([
+                Vehicle(id=1, license_plate='1234ABC', make='Seat', model='Leon', year=2020,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED),
+                Driver(id=1, first_name='Ana', last_name='Abad', document_type='DNI', document_number='12345678Z',
+                       driver_license_number='L1', driver_license_expiry=future,
+                       driver_type=DriverType.OFFICIAL, email='ana@example.com'),
+                *[_fine(i, past) for i in range(1, 6)],
+                _fine(6, future),
+                _fine(7, past, FineStatus.PAID),
+                # Marked overdue before its deadline was extended
+                _fine(8, future, FineStatus.OVERDUE),
+                VehicleTax(id=1, vehicle_id=1, tax_type=TaxType.IVTM, tax_year=2025, amount=90, due_date=past),
+                VehicleAssignment(id=1, vehicle_id=1, driver_id=1, assignment_type=AssignmentType.TEMPORAL,
+                                  start_date=past - timedelta(days=10), end_date=past, assignment_fee=50,
+                                  purpose='Obra'),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_sweep_persists_overdue_status(self, app):
+        """Past-deadline pending rows become OVERDUE in batches; extended ones reopen"""
+        counts = StatusSweeperService.sweep(batch_size=2)
+        assert counts == {
+            'fines': {'overdue': 5, 'reopened': 1},
+            'taxes': {'overdue': 1, 'reopened': 0},
+            'assignments': {'overdue': 1, 'reopened': 0},
+        }
+
+        db.session.expire_all()
+        statuses = {f.id: f.status for f in Fine.query.all()}
+        assert [i for i, s in statuses.items() if s == FineStatus.OVERDUE] == [1, 2, 3, 4, 5]
+        assert statuses[6] == statuses[8] == FineStatus.PENDING
+        assert statuses[7] == FineStatus.PAID
+        assert db.session.get(VehicleTax, 1).payment_status == PaymentStatus.OVERDUE
+        assignment = db.session.get(VehicleAssignment, 1)
+        assert assignment.payment_status == AssignmentPaymentStatus.OVERDUE and assignment.is_overdue
+
+        # Idempotent
+        assert StatusSweeperService.sweep()['fines'] == {'overdue': 0, 'reopened': 0}
+
+    def test_overdue_and_pending_queries_include_swept_rows(self, app):
+        """Overdue queries see unswept rows; pending ones keep counting overdue rows"""
+        assert {f.id for f in FineService.get_overdue_fines()} == {1, 2, 3, 4, 5, 8}
+        StatusSweeperService.sweep()
+        assert {f.id for f in FineService.get_overdue_fines()} == {1, 2, 3, 4, 5}
+        assert {f.id for f in FineService.get_pending_fines()} == {1, 2, 3, 4, 5, 6, 8}
+        assert {f.id for f in FineService.get_all_fines(status=FineStatus.PENDING)} == {6, 8}
+
+    def test_overdue_records_can_be_paid_from_the_ui(self, app):
+        """Swept fines and taxes keep the pay action, show as overdue and keep their status in the form"""
+        StatusSweeperService.sweep()
+        db.session.add(User(id=1, username='admin', email='admin@example.com', hashed_password='x',
+                            role=UserRole.ADMIN))
+        db.session.commit()
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+
+        fine_page = client.get('/compliance/fines/1').get_data(as_text=True)
+        assert 'Marcar como Pagada' in fine_page
+        assert 'Vencida</span>' in fine_page and 'Multa Vencida' in fine_page
+        assert 'Marcar como Pagado' in client.get('/compliance/taxes/1').get_data(as_text=True)
+        assert 'value="con_retraso" selected' in client.get('/compliance/fines/1/edit').get_data(as_text=True)
@@ -0,0 +1,89 @@
+"""
+Tests for the template bytecode cache and the versioned fragment cache
+"""
+import os
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.controllers import main_controller
+from app.models import Vehicle, VehicleType, VehicleStatus, OwnershipType, OrganizationUnit, User, UserRole
+from app.services import template_cache_service
+from app.services.template_cache_service import FragmentCache, TemplateCacheService
+
+
+class TestTemplateCache:
+    """Test fragment hits, invalidation on writes and the cached calendar grid"""
+
+    @pytest.fixture
+    def app(self, tmp_path):
+        app = create_app('testing')
+        app.config['JINJA_BYTECODE_CACHE_DIR'] = str(tmp_path / 'jinja')
+        template_cache_service.init_template_cache(app)
+        FragmentCache.clear()
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                User(id=1, username='admin', email='admin@example.com', hashed_password='x', role=UserRole.ADMIN,
+                     organization_unit_id=1),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+        FragmentCache.clear()
+
+    def test_fragment_invalidated_by_write(self, app, monkeypatch):
+        """A fragment is rendered once, again after a write to a table it depends on or after its ttl"""
+        calls = []
+        template = app.jinja_env.from_string(
+            "{% cache 'count', 60, ['vehicles'] %}{{ load() }}{% endcache %}")
+
+        def load():
+            calls.append(1)
+            return Vehicle.query.count()
+
+        assert template.render(load=load) == '0'
+        assert template.render(load=load) == '0'
+        assert len(calls) == 1
+
+        db.session.add(Vehicle(id=1, license_plate='0001ABC', make='Seat', model='Leon', year=2020,
+                               vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED,
+                               status=VehicleStatus.AVAILABLE, organization_unit_id=1))
+        db.session.commit()
+        assert TemplateCacheService.versions(['vehicles']) == (1,)
+        assert template.render(load=load) == '1'
+        assert len(calls) == 2
+
+        # Past the ttl the fragment is rendered again without any write
+        now = template_cache_service.time.monotonic()
+        monkeypatch.setattr(template_cache_service.time, 'monotonic', lambda: now + 61)
+        assert template.render(load=load) == '1'
+        assert len(calls) == 3
+
+        with pytest.raises(ValueError):
+            app.jinja_env.from_string("{% cache 'x', 60, ['users'] %}{% endcache %}").render()
+
+    def test_calendar_grid_cached(self, app, monkeypatch):
+        """The calendar only queries the month on a miss; templates leave bytecode in the shared cache"""
+        calls = []
+        month_calendar = main_controller.month_calendar
+
+        def counted(year, month):
+            calls.append((year, month))
+            return month_calendar(year, month)
+
+        monkeypatch.setattr(main_controller, 'month_calendar', counted)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+
+        first = client.get('/calendar?year=2025&month=3')
+        second = client.get('/calendar?year=2025&month=3')
+        assert first.status_code == second.status_code == 200
+        assert first.data == second.data
+        assert calls == [(2025, 3)]
+
+        client.get('/calendar?year=2025&month=4')
+        assert calls == [(2025, 3), (2025, 4)]
+        assert os.listdir(app.config['JINJA_BYTECODE_CACHE_DIR'])
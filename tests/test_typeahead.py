@@ -0,0 +1,106 @@
+"""
+Tests for the in-memory typeahead index and endpoint
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import (Vehicle, VehicleType, VehicleStatus, OwnershipType, Driver, DriverType,
+                        OrganizationUnit, User, UserRole)
+from app.services.typeahead_service import TypeaheadService
+
+
+def _vehicle(id, plate, org, status=VehicleStatus.AVAILABLE):
+    return Vehicle(id=id, license_plate=plate, make='Seat', model='Leon', year=2020, status=status,
+                   vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED, organization_unit_id=org)
+
+
+class TestTypeahead:
+    """Test prefix lookups, incremental refresh and organization scoping"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application with two organization units"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                OrganizationUnit(id=2, name='Sur', code='S'),
+                _vehicle(1, '1234-ABC', 1),
+                _vehicle(2, '1299 XYZ', 1, status=VehicleStatus.MAINTENANCE),
+                _vehicle(3, '1200ABD', 2),
+                Driver(id=1, first_name='Álvaro', last_name='Núñez', document_type='DNI',
+                       document_number='12345678Z', driver_license_number='L1',
+                       driver_license_expiry=datetime.now() + timedelta(days=365),
+                       driver_type=DriverType.OFFICIAL, email='alvaro@example.com', organization_unit_id=1),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_prefix_lookup_is_normalized_and_filtered(self, app):
+        """Spaces, dashes, case and accents are ignored; scope and status filter the matches"""
+        assert [r['id'] for r in TypeaheadService.lookup('vehicle', '12')] == [3, 1, 2]
+        assert [r['id'] for r in TypeaheadService.lookup('vehicle', '12-34 a')] == [1]
+        assert [r['id'] for r in TypeaheadService.lookup('vehicle', '12', organization_unit_id=1)] == [1, 2]
+        assert [r['id'] for r in TypeaheadService.lookup('vehicle', '12', available_only=True)] == [3, 1]
+        assert TypeaheadService.lookup('vehicle', '12', limit=1)[0]['label'] == '1200ABD - Seat Leon'
+
+        # First name, last name first or document
+        for query in ('alvaro nu', 'NUÑEZ', '1234'):
+            assert [r['id'] for r in TypeaheadService.lookup('driver', query)] == [1]
+
+    def test_committed_writes_update_the_index(self, app):
+        """Flushed rows are applied on commit and discarded on rollback"""
+        assert TypeaheadService.lookup('vehicle', '77') == []
+
+        db.session.add(_vehicle(4, '7777KKK', 2))
+        db.session.flush()
+        db.session.rollback()
+        assert TypeaheadService.lookup('vehicle', '77') == []
+
+        db.session.add(_vehicle(4, '7777KKK', 2))
+        db.session.commit()
+        assert [r['id'] for r in TypeaheadService.lookup('vehicle', '77', organization_unit_id=2)] == [4]
+
+        vehicle = db.session.get(Vehicle, 1)
+        vehicle.license_plate = '8888LLL'
+        db.session.get(Vehicle, 3).is_active = False
+        db.session.commit()
+        assert [r['id'] for r in TypeaheadService.lookup('vehicle', '12')] == [2]
+        assert [r['id'] for r in TypeaheadService.lookup('vehicle', '8888')] == [1]
+
+    def test_endpoint_is_scoped_to_user_org(self, app):
+        """Roles below fleet manager only get matches from their organization unit"""
+        db.session.add(User(id=1, username='operador', email='op@example.com', hashed_password='x',
+                            role=UserRole.OPERATIONS_MANAGER, organization_unit_id=2))
+        db.session.commit()
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+
+        response = client.get('/search/typeahead?type=vehicle&q=12')
+        assert response.status_code == 200
+        assert response.get_json()['results'] == [{'id': 3, 'label': '1200ABD - Seat Leon'}]
+        assert client.get('/search/typeahead?type=provider&q=a').status_code == 400
+
+        # The form no longer embeds the fleet: the picker fetches matches
+        page = client.get('/reservations/new').get_data(as_text=True)
+        assert 'data-typeahead-url' in page
+        assert '1234-ABC' not in page
+
+    def test_endpoint_without_org_unit_returns_nothing(self, app):
+        """A scoped role without an organization unit gets no matches instead of the whole fleet"""
+        db.session.add(User(id=1, username='operador', email='op@example.com', hashed_password='x',
+                            role=UserRole.OPERATIONS_MANAGER))
+        db.session.commit()
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+        response = client.get('/search/typeahead?type=vehicle&q=12')
+        assert response.status_code == 200
+        assert response.get_json() == {'results': []}
@@ -0,0 +1,115 @@
+"""
+Tests for the fleet utilization report
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import (Vehicle, VehicleType, OwnershipType, Driver, DriverType, OrganizationUnit, Reservation,
+                        ReservationStatus, VehiclePickup, PickupStatus, User, UserRole)
+from app.services.utilization_service import UtilizationService
+
+START = datetime(2025, 3, 1)
+END = datetime(2025, 3, 11)  # 240 hours
+
+
+def _reservation(id, vehicle_id, start, hours, created=None, status=ReservationStatus.COMPLETED):
+    return Reservation(id=id, vehicle_id=vehicle_id, driver_id=1, user_id=1, organization_unit_id=1,
+                       start_date=start, end_date=start + timedelta(hours=hours), status=status,
+                       purpose='Servicio', created_at=created or start - timedelta(hours=24))
+
+
+def _pickup(reservation_id, vehicle_id, start, hours, km, status=PickupStatus.TAKEN):
+    return VehiclePickup(reservation_id=reservation_id, driver_id=1, vehicle_id=vehicle_id, pickup_status=status,
+                         pickup_time=start if status == PickupStatus.TAKEN else None,
+                         return_time=start + timedelta(hours=hours) if status == PickupStatus.TAKEN else None,
+                         start_mileage=1000 if km else None, end_mileage=1000 + km if km else None)
+
+
+class TestUtilization:
+    """Test the vectorized utilization metrics"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application with two vehicles and their reservations"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            day = START + timedelta(days=1)
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                OrganizationUnit(id=2, name='Sur', code='S'),
+                User(id=1, username='admin', email='admin@example.com', hashed_password='x', role=UserRole.ADMIN),
+                Vehicle(id=1, license_plate='1234ABC', make='Seat', model='Leon', year=2020,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED, organization_unit_id=1),
+                Vehicle(id=2, license_plate='5678DEF', make='Seat', model='Ibiza', year=2021,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED, organization_unit_id=2),
+                Driver(id=1, first_name='Ana', last_name='Abad', document_type='DNI', document_number='12345678Z',
+                       driver_license_number='L1', driver_license_expiry=datetime(2030, 1, 1),
+                       driver_type=DriverType.OFFICIAL, email='ana@example.com'),
+                # Vehicle 1: two overlapping trips (10h + 10h overlapping by 4h -> 16h) and a no-show
+                _reservation(1, 1, day, 10),
+                _pickup(1, 1, day, 10, 120),
+                _reservation(2, 1, day + timedelta(hours=6), 10, created=day - timedelta(hours=48)),
+                _pickup(2, 1, day + timedelta(hours=6), 10, 80),
+                _reservation(3, 1, day + timedelta(days=2), 8),
+                _pickup(3, 1, day + timedelta(days=2), 8, 0, PickupStatus.NOT_TAKEN),
+                # Vehicle 2: a trip starting before the period (only 12h inside) and a cancelled booking
+                _reservation(4, 2, START - timedelta(hours=12), 24),
+                _pickup(4, 2, START - timedelta(hours=12), 24, 300),
+                _reservation(5, 2, day, 48, status=ReservationStatus.CANCELLED),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_vehicle_and_unit_metrics(self, app):
+        """Overlaps count once, clipping to the period, no-shows and cancellations"""
+        report = UtilizationService.report(START, END)
+        first, second = report['vehicles']
+
+        assert first['used_hours'] == 16.0
+        assert first['utilization_pct'] == round(16 / 240 * 100, 1)
+        assert first['booked_pct'] == round(24 / 240 * 100, 1)  # 16h + the no-show's 8h
+        assert first['idle_hours'] == 224.0
+        assert first['km'] == 200
+        assert first['reservations'] == 3
+        assert first['avg_lead_hours'] == round((24 + 54 + 24) / 3, 1)
+        assert first['no_shows'] == 1 and first['no_show_rate_pct'] == round(100 / 3, 1)
+
+        assert second['used_hours'] == 12.0
+        assert second['km'] == 0  # trip started before the period
+        assert second['reservations'] == 0
+        assert second['no_show_rate_pct'] is None
+
+        assert [u['name'] for u in report['organization_units']] == ['Norte', 'Sur']
+        assert report['fleet']['vehicles'] == 2
+        assert report['fleet']['used_hours'] == 28.0
+        assert report['fleet']['utilization_pct'] == round(28 / 480 * 100, 1)
+
+    def test_organization_scope_and_api(self, app):
+        """Scoped reports only include the unit's vehicles; the JSON endpoint validates dates"""
+        report = UtilizationService.report(START, END, organization_unit_id=2)
+        assert [v['license_plate'] for v in report['vehicles']] == ['5678DEF']
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+        response = client.get('/reports/utilization.json?start=2025-03-01&end=2025-03-10')
+        assert response.status_code == 200
+        assert response.get_json()['fleet']['used_hours'] == 28.0
+        assert client.get('/reports/utilization.json?start=2025-03-10&end=2025-03-01').status_code == 400
+        assert client.get('/reports/utilization?start=2025-03-01&end=2025-03-10').status_code == 200
+
+    def test_scoped_user_without_unit_is_forbidden(self, app):
+        """An operations manager without an organization unit does not get the whole fleet"""
+        db.session.add(User(id=2, username='operador', email='operador@example.com', hashed_password='x',
+                            role=UserRole.OPERATIONS_MANAGER))
+        db.session.commit()
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '2'
+        for url in ('/reports/utilization', '/reports/utilization.json', '/reports/costs', '/reports/costs.json'):
+            assert client.get(url).status_code == 403
@@ -0,0 +1,101 @@
+"""
+Tests for the monthly vehicle cost rollup
+"""
+from datetime import date, datetime
+from decimal import Decimal
+import pytest
+from app.main import create_app
+from app.extensions import db
+from app.models import (Vehicle, VehicleType, OwnershipType, OrganizationUnit, MaintenanceRecord, MaintenanceType,
+                        MaintenanceStatus, Fine, FineType, FineStatus, RentingContract, VehicleCostMonthly,
+                        CostCategory, User, UserRole)
+from app.services.vehicle_cost_service import VehicleCostService
+
+
+def _costs():
+    return {(row.vehicle_id, row.month, row.category): row.amount
+            for row in VehicleCostMonthly.query.populate_existing().all()}
+
+
+class TestVehicleCosts:
+    """Test incremental maintenance and rebuild of vehicle_cost_monthly"""
+
+    @pytest.fixture
+    def app(self):
+        """Create test application with two vehicles and some costs"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                OrganizationUnit(id=1, name='Norte', code='N'),
+                OrganizationUnit(id=2, name='Sur', code='S'),
+                User(id=1, username='admin', email='admin@example.com', hashed_password='x', role=UserRole.ADMIN),
+                Vehicle(id=1, license_plate='1234ABC', make='Seat', model='Leon', year=2020,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.OWNED, organization_unit_id=1),
+                Vehicle(id=2, license_plate='5678DEF', make='Seat', model='Ibiza', year=2021,
+                        vehicle_type=VehicleType.CAR, ownership_type=OwnershipType.RENTING, organization_unit_id=2),
+                MaintenanceRecord(id=1, vehicle_id=1, maintenance_type=MaintenanceType.OIL_CHANGE,
+                                  status=MaintenanceStatus.COMPLETED, scheduled_date=datetime(2025, 1, 10),
+                                  completed_date=datetime(2025, 2, 3), cost=120, description='Aceite'),
+                MaintenanceRecord(id=2, vehicle_id=1, maintenance_type=MaintenanceType.REPAIR,
+                                  status=MaintenanceStatus.CANCELLED, scheduled_date=datetime(2025, 2, 10),
+                                  cost=999, description='Cancelada'),
+                RentingContract(id=1, vehicle_id=2, company_name='Renta', contract_number='R-1',
+                                start_date=datetime(2025, 1, 15), end_date=datetime(2025, 4, 14), monthly_cost=300),
+            ])
+            db.session.commit()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_writes_keep_rollup_current(self, app):
+        """Inserts, updates, deletes and vehicle moves are reflected at flush time"""
+        costs = _costs()
+        assert costs[(1, date(2025, 2, 1), CostCategory.MAINTENANCE)] == Decimal('120.00')
+        assert [m for (v, m, c) in costs if c == CostCategory.RENTING] == [
+            date(2025, 1, 1), date(2025, 2, 1), date(2025, 3, 1)]
+        assert len(costs) == 4  # cancelled maintenance ignored
+
+        fine = Fine(id=1, vehicle_id=1, fine_number='M-1', fine_type=FineType.PARKING,
+                    fine_date=datetime(2025, 2, 20), description='Multa', amount=80)
+        db.session.add(fine)
+        db.session.commit()
+        assert _costs()[(1, date(2025, 2, 1), CostCategory.FINE)] == Decimal('80.00')
+
+        fine.payment_amount = 40
+        db.session.commit()
+        assert _costs()[(1, date(2025, 2, 1), CostCategory.FINE)] == Decimal('40.00')
+
+        fine.status = FineStatus.DISMISSED
+        db.session.commit()
+        assert (1, date(2025, 2, 1), CostCategory.FINE) not in _costs()
+
+        db.session.get(Vehicle, 1).organization_unit_id = 2
+        db.session.commit()
+        assert {row.organization_unit_id for row in VehicleCostMonthly.query.populate_existing().all()} == {2}
+
+    def test_rebuild_and_totals(self, app):
+        """A rebuild restores the rollup; totals group by month, vehicle or unit"""
+        VehicleCostMonthly.query.delete()
+        db.session.commit()
+        assert VehicleCostService.rebuild() == {
+            'maintenance': 1, 'tax': 0, 'insurance': 0, 'fine': 0, 'assignment': 0, 'renting': 3}
+
+        by_month = VehicleCostService.totals(date(2025, 1, 1), date(2025, 2, 1))
+        assert [(row['key'], row['total']) for row in by_month] == [
+            (date(2025, 1, 1), Decimal('300.00')), (date(2025, 2, 1), Decimal('420.00'))]
+
+        report = VehicleCostService.report(date(2025, 1, 1), date(2025, 12, 1), by='organization_unit')
+        assert [(row['label'], row['total']) for row in report['rows']] == [('Norte', 120.0), ('Sur', 900.0)]
+        assert report['categories'] == {'maintenance': 120.0, 'renting': 900.0}
+        with pytest.raises(ValueError):
+            VehicleCostService.totals(date(2025, 1, 1), date(2025, 2, 1), by='driver')
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+        response = client.get('/reports/costs.json?start=2025-01&end=2025-12&by=vehicle')
+        assert response.status_code == 200
+        assert [row['label'] for row in response.get_json()['rows']] == ['1234ABC', '5678DEF']
+        assert client.get('/reports/costs.json?start=2025-12&end=2025-01').status_code == 400
+        assert client.get('/reports/costs?start=2025-01&end=2025-12').status_code == 200